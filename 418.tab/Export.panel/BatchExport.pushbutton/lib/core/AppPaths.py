@@ -3,6 +3,28 @@
 
 import os
 
+# Override explicite du dossier de données (tests : dossier temporaire).
+DATA_DIR_ENV = 'PY418_CONFIG_DIR'
+
+
+def data_dir():
+    """Dossier de données de l'utilisateur : journal, manifeste, historique
+    des durées, trace, plan et cache de rendu de l'export.
+
+    `PY418_CONFIG_DIR` s'il est défini, sinon %APPDATA%/418/BatchExport
+    (~/.418/BatchExport hors Windows). Jamais dans le dossier de
+    l'extension : il peut être en lecture seule, est remplacé à chaque mise
+    à jour pyRevit et partagé entre utilisateurs. Non créé ici : chaque
+    écriture crée son dossier."""
+    override = os.environ.get(DATA_DIR_ENV)
+    if override:
+        return override
+    appdata = os.environ.get('APPDATA')
+    if appdata:
+        return os.path.join(appdata, '418', 'BatchExport')
+    return os.path.join(os.path.expanduser('~'), '.418', 'BatchExport')
+
+
 class AppPaths(object):
     def __init__(self, base_dir=None):
         # base_dir = dossier lib/ (celui-ci)
@@ -28,6 +50,10 @@ class AppPaths(object):
     def config_manager_xaml(self):
         return os.path.join(self.gui_root(), 'Modals', 'ConfigManager.xaml')
 
+    # Retourne le dossier de données de l'utilisateur (cf. data_dir)
+    def data_dir(self):
+        return data_dir()
+
     # Retourne le chemin absolu d'une ressource XAML (Colors.xaml, Styles.xaml, etc)
     def resource_path(self, filename):
         return os.path.join(self.gui_root(), 'resources', filename)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Cache (run-scoped) du contenu des dossiers de destination.
+#
+# Sur un partage SMB chaque stat coûte 5 à 30 ms : la détection des fichiers
+# existants (un os.path.exists par feuille et par format), la recherche d'un
+# suffixe libre de DestinationStore.unique_path (" (1)", " (2)"... une
+# sonde par essai) et les ensure() répétés sur le même dossier finissaient
+# par dominer la durée d'un run.
+#
+# Ici : UNE énumération par dossier (os.scandir si dispo, sinon
+# os.listdir), puis toutes les questions sont résolues en mémoire. Le cache
+# est mis à jour par l'orchestrateur à chaque fichier qu'il écrit (add) ;
+# il ne voit pas les écritures d'autres processus pendant le run.
+
+from __future__ import unicode_literals
+
+import os
+
+
+def _listdir(folder):
+    scandir = getattr(os, 'scandir', None)
+    if scandir is not None:
+        it = scandir(folder)
+        try:
+            return [e.name for e in it]
+        finally:
+            close = getattr(it, 'close', None)
+            if close is not None:
+                close()
+    return os.listdir(folder)
+
+
+class DestinationListing(object):
+    def __init__(self, store=None):
+        # `store` : DestinationStore optionnel, utilisé pour ensure().
+        self._store = store
+        self._names = {}      # clé dossier -> set(noms normalisés)
+        self._ensured = {}    # clé dossier -> (ok, err)
+
+    # Clé de dossier / de nom : insensible à la casse là où le FS l'est (Windows)
+    @staticmethod
+    def _folder_key(folder):
+        return os.path.normcase(os.path.abspath(folder or u'.'))
+
+    @staticmethod
+    def _name_key(name):
+        return os.path.normcase(name)
+
+    def _listing(self, folder):
+        key = self._folder_key(folder)
+        names = self._names.get(key)
+        if names is None:
+            try:
+                names = set(self._name_key(n) for n in _listdir(folder))
+            except Exception:
+                names = set()
+            self._names[key] = names
+        return names
+
+    # Existence d'un fichier (en mémoire après la première énumération)
+    def exists(self, path):
+        folder, name = os.path.split(path)
+        return self._name_key(name) in self._listing(folder)
+
+    # Même contrat que DestinationStore.unique_path, sans sonde disque
+    def unique_path(self, path):
+        if not self.exists(path):
+            return path
+        folder, name = os.path.split(path)
+        names = self._listing(folder)
+        root, ext = os.path.splitext(name)
+        i = 1
+        while True:
+            cand = u"{} ({}){}".format(root, i, ext)
+            if self._name_key(cand) not in names:
+                return os.path.join(folder, cand)
+            i += 1
+
+    # Valide/crée le dossier une seule fois par run -> (ok: bool, err: str|None)
+    def ensure(self, folder):
+        key = self._folder_key(folder)
+        if key in self._ensured:
+            return self._ensured[key]
+        if self._store is not None:
+            res = self._store.ensure(folder)
+        else:
+            try:
+                if not folder:
+                    res = (False, 'chemin vide')
+                else:
+                    if not os.path.isdir(folder):
+                        os.makedirs(folder)
+                    res = (True, None)
+            except Exception as e:
+                res = (False, str(e))
+        self._ensured[key] = res
+        return res
+
+    # Mises à jour au fil des écritures de l'orchestrateur
+    def add(self, path):
+        folder, name = os.path.split(path)
+        self._listing(folder).add(self._name_key(name))
+
+    def discard(self, path):
+        folder, name = os.path.split(path)
+        self._listing(folder).discard(self._name_key(name))
+
+    def invalidate(self, folder=None):
+        if folder is None:
+            self._names.clear()
+            self._ensured.clear()
+            return
+        key = self._folder_key(folder)
+        self._names.pop(key, None)
+        self._ensured.pop(key, None)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Contexte de nommage figé pour un rafraîchissement ou un run d'export.
+#
+# Les jetons de date (`{date}`, `{date_jour}`…, anciens 'Date: Jour'…)
+# appelaient `datetime.now()` pour chaque jeton de chaque élément, et les
+# jetons projet (`{projet_nom}`…) relisaient ProjectInfo. Un run qui passe
+# minuit pouvait en outre mélanger deux dates dans un même carnet.
+#
+# Un `NamingContext` est créé UNE fois par refresh / run : l'horodatage est
+# figé à la création et les propriétés ProjectInfo (Name, Number,
+# ClientName, Status) sont lues d'emblée. NamingService et NamingResolver
+# le consultent : ces jetons deviennent de simples lectures de dictionnaire,
+# identiques pour toutes les feuilles du run.
+
+from __future__ import unicode_literals
+
+import datetime
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+PROJECT_PROPERTIES = ('Name', 'Number', 'ClientName', 'Status')
+
+# Jeton (ou ancien nom de paramètre système) -> format strftime.
+_DATE_FORMATS = {
+    'date': '%Y-%m-%d',
+    'date_jour': '%d',
+    'date_mois': '%m',
+    'date_annee': '%Y',
+    'Date: Jour': '%d',
+    'Date: Mois': '%m',
+    'Date: Année': '%Y',
+}
+
+
+def project_info_element(doc):
+    """Élément ProjectInfo de `doc`, ou None."""
+    if doc is None:
+        return None
+    try:
+        info = getattr(doc, 'ProjectInformation', None)
+        if info is not None:
+            return info
+    except Exception:
+        pass
+    if DB is None:
+        return None
+    try:
+        found = DB.FilteredElementCollector(doc).OfClass(DB.ProjectInfo).ToElements()
+        if found and len(found) > 0:
+            return found[0]
+    except Exception:
+        pass
+    return None
+
+
+class NamingContext(object):
+    """Horodatage et propriétés ProjectInfo figés pour un refresh / un run.
+
+    `now` : instant de référence (défaut : création du contexte) ;
+    `project_info` : élément ProjectInfo (défaut : celui de `doc`)."""
+
+    __slots__ = ('now', '_dates', '_project')
+
+    def __init__(self, doc=None, now=None, project_info=None):
+        self.now = now or datetime.datetime.now()
+        self._dates = {}
+        for key, fmt in _DATE_FORMATS.items():
+            try:
+                self._dates[key] = self.now.strftime(fmt)
+            except Exception:
+                self._dates[key] = ''
+        if project_info is None:
+            project_info = project_info_element(doc)
+        self._project = {}
+        for prop in PROJECT_PROPERTIES:
+            val = ''
+            if project_info is not None:
+                try:
+                    raw = getattr(project_info, prop, None)
+                    if raw is not None and type(raw).__name__ in ('str', 'unicode'):
+                        val = raw
+                except Exception:
+                    val = ''
+            self._project[prop] = val
+
+    def date_part(self, kind):
+        """Partie de date figée pour `kind` ('date', 'date_jour', …, ou
+        'Date: Jour', …) ; None si `kind` n'est pas un jeton de date."""
+        return self._dates.get(kind)
+
+    def project_property(self, prop_name):
+        """Propriété ProjectInfo figée (u'' si absente)."""
+        val = self._project.get(prop_name)
+        if val is None:
+            return ''
+        return val
@@ -10,10 +10,32 @@ try:
 except Exception:
     DB = None  # type: ignore
 
+try:
+    from lib.data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+except Exception:
+    try:
+        from ..sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+    except Exception:
+        SESSION_SNAPSHOT = None  # type: ignore
+        scope_key = None  # type: ignore
+
+try:
+    from lib.data.naming.NamingContext import NamingContext  # type: ignore
+except Exception:
+    try:
+        from .NamingContext import NamingContext  # type: ignore
+    except Exception:
+        NamingContext = None  # type: ignore
+
 class NamingResolver(object):
-    def __init__(self, doc=None):
+    def __init__(self, doc=None, context=None):
         self._doc = doc
         self._project_params_cache = None
+        # Date figée pour le refresh / run (cf. NamingContext), créée au premier besoin
+        self._context = context
+        # Valeurs de paramètres partagées (cf. ParameterSnapshot)
+        self._snapshot = SESSION_SNAPSHOT
+        self._scope = scope_key(doc) if scope_key is not None else u''
 
         # Exemple pythonnet typique:
         #   <Autodesk.Revit.DB.WallType object at 0x00000123456789AB>
@@ -145,18 +167,18 @@ class NamingResolver(object):
 
     def _get_system_param_value(self, param_name):
         """Retourne la valeur d'un paramètre système (Date)."""
-        try:
-            from datetime import datetime
-            now = datetime.now()
-            if param_name == 'Date: Jour':
-                return now.strftime('%d')
-            elif param_name == 'Date: Mois':
-                return now.strftime('%m')
-            elif param_name == 'Date: Année':
-                return now.strftime('%Y')
-        except Exception:
-            pass
-        return None
+        if param_name not in ('Date: Jour', 'Date: Mois', 'Date: Année'):
+            return None
+        if self._context is None and NamingContext is not None:
+            try:
+                self._context = NamingContext(self._doc)
+            except Exception:
+                return None
+        return self._context.date_part(param_name) if self._context is not None else None
+
+    def use_context(self, context):
+        """Partage le contexte (date figée) d'un refresh / run."""
+        self._context = context
 
     def _get_param_value(self, elem, param_name):
         """Retourne une représentation chaîne du paramètre nommé sur l'élément, si trouvé."""
@@ -166,7 +188,17 @@ class NamingResolver(object):
             return sys_val
 
         val = ''
-        
+
+        # 1-3. Paramètre ou propriété de l'élément, via l'instantané partagé
+        if self._snapshot is not None:
+            try:
+                val = self._snapshot.text(elem, param_name, self._scope)
+                if val:
+                    return val
+                return self._get_project_param_value(param_name)
+            except Exception:
+                pass
+
         # 1. Essayer LookupParameter (plus fiable et rapide)
         try:
             p = elem.LookupParameter(param_name)
@@ -208,6 +240,13 @@ class NamingResolver(object):
 
     # Construit une chaîne résolue pour un élément
     def resolve_for_element(self, elem, rows, empty_fallback=True):
+        if self._snapshot is not None and elem is not None:
+            # Tous les paramètres des rows lus ensemble
+            try:
+                names = [(r.get('Name', '') or '').strip() for r in rows or []]
+                self._snapshot.read(elem, [n for n in names if n], self._scope)
+            except Exception:
+                pass
         parts = []
         for r in rows or []:
             token = (r.get('Name', '') or '').strip()
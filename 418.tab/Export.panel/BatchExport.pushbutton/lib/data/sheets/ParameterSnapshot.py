@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Instantané des valeurs de paramètres par élément (nommage, drapeaux).
+#
+# Résoudre un nom de fichier passait, pour CHAQUE jeton et chaque feuille,
+# par LookupParameter, puis une itération complète de `elem.Parameters`,
+# puis `hasattr`, avant le repli ProjectInfo. Un motif à 6 jetons sur
+# 2 000 feuilles : des dizaines de milliers d'allers-retours interop, et
+# autant à chaque rafraîchissement ou export.
+#
+# Ici, les paramètres d'un élément sont lus une fois pour les SEULS noms
+# demandés (ceux du motif compilé) : LookupParameter par nom, puis une
+# unique itération de `Parameters` pour l'ensemble des noms restants. Les
+# valeurs sont mémorisées par (portée = document, id d'élément) et
+# partagées par NamingService, NamingResolver et
+# SheetCollectionService.read_flag.
+#
+# Invalidation explicite (`invalidate`) : la fenêtre d'export est modale et
+# n'écrit aucun paramètre, donc l'instantané est vidé à l'ouverture de la
+# fenêtre (MainViewModel) et au début de chaque run (ExportOrchestrator).
+# Un élément sans Id (objets de test) n'est jamais mis en cache.
+
+from __future__ import unicode_literals
+
+import threading
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+TEXT = 'text'
+FLAG = 'flag'
+_ABSENT = object()
+
+
+def scope_key(doc):
+    """Portée d'un document (chemin, sinon titre) ; u'' sans document."""
+    if doc is None:
+        return u''
+    for attr in ('PathName', 'Title'):
+        try:
+            val = getattr(doc, attr, None)
+            if val:
+                return u'{}'.format(val)
+        except Exception:
+            continue
+    return u'doc:{}'.format(id(doc))
+
+
+def _element_key(elem):
+    # `.Value` (Revit 2024+) sinon `.IntegerValue` ; None = pas de cache.
+    try:
+        eid = getattr(elem, 'Id', None)
+    except Exception:
+        return None
+    if eid is None:
+        return None
+    for attr in ('Value', 'IntegerValue'):
+        try:
+            val = getattr(eid, attr, None)
+            if isinstance(val, int) or type(val).__name__ == 'long':
+                return val
+        except Exception:
+            continue
+    return None
+
+
+def text_value(param):
+    """Valeur texte d'un paramètre (AsString, AsValueString, puis selon
+    StorageType) ; u'' si vide ou illisible."""
+    if not param:
+        return ''
+    try:
+        s = param.AsString()
+        if s is not None and len(s) > 0:
+            return s
+    except Exception:
+        pass
+    try:
+        vs = param.AsValueString()
+        if vs:
+            return vs
+    except Exception:
+        pass
+    try:
+        if DB:
+            st = param.StorageType
+            if st == DB.StorageType.Integer:
+                return str(param.AsInteger())
+            elif st == DB.StorageType.Double:
+                return "{:.3f}".format(param.AsDouble())
+            elif st == DB.StorageType.String:
+                return param.AsString() or ''
+            elif st == DB.StorageType.ElementId:
+                eid = param.AsElementId()
+                return str(eid.IntegerValue) if eid else ''
+    except Exception:
+        pass
+    return ''
+
+
+def flag_value(param):
+    """Paramètre Oui/Non : `AsInteger() == 1`."""
+    try:
+        return param.AsInteger() == 1
+    except Exception:
+        return False
+
+
+class ParameterSnapshot(object):
+    def __init__(self):
+        self._entries = {}  # (portée, id élément) -> {(type, nom): valeur | _ABSENT}
+        self._lock = threading.Lock()
+        self.reads = 0  # éléments effectivement lus (hors cache)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def text(self, elem, name, scope=u''):
+        """Valeur texte du paramètre `name` (ou propriété texte du même nom),
+        None si absente ou vide."""
+        return self.read(elem, [name], scope, TEXT).get(name)
+
+    def flag(self, elem, name, scope=u''):
+        """Paramètre Oui/Non `name` : True/False, None si absent."""
+        return self.read(elem, [name], scope, FLAG).get(name)
+
+    def read(self, elem, names, scope=u'', kind=TEXT):
+        """`{nom: valeur}` pour `names` ; les noms absents valent None. Les
+        noms déjà lus pour cet élément ne sont pas relus."""
+        if elem is None:
+            return dict((n, None) for n in names or [])
+        key = _element_key(elem)
+        entry = None
+        if key is not None:
+            with self._lock:
+                entry = self._entries.setdefault((scope or u'', key), {})
+                cached = dict(((kind, n), entry[(kind, n)]) for n in names or [] if (kind, n) in entry)
+        else:
+            cached = {}
+        missing = [n for n in names or [] if n and (kind, n) not in cached]
+        if missing:
+            fresh = self._read_element(elem, missing, kind)
+            for n in missing:
+                cached[(kind, n)] = fresh.get(n, _ABSENT)
+            if entry is not None:
+                with self._lock:
+                    entry.update(cached)
+        out = {}
+        for n in names or []:
+            val = cached.get((kind, n), _ABSENT)
+            out[n] = None if val is _ABSENT else val
+        return out
+
+    def _read_element(self, elem, names, kind):
+        self.reads += 1
+        extract = flag_value if kind == FLAG else text_value
+        found = {}
+        # 1. LookupParameter, un appel par nom demandé.
+        lookup = getattr(elem, 'LookupParameter', None)
+        for name in names:
+            try:
+                p = lookup(name) if callable(lookup) else None
+            except Exception:
+                p = None
+            if p is None:
+                continue
+            val = extract(p)
+            if kind == FLAG or val:
+                found[name] = val
+        # 2. Une seule itération de Parameters pour tous les noms restants.
+        rest = set(n for n in names if n not in found)
+        if rest:
+            try:
+                params = getattr(elem, 'Parameters', None)
+                for p in params or []:
+                    try:
+                        d = getattr(p, 'Definition', None)
+                        pname = getattr(d, 'Name', '') if d else ''
+                        if pname not in rest:
+                            continue
+                        val = extract(p)
+                        if kind == FLAG or val:
+                            found[pname] = val
+                            rest.discard(pname)
+                            if not rest:
+                                break
+                    except Exception:
+                        continue
+            except Exception:
+                pass
+        # 3. Propriété texte directe (ex. 'Name' d'une SheetCollection).
+        if kind == TEXT:
+            for name in list(rest):
+                try:
+                    if hasattr(elem, name):
+                        val = getattr(elem, name)
+                        if val and type(val).__name__ in ('str', 'unicode'):
+                            found[name] = val
+                except Exception:
+                    continue
+        return found
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, scope=None, elem=None):
+        """Oublie un élément (`elem`), une portée (`scope`) ou tout."""
+        with self._lock:
+            if elem is not None:
+                key = _element_key(elem)
+                for k in [k for k in self._entries if k[1] == key and (scope is None or k[0] == scope)]:
+                    del self._entries[k]
+            elif scope is not None:
+                for k in [k for k in self._entries if k[0] == scope]:
+                    del self._entries[k]
+            else:
+                self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Instantané de la session (durée de vie du moteur Python).
+SESSION_SNAPSHOT = ParameterSnapshot()
@@ -23,6 +23,7 @@ class ConfigManagerService(object):
     KEYS = [
         'separate_format_folders',
         'create_subfolders',
+        'sheet_param_exportationcombo',
         'sheet_param_carnetcombo',
         'sheet_param_dwgcombo',
         'pattern_sheet',
@@ -167,6 +168,37 @@ class ConfigManagerService(object):
                 ok = False
         return ok
 
+    def capture_current_config(self):
+        """Snapshot of the current UserConfig values (KEYS only)."""
+        return self._capture_current_config()
+
+    def restore_config(self, data):
+        """Re-applies a snapshot taken with capture_current_config()."""
+        return self._apply_config(data)
+
+    def get_active_profile_key(self):
+        """Key of the active profile ('' if none)."""
+        return self._get_active_profile_key()
+
+    def set_active_profile_key(self, key):
+        """Marks `key` as the active profile (profil.json + UserConfig)
+        without applying its values (see restore_config)."""
+        key = self._normalize_profile_key(key) or ''
+        schema = self._read_schema()
+        schema['active_profile_key'] = key
+        wrote = self._atomic_write_json(self._profiles_json_path(), schema)
+        if wrote:
+            self._set_active_profile_key(key)
+        return wrote
+
+    def get_profile_data(self, name):
+        """Stored values of profile `name` ({} if unknown)."""
+        profile = self.get_profiles().get(self._normalize_profile_key(name))
+        if not isinstance(profile, dict):
+            return {}
+        data = profile.get('data', {})
+        return data if isinstance(data, dict) else {}
+
     def _set_active_profile_key(self, key):
         # Persist both in JSON and UserConfig (requested)
         if self._cfg is None:
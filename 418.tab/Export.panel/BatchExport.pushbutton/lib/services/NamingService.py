@@ -14,11 +14,23 @@
 # (compat) : `resolve_for_element` accepte toujours une liste, et
 # `build_pattern(rows)` continue de produire une chaîne `{Name}` à partir de
 # rows, réutilisable telle quelle par le nouveau résolveur de jetons.
+#
+# Compilation : un pattern est analysé UNE fois (`compile`) en une suite
+# plate de segments littéraux et de résolveurs pré-liés ; `evaluate(elem)`
+# ne fait plus que les concaténer. Les patterns compilés sont mémorisés par
+# (pattern, kind) dans un petit cache LRU partagé (cf. `_PatternLRU`).
+# `resolve_many` applique un pattern à toute une liste d'éléments (aperçus,
+# plan d'export) et signale au passage les noms vides et les doublons.
+#
+# Dates et propriétés projet : lues dans un `NamingContext` figé une fois
+# par refresh / run (`new_context`), pas à chaque jeton.
 
 from __future__ import unicode_literals
 
 import json
 import re
+import threading
+from collections import OrderedDict
 
 try:
     from Autodesk.Revit import DB  # type: ignore
@@ -33,6 +45,23 @@ except Exception:
     except Exception:
         UserConfig = None  # type: ignore
 
+try:
+    from lib.data.naming.NamingContext import NamingContext  # type: ignore
+except Exception:
+    try:
+        from data.naming.NamingContext import NamingContext  # type: ignore
+    except Exception:
+        NamingContext = None  # type: ignore
+
+try:
+    from lib.data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+except Exception:
+    try:
+        from data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+    except Exception:
+        SESSION_SNAPSHOT = None  # type: ignore
+        scope_key = None  # type: ignore
+
 
 _TOKEN_RE = re.compile(r'\{([^{}]*)\}')
 
@@ -44,6 +73,210 @@ _SIMPLE_TOKENS = (
     'projet_nom', 'projet_numero', 'projet_client', 'projet_statut',
 )
 
+_COMPILED_MAX = 64  # patterns compilés gardés en mémoire (LRU)
+
+try:
+    _TEXT_TYPES = (str, unicode)  # type: ignore  # IronPython 2.7
+except NameError:
+    _TEXT_TYPES = (str,)
+
+
+def _guarded(fn):
+    # Un résolveur ne lève jamais : valeur introuvable/invalide -> ''.
+    def resolve(service, elem):
+        try:
+            return fn(service, elem)
+        except Exception:
+            return ''
+    return resolve
+
+
+def _param_resolver(name):
+    resolve = _guarded(lambda s, e: s._sanitize_resolved_value(s._get_param_value(e, name)))
+    resolve.param_name = name
+    return resolve
+
+
+def _project_param_resolver(name):
+    return _guarded(lambda s, e: s._sanitize_resolved_value(s._get_project_param_value(name)))
+
+
+def _simple_resolver(lowered):
+    return _guarded(lambda s, e: s._resolve_simple_token(e, lowered))
+
+
+def _compile_token(token_body):
+    """Segment pour le contenu d'un `{...}` : chaîne (littéral) ou résolveur
+    `f(service, elem)`. Mêmes règles que `NamingService._resolve_token`."""
+    stripped = (token_body or '').strip()
+    if not stripped:
+        return ''
+    if ':' in stripped:
+        keyword, _, arg = stripped.partition(':')
+        keyword_l = keyword.strip().lower()
+        if keyword_l == 'param':
+            return _param_resolver(arg.strip())
+        if keyword_l == 'param_projet':
+            return _project_param_resolver(arg.strip())
+        return _param_resolver(stripped)
+    lowered = stripped.lower()
+    if lowered in _SIMPLE_TOKENS:
+        return _simple_resolver(lowered)
+    return _param_resolver(stripped)
+
+
+class CompiledPattern(object):
+    """Pattern analysé une fois : suite plate de segments, littéraux
+    (chaînes) ou résolveurs pré-liés `f(service, elem)`.
+
+    Obtenu via `NamingService.compile(pattern, kind)` (lié au service, donc
+    au document) ; `evaluate(elem)` résout contre un élément, avec le même
+    résultat que `resolve_for_element`. Ne lève jamais."""
+
+    __slots__ = ('source', 'kind', '_segments', '_service', 'param_names')
+
+    def __init__(self, source, segments, kind='sheet', service=None):
+        self.source = source
+        self.kind = kind
+        self._segments = tuple(segments)
+        self._service = service
+        # Paramètres lus sur l'élément : lus ensemble (cf. ParameterSnapshot).
+        names = []
+        for seg in self._segments:
+            name = getattr(seg, 'param_name', None)
+            if name and name not in names:
+                names.append(name)
+        self.param_names = tuple(names)
+
+    @classmethod
+    def parse(cls, pattern, kind='sheet'):
+        segments = []
+        literal = []
+        pos = 0
+        for m in _TOKEN_RE.finditer(pattern):
+            literal.append(pattern[pos:m.start()])
+            seg = _compile_token(m.group(1))
+            if isinstance(seg, _TEXT_TYPES):
+                literal.append(seg)
+            else:
+                if ''.join(literal):
+                    segments.append(''.join(literal))
+                literal = []
+                segments.append(seg)
+            pos = m.end()
+        literal.append(pattern[pos:])
+        if ''.join(literal):
+            segments.append(''.join(literal))
+        return cls(pattern, segments, kind=kind)
+
+    def bind(self, service):
+        """Même pattern, résolu avec `service` (document, caches projet)."""
+        return CompiledPattern(self.source, self._segments, kind=self.kind, service=service)
+
+    @property
+    def is_constant(self):
+        """Aucun jeton à résoudre (nom identique pour tous les éléments)."""
+        return all(isinstance(seg, _TEXT_TYPES) for seg in self._segments)
+
+    def evaluate(self, elem):
+        if self.param_names and self._service is not None:
+            self._service._prefetch(elem, self.param_names)
+        return self._render(elem)
+
+    def evaluate_many(self, elems):
+        """Noms de `elems` (même ordre) : paramètres du pattern lus en une
+        passe sur tous les éléments, puis concaténation élément par élément."""
+        elems = list(elems or [])
+        service = self._service
+        if self.param_names and service is not None:
+            for elem in elems:
+                service._prefetch(elem, self.param_names)
+        if self.is_constant:
+            constant = ''.join(self._segments)
+            return [constant for _elem in elems]
+        return [self._render(elem) for elem in elems]
+
+    def _render(self, elem):
+        service = self._service
+        try:
+            return ''.join([seg if isinstance(seg, _TEXT_TYPES) else seg(service, elem)
+                            for seg in self._segments])
+        except Exception:
+            return ''
+
+
+class ResolvedNames(list):
+    """Noms résolus par `NamingService.resolve_many`, dans l'ordre des
+    éléments, avec le bilan du lot :
+
+      - `empty` : positions des noms vides (ou blancs) ;
+      - `duplicates` : `{nom: [positions]}` des noms produits plusieurs
+        fois (comparaison insensible à la casse, comme les noms de fichiers
+        sous Windows ; clé = première graphie rencontrée).
+    """
+
+    def __init__(self, names=()):
+        list.__init__(self, names)
+        self.empty = []
+        self.duplicates = OrderedDict()
+        seen = OrderedDict()
+        for pos, name in enumerate(self):
+            if not name or not name.strip():
+                self.empty.append(pos)
+                continue
+            seen.setdefault(name.lower(), []).append(pos)
+        for positions in seen.values():
+            if len(positions) > 1:
+                self.duplicates[self[positions[0]]] = positions
+
+    @property
+    def has_issues(self):
+        return bool(self.empty or self.duplicates)
+
+
+class _PatternLRU(object):
+    """Cache LRU (borné) des patterns compilés, partagé par les services."""
+
+    def __init__(self, maxsize=_COMPILED_MAX):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            compiled = self._entries.pop(key, None)
+            if compiled is not None:
+                self._entries[key] = compiled  # le plus récent en dernier
+                self.hits += 1
+                return compiled
+        compiled = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = compiled
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_COMPILED = _PatternLRU()
+
+
+def _rows_key(rows):
+    try:
+        return tuple((r.get('Name', '') or '', r.get('Prefix', '') or '', r.get('Suffix', '') or '')
+                     for r in rows)
+    except Exception:
+        return None
+
 
 class NamingService(object):
     """Résout des patterns de nommage et persiste les patterns utilisateur.
@@ -92,10 +325,13 @@ class NamingService(object):
     _ROWS_KEY = {'sheet': 'pattern_sheet_rows', 'set': 'pattern_set_rows'}
     _PRESETS_KEY = 'naming_presets'
 
-    def __init__(self, doc=None, config=None, namespace='batch_export'):
+    def __init__(self, doc=None, config=None, namespace='batch_export', context=None):
         self._doc = doc
         self._project_params_cache = None
         self._project_info_elem_cache = None
+        self._context = context  # NamingContext (paresseux, cf. `context`)
+        self._snapshot = SESSION_SNAPSHOT
+        self._scope = None  # portée du document dans l'instantané (paresseux)
         if config is not None:
             self._cfg = config
         elif UserConfig is not None:
@@ -107,6 +343,30 @@ class NamingService(object):
     # Résolution
     # ------------------------------------------------------------------
 
+    @property
+    def context(self):
+        """`NamingContext` en vigueur (créé au premier besoin)."""
+        if self._context is None and NamingContext is not None:
+            self.new_context()
+        return self._context
+
+    def new_context(self, now=None):
+        """Fige un nouveau contexte (horodatage, ProjectInfo) : à appeler au
+        début de chaque refresh / run. Retourne le contexte, None si le
+        module est indisponible."""
+        if NamingContext is None:
+            return None
+        try:
+            self._context = NamingContext(self._doc, now=now,
+                                          project_info=self._get_project_info_elem())
+        except Exception:
+            self._context = None
+        return self._context
+
+    def use_context(self, context):
+        """Partage un contexte existant (ex. celui du run d'export)."""
+        self._context = context
+
     def resolve_for_element(self, elem, pattern):
         """Résout `pattern` contre `elem`.
 
@@ -116,21 +376,56 @@ class NamingService(object):
             convertie via `build_pattern` puis résolue comme une chaîne.
 
         Une valeur de jeton introuvable/invalide résout en chaîne vide.
-        Ne lève jamais : retourne '' en cas d'échec inattendu.
+        Ne lève jamais : retourne '' en cas d'échec inattendu. Pour résoudre
+        un même pattern sur de nombreux éléments : `resolve_many`.
         """
+        compiled = self.compile(pattern)
+        return compiled.evaluate(elem) if compiled is not None else ''
+
+    def compile(self, pattern, kind='sheet'):
+        """`CompiledPattern` lié à ce service pour `pattern` (chaîne à
+        jetons ou rows), mémorisé par (pattern, kind). None si `pattern`
+        est inexploitable."""
         try:
             if isinstance(pattern, (list, tuple)):
-                pattern = self.build_pattern(pattern)
-            pattern = pattern or ''
-            if not isinstance(pattern, (str, type(u''))):
-                pattern = str(pattern)
+                rows = pattern
+                key = _rows_key(rows)
+                build = lambda: CompiledPattern.parse(self.build_pattern(rows), kind)
+                if key is None:
+                    return build().bind(self)
+                key = ('rows', kind, key)
+            else:
+                text = pattern or ''
+                if not isinstance(text, _TEXT_TYPES):
+                    text = str(text)
+                key = ('text', kind, text)
+                build = lambda: CompiledPattern.parse(text, kind)
+            return _COMPILED.get(key, build).bind(self)
         except Exception:
-            return ''
+            return None
 
+    def resolve_many(self, elems, pattern, kind='sheet', transform=None):
+        """Résout `pattern` contre chaque élément de `elems` : pattern compilé
+        une fois, paramètres requis lus en une passe (cf. ParameterSnapshot),
+        puis `ResolvedNames` (liste de noms, même ordre, + `empty` /
+        `duplicates`). `transform(nom)` (ex. nettoyage pour le système de
+        fichiers) est appliqué avant le bilan. Ne lève jamais : noms vides
+        si le pattern est inexploitable."""
+        elems = list(elems or [])
+        compiled = self.compile(pattern, kind)
         try:
-            return _TOKEN_RE.sub(lambda m: self._resolve_token(elem, m.group(1)), pattern)
+            names = compiled.evaluate_many(elems) if compiled is not None else [''] * len(elems)
         except Exception:
-            return ''
+            names = [''] * len(elems)
+        if transform is not None:
+            out = []
+            for name in names:
+                try:
+                    out.append(transform(name) if name else name)
+                except Exception:
+                    out.append(name)
+            names = out
+        return ResolvedNames(names)
 
     def _resolve_token(self, elem, token_body):
         """Résout le contenu d'un `{...}` (sans les accolades) en chaîne."""
@@ -262,20 +557,9 @@ class NamingService(object):
         return self._get_param_value(elem, 'Title')
 
     def _get_date_part(self, kind):
-        try:
-            from datetime import datetime
-            now = datetime.now()
-            if kind == 'date':
-                return now.strftime('%Y-%m-%d')
-            if kind == 'date_jour':
-                return now.strftime('%d')
-            if kind == 'date_mois':
-                return now.strftime('%m')
-            if kind == 'date_annee':
-                return now.strftime('%Y')
-        except Exception:
-            pass
-        return ''
+        context = self.context
+        val = context.date_part(kind) if context is not None else None
+        return val or ''
 
     def _get_project_info_elem(self):
         """Retourne l'élément ProjectInfo brut (mis en cache), ou None."""
@@ -295,7 +579,11 @@ class NamingService(object):
     def _get_project_info_property(self, prop_name):
         """Lit une propriété .NET directe de ProjectInfo (Name, Number,
         ClientName, Status) -- indépendant de la langue Revit, à la
-        différence d'un lookup par nom de paramètre localisé."""
+        différence d'un lookup par nom de paramètre localisé. Valeurs figées
+        dans le contexte du refresh / run."""
+        context = self.context
+        if context is not None:
+            return context.project_property(prop_name)
         elem = self._get_project_info_elem()
         if elem is None:
             return ''
@@ -478,6 +766,19 @@ class NamingService(object):
     # Extraction de valeur paramètre (robuste, ordre de repli)
     # ------------------------------------------------------------------
 
+    def _snapshot_scope(self):
+        if self._scope is None:
+            self._scope = scope_key(self._doc) if scope_key is not None else u''
+        return self._scope
+
+    def _prefetch(self, elem, names):
+        """Lit ensemble les paramètres `names` de `elem` (instantané)."""
+        if self._snapshot is not None and elem is not None:
+            try:
+                self._snapshot.read(elem, names, self._snapshot_scope())
+            except Exception:
+                pass
+
     def _get_param_value(self, elem, param_name):
         """Retourne la valeur du paramètre nommé pour `elem`, via repli successif."""
         # 0. Paramètres système (Date)
@@ -485,6 +786,16 @@ class NamingService(object):
         if sys_val is not None:
             return sys_val
 
+        # 1-3. Paramètre ou propriété de l'élément, via l'instantané partagé
+        if self._snapshot is not None:
+            try:
+                val = self._snapshot.text(elem, param_name, self._snapshot_scope())
+                if val:
+                    return val
+                return self._get_project_param_value(param_name)
+            except Exception:
+                pass
+
         # 1. LookupParameter (le plus fiable/rapide)
         try:
             p = elem.LookupParameter(param_name)
@@ -564,18 +875,10 @@ class NamingService(object):
 
     def _get_system_param_value(self, param_name):
         """Retourne la valeur d'un paramètre système (Date), ou None si non concerné."""
-        try:
-            from datetime import datetime
-            now = datetime.now()
-            if param_name == 'Date: Jour':
-                return now.strftime('%d')
-            elif param_name == 'Date: Mois':
-                return now.strftime('%m')
-            elif param_name == 'Date: Année':
-                return now.strftime('%Y')
-        except Exception:
-            pass
-        return None
+        if param_name not in ('Date: Jour', 'Date: Mois', 'Date: Année'):
+            return None
+        context = self.context
+        return context.date_part(param_name) if context is not None else None
 
     def _get_project_param_value(self, param_name):
         """Retourne la valeur d'un paramètre du projet (ProjectInformation)."""
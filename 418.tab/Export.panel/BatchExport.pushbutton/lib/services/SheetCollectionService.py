@@ -23,6 +23,15 @@ except Exception:
     except Exception:
         UserConfig = None  # type: ignore
 
+try:
+    from lib.data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+except Exception:
+    try:
+        from data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key  # type: ignore
+    except Exception:
+        SESSION_SNAPSHOT = None  # type: ignore
+        scope_key = None  # type: ignore
+
 
 class SheetCollectionService(object):
     """Accès en lecture aux collections de feuilles (carnets) et à leurs feuilles.
@@ -324,6 +333,12 @@ class SheetCollectionService(object):
         """
         if elem is None or not param_name:
             return False
+        if SESSION_SNAPSHOT is not None:
+            # Instantané partagé (cf. ParameterSnapshot) : lu une fois par élément.
+            try:
+                return bool(SESSION_SNAPSHOT.flag(elem, param_name, scope_key(self._doc)))
+            except Exception:
+                pass
         param = None
         try:
             lookup = getattr(elem, 'LookupParameter', None)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Jeton d'annulation coopérative d'un run d'export.
+#
+# L'interface (ou tout autre thread) appelle `cancel()` ; l'orchestrateur
+# consulte `cancelled` entre deux éléments et entre deux étapes. Un
+# `doc.Export` en cours n'est jamais interrompu : il se termine, puis le
+# run s'arrête proprement (pipeline post-export vidé, dossiers de transit
+# supprimés, journal laissé en état « interrompu » pour la reprise).
+
+from __future__ import unicode_literals
+
+import threading
+
+
+class CancellationToken(object):
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = u''
+
+    def cancel(self, reason=u''):
+        """Demande l'arrêt du run (idempotent ; la première raison est gardée)."""
+        if not self._event.is_set():
+            self.reason = reason or u''
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Contrôle d'espace disque avant export.
+#
+# Un export qui remplit le partage du projet s'arrête à mi-course. Avant le
+# premier doc.Export, la taille des sorties est estimée depuis l'historique
+# (octets par feuille, par setup / format / classe de taille, cf.
+# TimingHistory) et comparée, pour chaque racine de destination, à l'espace
+# libre (avec une marge). Les mêmes estimations alimentent l'aperçu
+# (dry-run) : volume attendu par jeu.
+#
+# Racine de destination : le plus proche dossier existant du chemin de
+# sortie (les sous-dossiers de jeu/format sont créés pendant le run).
+
+from __future__ import unicode_literals
+
+import os
+
+try:
+    from .TimingHistory import plan_work
+except Exception:
+    plan_work = None  # type: ignore
+
+DEFAULT_MARGIN = 0.10  # 10 % de marge au-delà de l'estimation
+
+
+def existing_ancestor(path):
+    """Plus proche dossier existant de `path` (lui-même compris), ou u''."""
+    current = os.path.abspath(path or u'.')
+    while current:
+        if os.path.isdir(current):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return u''
+        current = parent
+    return u''
+
+
+def free_bytes(path):
+    """Espace libre (octets) du volume de `path`, None s'il est inconnu.
+    Fonctionne aussi sur un partage UNC (Windows)."""
+    root = existing_ancestor(path)
+    if not root:
+        return None
+    try:
+        import shutil
+        return int(shutil.disk_usage(root).free)
+    except AttributeError:
+        pass  # IronPython 2.7 : pas de disk_usage
+    except Exception:
+        return None
+    try:
+        import ctypes
+        free = ctypes.c_ulonglong(0)
+        ok = ctypes.windll.kernel32.GetDiskFreeSpaceExW(ctypes.c_wchar_p(root), None, None,
+                                                        ctypes.pointer(free))
+        return int(free.value) if ok else None
+    except Exception:
+        pass
+    try:
+        st = os.statvfs(root)
+        return int(st.f_bavail * st.f_frsize)
+    except Exception:
+        return None
+
+
+def format_bytes(nbytes):
+    """Taille lisible : u'850 Ko', u'12,4 Mo', u'1,8 Go'."""
+    try:
+        value = float(nbytes or 0)
+    except Exception:
+        return u'?'
+    for unit in (u'o', u'Ko', u'Mo', u'Go'):
+        if value < 1024.0 or unit == u'Go':
+            text = u'{:.0f}'.format(value) if unit in (u'o', u'Ko') else u'{:.1f}'.format(value)
+            return u'{} {}'.format(text.replace(u'.', u','), unit)
+        value /= 1024.0
+
+
+def estimate_items(items, history, setups=None, assembled_carnets=False, group=None):
+    """Octets attendus pour des éléments de plan, cumulés par `group(item)`
+    (par défaut : racine de destination). Retourne `({groupe: octets},
+    feuilles sans estimation)`."""
+    if group is None:
+        group = lambda it: existing_ancestor(os.path.dirname(it.path or u''))
+    totals = {}
+    unknown = 0
+    if history is None or plan_work is None:
+        return totals, unknown
+    for it in items or []:
+        nbytes, missing = history.predict_bytes(plan_work([it], setups, assembled_carnets))
+        unknown += missing
+        key = group(it)
+        totals[key] = totals.get(key, 0) + int(nbytes or 0)
+    return totals, unknown
+
+
+def shortfalls(needs, margin=DEFAULT_MARGIN, free=None):
+    """Racines où l'estimation (+ marge) dépasse l'espace libre :
+    `[(racine, octets nécessaires, octets libres)]`. Une racine dont
+    l'espace libre est inconnu n'est pas signalée."""
+    free = free or free_bytes
+    out = []
+    for root in sorted(needs):
+        need = needs[root]
+        if not need or not root:
+            continue
+        avail = free(root)
+        if avail is None:
+            continue
+        if need * (1.0 + margin) > avail:
+            out.append((root, need, avail))
+    return out
+
+
+def shortfall_lines(found):
+    return [u'{} : ~{} nécessaires, {} libres'.format(root, format_bytes(need), format_bytes(avail))
+            for root, need, avail in found]
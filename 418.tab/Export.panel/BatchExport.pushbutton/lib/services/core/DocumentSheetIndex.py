@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Index des feuilles/collections d'un document, construit en UNE passe.
+#
+# L'orchestrateur interrogeait le document à chaque plan : un
+# FilteredElementCollector sur SheetCollection par recherche de collection,
+# puis un collector sur TOUTES les ViewSheet par collection -- deux fois par
+# run (détection des fichiers existants puis exécution). Soit
+# O(collections x feuilles) appels API avant le premier fichier écrit.
+#
+# Cet index collecte collections et feuilles une seule fois par run et
+# répond ensuite en mémoire :
+#   - collection par nom ;
+#   - feuilles par id de collection (déjà triées par numéro) ;
+#   - feuille par id.
+
+from __future__ import unicode_literals
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+
+def element_id_key(eid):
+    """Clé hashable stable pour un ElementId (`.Value` Revit 2024+, sinon
+    `.IntegerValue`). Repli sur l'objet lui-même (tests hors Revit)."""
+    if eid is None:
+        return None
+    for attr in ('Value', 'IntegerValue'):
+        try:
+            val = getattr(eid, attr, None)
+            if val is not None:
+                return val
+        except Exception:
+            continue
+    return eid
+
+
+def _sheet_number(sheet):
+    try:
+        return u'{}'.format(getattr(sheet, 'SheetNumber', '') or '')
+    except Exception:
+        return u''
+
+
+class DocumentSheetIndex(object):
+    """Instantané (run-scoped) des collections et feuilles d'un document.
+
+    Construit via `build(doc)` (collectors Revit) ou `from_elements(...)`
+    (listes brutes, utilisé par les tests hors Revit). Ne lève jamais :
+    un document absent donne un index vide.
+    """
+
+    def __init__(self):
+        self._collections = []          # [(collection, nom)] dans l'ordre du doc
+        self._collections_by_name = {}
+        self._sheets_by_collection = {}  # clé id collection -> [ViewSheet] triées
+        self._sheets_by_id = {}
+        self._sheets = []
+
+    @classmethod
+    def build(cls, doc):
+        if DB is None or doc is None:
+            return cls()
+        try:
+            collections = DB.FilteredElementCollector(doc).OfClass(DB.SheetCollection).ToElements()
+        except Exception:
+            collections = []
+        try:
+            sheets = DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet).ToElements()
+        except Exception:
+            sheets = []
+        return cls.from_elements(collections, sheets)
+
+    @classmethod
+    def from_elements(cls, collections, sheets):
+        index = cls()
+        for sc in collections or []:
+            try:
+                name = sc.Name
+            except Exception:
+                continue
+            index._collections.append((sc, name))
+            # Premier arrivé gagne (même règle que l'ancien parcours linéaire).
+            if name not in index._collections_by_name:
+                index._collections_by_name[name] = sc
+        for vs in sheets or []:
+            index._sheets.append(vs)
+            try:
+                index._sheets_by_id[element_id_key(vs.Id)] = vs
+            except Exception:
+                pass
+            try:
+                ckey = element_id_key(vs.SheetCollectionId)
+            except Exception:
+                continue
+            index._sheets_by_collection.setdefault(ckey, []).append(vs)
+        for lst in index._sheets_by_collection.values():
+            try:
+                lst.sort(key=_sheet_number)
+            except Exception:
+                pass
+        return index
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+
+    def collections(self):
+        """Retourne `[(SheetCollection, nom), ...]` (copie)."""
+        return list(self._collections)
+
+    def collection_by_name(self, name):
+        return self._collections_by_name.get(name)
+
+    def sheets_for_collection(self, collection):
+        """Feuilles de `collection`, triées par numéro (copie)."""
+        if collection is None:
+            return []
+        try:
+            key = element_id_key(collection.Id)
+        except Exception:
+            return []
+        return list(self._sheets_by_collection.get(key, []))
+
+    def sheet_by_id(self, eid):
+        return self._sheets_by_id.get(element_id_key(eid))
+
+    def all_sheets(self):
+        return list(self._sheets)
+
+    def __len__(self):
+        return len(self._sheets)
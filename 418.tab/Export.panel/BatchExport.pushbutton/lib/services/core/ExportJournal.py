@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Journal d'export sur disque (JSONL, append-only) pour reprendre un run
+# interrompu (crash Revit, annulation).
+#
+# Un fichier unique dans le dossier de données de l'utilisateur
+# (core.AppPaths.data_dir) : il est réinitialisé au début de chaque run puis
+# complété ligne par ligne, avec flush après chaque écriture pour survivre à
+# un arrêt brutal.
+#
+#   {"type": "run",     "run_id": ..., "mode": "auto"|"manual", ...}
+#   {"type": "planned", "key": ..., "collection": ..., "sheet": ..., "fmt": ...}
+#   {"type": "done",    "key": ..., "path": ..., "size": ...}
+#   {"type": "end",     "status": "ok"}
+#
+# Un journal sans entrée "end" est un run interrompu. Une ligne tronquée
+# (arrêt pendant l'écriture) est ignorée à la relecture.
+
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import datetime
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+JOURNAL_FILE_NAME = 'batch_export_journal.jsonl'
+
+
+def item_key(collection_name, sheet_number, fmt):
+    """Clé stable d'un élément du plan : `collection|feuille|format`.
+    `sheet_number` vaut '*' pour un carnet (PDF combiné)."""
+    return u'{}|{}|{}'.format(collection_name or u'', sheet_number or u'*', (fmt or u'').lower())
+
+
+class JournalState(object):
+    """Contenu relu d'un journal : en-tête du run, éléments prévus/terminés."""
+
+    def __init__(self):
+        self.run = None        # dict de l'entrée "run" (ou None)
+        self.planned = []      # [dict "planned"] dans l'ordre d'écriture
+        self.done = {}         # clé -> dict "done" (dernier gagnant)
+        self.finished = False  # True si une entrée "end" a été écrite
+
+    @property
+    def interrupted(self):
+        return self.run is not None and not self.finished
+
+    def is_complete(self, key):
+        """Vrai si `key` est terminé ET que son fichier existe toujours avec
+        la taille enregistrée."""
+        rec = self.done.get(key)
+        if not rec:
+            return False
+        path = rec.get('path') or u''
+        try:
+            if not path or not os.path.isfile(path):
+                return False
+            size = rec.get('size')
+            if size is not None and os.path.getsize(path) != size:
+                return False
+        except Exception:
+            return False
+        return True
+
+    def pending_count(self):
+        return len([p for p in self.planned
+                    if not p.get('member') and not self.is_complete(p.get('key'))])
+
+
+class ExportJournal(object):
+    """Écriture/lecture du journal d'export. Ne lève jamais : un journal
+    inutilisable n'empêche pas l'export."""
+
+    def __init__(self, path=None):
+        self._path = path or os.path.join(data_dir(), JOURNAL_FILE_NAME)
+        self._planned = set()
+
+    @property
+    def path(self):
+        return self._path
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def start(self, mode, **info):
+        """Réinitialise le journal et écrit l'en-tête du run."""
+        self._planned = set()
+        rec = dict(info)
+        rec['type'] = 'run'
+        rec['mode'] = mode
+        rec['run_id'] = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        self._write([rec], mode='w')
+
+    def planned(self, key, collection=u'', sheet=u'', fmt=u'', **extra):
+        if key in self._planned:
+            return
+        self._planned.add(key)
+        rec = dict(extra)
+        rec.update({'type': 'planned', 'key': key, 'collection': collection,
+                    'sheet': sheet, 'fmt': fmt})
+        self._write([rec])
+
+    def done(self, key, path):
+        size = None
+        try:
+            size = os.path.getsize(path)
+        except Exception:
+            pass
+        self._write([{'type': 'done', 'key': key, 'path': path, 'size': size}])
+
+    def finish(self, status='ok'):
+        self._write([{'type': 'end', 'status': status}])
+
+    def _write(self, records, mode='a'):
+        try:
+            d = os.path.dirname(self._path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with io.open(self._path, mode, encoding='utf-8') as fh:
+                for rec in records:
+                    fh.write(u'{}\n'.format(json.dumps(rec, ensure_ascii=False)))
+                fh.flush()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Relit le journal. Retourne un `JournalState` (vide si absent)."""
+        state = JournalState()
+        try:
+            if not os.path.exists(self._path):
+                return state
+            with io.open(self._path, 'r', encoding='utf-8') as fh:
+                lines = fh.readlines()
+        except Exception:
+            return state
+        seen = set()
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            kind = rec.get('type')
+            if kind == 'run':
+                state.run = rec
+            elif kind == 'planned' and rec.get('key') not in seen:
+                # Une reprise réinscrit le plan à la suite : on dédoublonne.
+                seen.add(rec.get('key'))
+                state.planned.append(rec)
+            elif kind == 'done' and rec.get('key'):
+                state.done[rec['key']] = rec
+            elif kind == 'end':
+                state.finished = True
+        return state
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# Manifeste des sorties d'un run : ce que le run a réellement produit.
+#
+# Un enregistrement par élément du plan (ou par feuille en mode manuel) :
+#
+#   {"key": "Jeu|A101|pdf", "collection": "Jeu", "fmt": "pdf", "sheet": "A101",
+#    "path": "D:/.../A101.pdf", "status": "ok", "size": 48213,
+#    "sha256": "...", "duration": 1.92, "revit": "True", "check": "ok"}
+#
+# status : ok / error / skipped (reprise, incrémental : fichier antérieur)
+#          / pending (jamais atteint : run interrompu).
+# duration / revit : tirés de la trace du run (cf. ExportTrace) ; un lot
+#          groupé répartit sa durée entre ses fichiers.
+# check  : passe de vérification après le run, en parallèle (lecture seule) :
+#          fichier présent, non vide, en-tête PDF/DWG valide. La même lecture
+#          donne la taille et le SHA-256.
+#
+# Écrit en JSON et CSV (`batch_export_outputs.json` / `.csv`, dossier de
+# données de l'utilisateur, core.AppPaths.data_dir) : décrit le DERNIER run.
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+MANIFEST_FILE_NAME = 'batch_export_outputs.json'
+CSV_FILE_NAME = 'batch_export_outputs.csv'
+MANIFEST_VERSION = 1
+CSV_COLUMNS = ('key', 'collection', 'fmt', 'sheet', 'path', 'status', 'size', 'sha256',
+               'duration', 'revit', 'check')
+_BLOCK = 1024 * 1024
+_PDF_HEADER_WINDOW = 1024  # « %PDF- » toléré dans le premier Ko (comme les lecteurs)
+_DWG_HEADER = re.compile(br'^AC[0-9.]{4}')
+
+CHECK_OK = 'ok'
+CHECK_MISSING = 'absent'
+CHECK_EMPTY = 'vide'
+CHECK_HEADER = 'en-tête invalide'
+CHECK_UNREADABLE = 'illisible'
+
+
+def _text(value):
+    try:
+        return u'{}'.format(value if value is not None else u'')
+    except Exception:
+        return u''
+
+
+def _csv_field(value):
+    text = _text(value)
+    if any(c in text for c in u',;"\r\n'):
+        text = u'"{}"'.format(text.replace(u'"', u'""'))
+    return text
+
+
+def header_ok(fmt, head):
+    """En-tête attendu pour le format (`head` : premiers octets du fichier).
+    Formats sans signature connue : toujours vrai."""
+    fmt = (fmt or u'').lower()
+    if fmt == 'pdf':
+        return b'%PDF-' in head[:_PDF_HEADER_WINDOW]
+    if fmt == 'dwg':
+        return bool(_DWG_HEADER.match(head[:6]))
+    return True
+
+
+def check_file(path, fmt):
+    """Vérifie un fichier de sortie. Retourne `(check, taille, sha256)`."""
+    try:
+        if not path or not os.path.isfile(path):
+            return CHECK_MISSING, None, None
+        h = hashlib.sha256()
+        size = 0
+        head = b''
+        with open(path, 'rb') as fh:
+            while True:
+                block = fh.read(_BLOCK)
+                if not block:
+                    break
+                if len(head) < _PDF_HEADER_WINDOW:
+                    head += block[:_PDF_HEADER_WINDOW - len(head)]
+                h.update(block)
+                size += len(block)
+    except Exception:
+        return CHECK_UNREADABLE, None, None
+    if size == 0:
+        return CHECK_EMPTY, 0, h.hexdigest()
+    if not header_ok(fmt, head):
+        return CHECK_HEADER, size, h.hexdigest()
+    return CHECK_OK, size, h.hexdigest()
+
+
+class ExportManifest(object):
+    def __init__(self, path=None, **info):
+        self._path = path or os.path.join(data_dir(), MANIFEST_FILE_NAME)
+        self.info = dict(info)
+        self.records = []
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def csv_path(self):
+        return os.path.splitext(self._path)[0] + '.csv'
+
+    def __len__(self):
+        return len(self.records)
+
+    # ------------------------------------------------------------------
+    # Alimentation (thread appelant)
+    # ------------------------------------------------------------------
+
+    def _entry(self, key, **fields):
+        rec = self._by_key.get(key)
+        if rec is None:
+            rec = dict((name, None) for name in CSV_COLUMNS)
+            rec['key'] = key
+            rec['status'] = 'pending'
+            self._by_key[key] = rec
+            self.records.append(rec)
+        for name, value in fields.items():
+            if value is not None:
+                rec[name] = value
+        return rec
+
+    def plan(self, items):
+        """Inscrit les éléments du plan (`ExportItem`), statut 'pending'."""
+        for it in items or []:
+            self._entry(it.key or it.path, collection=it.collection, fmt=it.fmt,
+                        sheet=it.sheet_number, path=it.path)
+
+    def record(self, key, status, path=None, **fields):
+        """Issue d'un élément : 'ok', 'error' ou 'skipped'."""
+        return self._entry(key or path, status=status, path=path, **fields)
+
+    def apply_trace(self, trace_records):
+        """Durée et retour Revit depuis les enregistrements de la trace
+        (`paths` / `total` / `revit`), rapprochés par chemin."""
+        by_path = dict((os.path.normcase(_text(rec['path'])), rec) for rec in self.records if rec['path'])
+        for tr in trace_records or []:
+            paths = tr.get('paths') or []
+            if not paths:
+                continue
+            share = (tr.get('total') or 0.0) / float(len(paths))
+            for p in paths:
+                rec = by_path.get(os.path.normcase(_text(p)))
+                if rec is None:
+                    continue
+                rec['duration'] = round(share, 4)
+                if tr.get('revit') is not None:
+                    rec['revit'] = _text(tr.get('revit'))
+
+    # ------------------------------------------------------------------
+    # Vérification
+    # ------------------------------------------------------------------
+
+    def verify(self, workers=4):
+        """Vérifie en parallèle les fichiers des éléments 'ok' et 'skipped'
+        (présence, taille, en-tête, SHA-256). Retourne les anomalies
+        (cf. `failures`)."""
+        todo = [rec for rec in self.records if rec['status'] in ('ok', 'skipped')]
+        queue = list(reversed(todo))
+
+        def _worker():
+            while True:
+                with self._lock:
+                    if not queue:
+                        return
+                    rec = queue.pop()
+                check, size, sha = check_file(rec['path'], rec['fmt'])
+                with self._lock:
+                    rec['check'], rec['size'], rec['sha256'] = check, size, sha
+
+        count = max(1, min(int(workers or 1), len(todo)))
+        threads = [threading.Thread(target=_worker, name='verify-{}'.format(n)) for n in range(count - 1)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        _worker()
+        for t in threads:
+            t.join()
+        return self.failures()
+
+    def failures(self):
+        """Éléments en échec : export en erreur, ou fichier non conforme."""
+        return [rec for rec in self.records
+                if rec['status'] == 'error' or (rec['check'] not in (None, CHECK_OK))]
+
+    def counts(self):
+        out = {}
+        for rec in self.records:
+            out[rec['status']] = out.get(rec['status'], 0) + 1
+        return out
+
+    def failure_lines(self, limit=None):
+        lines = []
+        for rec in self.failures():
+            name = os.path.basename(_text(rec['path'])) or _text(rec['key'])
+            reason = u'export en échec' if rec['status'] == 'error' else rec['check']
+            lines.append(u'{} : {}'.format(name, reason))
+        if limit is not None and len(lines) > limit:
+            lines = lines[:limit] + [u'... et {} autre(s).'.format(len(lines) - limit)]
+        return lines
+
+    def summary_lines(self):
+        counts = self.counts()
+        failures = self.failures()
+        lines = [u'Manifeste : {} élément(s) : {} ok, {} sauté(s), {} en erreur, {} non atteint(s).'.format(
+            len(self.records), counts.get('ok', 0), counts.get('skipped', 0),
+            counts.get('error', 0), counts.get('pending', 0))]
+        if failures:
+            lines.append(u'Vérification : {} anomalie(s).'.format(len(failures)))
+            lines.extend(u'  {}'.format(line) for line in self.failure_lines(limit=10))
+        else:
+            lines.append(u'Vérification : tous les fichiers sont conformes.')
+        return lines
+
+    # ------------------------------------------------------------------
+    # Sérialisation
+    # ------------------------------------------------------------------
+
+    def to_dict(self):
+        return {'version': MANIFEST_VERSION, 'info': dict(self.info),
+                'items': [dict(rec) for rec in self.records]}
+
+    def csv_text(self):
+        lines = [u','.join(CSV_COLUMNS)]
+        for rec in self.records:
+            lines.append(u','.join(_csv_field(rec[name]) for name in CSV_COLUMNS))
+        return u'\r\n'.join(lines) + u'\r\n'
+
+    def save(self):
+        """Écrit le JSON et le CSV (atomique) ; ne lève jamais."""
+        payload = _text(json.dumps(self.to_dict(), ensure_ascii=False, indent=1, sort_keys=True))
+        ok = self._write(self._path, payload)
+        # BOM : accents lisibles à l'ouverture directe dans Excel.
+        return self._write(self.csv_path, u'\ufeff' + self.csv_text()) and ok
+
+    @staticmethod
+    def _write(path, text):
+        tmp = path + '.tmp'
+        try:
+            d = os.path.dirname(path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with io.open(tmp, 'w', encoding='utf-8', newline='') as fh:
+                fh.write(text)
+            try:
+                os.replace(tmp, path)
+            except Exception:
+                if os.path.exists(path):
+                    os.remove(path)
+                os.rename(tmp, path)
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def load(cls, path=None):
+        """Manifeste sauvegardé, ou None s'il est absent/illisible."""
+        path = path or os.path.join(data_dir(), MANIFEST_FILE_NAME)
+        try:
+            if not os.path.exists(path):
+                return None
+            with io.open(path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+            if not isinstance(data, dict):
+                return None
+            manifest = cls(path, **dict(data.get('info') or {}))
+            for rec in data.get('items') or []:
+                if isinstance(rec, dict) and rec.get('key'):
+                    manifest._entry(rec['key'], **dict((k, rec.get(k)) for k in CSV_COLUMNS if k != 'key'))
+            return manifest
+        except Exception:
+            return None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# Cache de session des options d'export PDF/DWG.
+#
+# `build_options` des services de format parcourt les collectors
+# ExportPDFSettings / PrintSetting / ExportDWGSettings : à chaque run, alors
+# que les setups changent rarement. Et l'orchestrateur modifiait ensuite
+# l'objet options partagé (Combine, FileName, MergedViews, règle de nommage)
+# feuille après feuille : un réglage d'un export fuyait dans le suivant.
+#
+# Ici :
+#   - `template(...)` : un gabarit par (document, format, setup, révision du
+#     setup), construit une fois par session et JAMAIS modifié ;
+#   - `derive(gabarit, **changes)` : copie par élément + application des
+#     changements (`NamingRule` -> SetNamingRule, le reste par attribut).
+#
+# Copie : constructeur de copie .NET si disponible, sinon recopie des
+# propriétés lisibles/écrivables par réflexion, sinon reconstruction via le
+# builder du gabarit ; objets Python (tests) : copy.copy.
+
+from __future__ import unicode_literals
+
+import copy
+import hashlib
+import json
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+
+def doc_key(doc):
+    """Identité stable d'un document pour la session (chemin, sinon titre)."""
+    for attr in ('PathName', 'Title'):
+        try:
+            val = getattr(doc, attr, None)
+            if val:
+                return u'{}'.format(val)
+        except Exception:
+            continue
+    return id(doc)
+
+
+def doc_revision(doc):
+    """Version enregistrée du document (change à chaque sauvegarde) ; u''
+    si l'API n'est pas disponible."""
+    if DB is None or doc is None:
+        return u''
+    try:
+        v = DB.Document.GetDocumentVersion(doc)
+        return u'{}-{}'.format(v.VersionGUID, v.NumberOfSaves)
+    except Exception:
+        return u''
+
+
+def data_revision(data):
+    """Empreinte d'un setup custom (dict JSON)."""
+    try:
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        if not isinstance(raw, bytes):
+            raw = raw.encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+    except Exception:
+        return u''
+
+
+def _clone_net(template):
+    t = template.GetType()
+    # 1) Constructeur de copie
+    try:
+        return type(template)(template)
+    except Exception:
+        pass
+    # 2) Réflexion : nouvelle instance + propriétés simples
+    from System import Activator  # type: ignore
+    clone = Activator.CreateInstance(t)
+    for prop in t.GetProperties():
+        try:
+            if prop.CanRead and prop.CanWrite and prop.GetIndexParameters().Length == 0:
+                prop.SetValue(clone, prop.GetValue(template, None), None)
+        except Exception:
+            continue
+    if hasattr(template, 'GetNamingRule') and hasattr(clone, 'SetNamingRule'):
+        try:
+            clone.SetNamingRule(template.GetNamingRule())
+        except Exception:
+            pass
+    return clone
+
+
+def clone_options(template):
+    """Copie indépendante de `template`, ou None si impossible."""
+    if template is None:
+        return None
+    try:
+        if hasattr(template, 'GetType'):
+            return _clone_net(template)
+        return copy.copy(template)
+    except Exception:
+        return None
+
+
+def apply_changes(options, changes):
+    """Applique les réglages d'un élément ; les champs absents de l'objet
+    sont ignorés (même règle que les `hasattr` de l'orchestrateur)."""
+    for name, value in (changes or {}).items():
+        try:
+            if name == 'NamingRule':
+                if hasattr(options, 'SetNamingRule'):
+                    options.SetNamingRule(value)
+            elif hasattr(options, name):
+                setattr(options, name, value)
+        except Exception:
+            continue
+    return options
+
+
+class ExportOptionsCache(object):
+    def __init__(self):
+        self._entries = {}    # clé -> gabarit
+        self._builders = {}   # id(gabarit) -> builder
+        self.hits = 0
+        self.misses = 0
+
+    def template(self, doc, fmt, setup_name, build, revision=u''):
+        """Gabarit pour (doc, fmt, setup, révision) ; `build()` sur défaut de
+        cache. Le gabarit ne doit pas être modifié : passer par `derive`."""
+        key = (doc_key(doc), fmt, setup_name or u'', revision or u'')
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        # Une révision plus récente remplace les anciennes du même setup.
+        for old in [k for k in self._entries if k[:3] == key[:3]]:
+            self._builders.pop(id(self._entries.pop(old)), None)
+        template = build()
+        if template is not None:
+            self._entries[key] = template
+            self._builders[id(template)] = build
+        return template
+
+    def derive(self, template, **changes):
+        """Options d'un élément : copie du gabarit + `changes`."""
+        if template is None:
+            return None
+        opts = clone_options(template)
+        if opts is None:
+            build = self._builders.get(id(template))
+            try:
+                opts = build() if build is not None else None
+            except Exception:
+                opts = None
+        if opts is None:
+            # Dernier recours (comportement historique) : objet partagé.
+            opts = template
+        return apply_changes(opts, changes)
+
+    def invalidate(self, doc=None):
+        if doc is None:
+            self._entries.clear()
+            self._builders.clear()
+            return
+        dk = doc_key(doc)
+        for k in [k for k in self._entries if k[0] == dk]:
+            self._builders.pop(id(self._entries.pop(k)), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache de la session (durée de vie du moteur Python, donc de la fenêtre).
+SESSION_CACHE = ExportOptionsCache()
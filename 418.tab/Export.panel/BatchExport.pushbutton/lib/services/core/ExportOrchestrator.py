@@ -3,8 +3,11 @@
 
 from __future__ import unicode_literals
 
+import datetime
 import os
 import tempfile
+import threading
+import uuid
 from collections import namedtuple
 
 try:
@@ -12,6 +15,126 @@ try:
 except Exception:
     DB = None  # type: ignore
 
+try:
+    from .DocumentSheetIndex import DocumentSheetIndex, element_id_key
+except Exception:
+    DocumentSheetIndex = None  # type: ignore
+    element_id_key = None  # type: ignore
+
+try:
+    from .IncrementalManifest import IncrementalManifest, sheet_fingerprint, carnet_fingerprint
+except Exception:
+    IncrementalManifest = None  # type: ignore
+    sheet_fingerprint = None  # type: ignore
+    carnet_fingerprint = None  # type: ignore
+
+try:
+    from .PostExportPipeline import PostExportPipeline
+except Exception:
+    PostExportPipeline = None  # type: ignore
+
+try:
+    from .ExportTrace import ExportTrace, NULL_ITEM
+except Exception:
+    ExportTrace = None  # type: ignore
+    NULL_ITEM = None  # type: ignore
+
+try:
+    from .ExportOptionsCache import SESSION_CACHE, doc_key, doc_revision, data_revision
+except Exception:
+    SESSION_CACHE = None  # type: ignore
+    doc_key = None  # type: ignore
+    doc_revision = None  # type: ignore
+    data_revision = None  # type: ignore
+
+try:
+    from .RenderCache import RenderCache, render_key, DEFAULT_MAX_MB
+except Exception:
+    RenderCache = None  # type: ignore
+    render_key = None  # type: ignore
+    DEFAULT_MAX_MB = 0  # type: ignore
+
+try:
+    from .ProgressDispatcher import SKIPPED
+except Exception:
+    SKIPPED = 'skipped'  # type: ignore
+
+try:
+    from .ExportJournal import ExportJournal, item_key
+except Exception:
+    ExportJournal = None  # type: ignore
+    item_key = None  # type: ignore
+
+try:
+    from .ExportRunPlan import ExportRunPlan, ExportItem
+except Exception:
+    ExportRunPlan = None  # type: ignore
+    ExportItem = None  # type: ignore
+
+try:
+    from .PdfMerger import merge_pdfs
+except Exception:
+    merge_pdfs = None  # type: ignore
+
+try:
+    from .ExportManifest import ExportManifest
+except Exception:
+    ExportManifest = None  # type: ignore
+
+try:
+    from .TransmittalPackager import TransmittalPackager
+except Exception:
+    TransmittalPackager = None  # type: ignore
+
+try:
+    from .TimingHistory import TimingHistory, plan_work, sheet_size_class, CARNET
+except Exception:
+    TimingHistory = None  # type: ignore
+    plan_work = None  # type: ignore
+    sheet_size_class = None  # type: ignore
+    CARNET = 'carnet'  # type: ignore
+
+try:
+    from .DiskSpacePrecheck import estimate_items, shortfalls, shortfall_lines, existing_ancestor
+except Exception:
+    estimate_items = None  # type: ignore
+    shortfalls = None  # type: ignore
+    shortfall_lines = None  # type: ignore
+    existing_ancestor = None  # type: ignore
+
+try:
+    from .NameCollisionDetector import find_collisions, collision_lines, disambiguate, STRATEGIES, DEFAULT_STRATEGY
+except Exception:
+    find_collisions = None  # type: ignore
+    collision_lines = None  # type: ignore
+    disambiguate = None  # type: ignore
+    STRATEGIES = ()  # type: ignore
+    DEFAULT_STRATEGY = 'index'  # type: ignore
+
+try:
+    from .ExportStrategySelector import SESSION_SELECTOR, ExportStrategySelector, revit_version, EXPORT_3, EXPORT_4, PRINT
+except Exception:
+    SESSION_SELECTOR = None  # type: ignore
+    ExportStrategySelector = None  # type: ignore
+    revit_version = None  # type: ignore
+    EXPORT_3, EXPORT_4, PRINT = 'export3', 'export4', 'print'  # type: ignore
+
+try:
+    from ...data.sheets.ParameterSnapshot import SESSION_SNAPSHOT, scope_key
+except Exception:
+    SESSION_SNAPSHOT = None  # type: ignore
+    scope_key = None  # type: ignore
+
+try:
+    from .ExportRenameMap import build_rename_map, build_rename_map_by_parts
+except Exception:
+    build_rename_map = None  # type: ignore
+    build_rename_map_by_parts = None  # type: ignore
+
+_STRATEGY_LABELS = {'export3': u'Export 3-arg', 'export4': u'Export 4-arg', 'print': u'PrintManager'}
+
+_RASTER_EXTS = {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif'}
+
 ExportPlan = namedtuple('ExportPlan', [
     'collection_name',
     'do_export',
@@ -20,8 +143,23 @@ ExportPlan = namedtuple('ExportPlan', [
     'do_pdf',
 ])
 
+
+class _ResumedSheet(object):
+    """Équivalent minimal d'un ManualSheetVM, reconstruit depuis le journal
+    pour reprendre un export manuel."""
+
+    def __init__(self, elem, export_pdf=False, export_dwg=False):
+        self.Elem = elem
+        self.ExportPdf = export_pdf
+        self.ExportDwg = export_dwg
+        try:
+            self.Numero = elem.SheetNumber
+        except Exception:
+            self.Numero = u''
+
+
 class ExportOrchestrator(object):
-    def __init__(self, namespace='batch_export'):
+    def __init__(self, namespace='batch_export', options_cache=None, strategy_selector=None):
         # Config utilisateur
         try:
             from ...core.UserConfig import UserConfig
@@ -50,7 +188,43 @@ class ExportOrchestrator(object):
         self._nstore = NamingPatternStore() if NamingPatternStore is not None else None
         self._nres = None  # Sera initialisé avec le doc dans run()
         self._NamingResolver_cls = NamingResolver
+        try:
+            from ...services.NamingService import NamingService
+        except Exception:
+            NamingService = None  # type: ignore
+        self._NamingService_cls = NamingService
+        self._namer = None  # NamingService du document (patterns compilés), cf. _init_resolver
         self._destination_override = None  # Chemin passé explicitement depuis le ViewModel
+        self._index = None  # DocumentSheetIndex du run en cours (cf. run())
+        self._journal = None  # ExportJournal du run en cours
+        self._resume = None  # JournalState du run repris (resume_last_run)
+        self._manifests = None  # {dossier: IncrementalManifest} en mode incrémental
+        try:
+            from ...data.destination.DestinationListing import DestinationListing
+        except Exception:
+            DestinationListing = None  # type: ignore
+        self._DestinationListing_cls = DestinationListing
+        self._listing = None  # DestinationListing du run en cours
+        self._post = None  # PostExportPipeline du run en cours
+        self._trace = None  # ExportTrace du run en cours
+        self._overwrite_policy = None  # None = demander, sinon True/False imposé (cf. run())
+        self._carnet_sheets = False  # carnets : PDF par feuille aussi (cf. run())
+        self._sheet_pdfs = None  # {id feuille: PDF unitaire disponible} du run en cours
+        self._render_cache = None  # RenderCache du run en cours (cf. _open_render_cache)
+        self._render_ctx = None  # (document, état, {fmt: (setup, révision)})
+        self._raster_outputs = set()  # DWG accompagnés de rasters (jamais mis en cache)
+        self._raster_lock = threading.Lock()
+        self._transmittal = None  # (portée, titre) du ZIP de diffusion du run, cf. run()
+        self._packagers = None  # {jeu ou u'': TransmittalPackager} du run en cours
+        self._outputs = None  # ExportManifest du run en cours (cf. _open_outputs)
+        self._cancel = None  # CancellationToken du run en cours (cf. run())
+        self._timings = None  # (TimingHistory, {fmt: setup}, {chemin: (taille, feuilles)}) du run
+        # Gabarits d'options PDF/DWG partagés par la session (cf. ExportOptionsCache)
+        self._options_cache = options_cache if options_cache is not None else SESSION_CACHE
+        # Chemins d'export PDF unitaire retenus par la session (cf. ExportStrategySelector)
+        self._strategy_selector = strategy_selector if strategy_selector is not None else SESSION_SELECTOR
+        self.last_plan = None  # ExportRunPlan exécuté par le dernier run()
+        self.last_manifest = None  # ExportManifest vérifié du dernier run
 
     # ------------------- Planification ------------------- #
     def _get_ui_selected_param_names(self, get_ctrl):
@@ -65,43 +239,35 @@ class ExportOrchestrator(object):
             names[cname] = val
         return names
 
+    def _sheet_index(self, doc):
+        """Index feuilles/collections du run en cours ; hors run (ex. plan
+        calculé par le ViewModel avant lancement), index éphémère."""
+        if self._index is not None:
+            return self._index
+        if DocumentSheetIndex is None:
+            return None
+        return DocumentSheetIndex.build(doc)
+
     def _collect_collections(self, doc):
-        out = []
         if DB is None or doc is None:
-            return out
-        try:
-            col = DB.FilteredElementCollector(doc).OfClass(DB.SheetCollection).ToElements()
-            for sc in col:
-                try:
-                    out.append((sc, sc.Name))
-                except Exception:
-                    continue
-        except Exception:
-            pass
-        return out
+            return []
+        index = self._sheet_index(doc)
+        return index.collections() if index is not None else []
 
     def _find_collection_by_name(self, doc, name):
+        index = self._sheet_index(doc)
         try:
-            for sc, nm in self._collect_collections(doc):
-                if nm == name:
-                    return sc
+            return index.collection_by_name(name) if index is not None else None
         except Exception:
-            pass
-        return None
+            return None
 
     def _get_collection_sheets(self, doc, collection):
-        res = []
+        """Feuilles de la collection, déjà triées par numéro croissant."""
+        index = self._sheet_index(doc)
         try:
-            all_sheets = DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet).ToElements()
-            for vs in all_sheets:
-                try:
-                    if vs.SheetCollectionId == collection.Id:
-                        res.append(vs)
-                except Exception:
-                    continue
+            return index.sheets_for_collection(collection) if index is not None else []
         except Exception:
-            pass
-        return res
+            return []
 
     def _read_flag_from_param(self, elem, param_name, default=False):
         try:
@@ -136,6 +302,136 @@ class ExportOrchestrator(object):
             plans.append(ExportPlan(cname, do_export, per_sheet, do_dwg, do_pdf))
         return plans
 
+    def build_export_plan(self, doc, plans):
+        """Développe les décisions par collection (`ExportPlan`) en plan
+        détaillé : un `ExportItem` par fichier de sortie, nom résolu et chemin
+        final (sans suffixe d'unicité, cf. `_assign_plan_paths`). Aucun export,
+        aucun dossier créé."""
+        try:
+            title = doc.Title
+        except Exception:
+            title = u''
+        run_plan = ExportRunPlan(mode='auto', doc=title, destination=self._destination_override or u'')
+        warnings = []
+        for plan in plans or []:
+            if not plan.do_export:
+                continue
+            cname = plan.collection_name
+            collection = self._find_collection_by_name(doc, cname)
+            sheets = self._get_collection_sheets(doc, collection) if collection is not None else []
+            base_pdf = self._get_destination_base('PDF', cname, ensure=False) if plan.do_pdf else None
+            base_dwg = self._get_destination_base('DWG', cname, ensure=False) if plan.do_dwg else None
+            sheet_pdf = bool(plan.do_pdf and base_pdf and (plan.per_sheet or self._carnet_sheets))
+            names = None
+            if sheet_pdf or (plan.do_dwg and base_dwg):
+                # Noms résolus une fois par jeu, partagés par PDF et DWG.
+                names, batch = self._resolve_sheet_names(sheets)
+                warnings.extend(self._naming_warnings(cname, sheets, batch))
+            if plan.do_pdf and base_pdf:
+                # Carnet + feuilles : les PDF unitaires passent d'abord, le
+                # carnet est ensuite assemblé à partir d'eux (cf. _assemble_carnet).
+                if sheet_pdf:
+                    for sh, name in zip(sheets, names):
+                        run_plan.add(self._plan_sheet_item(cname, sh, 'pdf', base_pdf, name))
+                if not plan.per_sheet:
+                    run_plan.add(self._plan_carnet_item(cname, sheets, collection, base_pdf))
+            if plan.do_dwg and base_dwg:
+                for sh, name in zip(sheets, names):
+                    run_plan.add(self._plan_sheet_item(cname, sh, 'dwg', base_dwg, name))
+        run_plan.info['naming_warnings'] = warnings
+        self._resolve_plan_collisions(run_plan)
+        return run_plan
+
+    def _collision_strategy(self):
+        # Config `name_collisions` : 'index' (défaut), 'numero' ou 'aucune'.
+        strategy = self._get_flag('name_collisions', DEFAULT_STRATEGY)
+        return strategy if strategy in STRATEGIES else DEFAULT_STRATEGY
+
+    def _resolve_plan_collisions(self, run_plan):
+        """Collisions de noms sur tout le plan (une passe, index par chemin) :
+        signalées dans `plan.info['collisions']` (feuilles en cause), puis
+        levées selon la stratégie configurée (cf. NameCollisionDetector).
+        Les chemins modifiés restent sans suffixe d'unicité disque."""
+        if find_collisions is None:
+            return
+        collisions = find_collisions(run_plan)
+        strategy = self._collision_strategy()
+        run_plan.info['collisions'] = collision_lines(collisions)
+        run_plan.info['collision_strategy'] = strategy
+        if not collisions:
+            return
+        sanitize = self._dest.sanitize if self._dest is not None else None
+        for it, _old in disambiguate(run_plan, strategy, sanitize=sanitize):
+            it.exists = self._path_exists(it.path)
+
+    def _plan_sheet_item(self, collection_name, sheet, fmt, base_folder, name_no_ext=None):
+        if name_no_ext is None:
+            name_no_ext = self._resolve_name_no_ext(sheet, self._get_rows_for_sheet(sheet))
+        path = os.path.join(base_folder, u'{}.{}'.format(name_no_ext, fmt))
+        return ExportItem(self._sheet_key(collection_name, sheet, fmt), collection_name, fmt, path,
+                          sheet_id=self._sheet_id(sheet), sheet_number=getattr(sheet, 'SheetNumber', u''),
+                          exists=self._path_exists(path), sheet=sheet)
+
+    def _plan_carnet_item(self, collection_name, sheets, collection, base_folder):
+        rows = self._carnet_rows(sheets, collection_name)
+        name_no_ext = self._resolve_carnet_name(sheets, rows, collection)
+        path = os.path.join(base_folder, u'{}.pdf'.format(name_no_ext or u'export'))
+        key = item_key(collection_name, None, 'pdf') if item_key is not None else None
+        return ExportItem(key, collection_name, 'pdf', path, sheet_number=u'*', group=collection_name,
+                          members=[self._sheet_id(sh) for sh in sheets or []],
+                          exists=self._path_exists(path), sheets=list(sheets or []))
+
+    def _carnet_rows(self, sheets, collection_name):
+        # Pattern 'set' (carnet) s'il existe, sinon fallback sur sheet/default
+        rows = self._get_rows_for_set()
+        if not rows:
+            rows = self._get_rows_for_sheet(sheets[0]) if sheets else [{'Name': collection_name, 'Prefix': '', 'Suffix': ''}]
+        return rows
+
+    def _sheet_id(self, sheet):
+        try:
+            return element_id_key(sheet.Id) if element_id_key is not None else None
+        except Exception:
+            return None
+
+    def _assign_plan_paths(self, run_plan, overwrite=False):
+        """Fixe les chemins définitifs du plan avant exécution : réservés
+        tels quels si `overwrite`, sinon suffixés " (n)" si déjà pris."""
+        for it in run_plan:
+            folder = os.path.dirname(it.path)
+            stem = os.path.splitext(it.file_name)[0]
+            it.path = self._unique_with_ext(folder, stem, it.fmt, overwrite=overwrite)
+
+    def dry_run(self, doc, get_ctrl, destination=None, carnet_sheets=None):
+        """Plan détaillé du run tel que `run()` l'exécuterait (chemins sans
+        suffixe d'unicité, `exists` renseigné), sans aucun `doc.Export` ni
+        écriture. À comparer au dernier run : `plan.diff(ExportRunPlan.load())`.
+        `plan.info` : volume attendu par jeu (`estimated_bytes`) et racines
+        de destination en manque d'espace (`space_warnings`), collisions de
+        noms (`collisions`) et stratégie appliquée (`collision_strategy`)."""
+        if ExportRunPlan is None:
+            return None
+        self._carnet_sheets = self._carnet_sheets_flag(carnet_sheets)
+        self._destination_override = destination or None
+        self._listing = self._new_listing()
+        self._index = DocumentSheetIndex.build(doc) if DocumentSheetIndex is not None else None
+        try:
+            self._init_resolver(doc)
+            plan = self.build_export_plan(doc, self.plan_exports_for_collections(doc, get_ctrl))
+            self._estimate_plan_space(plan)
+            return plan
+        finally:
+            self._carnet_sheets = False
+            self._destination_override = None
+            self._index = None
+            self._listing = None
+
+    def _carnet_sheets_flag(self, value):
+        # None : lu depuis la config (`pdf_carnet_sheets`)
+        if value is None:
+            return str(self._get_flag('pdf_carnet_sheets', '0')) == '1'
+        return bool(value)
+
     # ------------------- Préférences / Destinations ------------------- #
     def _get_flag(self, key, default='0'):
         try:
@@ -143,7 +439,7 @@ class ExportOrchestrator(object):
         except Exception:
             return default
 
-    def _get_destination_base(self, fmt_subfolder=None, collection_name=None):
+    def _get_destination_base(self, fmt_subfolder=None, collection_name=None, ensure=True):
         base = None
         try:
             if self._destination_override:
@@ -164,82 +460,341 @@ class ExportOrchestrator(object):
                 base = os.path.join(base, fmt_subfolder)
         except Exception:
             pass
-        try:
-            self._dest.ensure(base)
-        except Exception:
-            pass
+        if ensure:
+            try:
+                self._ensure_folder(base)
+            except Exception:
+                pass
         return base
 
     def _get_pdf_options(self, doc):
-        if self._pdf is None:
-            return None
-        setup_name = self._pdf.get_saved_setup()
-        # Config custom non mappée pour l'instant
-        return self._pdf.build_options(doc, setup_name=setup_name)
+        """Gabarit des options PDF (à ne pas modifier, cf. `_item_options`)."""
+        return self._cached_options(doc, 'pdf', self._pdf)
 
     def _get_dwg_options(self, doc):
-        if self._dwg is None:
+        """Gabarit des options DWG (à ne pas modifier, cf. `_item_options`)."""
+        return self._cached_options(doc, 'dwg', self._dwg)
+
+    def _cached_options(self, doc, fmt, service):
+        if service is None:
             return None
-        setup_name = self._dwg.get_saved_setup()
-        return self._dwg.build_options(doc, setup_name=setup_name)
-
-    # ------------------- Détection des fichiers existants ------------------- #
-    def _detect_existing_files(self, doc, plans):
-        for plan in plans:
-            if not plan.do_export: continue
-            
-            collection = self._find_collection_by_name(doc, plan.collection_name)
-            sheets = self._get_collection_sheets(doc, collection) if collection else []
-            # Tri des feuilles par numéro croissant
+        setup_name = service.get_saved_setup()
+        build = lambda: service.build_options(doc, setup_name=setup_name)
+        if self._options_cache is None:
+            return build()
+        return self._options_cache.template(doc, fmt, setup_name, build,
+                                            revision=self._setup_revision(service, doc, setup_name))
+
+    def _setup_revision(self, service, doc, setup_name):
+        # Setup custom : son contenu JSON ; setup Revit : la version enregistrée
+        # du document (un setup natif modifié est pris en compte après sauvegarde).
+        try:
+            custom = service.get_custom_setup_data(setup_name) if setup_name else None
+        except Exception:
+            custom = None
+        if custom and data_revision is not None:
+            return u'custom:' + data_revision(custom)
+        return u'doc:' + (doc_revision(doc) if doc_revision is not None else u'')
+
+    def _item_options(self, template, **changes):
+        """Copie des options pour UN export (Combine, FileName, règle de
+        nommage...) : le gabarit partagé n'est jamais modifié."""
+        if self._options_cache is not None:
+            return self._options_cache.derive(template, **changes)
+        for name, value in changes.items():
             try:
-                sheets = sorted(sheets, key=lambda sh: u'{}'.format(getattr(sh, 'SheetNumber', '') or ''))
+                if name == 'NamingRule':
+                    template.SetNamingRule(value)
+                elif hasattr(template, name):
+                    setattr(template, name, value)
             except Exception:
-                pass
-            
-            base_pdf = self._get_destination_base('PDF', plan.collection_name) if plan.do_pdf else None
-            base_dwg = self._get_destination_base('DWG', plan.collection_name) if plan.do_dwg else None
-            
-            # Check PDF
-            if plan.do_pdf and base_pdf:
-                if plan.per_sheet:
-                    for sh in sheets:
-                        rows = self._get_rows_for_sheet(sh)
-                        name = self._resolve_name_no_ext(sh, rows)
-                        if os.path.exists(os.path.join(base_pdf, name + '.pdf')): return True
-                else:
-                    # Collection PDF
-                    rows = self._get_rows_for_set()
-                    if not rows:
-                        rows = self._get_rows_for_sheet(sheets[0]) if sheets else [{'Name': plan.collection_name, 'Prefix': '', 'Suffix': ''}]
-                    elem = collection if collection else (sheets[0] if sheets else None)
-                    name = self._dest.sanitize('' if not elem else self._nres.resolve_for_element(elem, rows, empty_fallback=False)) or 'export'
-                    if os.path.exists(os.path.join(base_pdf, name + '.pdf')): return True
-
-            # Check DWG (always per sheet)
-            if plan.do_dwg and base_dwg:
-                for sh in sheets:
-                    rows = self._get_rows_for_sheet(sh)
-                    name = self._resolve_name_no_ext(sh, rows)
-                    if os.path.exists(os.path.join(base_dwg, name + '.dwg')): return True
-                    
-        return False
+                continue
+        return template
 
     # ------------------- Exécution ------------------- #
-    def run(self, doc, get_ctrl, progress_cb=None, log_cb=None, ui_win=None, destination=None):
+    def run(self, doc, get_ctrl, progress_cb=None, log_cb=None, ui_win=None, destination=None,
+            incremental=None, overwrite=None, carnet_sheets=None, transmittal=None, cancel=None):
+        """Export par jeu. `incremental=None` : lu depuis la config
+        (`incremental_export`) ; sinon force/désactive le mode incrémental.
+        `overwrite=None` : demande à l'utilisateur si des fichiers existent ;
+        True/False impose Remplacer/Renommer (exports sans surveillance).
+        `carnet_sheets` : les jeux en carnet produisent aussi leurs PDF par
+        feuille (None = config `pdf_carnet_sheets`).
+        `transmittal` : ZIP de diffusion 'collection' (un par jeu), 'run' (un
+        seul) ou désactivé (None = config `transmittal_zip`).
+        `cancel` : `CancellationToken` consulté entre les éléments et entre
+        les étapes ; un run annulé retourne False et reste reprenable."""
+        self._cancel = cancel
+        self._refresh_snapshot(doc)
+        self._overwrite_policy = overwrite
+        self._carnet_sheets = self._carnet_sheets_flag(carnet_sheets)
+        self._sheet_pdfs = {}
+        self.last_plan = None
+        if incremental is None:
+            incremental = str(self._get_flag('incremental_export', '0')) == '1'
+        self._manifests = {} if (incremental and IncrementalManifest is not None) else None
         self._destination_override = destination or None
+        self._listing = self._new_listing()
+        self._post = self._new_post_pipeline()
+        self._trace = self._new_trace()
+        # Index construit une seule fois : partagé par la planification, la
+        # détection des fichiers existants et l'exécution.
+        self._index = DocumentSheetIndex.build(doc) if DocumentSheetIndex is not None else None
+        self._open_journal('auto', doc, destination=destination or u'')
+        self._open_render_cache(doc)
+        self._open_transmittal(doc, transmittal)
+        self._open_outputs('auto', doc)
+        self._open_timings()
         try:
-            return self._run_impl(doc, get_ctrl, progress_cb=progress_cb, log_cb=log_cb, ui_win=ui_win)
+            ok = self._run_impl(doc, get_ctrl, progress_cb=progress_cb, log_cb=log_cb, ui_win=ui_win)
+            self._drain_post(log_cb)
+            if self._cancelled():
+                self._log_cancelled(log_cb)
+                return False
+            self._close_transmittals(log_cb)
+            if self._journal is not None:
+                self._journal.finish('ok')
+            return ok
         finally:
+            self._drain_post(log_cb)
+            self._close_transmittals(log_cb, abort=True)
+            self._close_outputs(log_cb)
+            self._close_timings()
+            self._close_render_cache(log_cb)
+            self._close_trace(log_cb)
+            self._cancel = None
             self._destination_override = None
+            self._overwrite_policy = None
+            self._carnet_sheets = False
+            self._sheet_pdfs = None
+            self._index = None
+            self._journal = None
+            self._resume = None
+            self._save_manifests()
+            self._manifests = None
+            self._listing = None
 
-    def _run_impl(self, doc, get_ctrl, progress_cb=None, log_cb=None, ui_win=None):
-        # Initialiser le NamingResolver avec le document
-        if self._NamingResolver_cls is not None and self._nres is None:
+    def resume_last_run(self, doc, get_ctrl=None, progress_cb=None, log_cb=None, ui_win=None, cancel=None):
+        """Reprend le dernier run interrompu d'après le journal d'export.
+
+        Rejoue le plan (même mode, même destination) en sautant les éléments
+        marqués terminés dont le fichier existe toujours ; les autres sont
+        réexportés en écrasant les sorties partielles. Retourne False s'il
+        n'y a rien à reprendre.
+        """
+        state = ExportJournal().load() if ExportJournal is not None else None
+        if state is None or not state.interrupted:
+            if log_cb:
+                try:
+                    log_cb(u"Aucun export interrompu à reprendre.")
+                except Exception:
+                    pass
+            return False
+        info = state.run or {}
+        if log_cb:
+            try:
+                log_cb(u"Reprise de l'export du {} : {} élément(s) restant(s).".format(
+                    info.get('run_id', u'?'), state.pending_count()))
+            except Exception:
+                pass
+        self._resume = state
+        destination = info.get('destination') or None
+        if info.get('mode') == 'manual':
+            index = DocumentSheetIndex.build(doc) if DocumentSheetIndex is not None else None
+            by_id = {}
+            for rec in state.planned:
+                sid = rec.get('sheet_id')
+                elem = index.sheet_by_id(sid) if (index is not None and sid is not None) else None
+                if elem is None:
+                    continue
+                svm = by_id.get(sid)
+                if svm is None:
+                    svm = by_id[sid] = _ResumedSheet(elem)
+                if rec.get('fmt') == 'pdf':
+                    svm.ExportPdf = True
+                elif rec.get('fmt') == 'dwg':
+                    svm.ExportDwg = True
+            sheet_vms = [by_id[k] for k in sorted(by_id, key=lambda k: u'{}'.format(by_id[k].Numero))]
+            return self.run_manual(doc, sheet_vms, combine_pdf=bool(info.get('combine_pdf')),
+                                   pdf_title=info.get('pdf_title') or u'', progress_cb=progress_cb,
+                                   log_cb=log_cb, destination=destination, cancel=cancel)
+        return self.run(doc, get_ctrl, progress_cb=progress_cb, log_cb=log_cb, ui_win=ui_win,
+                        destination=destination, cancel=cancel)
+
+    # ------------------- Annulation ------------------- #
+    def _cancelled(self):
+        """Annulation demandée pour le run en cours (cf. `run(cancel=...)`)."""
+        return self._cancel is not None and bool(getattr(self._cancel, 'cancelled', False))
+
+    def _log_cancelled(self, log_cb):
+        # Le journal n'est pas clos : le run reste « interrompu », donc reprenable.
+        if not log_cb:
+            return
+        reason = getattr(self._cancel, 'reason', u'') or u''
+        try:
+            log_cb(u"Export annulé{} : les éléments restants pourront être repris.".format(
+                u' ({})'.format(reason) if reason else u''))
+        except Exception:
+            pass
+
+    # ------------------- Export incrémental ------------------- #
+    def _manifest(self, folder):
+        m = self._manifests.get(folder)
+        if m is None:
+            m = self._manifests[folder] = IncrementalManifest(folder)
+        return m
+
+    def _save_manifests(self):
+        for m in (self._manifests or {}).values():
+            m.save()
+
+    def _unchanged_filter(self, items, ext, setup_name, log_cb=None):
+        """Mode incrémental : retire les éléments du plan dont l'empreinte et
+        le fichier sont inchangés. Retourne `(à_exporter, {id(sheet): empreinte})`."""
+        if self._manifests is None:
+            return items, {}
+        pending = []
+        fps = {}
+        for it in items or []:
+            fp = sheet_fingerprint(it.sheet, it.file_name, self._get_rows_for_sheet(it.sheet), setup_name)
+            fps[id(it.sheet)] = fp
+            if not self._manifest(os.path.dirname(it.path)).is_unchanged(it.file_name, fp):
+                pending.append(it)
+        skipped = len(items or []) - len(pending)
+        if skipped and log_cb:
+            try:
+                log_cb(u"Incrémental : {} {} inchangé(s), ignoré(s).".format(skipped, ext.upper()))
+            except Exception:
+                pass
+        return pending, fps
+
+    def _record_fingerprints(self, results, fps):
+        if self._manifests is None:
+            return
+        for sh, ok, path in results or []:
+            fp = fps.get(id(sh))
+            if ok and fp and path:
+                manifest = self._manifest(os.path.dirname(path))
+                self._when_written(path, lambda m=manifest, p=path, f=fp: m.record(os.path.basename(p), f))
+
+    def _carnet_fingerprint(self, sheets, file_name, setup_name):
+        members = [sheet_fingerprint(sh, u'', self._get_rows_for_sheet(sh), setup_name)
+                   for sh in sheets or []]
+        return carnet_fingerprint(file_name, members, setup_name)
+
+    # ------------------- Journal (reprise) ------------------- #
+    def _open_journal(self, mode, doc, **info):
+        """Ouvre le journal du run. En reprise, on continue le journal
+        existant (les entrées "done" précédentes restent valables)."""
+        self._journal = ExportJournal() if ExportJournal is not None else None
+        if self._journal is None or self._resume is not None:
+            return
+        try:
+            info['doc'] = doc.Title
+        except Exception:
+            info['doc'] = u''
+        self._journal.start(mode, **info)
+
+    def _sheet_key(self, collection_name, sheet, fmt):
+        try:
+            numero = sheet.SheetNumber if sheet is not None else None
+        except Exception:
+            numero = None
+        if item_key is None:
+            return None
+        return item_key(collection_name, numero, fmt)
+
+    def _pending_sheets(self, sheets, collection_name, fmt, log_cb=None, member=False):
+        """Inscrit les feuilles au plan du journal et retourne celles qui
+        restent à exporter (toutes, hors reprise).
+
+        `member=True` : feuilles d'un PDF combiné, inscrites seulement pour
+        reconstruire la sélection (elles ne sont pas des sorties)."""
+        pending = []
+        for sh in sheets or []:
+            key = self._sheet_key(collection_name, sh, fmt)
+            if self._journal is not None and key is not None:
+                self._journal.planned(key, collection=collection_name or u'',
+                                      sheet=getattr(sh, 'SheetNumber', u''), fmt=fmt,
+                                      sheet_id=self._sheet_id(sh), member=bool(member))
+            if self._resume is not None and key is not None and self._resume.is_complete(key):
+                continue
+            pending.append(sh)
+        skipped = len(sheets or []) - len(pending)
+        if skipped and log_cb:
+            try:
+                log_cb(u"Reprise : {} {} déjà exporté(s), ignoré(s).".format(skipped, fmt.upper()))
+            except Exception:
+                pass
+        return pending
+
+    def _pending_items(self, items, collection_name, fmt, log_cb=None):
+        """`_pending_sheets` appliqué aux éléments unitaires du plan."""
+        keep = set(id(sh) for sh in self._pending_sheets([it.sheet for it in items], collection_name,
+                                                         fmt, log_cb=log_cb))
+        return [it for it in items if id(it.sheet) in keep]
+
+    def _journal_results(self, results, collection_name, fmt):
+        if self._journal is None:
+            return
+        for sh, ok, path in results or []:
+            key = self._sheet_key(collection_name, sh, fmt)
+            if ok and key is not None and path:
+                self._when_written(path, lambda k=key, p=path: self._journal_done(k, p))
+
+    def _carnet_pending(self, collection_name):
+        """Même logique que `_pending_sheets` pour un PDF combiné."""
+        key = item_key(collection_name, None, 'pdf') if item_key is not None else None
+        if self._journal is not None and key is not None:
+            self._journal.planned(key, collection=collection_name or u'', sheet=u'*', fmt='pdf')
+        if self._resume is not None and key is not None and self._resume.is_complete(key):
+            return None
+        return key or u''
+
+    def _journal_carnet(self, key, ok, path):
+        if self._journal is not None and key and ok and path:
+            self._when_written(path, lambda: self._journal_done(key, path))
+
+    def _journal_done(self, key, path):
+        # Appelé une fois le fichier réellement écrit (cf. pipeline post-export).
+        if self._journal is not None and os.path.exists(path):
+            self._journal.done(key, path)
+
+    def _init_resolver(self, doc):
+        # Patterns compilés (NamingService), à défaut l'ancien NamingResolver.
+        if self._NamingService_cls is not None and self._namer is None:
+            try:
+                self._namer = self._NamingService_cls(doc, config=self._cfg)
+            except Exception:
+                self._namer = None
+        if self._NamingResolver_cls is not None and self._nres is None and self._namer is None:
             try:
                 self._nres = self._NamingResolver_cls(doc)
             except Exception:
                 self._nres = None
-        
+        # Un contexte de nommage par run : date et ProjectInfo figées pour
+        # toutes les feuilles (un run qui passe minuit garde sa date).
+        context = self._namer.new_context() if self._namer is not None else None
+        if self._nres is not None and hasattr(self._nres, 'use_context'):
+            self._nres.use_context(context)
+
+    @staticmethod
+    def _refresh_snapshot(doc):
+        # Début de run : valeurs de paramètres du document relues (cf. ParameterSnapshot).
+        if SESSION_SNAPSHOT is not None:
+            SESSION_SNAPSHOT.invalidate(scope=scope_key(doc))
+
+    def _resolve_rows(self, elem, rows, kind='sheet'):
+        """Nom brut (non nettoyé) de `elem` selon `rows` ; pattern compilé
+        une fois par (rows, kind), cf. NamingService.compile."""
+        compiled = self._namer.compile(rows, kind) if self._namer is not None else None
+        if compiled is not None:
+            return compiled.evaluate(elem)
+        return self._nres.resolve_for_element(elem, rows, empty_fallback=False) if self._nres is not None else ''
+
+    def _run_impl(self, doc, get_ctrl, progress_cb=None, log_cb=None, ui_win=None):
+        self._init_resolver(doc)
+
         plans = self.plan_exports_for_collections(doc, get_ctrl)
 
         # Diagnostic immédiat si aucun plan ne qualifie
@@ -266,10 +821,28 @@ class ExportOrchestrator(object):
 
         total = len(plans)
 
+        # Plan détaillé : noms et chemins résolus une seule fois, exécuté tel quel.
+        run_plan = self.build_export_plan(doc, plans)
+        self.last_plan = run_plan
+        if log_cb and run_plan.info.get('collisions'):
+            try:
+                log_cb(u"{} collision(s) de noms (stratégie « {} ») :".format(
+                    len(run_plan.info['collisions']), run_plan.info.get('collision_strategy')))
+                for line in run_plan.info['collisions']:
+                    log_cb(u"  " + line)
+            except Exception:
+                pass
+
         # --- Check existing files ---
         overwrite = False
         try:
-            if self._detect_existing_files(doc, plans):
+            if self._resume is not None or self._manifests is not None:
+                # Reprise : les sorties partielles du run interrompu sont remplacées.
+                # Incrémental : les noms doivent rester stables d'un run à l'autre.
+                overwrite = True
+            elif self._overwrite_policy is not None:
+                overwrite = bool(self._overwrite_policy)
+            elif run_plan.existing():
                 from pyrevit import forms
                 res = forms.alert(
                     "Des fichiers existent déjà.\nVoulez-vous les remplacer ?",
@@ -281,112 +854,196 @@ class ExportOrchestrator(object):
         except Exception:
             pass
         # ----------------------------
+        self._assign_plan_paths(run_plan, overwrite=overwrite)
+        if self._outputs is not None:
+            self._outputs.plan(run_plan)
+        # Plan du dernier run exécuté : référence du prochain dry-run (diff).
+        run_plan.save()
+        if not self._precheck_space(self._space_needs(run_plan), log_cb):
+            return False
+        self._progress_planned(progress_cb, len(run_plan))
+        self._progress_predicted(progress_cb, self._predict_items(run_plan))
 
         if progress_cb:
             progress_cb(0, max(total, 1), 'Préparation...')
 
-        # Remove non-error logs
-
+        # Options d'export résolues une fois pour tout le run (étape mesurée).
         pdf_sep = self._pdf.get_separate(False) if self._pdf is not None else False
-        dwg_sep = self._dwg.get_separate(False) if self._dwg is not None else False
-        pdf_opt = self._get_pdf_options(doc)
-        dwg_opt = self._get_dwg_options(doc)
+        opt_item = self._trace_item('run', u'options')
+        with opt_item.stage('options_pdf'):
+            pdf_opt = self._get_pdf_options(doc)
+        with opt_item.stage('options_dwg'):
+            dwg_opt = self._get_dwg_options(doc)
+        opt_item.finish()
+        pdf_setup = self._pdf.get_saved_setup() if self._pdf is not None else None
+        dwg_setup = self._dwg.get_saved_setup() if self._dwg is not None else None
 
         for i, plan in enumerate(plans):
+            if self._cancelled():
+                break
             if progress_cb:
                 progress_cb(i, total, 'Collection: {}'.format(plan.collection_name))
             if not plan.do_export:
                 continue
+            cname = plan.collection_name
 
-            collection = self._find_collection_by_name(doc, plan.collection_name)
-            sheets = self._get_collection_sheets(doc, collection) if collection is not None else []
-            # Tri des feuilles par numéro croissant
-            try:
-                sheets = sorted(sheets, key=lambda sh: u'{}'.format(getattr(sh, 'SheetNumber', '') or ''))
-            except Exception:
-                pass
-            base_pdf = self._get_destination_base('PDF', plan.collection_name) if plan.do_pdf else None
-            base_dwg = self._get_destination_base('DWG', plan.collection_name) if plan.do_dwg else None
+            pdf_items = run_plan.items_for(cname, 'pdf', group=False)
+            if pdf_items:
+                self._progress_start(progress_cb, i, total,
+                                     u'{}: PDF ({} feuille(s))'.format(cname, len(pdf_items)))
+                todo = self._pending_items(pdf_items, cname, 'pdf', log_cb=log_cb)
+                todo, fps = self._unchanged_filter(todo, 'pdf', pdf_setup, log_cb=log_cb)
+                self._progress_items(progress_cb, SKIPPED, len(pdf_items) - len(todo))
+                results = self._export_plan_items(doc, todo, self._export_pdf_sheets, pdf_opt,
+                                                  separate=pdf_sep, overwrite=overwrite, log_cb=log_cb,
+                                                  progress=self._sheet_progress(progress_cb, i, total, cname, 'PDF'))
+                self._progress_items(progress_cb, 'pdf', len(results))
+                self._journal_results(results, cname, 'pdf')
+                self._record_fingerprints(results, fps)
+                self._register_sheet_pdfs(pdf_items, todo, results)
+                self._record_items(pdf_items, todo, results)
+                self._package_items(cname, pdf_items, todo, results)
 
-            if plan.per_sheet:
-                for sh in sheets:
-                    rows = self._get_rows_for_sheet(sh)
-                    if plan.do_pdf and base_pdf:
-                        if progress_cb:
-                            try:
-                                progress_cb(i, total, u'{}: {} (PDF)'.format(plan.collection_name, self._safe_sheet_name(sh)))
-                            except Exception:
-                                pass
-                        ok, path = self._export_pdf_sheet(doc, sh, rows, base_pdf, pdf_opt, separate=pdf_sep, overwrite=overwrite, log_cb=log_cb)
-                    if plan.do_dwg and base_dwg:
-                        if progress_cb:
+            for carnet in run_plan.items_for(cname, 'pdf', group=True):
+                if self._cancelled():
+                    break
+                carnet_key = self._carnet_pending(cname)
+                carnet_fp = None
+                if carnet_key is not None and self._manifests is not None:
+                    carnet_fp = self._carnet_fingerprint(carnet.sheets, carnet.file_name, pdf_setup)
+                    if self._manifest(os.path.dirname(carnet.path)).is_unchanged(carnet.file_name, carnet_fp):
+                        carnet_key = None
+                        if log_cb:
                             try:
-                                progress_cb(i, total, u'{}: {} (DWG)'.format(plan.collection_name, self._safe_sheet_name(sh)))
+                                log_cb(u"Incrémental : carnet {} inchangé, ignoré.".format(cname))
                             except Exception:
                                 pass
-                        ok, path = self._export_dwg_sheet(doc, sh, rows, base_dwg, dwg_opt, overwrite=overwrite, log_cb=log_cb)
-            else:
-                # Utiliser le pattern 'set' (carnet) s'il existe, sinon fallback sur sheet/default
-                rows = self._get_rows_for_set()
-                if not rows:
-                    rows = self._get_rows_for_sheet(sheets[0]) if sheets else [{'Name': plan.collection_name, 'Prefix': '', 'Suffix': ''}]
+                if carnet_key is None:
+                    self._progress_items(progress_cb, SKIPPED, 1)
+                    self._record_items([carnet], [], [])
+                    self._package_items(cname, [carnet], [], [])
+                    continue
+                self._progress_start(progress_cb, i, total, u'{}: PDF (combiné)'.format(cname))
+                ok, path = self._export_pdf_collection(doc, carnet.sheets, None, os.path.dirname(carnet.path),
+                                                       pdf_opt, overwrite=overwrite, log_cb=log_cb,
+                                                       path=carnet.path)
+                self._journal_carnet(carnet_key, ok, path)
+                self._progress_items(progress_cb, 'carnet', 1)
+                self._record_output(carnet.key, ok, path)
+                self._note_timing(ok, path, CARNET, len(carnet.sheets or []))
+                if ok:
+                    self._package(cname, path)
+                if ok and carnet_fp:
+                    self._when_written(path, lambda m=self._manifest(os.path.dirname(path)), p=path, f=carnet_fp:
+                                       m.record(os.path.basename(p), f))
 
-                if plan.do_pdf and base_pdf:
-                    if progress_cb:
-                        try:
-                            progress_cb(i, total, u'{}: PDF (combiné)'.format(plan.collection_name))
-                        except Exception:
-                            pass
-                    ok, path = self._export_pdf_collection(doc, sheets, rows, base_pdf, pdf_opt, collection=collection, overwrite=overwrite, log_cb=log_cb)
-                if plan.do_dwg and base_dwg:
-                    for sh in sheets:
-                        rows_sh = self._get_rows_for_sheet(sh)
-                        if progress_cb:
-                            try:
-                                progress_cb(i, total, u'{}: {} (DWG)'.format(plan.collection_name, self._safe_sheet_name(sh)))
-                            except Exception:
-                                pass
-                        ok, path = self._export_dwg_sheet(doc, sh, rows_sh, base_dwg, dwg_opt, overwrite=overwrite, log_cb=log_cb)
+            dwg_items = run_plan.items_for(cname, 'dwg')
+            if dwg_items and not self._cancelled():
+                self._progress_start(progress_cb, i, total,
+                                     u'{}: DWG ({} feuille(s))'.format(cname, len(dwg_items)))
+                todo = self._pending_items(dwg_items, cname, 'dwg', log_cb=log_cb)
+                todo, fps = self._unchanged_filter(todo, 'dwg', dwg_setup, log_cb=log_cb)
+                self._progress_items(progress_cb, SKIPPED, len(dwg_items) - len(todo))
+                results = self._export_plan_items(doc, todo, self._export_dwg_sheets, dwg_opt,
+                                                  overwrite=overwrite, log_cb=log_cb,
+                                                  progress=self._sheet_progress(progress_cb, i, total, cname, 'DWG'))
+                self._progress_items(progress_cb, 'dwg', len(results))
+                self._journal_results(results, cname, 'dwg')
+                self._record_fingerprints(results, fps)
+                self._record_items(dwg_items, todo, results)
+                self._package_items(cname, dwg_items, todo, results)
+            # Relève du pipeline post-export (journal/empreintes des fichiers
+            # terminés) puis sauvegarde par collection : un run interrompu
+            # garde ses empreintes.
+            self._poll_post(log_cb)
+            self._save_manifests()
 
+        if self._cancelled():
+            return False
         if progress_cb:
             progress_cb(total, max(total, 1), u'')
         return True
 
+    def _export_plan_items(self, doc, items, export_fn, options, **kwargs):
+        """Exécute des éléments unitaires du plan avec leurs chemins déjà
+        fixés. Retourne `[(sheet, ok, path)]` (cf. `_export_pdf_sheets`)."""
+        if not items:
+            return []
+        return export_fn(doc, [it.sheet for it in items], os.path.dirname(items[0].path), options,
+                         paths=[it.path for it in items], **kwargs)
+
     def run_manual(self, doc, sheet_vms, combine_pdf=False, pdf_title=u'',
-                   progress_cb=None, log_cb=None, destination=None):
+                   progress_cb=None, log_cb=None, destination=None, transmittal=None, cancel=None):
         """Export manuel : feuilles sélectionnées une par une (ou PDF combiné).
 
         sheet_vms  : liste de ManualSheetVM (ExportPdf / ExportDwg / Elem / Numero).
         combine_pdf: fusionner toutes les feuilles PDF en un seul fichier.
         pdf_title  : nom du fichier PDF combiné (ignoré si combine_pdf=False).
         destination: chemin de destination explicite (prioritaire sur DestinationStore).
+        transmittal: ZIP de diffusion (un seul pour le run), cf. `run()`.
+        cancel     : `CancellationToken`, cf. `run()`.
         """
+        self._cancel = cancel
+        self._refresh_snapshot(doc)
         self._destination_override = destination or None
+        self._listing = self._new_listing()
+        self._post = self._new_post_pipeline()
+        self._trace = self._new_trace()
+        self._open_journal('manual', doc, destination=destination or u'',
+                           combine_pdf=bool(combine_pdf), pdf_title=pdf_title or u'')
+        self._open_render_cache(doc)
+        self._open_transmittal(doc, transmittal)
+        self._open_outputs('manual', doc)
+        self._open_timings()
         try:
-            return self._run_manual_impl(doc, sheet_vms, combine_pdf=combine_pdf,
-                                         pdf_title=pdf_title, progress_cb=progress_cb,
-                                         log_cb=log_cb)
+            ok = self._run_manual_impl(doc, sheet_vms, combine_pdf=combine_pdf,
+                                       pdf_title=pdf_title, progress_cb=progress_cb,
+                                       log_cb=log_cb)
+            self._drain_post(log_cb)
+            if self._cancelled():
+                self._log_cancelled(log_cb)
+                return False
+            self._close_transmittals(log_cb)
+            if self._journal is not None:
+                self._journal.finish('ok')
+            return ok
         finally:
+            self._drain_post(log_cb)
+            self._close_transmittals(log_cb, abort=True)
+            self._close_outputs(log_cb)
+            self._close_timings()
+            self._close_render_cache(log_cb)
+            self._close_trace(log_cb)
+            self._cancel = None
             self._destination_override = None
+            self._journal = None
+            self._resume = None
+            self._listing = None
 
     def _run_manual_impl(self, doc, sheet_vms, combine_pdf=False, pdf_title=u'',
                          progress_cb=None, log_cb=None):
-        if self._NamingResolver_cls is not None and self._nres is None:
-            try:
-                self._nres = self._NamingResolver_cls(doc)
-            except Exception:
-                self._nres = None
+        self._init_resolver(doc)
 
         pdf_vms = [s for s in (sheet_vms or []) if s.ExportPdf]
         dwg_vms = [s for s in (sheet_vms or []) if s.ExportDwg]
         total = len(pdf_vms) + len(dwg_vms)
+        if not self._precheck_space(self._manual_space_needs(pdf_vms, dwg_vms, combine_pdf), log_cb):
+            return False
+        self._progress_planned(progress_cb, total)
+        self._progress_predicted(progress_cb, self._predict_manual(pdf_vms, dwg_vms, combine_pdf))
 
         if progress_cb:
             progress_cb(0, max(total, 1), u'Préparation...')
 
-        pdf_opt = self._get_pdf_options(doc)
-        dwg_opt = self._get_dwg_options(doc)
+        opt_item = self._trace_item('run', u'options')
+        with opt_item.stage('options_pdf'):
+            pdf_opt = self._get_pdf_options(doc)
+        with opt_item.stage('options_dwg'):
+            dwg_opt = self._get_dwg_options(doc)
+        opt_item.finish()
         pdf_sep = self._pdf.get_separate(False) if self._pdf is not None else False
+        # Reprise : les sorties partielles du run interrompu sont remplacées.
+        overwrite = self._resume is not None
 
         done = 0
 
@@ -395,44 +1052,123 @@ class ExportOrchestrator(object):
             if combine_pdf:
                 elems = [s.Elem for s in pdf_vms if s.Elem is not None]
                 rows = [{'Name': pdf_title or u'export', 'Prefix': u'', 'Suffix': u''}]
-                if progress_cb:
-                    progress_cb(done, max(total, 1), u'PDF combiné...')
-                ok, path = self._export_pdf_collection(doc, elems, rows, base_pdf, pdf_opt, log_cb=log_cb)
+                # Les feuilles sont inscrites au journal pour pouvoir
+                # reconstruire la sélection en cas de reprise.
+                self._pending_sheets(elems, u'', 'pdf', member=True)
+                carnet_key = self._carnet_pending(u'')
+                if carnet_key is not None and not self._cancelled():
+                    self._progress_start(progress_cb, done, max(total, 1), u'PDF combiné...')
+                    ok, path = self._export_pdf_collection(doc, elems, rows, base_pdf, pdf_opt,
+                                                           overwrite=overwrite, log_cb=log_cb)
+                    self._journal_carnet(carnet_key, ok, path)
+                    self._progress_items(progress_cb, 'carnet', len(pdf_vms))
+                    self._record_output(carnet_key, ok, path, fmt='pdf', sheet=u'*')
+                    self._note_timing(ok, path, CARNET, len(elems))
+                    if ok:
+                        self._package(u'', path)
+                elif carnet_key is None:
+                    self._progress_items(progress_cb, SKIPPED, len(pdf_vms))
                 done += len(pdf_vms)
             else:
-                for svm in pdf_vms:
-                    if svm.Elem is None:
-                        done += 1
-                        continue
-                    rows = self._get_rows_for_sheet(svm.Elem)
-                    if progress_cb:
-                        try:
-                            progress_cb(done, max(total, 1), u'{} (PDF)'.format(svm.Numero))
-                        except Exception:
-                            pass
-                    ok, path = self._export_pdf_sheet(doc, svm.Elem, rows, base_pdf, pdf_opt,
-                                                      separate=pdf_sep, log_cb=log_cb)
-                    done += 1
+                elems = self._pending_sheets([s.Elem for s in pdf_vms if s.Elem is not None], u'', 'pdf',
+                                             log_cb=log_cb)
+                self._progress_start(progress_cb, done, max(total, 1),
+                                     u'PDF ({} feuille(s))...'.format(len(elems)))
+                counter = [done]
 
-        for svm in dwg_vms:
-            if svm.Elem is None:
-                done += 1
-                continue
-            rows = self._get_rows_for_sheet(svm.Elem)
+                def _pdf_progress(sh):
+                    self._progress_start(progress_cb, counter[0], max(total, 1),
+                                         u'{} (PDF)'.format(getattr(sh, 'SheetNumber', u'')))
+                    counter[0] += 1
+                results = self._export_pdf_sheets(doc, elems, base_pdf, pdf_opt, separate=pdf_sep,
+                                                  overwrite=overwrite, log_cb=log_cb, progress=_pdf_progress)
+                self._journal_results(results, u'', 'pdf')
+                self._record_results(results, 'pdf', sheets=elems)
+                self._package_results(results)
+                self._progress_items(progress_cb, SKIPPED, len(pdf_vms) - len(results))
+                self._progress_items(progress_cb, 'pdf', len(results))
+                done += len(pdf_vms)
+
+        if dwg_vms and self._cancelled():
+            # Étape jamais commencée : feuilles inscrites au journal (la
+            # reprise reconstruit la sélection) et au manifeste, à faire.
+            self._record_results([], 'dwg', sheets=self._pending_sheets(
+                [s.Elem for s in dwg_vms if s.Elem is not None], u'', 'dwg'))
+        elif dwg_vms:
+            elems = self._pending_sheets([s.Elem for s in dwg_vms if s.Elem is not None], u'', 'dwg',
+                                         log_cb=log_cb)
             base_dwg = self._get_destination_base('DWG', None)
-            if progress_cb:
-                try:
-                    progress_cb(done, max(total, 1), u'{} (DWG)'.format(svm.Numero))
-                except Exception:
-                    pass
-            ok, path = self._export_dwg_sheet(doc, svm.Elem, rows, base_dwg, dwg_opt, log_cb=log_cb)
-            done += 1
+            self._progress_start(progress_cb, done, max(total, 1),
+                                 u'DWG ({} feuille(s))...'.format(len(elems)))
+            counter = [done]
 
+            def _dwg_progress(sh):
+                self._progress_start(progress_cb, counter[0], max(total, 1),
+                                     u'{} (DWG)'.format(getattr(sh, 'SheetNumber', u'')))
+                counter[0] += 1
+            results = self._export_dwg_sheets(doc, elems, base_dwg, dwg_opt, overwrite=overwrite,
+                                              log_cb=log_cb, progress=_dwg_progress)
+            self._journal_results(results, u'', 'dwg')
+            self._record_results(results, 'dwg', sheets=elems)
+            self._package_results(results)
+            self._progress_items(progress_cb, SKIPPED, len(dwg_vms) - len(results))
+            self._progress_items(progress_cb, 'dwg', len(results))
+            done += len(dwg_vms)
+
+        if self._cancelled():
+            return False
         if progress_cb:
             progress_cb(total, max(total, 1), u'')
         return True
 
     # ------------------- Helpers noms/export ------------------- #
+    @staticmethod
+    def _progress_planned(progress_cb, count):
+        # Extensions optionnelles du callback (cf. ProgressDispatcher)
+        fn = getattr(progress_cb, 'planned', None)
+        if fn is not None:
+            try:
+                fn(count)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _progress_predicted(progress_cb, seconds):
+        fn = getattr(progress_cb, 'predicted', None)
+        if fn is not None and seconds is not None:
+            try:
+                fn(seconds)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _progress_items(progress_cb, stage, count):
+        fn = getattr(progress_cb, 'item_done', None)
+        if fn is not None and count > 0:
+            try:
+                fn(stage, count)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _progress_start(progress_cb, current, total, message):
+        """Annonce d'un export bloquant qui démarre : livrée sans coalescence
+        si le callback le permet (`ProgressDispatcher.start`)."""
+        if not progress_cb:
+            return
+        fn = getattr(progress_cb, 'start', None) or progress_cb
+        try:
+            fn(current, total, message)
+        except Exception:
+            pass
+
+    def _sheet_progress(self, progress_cb, i, total, collection_name, fmt):
+        """Callback `progress(sheet)` pour les exports unitaires d'une collection."""
+        def _progress(sh):
+            self._progress_start(progress_cb, i, total,
+                                 u'{}: {} ({})'.format(collection_name, self._safe_sheet_name(sh), fmt))
+        return _progress
+
     def _safe_sheet_name(self, sheet):
         try:
             return sheet.SheetNumber + '_' + sheet.Name
@@ -459,33 +1195,114 @@ class ExportOrchestrator(object):
 
     def _resolve_name_no_ext(self, elem, rows):
         try:
-            s = self._nres.resolve_for_element(elem, rows, empty_fallback=False) if self._nres is not None else ''
+            s = self._resolve_rows(elem, rows)
             # Si le résultat est vide après résolution, utiliser un nom par défaut
             # MAIS seulement si rows était vide ou si le résultat est vraiment vide
             # Si rows n'est pas vide, c'est que l'utilisateur a demandé un format spécifique.
             # Si ce format donne une chaîne vide (ex: paramètre vide), on respecte (ou on met un placeholder ?)
             # Pour l'instant, on garde le fallback si vide, car un nom de fichier vide est invalide.
             if not s or not s.strip():
-                # Fallback seulement si rows était vide ou invalide
-                # Si rows existe, on essaie de voir si on peut sauver les meubles
-                try:
-                    s = elem.SheetNumber + '_' + elem.Name
-                except Exception:
-                    s = getattr(elem, 'Name', 'export')
+                s = self._fallback_name(elem)
             return self._dest.sanitize(s) if self._dest is not None else s
         except Exception:
             return 'export'
 
+    @staticmethod
+    def _fallback_name(elem):
+        # Nom par défaut d'une feuille dont le pattern résout à vide.
+        try:
+            return elem.SheetNumber + '_' + elem.Name
+        except Exception:
+            return getattr(elem, 'Name', 'export')
+
+    def _resolve_sheet_names(self, sheets):
+        """Noms (sans extension, nettoyés) de `sheets` selon le pattern
+        feuille, mêmes replis que `_resolve_name_no_ext`, résolus en un lot
+        (`NamingService.resolve_many`). Retourne `(noms, bilan)` ; bilan =
+        `ResolvedNames` (noms vides / doublons) ou None sans résolution
+        groupée (pas de pattern enregistré, ancien résolveur)."""
+        sheets = list(sheets or [])
+        try:
+            _patt, rows = self._nstore.load('sheet') if self._nstore is not None else ('', [])
+        except Exception:
+            rows = []
+        if not rows or self._namer is None or not hasattr(self._namer, 'resolve_many'):
+            return [self._resolve_name_no_ext(sh, self._get_rows_for_sheet(sh)) for sh in sheets], None
+        sanitize = self._dest.sanitize if self._dest is not None else None
+        try:
+            batch = self._namer.resolve_many(sheets, rows, 'sheet', transform=sanitize)
+        except Exception:
+            return [self._resolve_name_no_ext(sh, rows) for sh in sheets], None
+        names = []
+        for sh, name in zip(sheets, batch):
+            if not name or not name.strip():
+                name = self._fallback_name(sh)
+                try:
+                    name = sanitize(name) if sanitize is not None else name
+                except Exception:
+                    name = 'export'
+            names.append(name)
+        return names, batch
+
+    @staticmethod
+    def _naming_warnings(collection_name, sheets, batch):
+        """Lignes d'avertissement (aperçu) pour les noms vides et doublons."""
+        if batch is None or not batch.has_issues:
+            return []
+        def _nums(positions):
+            return u', '.join(u'{}'.format(getattr(sheets[pos], 'SheetNumber', u'?')) for pos in positions)
+        lines = []
+        if batch.empty:
+            lines.append(u'{} : nom vide pour {} (nom par défaut)'.format(collection_name, _nums(batch.empty)))
+        for name, positions in batch.duplicates.items():
+            lines.append(u'{} : "{}" produit par {}'.format(collection_name, name, _nums(positions)))
+        return lines
+
+    def _resolve_carnet_name(self, sheets, rows, collection=None):
+        """Nom (sans extension) d'un PDF combiné : résolu sur la collection,
+        à défaut sur la première feuille."""
+        try:
+            elem_to_resolve = collection if collection else (sheets[0] if sheets else None)
+            name_no_ext = self._dest.sanitize('' if not elem_to_resolve else self._resolve_rows(elem_to_resolve, rows, 'set')) if self._dest is not None else 'export'
+        except Exception:
+            name_no_ext = 'export'
+        return name_no_ext or 'export'
+
     def _unique_with_ext(self, folder, file_no_ext, ext, overwrite=False):
         try:
             base = os.path.join(folder, file_no_ext + '.' + ext)
+            if self._listing is not None:
+                path = base if overwrite else self._listing.unique_path(base)
+                # Réservé dès maintenant : les noms suivants du run l'évitent.
+                self._listing.add(path)
+                return path
             if overwrite:
                 return base
             return self._dest.unique_path(base) if self._dest is not None else base
         except Exception:
             return os.path.join(folder, file_no_ext + '.' + ext)
 
-    def _export_pdf_sheet(self, doc, sheet, rows, base_folder, options, separate=True, overwrite=False, log_cb=None):
+    # ------------------- Accès dossiers (cache du run) ------------------- #
+    def _new_listing(self):
+        if self._DestinationListing_cls is None:
+            return None
+        try:
+            return self._DestinationListing_cls(self._dest)
+        except Exception:
+            return None
+
+    def _ensure_folder(self, folder):
+        if self._listing is not None:
+            return self._listing.ensure(folder)
+        return self._dest.ensure(folder)
+
+    def _path_exists(self, path):
+        if self._listing is not None:
+            return self._listing.exists(path)
+        return os.path.exists(path)
+
+    def _export_pdf_sheet(self, doc, sheet, rows, base_folder, options, separate=True, overwrite=False, log_cb=None,
+                          path=None):
         def _log(msg):
             if log_cb:
                 try:
@@ -493,15 +1310,21 @@ class ExportOrchestrator(object):
                 except Exception:
                     pass
         label = self._safe_sheet_name(sheet)
-        name_no_ext = self._resolve_name_no_ext(sheet, rows)
+        item = self._trace_item('pdf', label)
         try:
-            self._dest.ensure(base_folder)
+            self._ensure_folder(base_folder)
         except Exception:
             pass
-        path = self._unique_with_ext(base_folder, name_no_ext, 'pdf', overwrite=overwrite)
+        if path is None:
+            path = self._target_path(sheet, rows, base_folder, 'pdf', overwrite, item)
+        if RenderCache is not None:
+            # Revit réécrit le fichier en place : ne pas altérer un blob du cache.
+            RenderCache.detach(path)
         folder = os.path.dirname(path)
         file_no_ext = os.path.splitext(os.path.basename(path))[0]
         ok = False
+        item.start('export')
+        views = None
         try:
             if DB is not None and hasattr(DB, 'PDFExportOptions') and options is not None:
                 try:
@@ -511,43 +1334,57 @@ class ExportOrchestrator(object):
                 except Exception as _ve:
                     _log(u"PDF [{}] : préparation vues : {}".format(label, _ve))
                     views = None
-                try:
-                    if hasattr(options, 'Combine'):
-                        # Toujours combiner pour forcer l'utilisation du FileName exact
-                        # (sinon Revit utilise FileName comme préfixe)
-                        options.Combine = True
-                except Exception:
-                    pass
-                try:
-                    if hasattr(options, 'FileName'):
-                        options.FileName = file_no_ext
-                except Exception:
-                    pass
+                # Toujours combiner pour forcer l'utilisation du FileName exact
+                # (sinon Revit utilise FileName comme préfixe)
+                options = self._item_options(options, Combine=True, FileName=file_no_ext)
                 _log(u"PDF [{}] : dossier={!r} | fichier={!r}".format(label, folder, file_no_ext))
-                if views is not None:
-                    try:
-                        raw = doc.Export(folder, views, options)
-                        ok = bool(raw)
-                        _log(u"PDF [{}] : retour Export={!r} ok={}".format(label, raw, ok))
-                        if ok:
-                            expected = os.path.join(folder, file_no_ext + '.pdf')
-                            _log(u"PDF [{}] : fichier existe={} path={!r}".format(label, os.path.exists(expected), expected))
-                    except Exception as _e1:
-                        _log(u"PDF [{}] : Export 3-arg echoue : {}".format(label, _e1))
-                        try:
-                            raw = doc.Export(folder, file_no_ext, views, options)
-                            ok = bool(raw)
-                            _log(u"PDF [{}] : retour Export 4-arg={!r} ok={}".format(label, raw, ok))
-                        except Exception as _e2:
-                            _log(u"PDF [{}] : Export API : {} / {}".format(label, _e1, _e2))
-                            ok = False
             elif options is None:
                 _log(u"PDF [{}] : options d'export non disponibles (PDFExportOptions introuvable ou config vide).".format(label))
         except Exception as _e:
             _log(u"PDF [{}] : erreur inattendue : {}".format(label, _e))
-            ok = False
-        if not ok:
-            try:
+            views = None
+        # Chemin retenu pour (version de Revit, setup) essayé en premier ;
+        # renégociation complète après un échec (cf. ExportStrategySelector).
+        selector = self._strategy_selector
+        key = self._strategy_key(doc)
+        order = selector.order(key) if selector is not None else [EXPORT_3, EXPORT_4, PRINT]
+        for strategy in order:
+            ok = self._pdf_strategy(strategy, doc, sheet, views, folder, file_no_ext, path, options,
+                                    item, label, _log)
+            if ok is None:
+                ok = False
+                continue  # chemin indisponible pour cette feuille : ni retenu ni oublié
+            if ok:
+                if selector is not None:
+                    selector.succeeded(key, strategy)
+                break
+            if selector is not None:
+                selector.failed(key, strategy)
+        item.stop('export')
+        item.finish(path if ok else None, status='ok' if ok else 'error')
+        return ok, path
+
+    def _strategy_key(self, doc):
+        if ExportStrategySelector is None:
+            return None
+        try:
+            setup_name = self._pdf.get_saved_setup() if self._pdf is not None else None
+        except Exception:
+            setup_name = None
+        return ExportStrategySelector.key(revit_version(doc), setup_name)
+
+    def _pdf_strategy(self, strategy, doc, sheet, views, folder, file_no_ext, path, options, item, label, _log):
+        """Un chemin d'export PDF unitaire ; True si Revit a produit le
+        fichier, None si le chemin n'est pas applicable (API d'export sans
+        vues ni options)."""
+        if strategy != PRINT and views is None:
+            return None
+        try:
+            if strategy == EXPORT_3:
+                raw = doc.Export(folder, views, options)
+            elif strategy == EXPORT_4:
+                raw = doc.Export(folder, file_no_ext, views, options)
+            else:
                 pm = doc.PrintManager
                 pm.PrintToFile = True
                 pm.PrintToFileName = path
@@ -564,13 +1401,171 @@ class ExportOrchestrator(object):
                     vs.Insert(sheet)
                 except Exception:
                     pass
-                ok = bool(pm.SubmitPrint(vs))
+                return bool(pm.SubmitPrint(vs))
+        except Exception as _e:
+            _log(u"PDF [{}] : {} echoue : {}".format(label, _STRATEGY_LABELS.get(strategy, strategy), _e))
+            return False
+        ok = bool(raw)
+        item.note('revit', raw)
+        _log(u"PDF [{}] : retour {}={!r} ok={}".format(label, _STRATEGY_LABELS.get(strategy, strategy), raw, ok))
+        if ok:
+            expected = os.path.join(folder, file_no_ext + '.pdf')
+            _log(u"PDF [{}] : fichier existe={} path={!r}".format(label, os.path.exists(expected), expected))
+        return ok
+
+    def _export_pdf_sheets(self, doc, sheets, base_folder, options, separate=True, overwrite=False,
+                           log_cb=None, progress=None, paths=None):
+        """Exporte chaque feuille de `sheets` dans son propre PDF.
+
+        Tente d'abord un export groupé (un seul appel Revit), puis repasse par
+        `_export_pdf_sheet` pour chaque feuille que le groupé n'a pas produite.
+        `progress(sheet)` est appelé avant chaque export unitaire.
+        `paths` : chemins finaux déjà fixés (plan), parallèles à `sheets` ;
+        sinon résolus ici.
+        Retourne `[(sheet, ok, path)]` dans l'ordre de `sheets`.
+        """
+        sheets, paths = self._sheets_and_paths(sheets, paths)
+        keys, paths = self._render_keys(sheets, paths, 'pdf', base_folder, overwrite)
+        cached = self._serve_rendered(sheets, paths, keys, 'pdf')
+        todo = [pos for pos in range(len(sheets)) if pos not in cached]
+        by_pos = {} if self._cancelled() else self._export_subset_batched(
+            self._export_pdf_sheets_batched, doc, sheets, paths, todo, base_folder, options,
+            overwrite=overwrite, log_cb=log_cb)
+        by_pos.update(cached)
+        results = []
+        unreached = set()
+        for pos, sh in enumerate(sheets):
+            if pos in by_pos:
+                results.append((sh, True, by_pos[pos]))
+                continue
+            if self._cancelled():
+                unreached.add(pos)
+                results.append((sh, False, None))
+                continue
+            if progress is not None:
+                progress(sh)
+            rows = self._get_rows_for_sheet(sh)
+            ok, path = self._export_pdf_sheet(doc, sh, rows, base_folder, options,
+                                              separate=separate, overwrite=overwrite, log_cb=log_cb,
+                                              path=paths[pos] if paths else None)
+            results.append((sh, ok, path))
+        self._store_rendered(results, keys, cached, 'pdf')
+        return self._reached(results, unreached)
+
+    @staticmethod
+    def _reached(results, unreached):
+        # Run annulé : les feuilles jamais atteintes ne figurent pas dans le
+        # résultat (ni réussies ni en échec ; elles restent à faire au journal).
+        if not unreached:
+            return results
+        return [res for pos, res in enumerate(results) if pos not in unreached]
+
+    @staticmethod
+    def _sheets_and_paths(sheets, paths):
+        """Retire les feuilles None en gardant `paths` aligné."""
+        pairs = [(sh, paths[pos] if paths else None) for pos, sh in enumerate(sheets or [])
+                 if sh is not None]
+        return [sh for sh, _p in pairs], ([p for _sh, p in pairs] if paths else None)
+
+    def _target_path(self, sheet, rows, base_folder, ext, overwrite, item=None):
+        """Chemin de sortie d'une feuille hors plan : résolution du nom puis
+        unicité (réservé dans le cache du run)."""
+        with (item or NULL_ITEM).stage('resolve'):
+            name_no_ext = self._resolve_name_no_ext(sheet, rows)
+        return self._unique_with_ext(base_folder, name_no_ext, ext, overwrite=overwrite)
+
+    def _export_pdf_sheets_batched(self, doc, sheets, base_folder, options, overwrite=False, log_cb=None,
+                                   paths=None):
+        """Export PDF groupé : `Combine = False`, règle de nommage imposée sur
+        le numéro de feuille, sortie dans un dossier de transit, puis
+        renommage vers les noms résolus.
+
+        Retourne `{position dans sheets: chemin final}` pour les feuilles
+        effectivement produites ; `{}` si le mode groupé n'est pas disponible
+        ou a échoué (l'appelant se replie alors feuille par feuille).
+        """
+        def _log(msg):
+            if log_cb:
+                try:
+                    log_cb(msg)
+                except Exception:
+                    pass
+        if len(sheets) < 2 or build_rename_map is None:
+            return {}
+        if DB is None or options is None or not hasattr(DB, 'TableCellCombinedParameterData'):
+            return {}
+        if not hasattr(options, 'SetNamingRule') or not hasattr(options, 'Combine'):
+            return {}
+        try:
+            staging = tempfile.mkdtemp(prefix='batchexport_pdf_')
+        except Exception:
+            return {}
+        import shutil
+        placed = {}
+        item = self._trace_item('pdf', u'PDF groupé ({} feuilles)'.format(len(sheets)))
+        try:
+            expected = {}
+            for pos, sh in enumerate(sheets):
+                try:
+                    expected[pos] = sh.SheetNumber
+                except Exception:
+                    continue
+            ok = False
+            try:
+                from System.Collections.Generic import List as Clist  # type: ignore
+                views = Clist[DB.ElementId]()
+                for sh in sheets:
+                    views.Add(sh.Id)
+                part = DB.TableCellCombinedParameterData.Create()
+                part.ParamId = DB.ElementId(DB.BuiltInParameter.SHEET_NUMBER)
+                part.CategoryId = DB.ElementId(DB.BuiltInCategory.OST_Sheets)
+                rule = Clist[DB.TableCellCombinedParameterData]()
+                rule.Add(part)
+                batch_opt = self._item_options(options, NamingRule=rule, Combine=False)
+                _log(u"PDF groupé : {} feuille(s) -> {!r}".format(len(sheets), staging))
+                with item.stage('export'):
+                    raw = doc.Export(staging, views, batch_opt)
+                ok = bool(raw)
+                item.note('revit', raw)
+                _log(u"PDF groupé : retour Export={!r} ok={}".format(raw, ok))
             except Exception as _e:
-                _log(u"PDF [{}] : PrintManager fallback : {}".format(label, _e))
+                _log(u"PDF groupé : indisponible ({}), repli feuille par feuille.".format(_e))
                 ok = False
-        return ok, path
+            if not ok:
+                item.finish(status='error')
+                return {}
+            try:
+                produced = os.listdir(staging)
+            except Exception:
+                produced = []
+            mapping = build_rename_map(produced, expected, 'pdf')
+            try:
+                self._ensure_folder(base_folder)
+            except Exception:
+                pass
+            moves = []
+            for pos in sorted(mapping):
+                sh = sheets[pos]
+                path = paths[pos] if paths else self._target_path(
+                    sh, self._get_rows_for_sheet(sh), base_folder, 'pdf', overwrite, item)
+                moves.append((os.path.join(staging, mapping[pos]), path))
+                placed[pos] = path
+            if len(placed) < len(sheets):
+                _log(u"PDF groupé : {}/{} feuille(s) produites, repli unitaire pour le reste.".format(
+                    len(placed), len(sheets)))
+            # Déplacements + nettoyage du transit : pipeline post-export.
+            if not self._post_job(u'PDF groupé', self._move_outputs, (staging, moves, None, item),
+                                  targets=[dst for _src, dst in moves]):
+                placed = {}
+            staging = None
+            self._finish_batch_item(item, [dst for _src, dst in moves])
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+        return placed
 
-    def _export_dwg_sheet(self, doc, sheet, rows, base_folder, options, overwrite=False, log_cb=None):
+    def _export_dwg_sheet(self, doc, sheet, rows, base_folder, options, overwrite=False, log_cb=None,
+                          path=None):
         def _log(msg):
             if log_cb:
                 try:
@@ -578,12 +1573,12 @@ class ExportOrchestrator(object):
                 except Exception:
                     pass
         label = self._safe_sheet_name(sheet)
-        name_no_ext = self._resolve_name_no_ext(sheet, rows)
+        item = self._trace_item('dwg', label)
         try:
-            self._dest.ensure(base_folder)
+            self._ensure_folder(base_folder)
         except Exception:
             pass
-        final_path = self._unique_with_ext(base_folder, name_no_ext, 'dwg', overwrite=overwrite)
+        final_path = path or self._target_path(sheet, rows, base_folder, 'dwg', overwrite, item)
         try:
             tmp_dir = tempfile.mkdtemp(prefix='batchexport_dwg_')
         except Exception:
@@ -593,6 +1588,7 @@ class ExportOrchestrator(object):
             except Exception:
                 pass
         ok = False
+        item.start('export')
         try:
             if DB is not None and options is not None:
                 from System.Collections.Generic import List as Clist  # type: ignore
@@ -600,15 +1596,13 @@ class ExportOrchestrator(object):
                 views.Add(sheet.Id)
 
                 # Force MergedViews to True to ensure single file output (no XREFs)
-                try:
-                    options.MergedViews = True
-                except Exception:
-                    pass
+                options = self._item_options(options, MergedViews=True)
 
                 # DWG export requires a prefix name in most overloads
                 _log(u"DWG [{}] : tmp_dir={!r}".format(label, tmp_dir))
                 raw = doc.Export(tmp_dir, "export", views, options)
                 ok = bool(raw)
+                item.note('revit', raw)
                 _log(u"DWG [{}] : retour Export={!r} ok={}".format(label, raw, ok))
                 if ok:
                     _log(u"DWG [{}] : contenu tmp_dir={}".format(label, os.listdir(tmp_dir) if os.path.isdir(tmp_dir) else 'ABSENT'))
@@ -618,90 +1612,877 @@ class ExportOrchestrator(object):
             _log(u"DWG [{}] : Export API : {}".format(label, _e))
             ok = False
         
+        item.stop('export')
+        # Renommage, rasters et nettoyage : pipeline post-export (hors thread
+        # Revit si actif, sinon en ligne).
+        if ok:
+            ok = self._post_job(u'DWG [{}]'.format(label), self._finalize_dwg_sheet,
+                                (tmp_dir, final_path, base_folder, item), targets=(final_path,))
+        else:
+            self._post_job(u'DWG [{}] nettoyage'.format(label), self._move_outputs, (tmp_dir, [], None))
+        if ok:
+            self._when_written(final_path, lambda: item.finish(final_path))
+        else:
+            item.finish(status='error')
+        return ok, final_path
+
+    def _finalize_dwg_sheet(self, tmp_dir, final_path, base_folder, item=None):
+        """Travail fichiers d'un export DWG unitaire : place le DWG produit
+        sous son nom final, recopie les rasters, supprime le temporaire.
+        Lève si aucun DWG n'a été produit."""
+        import shutil
         try:
-            if ok:
-                # Prioritize the main file "export.dwg"
-                exported_file = None
-                expected_main = os.path.join(tmp_dir, "export.dwg")
-
-                if os.path.exists(expected_main):
-                    exported_file = expected_main
-                else:
-                    # Fallback: pick the most recent DWG
-                    cands = [os.path.join(tmp_dir, f) for f in os.listdir(tmp_dir) if f.lower().endswith('.dwg')]
-                    if cands:
-                        cands.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-                        exported_file = cands[0]
-
-                if exported_file:
+            # Prioritize the main file "export.dwg"
+            exported_file = None
+            expected_main = os.path.join(tmp_dir, "export.dwg")
+
+            if os.path.exists(expected_main):
+                exported_file = expected_main
+            else:
+                # Fallback: pick the most recent DWG
+                cands = [os.path.join(tmp_dir, f) for f in os.listdir(tmp_dir) if f.lower().endswith('.dwg')]
+                if cands:
+                    cands.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+                    exported_file = cands[0]
+
+            if not exported_file:
+                raise IOError(u"aucun DWG produit dans {}".format(tmp_dir))
+            item = item or NULL_ITEM
+            with item.stage('move'):
+                try:
+                    if os.path.exists(final_path):
+                        os.remove(final_path)
+                    os.rename(exported_file, final_path)
+                except Exception:
+                    shutil.copy2(exported_file, final_path)
                     try:
-                        if os.path.exists(final_path):
-                            os.remove(final_path)
-                        os.rename(exported_file, final_path)
+                        os.remove(exported_file)
                     except Exception:
-                        import shutil
-                        shutil.copy2(exported_file, final_path)
-                        try:
-                            os.remove(exported_file)
-                        except Exception:
-                            pass
+                        pass
+
+            # Copy referenced raster files from tmp to final folder to preserve XREFs
+            with item.stage('rasters'):
+                if self._copy_rasters(tmp_dir, base_folder):
+                    self._mark_rasters([final_path])
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
-                    # Copy referenced raster files from tmp to final folder to preserve XREFs
+    def _move_outputs(self, tmp_dir, moves, raster_folder=None, item=None):
+        """Travail fichiers d'un export groupé : `moves` = [(source, cible)],
+        rasters recopiés vers `raster_folder` si fourni, temporaire supprimé.
+        Lève à la fin si au moins un déplacement a échoué."""
+        import shutil
+        failed = []
+        item = item or NULL_ITEM
+        try:
+            with item.stage('move'):
+                for src, dst in moves:
                     try:
-                        import shutil
-                        exts = {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif'}
-                        for root, dirs, files in os.walk(tmp_dir):
-                            rel = os.path.relpath(root, tmp_dir)
-                            dest_root = base_folder if rel == '.' else os.path.join(base_folder, rel)
+                        if os.path.exists(dst):
+                            os.remove(dst)
+                        shutil.move(src, dst)
+                    except Exception as _e:
+                        failed.append(u'{} ({})'.format(os.path.basename(dst), _e))
+            if raster_folder:
+                with item.stage('rasters'):
+                    if self._copy_rasters(tmp_dir, raster_folder):
+                        self._mark_rasters([dst for _src, dst in moves])
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if failed:
+            raise IOError(u"déplacement échoué : {}".format(u', '.join(failed)))
+
+    # ------------------- Pipeline post-export ------------------- #
+    def _new_post_pipeline(self):
+        if PostExportPipeline is None:
+            return None
+        try:
+            workers = int(self._get_flag('post_export_workers', '2'))
+        except Exception:
+            workers = 2
+        try:
+            return PostExportPipeline(workers=workers)
+        except Exception:
+            return None
+
+    def _post_job(self, label, fn, args=(), targets=()):
+        """Soumet un travail fichiers. Sans pipeline (appel direct hors
+        run), exécute en ligne ; retourne False si le travail a échoué."""
+        if self._post is not None:
+            self._post.submit(label, fn, args, targets=targets)
+            return True
+        try:
+            fn(*args)
+            return True
+        except Exception:
+            return False
+
+    def _when_written(self, path, callback):
+        if self._post is not None:
+            self._post.when_written(path, callback)
+        else:
+            callback()
+
+    def _poll_post(self, log_cb=None):
+        if self._post is not None:
+            self._report_post_errors(self._post.poll(), log_cb)
+
+    def _drain_post(self, log_cb=None):
+        """Attend la fin du pipeline post-export (fin de run) et remonte
+        les erreurs via log_cb. Idempotent."""
+        post, self._post = self._post, None
+        if post is None:
+            return
+        self._report_post_errors(post.drain(), log_cb)
+
+    # ------------------- Trace par étape ------------------- #
+    def _new_trace(self):
+        if ExportTrace is None:
+            return None
+        try:
+            return ExportTrace()
+        except Exception:
+            return None
+
+    def _trace_item(self, fmt, label):
+        if self._trace is None:
+            return NULL_ITEM
+        return self._trace.item(fmt, label)
+
+    def _finish_batch_item(self, item, paths):
+        """Clôt l'élément d'un lot groupé une fois ses fichiers déplacés
+        (même job post-export pour toutes les cibles : la dernière suffit)."""
+        if paths:
+            self._when_written(paths[-1], lambda: item.finish(paths))
+        else:
+            item.finish()
+
+    def _close_trace(self, log_cb=None):
+        trace, self._trace = self._trace, None
+        if trace is None:
+            return
+        trace.close()
+        if log_cb:
+            for line in trace.summary_lines():
+                try:
+                    log_cb(line)
+                except Exception:
+                    pass
+
+    def _report_post_errors(self, errors, log_cb):
+        if not log_cb:
+            return
+        for label, msg in errors or []:
+            try:
+                log_cb(u"{} : post-export : {}".format(label, msg))
+            except Exception:
+                pass
+
+    def _copy_rasters(self, tmp_dir, base_folder):
+        """Recopie les images référencées par les DWG (arborescence conservée).
+        Retourne le nombre d'images trouvées."""
+        found = 0
+        try:
+            import shutil
+            for root, dirs, files in os.walk(tmp_dir):
+                rel = os.path.relpath(root, tmp_dir)
+                dest_root = base_folder if rel == '.' else os.path.join(base_folder, rel)
+                # Appelé depuis le pipeline post-export : pas de cache partagé ici.
+                try:
+                    if not os.path.isdir(dest_root):
+                        os.makedirs(dest_root)
+                except Exception:
+                    pass
+                for fn in files:
+                    ext = os.path.splitext(fn)[1].lower()
+                    if ext in _RASTER_EXTS:
+                        found += 1
+                        src = os.path.join(root, fn)
+                        dst = os.path.join(dest_root, fn)
+                        try:
+                            shutil.copy2(src, dst)
+                        except Exception:
                             try:
-                                self._dest.ensure(dest_root)
+                                shutil.copy(src, dst)
                             except Exception:
                                 pass
-                            for fn in files:
-                                ext = os.path.splitext(fn)[1].lower()
-                                if ext in exts:
-                                    src = os.path.join(root, fn)
-                                    dst = os.path.join(dest_root, fn)
-                                    try:
-                                        shutil.copy2(src, dst)
-                                    except Exception:
-                                        try:
-                                            shutil.copy(src, dst)
-                                        except Exception:
-                                            pass
-                    except Exception:
-                        pass
         except Exception:
-            ok = False
-            
+            pass
+        return found
+
+    def _mark_rasters(self, paths):
+        # Thread post-export : DWG dont les rasters ne sont pas dans le cache.
+        with self._raster_lock:
+            self._raster_outputs.update(paths)
+
+    def _export_dwg_sheets(self, doc, sheets, base_folder, options, overwrite=False, log_cb=None, progress=None,
+                           paths=None):
+        """Exporte chaque feuille de `sheets` dans son propre DWG.
+
+        Un seul export groupé pour toute la liste, puis `_export_dwg_sheet`
+        pour les feuilles que le groupé n'a pas produites. `paths` : cf.
+        `_export_pdf_sheets`.
+        Retourne `[(sheet, ok, path)]` dans l'ordre de `sheets`.
+        """
+        sheets, paths = self._sheets_and_paths(sheets, paths)
+        keys, paths = self._render_keys(sheets, paths, 'dwg', base_folder, overwrite)
+        cached = self._serve_rendered(sheets, paths, keys, 'dwg')
+        todo = [pos for pos in range(len(sheets)) if pos not in cached]
+        by_pos = {} if self._cancelled() else self._export_subset_batched(
+            self._export_dwg_sheets_batched, doc, sheets, paths, todo, base_folder, options,
+            overwrite=overwrite, log_cb=log_cb)
+        by_pos.update(cached)
+        results = []
+        unreached = set()
+        for pos, sh in enumerate(sheets):
+            if pos in by_pos:
+                results.append((sh, True, by_pos[pos]))
+                continue
+            if self._cancelled():
+                unreached.add(pos)
+                results.append((sh, False, None))
+                continue
+            if progress is not None:
+                progress(sh)
+            rows = self._get_rows_for_sheet(sh)
+            ok, path = self._export_dwg_sheet(doc, sh, rows, base_folder, options,
+                                              overwrite=overwrite, log_cb=log_cb,
+                                              path=paths[pos] if paths else None)
+            results.append((sh, ok, path))
+        self._store_rendered(results, keys, cached, 'dwg')
+        return self._reached(results, unreached)
+
+    def _export_dwg_sheets_batched(self, doc, sheets, base_folder, options, overwrite=False, log_cb=None,
+                                   paths=None):
+        """Export DWG groupé : un dossier temporaire et un `doc.Export` pour
+        toutes les feuilles, puis déplacement en bloc vers les noms résolus
+        (correspondance par numéro de feuille dans le nom produit par Revit).
+
+        Retourne `{position dans sheets: chemin final}` ; `{}` si le mode
+        groupé n'est pas disponible ou a échoué.
+        """
+        def _log(msg):
+            if log_cb:
+                try:
+                    log_cb(msg)
+                except Exception:
+                    pass
+        if len(sheets) < 2 or build_rename_map_by_parts is None:
+            return {}
+        if DB is None or options is None:
+            return {}
+        try:
+            tmp_dir = tempfile.mkdtemp(prefix='batchexport_dwg_')
+        except Exception:
+            return {}
+        import shutil
+        prefix = u'export'
+        placed = {}
+        item = self._trace_item('dwg', u'DWG groupé ({} feuilles)'.format(len(sheets)))
         try:
-            if os.path.isdir(tmp_dir):
-                import shutil
+            try:
+                from System.Collections.Generic import List as Clist  # type: ignore
+                views = Clist[DB.ElementId]()
+                for sh in sheets:
+                    views.Add(sh.Id)
+                options = self._item_options(options, MergedViews=True)
+                _log(u"DWG groupé : {} feuille(s) -> {!r}".format(len(sheets), tmp_dir))
+                with item.stage('export'):
+                    raw = doc.Export(tmp_dir, prefix, views, options)
+                ok = bool(raw)
+                item.note('revit', raw)
+                _log(u"DWG groupé : retour Export={!r} ok={}".format(raw, ok))
+            except Exception as _e:
+                _log(u"DWG groupé : indisponible ({}), repli feuille par feuille.".format(_e))
+                ok = False
+            if not ok:
+                item.finish(status='error')
+                return {}
+            try:
+                produced = os.listdir(tmp_dir)
+            except Exception:
+                produced = []
+            expected = {}
+            for pos, sh in enumerate(sheets):
+                try:
+                    expected[pos] = sh.SheetNumber
+                except Exception:
+                    continue
+            mapping = build_rename_map_by_parts(produced, expected, 'dwg', prefix=prefix)
+            try:
+                self._ensure_folder(base_folder)
+            except Exception:
+                pass
+            moves = []
+            for pos in sorted(mapping):
+                sh = sheets[pos]
+                path = paths[pos] if paths else self._target_path(
+                    sh, self._get_rows_for_sheet(sh), base_folder, 'dwg', overwrite, item)
+                moves.append((os.path.join(tmp_dir, mapping[pos]), path))
+                placed[pos] = path
+            if len(placed) < len(sheets):
+                _log(u"DWG groupé : {}/{} feuille(s) associées, repli unitaire pour le reste.".format(
+                    len(placed), len(sheets)))
+            # Déplacements, rasters et nettoyage : pipeline post-export.
+            if not self._post_job(u'DWG groupé', self._move_outputs,
+                                  (tmp_dir, moves, base_folder if moves else None, item),
+                                  targets=[dst for _src, dst in moves]):
+                placed = {}
+            tmp_dir = None
+            self._finish_batch_item(item, [dst for _src, dst in moves])
+        finally:
+            if tmp_dir:
                 shutil.rmtree(tmp_dir, ignore_errors=True)
+        return placed
+
+    # ------------------- Cache de rendu ------------------- #
+    def _open_render_cache(self, doc):
+        """Ouvre le cache de rendu du run (config `render_cache_mb`, 0 =
+        désactivé) et fixe le contexte des clés : document, état, setups."""
+        self._render_cache = None
+        self._render_ctx = None
+        with self._raster_lock:
+            self._raster_outputs = set()
+        if RenderCache is None or sheet_fingerprint is None:
+            return
+        try:
+            max_mb = int(self._get_flag('render_cache_mb', str(DEFAULT_MAX_MB)))
+        except Exception:
+            max_mb = DEFAULT_MAX_MB
+        if max_mb <= 0:
+            return
+        # Version enregistrée du document ; s'il a des modifications non
+        # enregistrées, état propre à ce run : les rendus ne servent alors
+        # qu'entre collections du même run.
+        state = doc_revision(doc) if doc_revision is not None else u''
+        try:
+            modified = bool(doc.IsModified)
+        except Exception:
+            modified = True
+        if modified or not state:
+            state = u'run:' + uuid.uuid4().hex
+        setups = {}
+        for fmt, service in (('pdf', self._pdf), ('dwg', self._dwg)):
+            try:
+                name = service.get_saved_setup() if service is not None else None
+            except Exception:
+                name = None
+            setups[fmt] = (name or u'', self._setup_revision(service, doc, name))
+        try:
+            self._render_cache = RenderCache(max_bytes=max_mb * 1024 * 1024)
+        except Exception:
+            return
+        self._render_ctx = (doc_key(doc) if doc_key is not None else u'', state, setups)
+
+    def _close_render_cache(self, log_cb=None):
+        cache, self._render_cache = self._render_cache, None
+        self._render_ctx = None
+        if cache is None:
+            return
+        cache.save()
+        if cache.hits and log_cb:
+            try:
+                log_cb(u"Cache de rendu : {} feuille(s) reprise(s) sans export Revit.".format(cache.hits))
+            except Exception:
+                pass
+
+    def _render_keys(self, sheets, paths, fmt, base_folder, overwrite):
+        """Clés de rendu parallèles à `sheets` (None sans cache). Les chemins
+        sont alors résolus ici s'ils ne sont pas fournis (même règle que
+        l'export unitaire). Retourne `(clés, chemins)`."""
+        if self._render_cache is None or self._render_ctx is None or not sheets:
+            return None, paths
+        doc_id, state, setups = self._render_ctx
+        setup_name, setup_rev = setups.get(fmt) or (u'', u'')
+        keys = []
+        for sh in sheets:
+            try:
+                fp = sheet_fingerprint(sh, u'', self._get_rows_for_sheet(sh), setup_name)
+                keys.append(render_key(doc_id, state, fmt, setup_name, setup_rev, fp))
+            except Exception:
+                keys.append(None)
+        if not paths:
+            names, _batch = self._resolve_sheet_names(sheets)
+            paths = [self._unique_with_ext(base_folder, name, fmt, overwrite=overwrite) for name in names]
+        return keys, paths
+
+    def _serve_rendered(self, sheets, paths, keys, fmt):
+        """Place depuis le cache les rendus disponibles. Retourne
+        `{position: chemin}` des feuilles servies."""
+        served = {}
+        if not keys or self._render_cache is None:
+            return served
+        for pos, sh in enumerate(sheets):
+            if keys[pos] is None or self._render_cache.lookup(keys[pos]) is None:
+                continue
+            item = self._trace_item(fmt, self._safe_sheet_name(sh))
+            with item.stage('cache'):
+                ok = self._render_cache.fetch(keys[pos], paths[pos])
+            if ok:
+                served[pos] = paths[pos]
+                item.finish(paths[pos])
+        return served
+
+    @staticmethod
+    def _export_subset_batched(batched, doc, sheets, paths, todo, base_folder, options, **kwargs):
+        """Export groupé des seules positions `todo` ; retourne
+        `{position dans sheets: chemin}`."""
+        if not todo:
+            return {}
+        by_sub = batched(doc, [sheets[pos] for pos in todo], base_folder, options,
+                         paths=[paths[pos] for pos in todo] if paths else None, **kwargs)
+        return dict((todo[sub], path) for sub, path in by_sub.items())
+
+    def _store_rendered(self, results, keys, served, fmt):
+        """Enregistre dans le cache les rendus produits par Revit, une fois
+        écrits (copie en tâche post-export)."""
+        if not keys or self._render_cache is None:
+            return
+        for pos, (_sh, ok, path) in enumerate(results):
+            if ok and path and keys[pos] is not None and pos not in served:
+                self._when_written(path, lambda k=keys[pos], p=path: self._cache_rendered(k, p, fmt))
+
+    def _cache_rendered(self, key, path, fmt):
+        cache = self._render_cache
+        if cache is None:
+            return
+        with self._raster_lock:
+            if path in self._raster_outputs:
+                return
+        self._post_job(u'Cache [{}]'.format(os.path.basename(path)), cache.store, (key, path, fmt))
+
+    # ------------------- Manifeste des sorties ------------------- #
+    def _open_outputs(self, mode, doc):
+        self._outputs = None
+        if ExportManifest is None:
+            return
+        try:
+            title = doc.Title
+        except Exception:
+            title = u''
+        run_id = self._trace.run_id if self._trace is not None else None
+        self._outputs = ExportManifest(mode=mode, doc=title, run_id=run_id,
+                                       destination=self._destination_override or u'')
+
+    def _item_outcomes(self, items, todo, results):
+        """`[(élément, statut, chemin)]` pour des éléments unitaires du plan :
+        'ok'/'error' s'ils ont été exportés (`todo`), 'pending' s'ils étaient
+        à exporter mais que le run a été annulé avant, sinon 'skipped' avec
+        le fichier antérieur s'il existe."""
+        exported = set(id(it) for it in todo or [])
+        done = dict((id(sh), (ok, path)) for sh, ok, path in results or [])
+        out = []
+        for it in items or []:
+            if id(it) in exported:
+                if id(it.sheet) not in done and self._cancelled():
+                    out.append((it, 'pending', it.path))
+                    continue
+                ok, path = done.get(id(it.sheet), (False, None))
+                out.append((it, 'ok' if ok and path else 'error', path or it.path))
+            else:
+                out.append((it, 'skipped', self._skipped_output(it)))
+        return out
+
+    def _record_items(self, items, todo, results):
+        if self._outputs is None:
+            return
+        for it, status, path in self._item_outcomes(items, todo, results):
+            self._outputs.record(it.key or it.path, status, path or it.path)
+            self._note_timing(status == 'ok', path, self._size_class(it.sheet))
+
+    def _record_output(self, key, ok, path, **fields):
+        if self._outputs is not None:
+            self._outputs.record(key or path, 'ok' if ok and path else 'error', path, **fields)
+
+    def _record_results(self, results, fmt, collection_name=u'', sheets=None):
+        # Mode manuel : pas de plan, les éléments sont inscrits à leur issue ;
+        # `sheets` : feuilles demandées, celles sans issue (run annulé)
+        # restent 'pending'.
+        if self._outputs is None:
+            return
+        for sh, ok, path in results or []:
+            self._record_output(self._sheet_key(collection_name, sh, fmt), ok, path, fmt=fmt,
+                                collection=collection_name, sheet=getattr(sh, 'SheetNumber', u''))
+            self._note_timing(ok, path, self._size_class(sh))
+        reached = set(id(sh) for sh, _ok, _path in results or [])
+        for sh in sheets or []:
+            if id(sh) not in reached:
+                self._outputs.record(self._sheet_key(collection_name, sh, fmt), 'pending', fmt=fmt,
+                                     collection=collection_name, sheet=getattr(sh, 'SheetNumber', u''))
+
+    def _close_outputs(self, log_cb=None):
+        """Fin de run (pipeline vidé) : durées/retours Revit depuis la trace,
+        passe de vérification parallèle, écriture JSON + CSV."""
+        manifest, self._outputs = self._outputs, None
+        if manifest is None:
+            return
+        if self._trace is not None:
+            manifest.apply_trace(self._trace.records)
+        try:
+            workers = int(self._get_flag('verify_workers', '4'))
+        except Exception:
+            workers = 4
+        manifest.verify(workers=workers)
+        manifest.save()
+        self.last_manifest = manifest
+        if log_cb:
+            for line in manifest.summary_lines():
+                try:
+                    log_cb(line)
+                except Exception:
+                    pass
+
+    # ------------------- Historique des durées (estimations) ------------------- #
+    def _open_timings(self):
+        self._timings = None
+        if TimingHistory is None:
+            return
+        try:
+            window = int(self._get_flag('timing_window', '30'))
+        except Exception:
+            window = 30
+        try:
+            history = TimingHistory(window=window)
+        except Exception:
+            return
+        self._timings = (history, self._timing_setups(), {})
+
+    def _timing_setups(self):
+        return {
+            'pdf': self._pdf.get_saved_setup() if self._pdf is not None else None,
+            'dwg': self._dwg.get_saved_setup() if self._dwg is not None else None,
+        }
+
+    @staticmethod
+    def _size_class(sheet):
+        return sheet_size_class(sheet) if sheet_size_class is not None else u''
+
+    def _predict_items(self, items):
+        """Durée prévue (s) pour des éléments du plan, None sans historique."""
+        if self._timings is None or plan_work is None:
+            return None
+        history, setups, _outputs = self._timings
+        return history.predict(plan_work(items, setups, assembled_carnets=self._carnet_sheets))[0]
+
+    def _predict_manual(self, pdf_vms, dwg_vms, combine_pdf):
+        if self._timings is None:
+            return None
+        history, setups, _outputs = self._timings
+        pdf_work, dwg_work = self._manual_work(pdf_vms, dwg_vms, combine_pdf, setups)
+        return history.predict(pdf_work + dwg_work)[0]
+
+    def _manual_work(self, pdf_vms, dwg_vms, combine_pdf, setups):
+        """`work` (cf. TimingHistory.predict) d'un export manuel : (PDF, DWG)."""
+        if combine_pdf and pdf_vms:
+            pdf_work = [(setups['pdf'], 'pdf', CARNET, len(pdf_vms))]
+        else:
+            pdf_work = [(setups['pdf'], 'pdf', self._size_class(s.Elem), 1) for s in pdf_vms]
+        dwg_work = [(setups['dwg'], 'dwg', self._size_class(s.Elem), 1) for s in dwg_vms]
+        return pdf_work, dwg_work
+
+    def _note_timing(self, ok, path, size, sheets=1):
+        # Sortie produite par ce run : rapprochée de la trace en fin de run.
+        if self._timings is not None and ok and path and sheets:
+            self._timings[2][os.path.normcase(path)] = (size or u'', sheets)
+
+    def _close_timings(self):
+        """Fin de run (pipeline vidé) : durées par feuille de la trace
+        ajoutées à l'historique."""
+        timings, self._timings = self._timings, None
+        if timings is None or self._trace is None:
+            return
+        history, setups, outputs = timings
+        if outputs and history.record_trace(self._trace.records, outputs, setups):
+            history.save()
+
+    # ------------------- Espace disque (contrôle préalable) ------------------- #
+    def _space_history(self):
+        # Historique du run (cf. _open_timings), sinon relu (dry-run).
+        if self._timings is not None:
+            return self._timings[0], self._timings[1]
+        if TimingHistory is None:
+            return None, {}
+        try:
+            return TimingHistory(), self._timing_setups()
+        except Exception:
+            return None, {}
+
+    def _space_needs(self, items):
+        """Octets attendus par racine de destination pour des éléments du plan."""
+        if estimate_items is None:
+            return {}
+        history, setups = self._space_history()
+        return estimate_items(items, history, setups, assembled_carnets=self._carnet_sheets)[0]
+
+    def _manual_space_needs(self, pdf_vms, dwg_vms, combine_pdf):
+        history, setups = self._space_history()
+        if history is None or existing_ancestor is None:
+            return {}
+        needs = {}
+        for fmt, work in zip(('PDF', 'DWG'), self._manual_work(pdf_vms, dwg_vms, combine_pdf, setups)):
+            nbytes = history.predict_bytes(work)[0] if work else None
+            if nbytes:
+                root = existing_ancestor(self._get_destination_base(fmt, None, ensure=False))
+                needs[root] = needs.get(root, 0) + int(nbytes)
+        return needs
+
+    def _estimate_plan_space(self, plan):
+        """Aperçu : volume attendu par jeu et manques d'espace, dans `plan.info`."""
+        if plan is None or estimate_items is None:
+            return
+        history, setups = self._space_history()
+        by_collection, unknown = estimate_items(plan, history, setups, assembled_carnets=self._carnet_sheets,
+                                                group=lambda it: it.collection)
+        plan.info['estimated_bytes'] = by_collection
+        plan.info['estimated_unknown'] = unknown
+        plan.info['space_warnings'] = shortfall_lines(shortfalls(self._space_needs(plan)))
+
+    def _precheck_space(self, needs, log_cb=None):
+        """Avant le premier export : avertit si une destination manque de
+        place. Retourne False si l'utilisateur renonce à lancer l'export."""
+        if not needs or shortfalls is None:
+            return True
+        try:
+            lines = shortfall_lines(shortfalls(needs))
+        except Exception:
+            return True
+        if not lines:
+            return True
+        if log_cb:
+            try:
+                log_cb(u"Espace disque probablement insuffisant :")
+                for line in lines:
+                    log_cb(u'  ' + line)
+            except Exception:
+                pass
+        if self._overwrite_policy is not None:
+            return True  # export sans surveillance : avertissement seul
+        if self._confirm_low_space(lines):
+            return True
+        if log_cb:
+            try:
+                log_cb(u"Export abandonné avant démarrage (espace disque).")
+            except Exception:
+                pass
+        return False
+
+    def _confirm_low_space(self, lines):
+        try:
+            from pyrevit import forms
+            res = forms.alert(
+                u"Espace disque probablement insuffisant :\n" + u"\n".join(lines),
+                options=[u"Continuer", u"Annuler"],
+                footer=u"Estimation d'après les tailles des exports précédents."
+            )
+            return res != u"Annuler"
+        except Exception:
+            return True
+
+    # ------------------- Paquet de diffusion (ZIP) ------------------- #
+    def _transmittal_scope(self, value):
+        # None : lu depuis la config (`transmittal_zip` : 0 / collection / run)
+        if value is None:
+            value = self._get_flag('transmittal_zip', '0')
+        if value is True:
+            return 'collection'
+        value = u'{}'.format(value or u'').strip().lower()
+        if value in ('collection', 'run'):
+            return value
+        return 'collection' if value == '1' else None
+
+    def _open_transmittal(self, doc, value):
+        """Prépare les ZIP de diffusion du run (ouverts au premier fichier)."""
+        self._packagers = None
+        self._transmittal = None
+        scope = self._transmittal_scope(value)
+        if scope is None or TransmittalPackager is None:
+            return
+        try:
+            title = doc.Title
+        except Exception:
+            title = u''
+        self._transmittal = (scope, title or u'export')
+        self._packagers = {}
+
+    def _packager(self, collection_name):
+        """ZIP du jeu (portée 'collection') ou du run. Archive à la racine de
+        la destination ; chemins internes relatifs au dossier du jeu, ou à la
+        racine pour le ZIP du run."""
+        if self._packagers is None:
+            return None
+        scope, title = self._transmittal
+        key = collection_name if (scope == 'collection' and collection_name) else u''
+        packager = self._packagers.get(key)
+        if packager is None:
+            folder = self._get_destination_base(None, None, ensure=False)
+            root = self._get_destination_base(None, key, ensure=False) if key else folder
+            stem = u'Diffusion - {} - {}'.format(key or title, datetime.date.today().strftime('%Y-%m-%d'))
+            packager = self._packagers[key] = TransmittalPackager(os.path.join(folder, stem + u'.zip'), root)
+        return packager
+
+    def _sheet_revision(self, sheet):
+        """Révision courante de la feuille (valeur affichée), u'' à défaut."""
+        if sheet is None:
+            return u''
+        params = []
+        try:
+            if DB is not None:
+                params.append(sheet.get_Parameter(DB.BuiltInParameter.SHEET_CURRENT_REVISION))
         except Exception:
             pass
-        return ok, final_path
+        try:
+            params.append(sheet.LookupParameter('Current Revision'))
+        except Exception:
+            pass
+        for p in params:
+            try:
+                val = p.AsString() if p is not None else None
+                if val:
+                    return u'{}'.format(val)
+            except Exception:
+                continue
+        return u''
+
+    def _package(self, collection_name, path, sheet=None):
+        """Ajoute `path` au ZIP de diffusion dès qu'il est écrit : lecture,
+        SHA-256 et compression dans le pipeline post-export. Numéro et
+        révision sont lus ici (API Revit, thread appelant)."""
+        packager = self._packager(collection_name) if path else None
+        if packager is None:
+            return
+        number = getattr(sheet, 'SheetNumber', u'') if sheet is not None else u''
+        revision = self._sheet_revision(sheet)
+        label = u'ZIP [{}]'.format(os.path.basename(path))
+        self._when_written(path, lambda: self._post_job(label, packager.add, (path, number, revision)))
+
+    def _package_results(self, results, collection_name=u''):
+        for sh, ok, path in results or []:
+            if ok and path:
+                self._package(collection_name, path, sh)
+
+    def _package_items(self, collection_name, items, todo, results):
+        """Sorties du plan pour le ZIP : écrites par ce run, ou sautées
+        (reprise/incrémental) mais présentes sur disque : le paquet reste
+        complet."""
+        if self._packagers is None:
+            return
+        for it, status, path in self._item_outcomes(items, todo, results):
+            if path and status in ('ok', 'skipped'):
+                self._package(collection_name, path, it.sheet)
+
+    def _close_transmittals(self, log_cb=None, abort=False):
+        """Ferme les ZIP (bordereau CSV ajouté) une fois le pipeline vidé ;
+        `abort` (run interrompu) : archives partielles supprimées."""
+        packagers, self._packagers = self._packagers, None
+        self._transmittal = None
+        for key in sorted(packagers or {}):
+            packager = packagers[key]
+            name = os.path.basename(packager.path)
+            if abort:
+                packager.abort()
+                continue
+            try:
+                count = packager.close()
+                msg = u"ZIP de diffusion [{}] : {} fichier(s), {:.1f} Mo.".format(
+                    name, count, packager.total_bytes() / 1048576.0) if count else None
+            except Exception as e:
+                msg = u"ZIP de diffusion [{}] : échec ({}).".format(name, e)
+            if msg and log_cb:
+                try:
+                    log_cb(msg)
+                except Exception:
+                    pass
 
-    def _export_pdf_collection(self, doc, sheets, rows, base_folder, options, collection=None, overwrite=False, log_cb=None):
+    # ------------------- Assemblage des carnets ------------------- #
+    def _register_sheet_pdfs(self, items, todo, results):
+        """Retient les PDF unitaires disponibles pour l'assemblage des
+        carnets : écrits par ce run, ou sautés (reprise/incrémental) parce
+        que déjà à jour sur disque."""
+        if self._sheet_pdfs is None:
+            return
+        exported = set(id(it) for it in todo or [])
+        written = dict((id(sh), path) for sh, ok, path in results or [] if ok and path)
+        for it in items or []:
+            if id(it) in exported:
+                path = written.get(id(it.sheet))
+            else:
+                path = self._skipped_output(it)
+            if path and it.sheet_id is not None:
+                self._sheet_pdfs[it.sheet_id] = path
+
+    def _skipped_output(self, it):
+        # Sortie sautée (reprise/incrémental) : chemin du run précédent ou du plan.
+        if self._resume is not None and it.key is not None:
+            rec = self._resume.done.get(it.key) or {}
+            if rec.get('path') and self._resume.is_complete(it.key):
+                return rec.get('path')
+        return it.path if os.path.isfile(it.path) else None
+
+    def _carnet_sources(self, sheets):
+        """PDF unitaires des feuilles du carnet, dans l'ordre (numéro de
+        feuille) ; None s'il en manque un."""
+        if self._sheet_pdfs is None or merge_pdfs is None or not sheets:
+            return None
+        sources = [self._sheet_pdfs.get(self._sheet_id(sh)) for sh in sheets]
+        if not all(sources):
+            return None
+        return sources
+
+    def _assemble_carnet(self, sources, path, item, log_cb=None):
+        """Concatène les PDF unitaires dans `path` (sans Revit). Retourne
+        False si l'assemblage est impossible (l'appelant exporte via Revit)."""
+        name = os.path.splitext(os.path.basename(path))[0]
+        if self._post is not None:
+            # Les PDF unitaires du lot groupé sont peut-être encore en
+            # cours de déplacement dans le pipeline post-export.
+            self._post.wait(sources)
+        ok = False
+        item.start('merge')
+        try:
+            missing = [src for src in sources if not os.path.isfile(src)]
+            if missing:
+                raise IOError(u"PDF unitaire absent : {}".format(missing[0]))
+            pages = merge_pdfs(sources, path)
+            ok = True
+            msg = u"PDF combiné [{}] : assemblé depuis {} PDF unitaire(s), {} page(s).".format(
+                name, len(sources), pages)
+        except Exception as e:
+            msg = u"PDF combiné [{}] : assemblage local impossible ({}), export Revit.".format(name, e)
+        item.stop('merge')
+        if log_cb:
+            try:
+                log_cb(msg)
+            except Exception:
+                pass
+        return ok
+
+    def _export_pdf_collection(self, doc, sheets, rows, base_folder, options, collection=None, overwrite=False, log_cb=None,
+                               path=None):
         def _log(msg):
             if log_cb:
                 try:
                     log_cb(msg)
                 except Exception:
                     pass
+        item = self._trace_item('pdf', u'carnet')
         try:
-            elem_to_resolve = collection if collection else (sheets[0] if sheets else None)
-            name_no_ext = self._dest.sanitize('' if not elem_to_resolve else self._nres.resolve_for_element(elem_to_resolve, rows, empty_fallback=False)) if (self._dest is not None and self._nres is not None) else 'export'
-        except Exception:
-            name_no_ext = 'export'
-        try:
-            self._dest.ensure(base_folder)
+            self._ensure_folder(base_folder)
         except Exception:
             pass
-        path = self._unique_with_ext(base_folder, name_no_ext or 'export', 'pdf', overwrite=overwrite)
+        if path is None:
+            with item.stage('resolve'):
+                name_no_ext = self._resolve_carnet_name(sheets, rows, collection)
+            path = self._unique_with_ext(base_folder, name_no_ext or 'export', 'pdf', overwrite=overwrite)
+        # PDF unitaires déjà produits : assemblage local, Revit n'est appelé
+        # qu'à défaut.
+        sources = self._carnet_sources(sheets)
+        if sources and self._assemble_carnet(sources, path, item, log_cb):
+            item.finish(path, status='ok')
+            return True, path
         folder = os.path.dirname(path)
         file_no_ext = os.path.splitext(os.path.basename(path))[0]
         ok = False
+        item.start('export')
         try:
             if DB is not None and hasattr(DB, 'PDFExportOptions') and options is not None and sheets:
                 from System.Collections.Generic import List as Clist  # type: ignore
@@ -711,20 +2492,12 @@ class ExportOrchestrator(object):
                         views.Add(sh.Id)
                     except Exception:
                         continue
-                try:
-                    if hasattr(options, 'Combine'):
-                        options.Combine = True
-                except Exception:
-                    pass
-                try:
-                    if hasattr(options, 'FileName'):
-                        options.FileName = file_no_ext
-                except Exception:
-                    pass
+                options = self._item_options(options, Combine=True, FileName=file_no_ext)
                 _log(u"PDF combiné [{}] : dossier={!r} | fichier={!r}".format(file_no_ext, folder, file_no_ext))
                 try:
                     raw = doc.Export(folder, views, options)
                     ok = bool(raw)
+                    item.note('revit', raw)
                     _log(u"PDF combiné [{}] : retour Export={!r} ok={}".format(file_no_ext, raw, ok))
                     if ok:
                         expected = os.path.join(folder, file_no_ext + '.pdf')
@@ -734,6 +2507,7 @@ class ExportOrchestrator(object):
                     try:
                         raw = doc.Export(folder, file_no_ext, views, options)
                         ok = bool(raw)
+                        item.note('revit', raw)
                         _log(u"PDF combiné [{}] : retour Export 4-arg={!r} ok={}".format(file_no_ext, raw, ok))
                     except Exception as _e2:
                         _log(u"PDF combiné [{}] : Export API : {} / {}".format(file_no_ext, _e1, _e2))
@@ -745,4 +2519,6 @@ class ExportOrchestrator(object):
         except Exception as _e:
             _log(u"PDF combiné : erreur inattendue : {}".format(_e))
             ok = False
+        item.stop('export')
+        item.finish(path if ok else None, status='ok' if ok else 'error')
         return ok, path
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Correspondance fichiers produits par Revit -> feuilles, pour les exports
+# groupés (un seul Document.Export pour plusieurs feuilles).
+#
+# Revit nomme lui-même les fichiers d'un export groupé. On lui impose un nom
+# prévisible (le numéro de feuille, unique dans un document) puis on
+# renomme chaque fichier vers le nom résolu par le NamingResolver. Tout ce
+# qui n'a pas pu être associé de façon sûre est rendu à l'appelant, qui
+# repasse par l'export feuille par feuille.
+
+from __future__ import unicode_literals
+
+import os
+import re
+
+_INVALID = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def normalize_stem(stem):
+    """Forme canonique d'un nom (sans extension) pour comparaison : casse
+    ignorée, caractères interdits/espaces fusionnés en '_'."""
+    try:
+        s = u'{}'.format(stem or u'')
+    except Exception:
+        return u''
+    return _INVALID.sub(u'_', s.strip()).strip(u'_.').lower()
+
+
+def build_rename_map(filenames, expected_stems, ext):
+    """Associe chaque clé de `expected_stems` ({cle: nom attendu}) au fichier
+    de `filenames` dont le nom sans extension lui correspond exactement
+    (après `normalize_stem`).
+
+    Retourne `{cle: nom_de_fichier}` ; les clés sans correspondance, ou dont
+    le nom attendu est ambigu (partagé par plusieurs clés), sont absentes.
+    """
+    ext = u'.' + (ext or u'').lstrip(u'.').lower()
+    by_stem = {}
+    for fn in filenames or []:
+        root, fext = os.path.splitext(fn)
+        if fext.lower() != ext:
+            continue
+        by_stem.setdefault(normalize_stem(root), []).append(fn)
+
+    wanted = {}
+    for key, stem in (expected_stems or {}).items():
+        wanted.setdefault(normalize_stem(stem), []).append(key)
+
+    out = {}
+    for norm, keys in wanted.items():
+        if not norm or len(keys) != 1:
+            continue
+        files = by_stem.get(norm) or []
+        if len(files) == 1:
+            out[keys[0]] = files[0]
+    return out
+
+
+def build_rename_map_by_parts(filenames, expected_stems, ext, prefix=u'', sep=u' - '):
+    """Variante pour les exports DWG groupés, où Revit compose le nom :
+    `<prefix>-<type de vue> - <numéro> - <nom>.dwg`.
+
+    Le préfixe est retiré puis le nom découpé sur `sep` ; une clé est
+    associée au fichier dont UNE des parties vaut le nom attendu. Une partie
+    revendiquée par plusieurs fichiers, ou un fichier revendiqué par
+    plusieurs clés, n'est jamais associé.
+    """
+    ext = u'.' + (ext or u'').lstrip(u'.').lower()
+    norm_prefix = normalize_stem(prefix)
+    parts_to_files = {}
+    for fn in filenames or []:
+        root, fext = os.path.splitext(fn)
+        if fext.lower() != ext:
+            continue
+        stem = root
+        if prefix and stem.lower().startswith(prefix.lower()):
+            stem = stem[len(prefix):].lstrip(u'-_ ')
+        seen = set()
+        for part in stem.split(sep):
+            norm = normalize_stem(part)
+            if norm and norm != norm_prefix and norm not in seen:
+                seen.add(norm)
+                parts_to_files.setdefault(norm, []).append(fn)
+
+    wanted = {}
+    for key, stem in (expected_stems or {}).items():
+        wanted.setdefault(normalize_stem(stem), []).append(key)
+
+    out = {}
+    claimed = {}
+    for norm, keys in wanted.items():
+        if not norm or len(keys) != 1:
+            continue
+        files = parts_to_files.get(norm) or []
+        if len(files) == 1:
+            out[keys[0]] = files[0]
+            claimed.setdefault(files[0], []).append(keys[0])
+    for fn, keys in claimed.items():
+        if len(keys) > 1:
+            for k in keys:
+                out.pop(k, None)
+    return out
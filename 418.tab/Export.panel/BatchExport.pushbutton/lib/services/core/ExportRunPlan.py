@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# Plan d'export détaillé : la liste concrète de ce qu'un run va écrire.
+#
+# `ExportPlan` (orchestrateur) ne décrit qu'une décision par collection
+# (exporter ? par feuille ? PDF/DWG ?). Le plan détaillé la développe en
+# éléments concrets, un par fichier de sortie :
+#
+#   {"key": "Jeu|A101|pdf", "collection": "Jeu", "fmt": "pdf",
+#    "sheet_id": "123", "sheet": "A101", "path": "D:/.../A101.pdf",
+#    "group": null, "members": [], "exists": false}
+#
+# Un carnet (PDF combiné) est UN élément avec `group` = nom de la
+# collection et `members` = ids des feuilles, dans l'ordre.
+#
+# Le plan est calculé une fois (noms résolus, chemins finaux), relu par
+# l'utilisateur (dry-run), puis exécuté tel quel par l'orchestrateur. Le
+# plan du dernier run exécuté est sauvegardé (`batch_export_plan.json`,
+# dossier de données de l'utilisateur, core.AppPaths.data_dir) pour être
+# comparé au suivant (`diff`).
+
+from __future__ import unicode_literals
+
+import datetime
+import io
+import json
+import os
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+PLAN_FILE_NAME = 'batch_export_plan.json'
+PLAN_VERSION = 1
+
+
+def _text(value):
+    try:
+        return u'{}'.format(value if value is not None else u'')
+    except Exception:
+        return u''
+
+
+class ExportItem(object):
+    """Un fichier de sortie du plan.
+
+    `sheet` / `sheets` gardent les éléments Revit pour l'exécution ; ils ne
+    sont pas sérialisés (seuls leurs ids le sont).
+    """
+
+    FIELDS = ('key', 'collection', 'fmt', 'sheet_id', 'sheet', 'path', 'group', 'members', 'exists')
+
+    def __init__(self, key, collection, fmt, path, sheet_id=None, sheet_number=u'',
+                 group=None, members=None, exists=False, sheet=None, sheets=None):
+        self.key = key
+        self.collection = collection or u''
+        self.fmt = (fmt or u'').lower()
+        self.path = path
+        self.sheet_id = sheet_id
+        self.sheet_number = sheet_number or u''
+        self.group = group
+        self.members = list(members or [])
+        self.exists = bool(exists)
+        self.sheet = sheet        # élément feuille (export unitaire)
+        self.sheets = sheets      # éléments membres (carnet)
+
+    @property
+    def is_group(self):
+        return self.group is not None
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path or u'')
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'collection': self.collection,
+            'fmt': self.fmt,
+            'sheet_id': self.sheet_id,
+            'sheet': self.sheet_number,
+            'path': self.path,
+            'group': self.group,
+            'members': list(self.members),
+            'exists': self.exists,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('key'), data.get('collection'), data.get('fmt'), data.get('path'),
+                   sheet_id=data.get('sheet_id'), sheet_number=data.get('sheet'),
+                   group=data.get('group'), members=data.get('members'),
+                   exists=data.get('exists'))
+
+    def same_output(self, other):
+        """Vrai si `other` écrit le même fichier avec le même contenu prévu."""
+        return (os.path.normcase(_text(self.path)) == os.path.normcase(_text(other.path))
+                and list(self.members) == list(other.members)
+                and _text(self.sheet_id) == _text(other.sheet_id))
+
+
+class PlanDiff(object):
+    """Écart entre deux plans, par clé d'élément."""
+
+    def __init__(self, added, removed, changed):
+        self.added = added        # [ExportItem] nouveaux
+        self.removed = removed    # [ExportItem] disparus (ancien plan)
+        self.changed = changed    # [(ancien, nouveau)] chemin/membres modifiés
+
+    @property
+    def is_empty(self):
+        return not (self.added or self.removed or self.changed)
+
+    def summary_lines(self):
+        lines = []
+        for it in self.added:
+            lines.append(u'+ {}'.format(it.path))
+        for it in self.removed:
+            lines.append(u'- {}'.format(it.path))
+        for old, new in self.changed:
+            if os.path.normcase(_text(old.path)) != os.path.normcase(_text(new.path)):
+                lines.append(u'~ {} -> {}'.format(old.path, new.path))
+            else:
+                lines.append(u'~ {} (feuilles modifiées)'.format(new.path))
+        return lines
+
+
+class ExportRunPlan(object):
+    def __init__(self, items=None, **info):
+        self.items = list(items or [])
+        self.info = dict(info)
+        self.info.setdefault('created', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, item):
+        self.items.append(item)
+        return item
+
+    def collections(self):
+        """Noms des collections, dans l'ordre du plan."""
+        seen = []
+        for it in self.items:
+            if it.collection not in seen:
+                seen.append(it.collection)
+        return seen
+
+    def items_for(self, collection, fmt=None, group=None):
+        """Éléments d'une collection ; `group=True/False` filtre carnets /
+        exports unitaires."""
+        out = []
+        for it in self.items:
+            if it.collection != collection:
+                continue
+            if fmt is not None and it.fmt != fmt:
+                continue
+            if group is not None and it.is_group != bool(group):
+                continue
+            out.append(it)
+        return out
+
+    def existing(self):
+        return [it for it in self.items if it.exists]
+
+    # ------------------------------------------------------------------
+    # Comparaison
+    # ------------------------------------------------------------------
+
+    def diff(self, previous):
+        """Compare au plan `previous` (None = tout est nouveau)."""
+        old = dict((it.key, it) for it in (previous.items if previous is not None else []))
+        new = dict((it.key, it) for it in self.items)
+        added = [it for it in self.items if it.key not in old]
+        removed = [it for it in (previous.items if previous is not None else []) if it.key not in new]
+        changed = [(old[it.key], it) for it in self.items
+                   if it.key in old and not old[it.key].same_output(it)]
+        return PlanDiff(added, removed, changed)
+
+    # ------------------------------------------------------------------
+    # Sérialisation
+    # ------------------------------------------------------------------
+
+    def to_dict(self):
+        return {'version': PLAN_VERSION, 'info': dict(self.info),
+                'items': [it.to_dict() for it in self.items]}
+
+    def to_json(self, indent=1):
+        return _text(json.dumps(self.to_dict(), ensure_ascii=False, indent=indent, sort_keys=True))
+
+    @classmethod
+    def from_dict(cls, data):
+        items = [ExportItem.from_dict(d) for d in (data.get('items') or []) if isinstance(d, dict)]
+        return cls(items, **dict(data.get('info') or {}))
+
+    @staticmethod
+    def default_path():
+        return os.path.join(data_dir(), PLAN_FILE_NAME)
+
+    def save(self, path=None):
+        """Écriture atomique ; ne lève jamais."""
+        path = path or self.default_path()
+        tmp = path + '.tmp'
+        try:
+            d = os.path.dirname(path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with io.open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write(self.to_json())
+            try:
+                os.replace(tmp, path)
+            except Exception:
+                if os.path.exists(path):
+                    os.remove(path)
+                os.rename(tmp, path)
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def load(cls, path=None):
+        """Plan sauvegardé, ou None s'il est absent/illisible."""
+        path = path or cls.default_path()
+        try:
+            if not os.path.exists(path):
+                return None
+            with io.open(path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+            if isinstance(data, dict):
+                return cls.from_dict(data)
+        except Exception:
+            pass
+        return None
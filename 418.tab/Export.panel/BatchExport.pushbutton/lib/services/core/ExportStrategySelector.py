@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Mémoire de session des stratégies d'export PDF unitaire.
+#
+# `_export_pdf_sheet` dispose de trois chemins : `doc.Export` à 3 arguments,
+# la surcharge à 4 arguments, puis l'impression via PrintManager
+# (« Microsoft Print to PDF »). Les essayer dans l'ordre à chaque feuille
+# coûte, sur une version de Revit où le premier chemin échoue, un appel en
+# échec (voire deux) par feuille.
+#
+# Ici, le chemin qui a abouti est retenu par (version de Revit, setup) et
+# essayé en premier pour les feuilles suivantes. S'il échoue, il est oublié
+# et la négociation complète reprend (les autres chemins, dans l'ordre).
+
+from __future__ import unicode_literals
+
+import threading
+
+EXPORT_3 = 'export3'
+EXPORT_4 = 'export4'
+PRINT = 'print'
+STRATEGIES = (EXPORT_3, EXPORT_4, PRINT)
+
+
+def revit_version(doc):
+    """Version de Revit (ex. u'2024') ; u'' hors Revit."""
+    try:
+        return u'{}'.format(doc.Application.VersionNumber or u'')
+    except Exception:
+        return u''
+
+
+class ExportStrategySelector(object):
+    def __init__(self, strategies=STRATEGIES):
+        self._strategies = tuple(strategies)
+        self._preferred = {}  # (version, setup) -> stratégie qui a abouti
+        self._lock = threading.Lock()
+        self.probes = 0  # négociations complètes (aucune stratégie retenue)
+
+    @staticmethod
+    def key(version, setup_name):
+        return (version or u'', setup_name or u'')
+
+    def preferred(self, key):
+        with self._lock:
+            return self._preferred.get(key)
+
+    def order(self, key):
+        """Stratégies à essayer : celle retenue d'abord, puis les autres
+        dans l'ordre par défaut."""
+        with self._lock:
+            first = self._preferred.get(key)
+            if first is None:
+                self.probes += 1
+        if first is None:
+            return list(self._strategies)
+        return [first] + [s for s in self._strategies if s != first]
+
+    def succeeded(self, key, strategy):
+        with self._lock:
+            self._preferred[key] = strategy
+
+    def failed(self, key, strategy):
+        """Oublie `strategy` si c'était la stratégie retenue : la feuille
+        suivante renégocie."""
+        with self._lock:
+            if self._preferred.get(key) == strategy:
+                del self._preferred[key]
+
+    def reset(self):
+        with self._lock:
+            self._preferred.clear()
+
+    def __len__(self):
+        return len(self._preferred)
+
+
+# Sélecteur de la session (durée de vie du moteur Python, donc de la fenêtre).
+SESSION_SELECTOR = ExportStrategySelector()
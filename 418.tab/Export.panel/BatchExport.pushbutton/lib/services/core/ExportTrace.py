@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# Trace structurée des runs d'export : un enregistrement JSONL par élément
+# exporté, avec la durée de chaque étape.
+#
+# Étapes mesurées (toutes optionnelles) :
+#   resolve  - résolution du nom de fichier
+#   options  - construction des options PDF/DWG (une fois par run)
+#   export   - appel doc.Export
+#   move     - renommage/déplacement vers la destination
+#   rasters  - recopie des images référencées (DWG)
+#   total    - de la création de l'élément à sa clôture
+#
+# Chaque élément porte aussi ses fichiers (`paths`) et ses annotations
+# (`note`, ex. `revit` : valeur retournée par doc.Export), reprises par le
+# manifeste des sorties (cf. ExportManifest).
+#
+# Le fichier (`batch_export_trace.jsonl`, dossier de données de l'utilisateur,
+# core.AppPaths.data_dir) est réécrit à chaque run : il décrit le DERNIER run, et se termine par une
+# ligne "summary" (p50/p95 par étape et par format). Les étapes move/rasters
+# peuvent s'exécuter dans le pipeline post-export : un élément n'est écrit
+# qu'à sa clôture (`finish`), et `close()` écrit les éléments restés ouverts
+# avec `"status": "incomplete"`.
+
+from __future__ import unicode_literals
+
+import io
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+TRACE_FILE_NAME = 'batch_export_trace.jsonl'
+
+
+def percentile(values, pct):
+    """Percentile « rang le plus proche » (pct dans [0, 100])."""
+    vals = sorted(values or [])
+    if not vals:
+        return None
+    rank = int(math.ceil(pct / 100.0 * len(vals))) - 1
+    return vals[max(0, min(len(vals) - 1, rank))]
+
+
+class _Stage(object):
+    def __init__(self, item, name):
+        self._item = item
+        self._name = name
+        self._t0 = None
+
+    def __enter__(self):
+        self._t0 = self._item._clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._item.add(self._name, self._item._clock() - self._t0)
+        return False
+
+
+class TraceItem(object):
+    """Un élément tracé (une feuille, un carnet, un lot groupé...)."""
+
+    def __init__(self, trace, fmt, label, clock):
+        self._trace = trace
+        self._clock = clock
+        self._t0 = clock()
+        self.fmt = fmt
+        self.label = label
+        self.stages = {}
+        self.notes = {}
+        self._started = {}
+        self._done = False
+
+    def stage(self, name):
+        """Context manager : `with item.stage('export'): ...` (cumulatif)."""
+        return _Stage(self, name)
+
+    def start(self, name):
+        """Variante sans `with` pour les blocs longs : `start` ... `stop`."""
+        self._started[name] = self._clock()
+
+    def stop(self, name):
+        t0 = self._started.pop(name, None)
+        if t0 is not None:
+            self.add(name, self._clock() - t0)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + max(0.0, seconds)
+
+    def note(self, name, value):
+        """Annotation libre écrite avec l'élément (texte)."""
+        try:
+            self.notes[name] = u'{!r}'.format(value) if not isinstance(value, type(u'')) else value
+        except Exception:
+            self.notes[name] = u'?'
+
+    def finish(self, paths=None, status='ok'):
+        if self._done:
+            return
+        self._done = True
+        if isinstance(paths, (list, tuple)):
+            paths = list(paths)
+        else:
+            paths = [paths] if paths else []
+        size = 0
+        for p in paths:
+            try:
+                size += os.path.getsize(p)
+            except Exception:
+                pass
+        rec = {
+            'type': 'item',
+            'fmt': self.fmt,
+            'item': self.label,
+            'count': max(1, len(paths)),
+            'stages': dict((k, round(v, 4)) for k, v in self.stages.items()),
+            'total': round(self._clock() - self._t0, 4),
+            'size': size,
+            'status': status,
+            'paths': paths,
+        }
+        for name, value in self.notes.items():
+            rec.setdefault(name, value)
+        self._trace._record(self, rec)
+
+
+class _NullItem(object):
+    """Élément inerte quand la trace est désactivée (même interface)."""
+
+    class _NullStage(object):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+    _STAGE = _NullStage()
+
+    def stage(self, name):
+        return self._STAGE
+
+    def start(self, name):
+        pass
+
+    def stop(self, name):
+        pass
+
+    def add(self, name, seconds):
+        pass
+
+    def note(self, name, value):
+        pass
+
+    def finish(self, paths=None, status='ok'):
+        pass
+
+
+NULL_ITEM = _NullItem()
+
+
+class ExportTrace(object):
+    def __init__(self, path=None, clock=None, run_id=None):
+        self._path = path or os.path.join(data_dir(), TRACE_FILE_NAME)
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._open = []
+        self.records = []
+        self.run_id = run_id or time.strftime('%Y%m%d-%H%M%S')
+        self._write([{'type': 'run', 'run_id': self.run_id}], mode='w')
+
+    @property
+    def path(self):
+        return self._path
+
+    def item(self, fmt, label):
+        it = TraceItem(self, (fmt or u'').lower(), label, self._clock)
+        with self._lock:
+            self._open.append(it)
+        return it
+
+    def _record(self, item, rec):
+        with self._lock:
+            try:
+                self._open.remove(item)
+            except ValueError:
+                pass
+            self.records.append(rec)
+        self._write([rec])
+
+    def summary(self):
+        """`{fmt: {stage: {'n', 'p50', 'p95'}}}` sur les éléments clos ;
+        'total' et 'size' sont traités comme des étapes."""
+        buckets = {}
+        for rec in list(self.records):
+            by_stage = buckets.setdefault(rec.get('fmt') or u'', {})
+            values = dict(rec.get('stages') or {})
+            values['total'] = rec.get('total')
+            for name, val in values.items():
+                if val is not None:
+                    by_stage.setdefault(name, []).append(val)
+        out = {}
+        for fmt, by_stage in buckets.items():
+            out[fmt] = dict((name, {'n': len(vals), 'p50': percentile(vals, 50), 'p95': percentile(vals, 95)})
+                            for name, vals in by_stage.items())
+        return out
+
+    def summary_lines(self):
+        lines = []
+        for fmt, stages in sorted(self.summary().items()):
+            parts = []
+            for name in sorted(stages):
+                st = stages[name]
+                parts.append(u'{} p50={:.2f}s p95={:.2f}s (n={})'.format(name, st['p50'], st['p95'], st['n']))
+            lines.append(u'Trace {} : {}'.format(fmt.upper() or u'?', u' | '.join(parts)))
+        return lines
+
+    def close(self):
+        """Clôt les éléments restés ouverts et écrit le résumé."""
+        with self._lock:
+            pending = list(self._open)
+        for it in pending:
+            it.finish(status='incomplete')
+        self._write([{'type': 'summary', 'run_id': self.run_id, 'stages': self.summary()}])
+
+    def _write(self, records, mode='a'):
+        try:
+            d = os.path.dirname(self._path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with self._lock:
+                with io.open(self._path, mode, encoding='utf-8') as fh:
+                    for rec in records:
+                        fh.write(u'{}\n'.format(json.dumps(rec, ensure_ascii=False, sort_keys=True)))
+        except Exception:
+            pass
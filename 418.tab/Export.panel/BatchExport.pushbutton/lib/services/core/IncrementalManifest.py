@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Export incrémental : empreinte de contenu par feuille + manifeste local.
+#
+# L'empreinte d'une feuille combine tout ce qui change sa sortie :
+#   - le nom de fichier résolu ;
+#   - les révisions de la feuille (ids + révision courante) ;
+#   - les valeurs des paramètres utilisés par le pattern de nommage ;
+#   - le nom du setup PDF/DWG ;
+#   - les ids des vues placées.
+#
+# Le manifeste (`.batchexport_manifest.json`) vit dans le dossier de
+# destination lui-même : déplacer ou copier le dossier garde l'historique
+# cohérent avec les fichiers qu'il décrit. Une feuille est sautée si son
+# empreinte est identique ET que le fichier est toujours là avec la taille
+# enregistrée.
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import os
+
+MANIFEST_FILE_NAME = '.batchexport_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def _text(value):
+    try:
+        return u'{}'.format(value if value is not None else u'')
+    except Exception:
+        return u''
+
+
+def _id_text(eid):
+    if eid is None:
+        return u''
+    for attr in ('Value', 'IntegerValue'):
+        try:
+            val = getattr(eid, attr, None)
+            if val is not None:
+                return _text(val)
+        except Exception:
+            continue
+    return _text(eid)
+
+
+def _param_text(elem, name):
+    try:
+        p = elem.LookupParameter(name)
+    except Exception:
+        p = None
+    if p is None:
+        return u''
+    for getter in ('AsString', 'AsValueString'):
+        try:
+            val = getattr(p, getter)()
+            if val:
+                return _text(val)
+        except Exception:
+            continue
+    return u''
+
+
+def _ids(getter):
+    try:
+        return sorted(_id_text(i) for i in (getter() or []))
+    except Exception:
+        return []
+
+
+def digest(parts):
+    """Empreinte hexadécimale (sha1) d'une structure JSON-sérialisable."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    if not isinstance(raw, bytes):
+        raw = raw.encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+
+def sheet_fingerprint(sheet, file_name, rows, setup_name):
+    """Empreinte de contenu d'une feuille (cf. en-tête du module).
+
+    `rows` : lignes du pattern de nommage (`[{'Name': param, ...}]`) ;
+    seules leurs valeurs de paramètres entrent dans l'empreinte.
+    """
+    params = []
+    for row in rows or []:
+        try:
+            name = row.get('Name')
+        except Exception:
+            name = None
+        if name:
+            params.append([_text(name), _param_text(sheet, name)])
+    try:
+        current = _id_text(sheet.GetCurrentRevision())
+    except Exception:
+        current = u''
+    return digest({
+        'file': _text(file_name),
+        'revisions': _ids(getattr(sheet, 'GetAllRevisionIds', None) or (lambda: [])),
+        'current_revision': current,
+        'params': params,
+        'setup': _text(setup_name),
+        'views': _ids(getattr(sheet, 'GetAllPlacedViews', None) or (lambda: [])),
+    })
+
+
+def carnet_fingerprint(file_name, member_fingerprints, setup_name):
+    """Empreinte d'un PDF combiné : change dès qu'une feuille membre change
+    (ou que l'ordre/la composition du carnet change)."""
+    return digest({
+        'file': _text(file_name),
+        'members': list(member_fingerprints or []),
+        'setup': _text(setup_name),
+    })
+
+
+class IncrementalManifest(object):
+    """Manifeste d'empreintes d'un dossier de destination.
+
+    Clés = noms de fichiers (insensibles à la casse, comme Windows). Ne lève
+    jamais : un manifeste illisible équivaut à un manifeste vide (tout est
+    réexporté).
+    """
+
+    def __init__(self, folder):
+        self._folder = folder
+        self._path = os.path.join(folder, MANIFEST_FILE_NAME)
+        self._entries = self._load()
+        self._dirty = False
+
+    @property
+    def folder(self):
+        return self._folder
+
+    def _load(self):
+        try:
+            if os.path.exists(self._path):
+                with io.open(self._path, 'r', encoding='utf-8') as fh:
+                    data = json.load(fh)
+                if isinstance(data, dict) and isinstance(data.get('entries'), dict):
+                    return dict(data['entries'])
+        except Exception:
+            pass
+        return {}
+
+    @staticmethod
+    def _key(file_name):
+        return _text(file_name).lower()
+
+    def is_unchanged(self, file_name, fingerprint):
+        """Vrai si l'empreinte est identique et que le fichier est intact."""
+        entry = self._entries.get(self._key(file_name))
+        if not entry or entry.get('fp') != fingerprint:
+            return False
+        path = os.path.join(self._folder, file_name)
+        try:
+            return os.path.isfile(path) and os.path.getsize(path) == entry.get('size')
+        except Exception:
+            return False
+
+    def record(self, file_name, fingerprint):
+        path = os.path.join(self._folder, file_name)
+        try:
+            size = os.path.getsize(path)
+        except Exception:
+            return
+        self._entries[self._key(file_name)] = {'fp': fingerprint, 'size': size}
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp = self._path + '.tmp'
+        try:
+            with io.open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write(_text(json.dumps({'version': MANIFEST_VERSION, 'entries': self._entries},
+                                          ensure_ascii=False, indent=1, sort_keys=True)))
+            try:
+                os.replace(tmp, self._path)
+            except Exception:
+                if os.path.exists(self._path):
+                    os.remove(self._path)
+                os.rename(tmp, self._path)
+            self._dirty = False
+        except Exception:
+            pass
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+# File d'export multi-documents : même configuration (profil
+# ConfigManagerService) appliquée à une liste de maquettes, ouvertes,
+# exportées puis fermées l'une après l'autre.
+#
+#   runner = MultiDocumentExportRunner(RevitDocumentProvider(app))
+#   report = runner.run(paths, u'Carnets vendredi', u'D:/Exports')
+#
+# Chaque document sort dans son propre sous-dossier de la destination
+# (nom du fichier .rvt), avec un orchestrateur neuf (le NamingResolver est
+# lié au document). Un document en échec n'arrête pas la file. Son statut
+# et ses fichiers viennent du retour de `run()` et du manifeste vérifié
+# (`last_manifest`) : run interrompu ou anomalie = échec. Le rapport
+# consolidé est écrit dans la destination (`batch_export_report.json`).
+#
+# L'ouverture/fermeture passe par un `DocumentProvider` : les tests
+# utilisent un faux fournisseur, Revit utilise `RevitDocumentProvider`.
+#
+# Point d'entrée : bouton « Plusieurs maquettes… » de la fenêtre principale
+# (`MainViewModel.exporter_maquettes`, profil actif, destination courante).
+
+from __future__ import unicode_literals
+
+import datetime
+import io
+import json
+import os
+import re
+import time
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+REPORT_FILE_NAME = 'batch_export_report.json'
+
+# Combos lus par l'orchestrateur via get_ctrl(name).SelectedItem -> clé de config
+_COMBO_KEYS = {
+    'ExportationCombo': 'sheet_param_exportationcombo',
+    'CarnetCombo': 'sheet_param_carnetcombo',
+    'DWGCombo': 'sheet_param_dwgcombo',
+}
+
+_INVALID = re.compile(r'[\\/:*?"<>|]+')
+
+
+def _folder_name(path):
+    stem = os.path.splitext(os.path.basename(path or u''))[0]
+    return _INVALID.sub(u'_', stem).strip().rstrip(u'.') or u'document'
+
+
+def _written_files(manifest):
+    """Fichiers présents et conformes après le run (exportés ou conservés
+    d'un run antérieur), d'après le manifeste vérifié."""
+    if manifest is None:
+        return []
+    return [rec['path'] for rec in manifest.records
+            if rec['status'] in ('ok', 'skipped') and rec['check'] in (None, 'ok') and rec['path']]
+
+
+class DocumentProvider(object):
+    """Ouvre/ferme les documents de la file. `open` lève en cas d'échec."""
+
+    def open(self, path):
+        raise NotImplementedError
+
+    def close(self, doc):
+        raise NotImplementedError
+
+
+class RevitDocumentProvider(DocumentProvider):
+    """Ouverture via l'API Revit. Les modèles partagés sont détachés (worksets
+    conservés) : aucun verrou ni synchronisation avec le central. Un document
+    déjà ouvert dans la session est réutilisé et n'est pas fermé."""
+
+    def __init__(self, app, detach=True):
+        self._app = app
+        self._detach = detach
+        self._borrowed = []
+
+    def _already_open(self, path):
+        wanted = os.path.normcase(os.path.abspath(path))
+        try:
+            for doc in self._app.Documents:
+                try:
+                    if doc.PathName and os.path.normcase(os.path.abspath(doc.PathName)) == wanted:
+                        return doc
+                except Exception:
+                    continue
+        except Exception:
+            pass
+        return None
+
+    def open(self, path):
+        if DB is None:
+            raise RuntimeError(u"API Revit indisponible")
+        doc = self._already_open(path)
+        if doc is not None:
+            self._borrowed.append(doc)
+            return doc
+        model_path = DB.ModelPathUtils.ConvertUserVisiblePathToModelPath(path)
+        options = DB.OpenOptions()
+        if self._detach:
+            try:
+                if DB.BasicFileInfo.Extract(path).IsWorkshared:
+                    options.DetachFromCentralOption = DB.DetachFromCentralOption.DetachAndPreserveWorksets
+            except Exception:
+                pass
+        return self._app.OpenDocumentFile(model_path, options)
+
+    def close(self, doc):
+        if any(d is doc for d in self._borrowed):
+            self._borrowed = [d for d in self._borrowed if d is not doc]
+            return
+        doc.Close(False)
+
+
+class DocumentExportResult(object):
+    def __init__(self, path, folder):
+        self.path = path
+        self.folder = folder
+        self.status = 'pending'   # 'ok' | 'error'
+        self.error = None
+        self.files = []           # fichiers écrits et vérifiés (cf. ExportManifest)
+        self.duration = 0.0
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'folder': self.folder,
+            'status': self.status,
+            'error': self.error,
+            'files': list(self.files),
+            'duration': round(self.duration, 2),
+        }
+
+
+class MultiDocumentReport(object):
+    """Rapport consolidé d'une file d'export."""
+
+    def __init__(self, profile, destination):
+        self.profile = profile
+        self.destination = destination
+        self.started = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.results = []
+
+    @property
+    def failed(self):
+        return [r for r in self.results if r.status != 'ok']
+
+    def to_dict(self):
+        return {
+            'profile': self.profile,
+            'destination': self.destination,
+            'started': self.started,
+            'documents': [r.to_dict() for r in self.results],
+        }
+
+    def summary_lines(self):
+        lines = [u'{} document(s), {} en échec, {} fichier(s) exporté(s).'.format(
+            len(self.results), len(self.failed), sum(len(r.files) for r in self.results))]
+        for r in self.results:
+            if r.status == 'ok':
+                lines.append(u'  OK     {} : {} fichier(s) -> {}'.format(
+                    os.path.basename(r.path), len(r.files), r.folder))
+            else:
+                lines.append(u'  ERREUR {} : {} ({} fichier(s))'.format(
+                    os.path.basename(r.path), r.error, len(r.files)))
+        return lines
+
+    def save(self, path=None):
+        path = path or os.path.join(self.destination, REPORT_FILE_NAME)
+        try:
+            d = os.path.dirname(path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with io.open(path, 'w', encoding='utf-8') as fh:
+                fh.write(u'{}'.format(json.dumps(self.to_dict(), ensure_ascii=False, indent=1)))
+            return path
+        except Exception:
+            return None
+
+
+class _ComboShim(object):
+    def __init__(self, value):
+        self.SelectedItem = value if value else u''
+
+
+class MultiDocumentExportRunner(object):
+    def __init__(self, provider, orchestrator_factory=None, config_manager=None):
+        self._provider = provider
+        self._orchestrator_factory = orchestrator_factory
+        self._config_manager = config_manager
+
+    def _new_orchestrator(self):
+        if self._orchestrator_factory is not None:
+            return self._orchestrator_factory()
+        from .ExportOrchestrator import ExportOrchestrator
+        return ExportOrchestrator()
+
+    def _manager(self):
+        if self._config_manager is None:
+            from ..ConfigManagerService import ConfigManagerService
+            self._config_manager = ConfigManagerService()
+        return self._config_manager
+
+    @staticmethod
+    def _profile_get_ctrl(data):
+        def get_ctrl(name):
+            return _ComboShim((data or {}).get(_COMBO_KEYS.get(name, u''), u''))
+        return get_ctrl
+
+    def run(self, paths, profile_name, destination, get_ctrl=None, progress_cb=None, log_cb=None,
+            overwrite=True, cancel=None):
+        """Exporte chaque document de `paths` avec le profil `profile_name`.
+
+        `get_ctrl` : mapping des paramètres Oui/Non ; par défaut celui du
+        profil. `overwrite` : politique imposée aux fichiers existants (pas
+        de question pendant une file sans surveillance). `cancel` :
+        `CancellationToken` transmis à chaque run ; une fois annulé, les
+        documents restants ne sont pas ouverts. La configuration
+        courante et le profil actif sont restaurés en fin de file. Retourne
+        un `MultiDocumentReport`.
+        """
+        def _log(msg):
+            if log_cb:
+                try:
+                    log_cb(msg)
+                except Exception:
+                    pass
+
+        report = MultiDocumentReport(profile_name, destination)
+        manager = self._manager()
+        saved = manager.capture_current_config()
+        # load_profile persiste le profil chargé comme profil actif.
+        saved_active = manager.get_active_profile_key()
+
+        def _restore():
+            manager.restore_config(saved)
+            manager.set_active_profile_key(saved_active)
+
+        if not manager.load_profile(profile_name):
+            _restore()
+            _log(u"Profil introuvable ou non applicable : {}".format(profile_name))
+            for path in paths or []:
+                res = DocumentExportResult(path, None)
+                res.status, res.error = 'error', u'profil {} non chargé'.format(profile_name)
+                report.results.append(res)
+            report.save()
+            return report
+        if get_ctrl is None:
+            get_ctrl = self._profile_get_ctrl(manager.get_profile_data(profile_name))
+
+        total = len(paths or [])
+        used = set()
+        try:
+            for i, path in enumerate(paths or []):
+                if cancel is not None and cancel.cancelled:
+                    res = DocumentExportResult(path, None)
+                    res.status, res.error = 'error', u'file annulée'
+                    report.results.append(res)
+                    continue
+                name = _folder_name(path)
+                folder_name, n = name, 2
+                while folder_name.lower() in used:
+                    folder_name, n = u'{} ({})'.format(name, n), n + 1
+                used.add(folder_name.lower())
+                res = DocumentExportResult(path, os.path.join(destination, folder_name))
+                report.results.append(res)
+                if progress_cb:
+                    try:
+                        progress_cb(i, max(total, 1), u'{} ({}/{})'.format(folder_name, i + 1, total))
+                    except Exception:
+                        pass
+                _log(u"--- Document {}/{} : {} ---".format(i + 1, total, path))
+                self._export_one(res, get_ctrl, log_cb, overwrite, cancel)
+                _log(u"Document {} : {}".format(folder_name, res.status if res.status == 'ok' else res.error))
+        finally:
+            _restore()
+        if progress_cb:
+            try:
+                progress_cb(total, max(total, 1), u'')
+            except Exception:
+                pass
+        for line in report.summary_lines():
+            _log(line)
+        report.save()
+        return report
+
+    def _export_one(self, res, get_ctrl, log_cb, overwrite, cancel=None):
+        t0 = time.time()
+        doc = None
+        try:
+            doc = self._provider.open(res.path)
+            orch = self._new_orchestrator()
+            ok = orch.run(doc, get_ctrl, log_cb=log_cb, destination=res.folder, overwrite=overwrite,
+                          cancel=cancel)
+            manifest = getattr(orch, 'last_manifest', None)
+            res.files = _written_files(manifest)
+            failures = manifest.failure_lines(limit=3) if manifest is not None else []
+            if not ok:
+                res.status, res.error = 'error', u'export interrompu'
+            elif failures:
+                res.status, res.error = 'error', u'; '.join(failures)
+            else:
+                res.status = 'ok'
+        except Exception as e:
+            res.status = 'error'
+            try:
+                res.error = u'{}'.format(e) or e.__class__.__name__
+            except Exception:
+                res.error = u'erreur'
+        finally:
+            if doc is not None:
+                try:
+                    self._provider.close(doc)
+                except Exception as e:
+                    if res.status == 'ok':
+                        res.status, res.error = 'error', u'fermeture : {}'.format(e)
+            res.duration = time.time() - t0
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# Détection des collisions de noms de sortie sur l'ensemble du plan d'export.
+#
+# Deux feuilles dont le pattern résout au même nom n'étaient découvertes
+# qu'à l'écriture : suffixe " (1)" silencieux (unique_path), ou pire, avec
+# `overwrite=True`, le second fichier écrasait le premier.
+#
+# Ici, une passe O(n) sur les chemins déjà résolus du plan (pattern compilé
+# + nettoyage, cf. ExportOrchestrator.build_export_plan) : index par chemin
+# normalisé (casse selon le système de fichiers, comme DestinationListing),
+# groupes de plus d'un élément = collisions. Elles sont signalées dans
+# l'aperçu avec les feuilles en cause, puis levées selon une stratégie :
+#
+#   'index'  : " (1)", " (2)"… sur les suivants (défaut, même forme que
+#              unique_path, mais décidé avant l'export donc jamais écrasé) ;
+#   'numero' : "_{numero}" ajouté aux feuilles en collision, " (n)" pour ce
+#              qui reste ambigu (carnets, numéros identiques) ;
+#   'aucune' : signalement seul.
+
+from __future__ import unicode_literals
+
+import os
+from collections import OrderedDict
+
+STRATEGY_INDEX = 'index'
+STRATEGY_NUMERO = 'numero'
+STRATEGY_NONE = 'aucune'
+STRATEGIES = (STRATEGY_INDEX, STRATEGY_NUMERO, STRATEGY_NONE)
+DEFAULT_STRATEGY = STRATEGY_INDEX
+
+
+def path_key(path):
+    """Clé de comparaison d'un chemin de sortie (casse selon le FS)."""
+    return os.path.normcase(os.path.abspath(path or u'.'))
+
+
+def find_collisions(items):
+    """`{clé de chemin: [éléments]}` des chemins visés par plusieurs
+    éléments du plan, dans l'ordre du plan."""
+    index = OrderedDict()
+    for it in items or []:
+        index.setdefault(path_key(it.path), []).append(it)
+    return OrderedDict((key, group) for key, group in index.items() if len(group) > 1)
+
+
+def _label(it):
+    if it.is_group:
+        return u'carnet {}'.format(it.collection)
+    return it.sheet_number or u'?'
+
+
+def collision_lines(collisions):
+    """Une ligne par collision : `"nom.pdf" (jeu) : A101, A102`."""
+    lines = []
+    for group in collisions.values():
+        first = group[0]
+        lines.append(u'"{}" ({}) : {}'.format(first.file_name, first.collection,
+                                             u', '.join(_label(it) for it in group)))
+    return lines
+
+
+def _with_stem(it, stem):
+    return os.path.join(os.path.dirname(it.path), u'{}.{}'.format(stem, it.fmt))
+
+
+def _stem(it):
+    return os.path.splitext(it.file_name)[0]
+
+
+def disambiguate(items, strategy=DEFAULT_STRATEGY, sanitize=None):
+    """Lève les collisions de `items` (chemins modifiés en place) selon
+    `strategy`. Retourne `[(élément, ancien chemin)]` des éléments renommés.
+    `sanitize(texte)` : nettoyage appliqué au numéro ajouté."""
+    if strategy not in STRATEGIES or strategy == STRATEGY_NONE:
+        return []
+    items = list(items or [])
+    collisions = find_collisions(items)
+    if not collisions:
+        return []
+    taken = set(path_key(it.path) for it in items)
+    renamed = []
+
+    def _move(it, path):
+        renamed.append((it, it.path))
+        it.path = path
+        taken.add(path_key(path))
+
+    if strategy == STRATEGY_NUMERO:
+        for group in collisions.values():
+            for it in group:
+                if it.is_group or not it.sheet_number:
+                    continue
+                numero = it.sheet_number
+                try:
+                    numero = sanitize(numero) if sanitize is not None else numero
+                except Exception:
+                    pass
+                _move(it, _with_stem(it, u'{}_{}'.format(_stem(it), numero)))
+        collisions = find_collisions(items)
+
+    for group in collisions.values():
+        for it in group[1:]:
+            stem = _stem(it)
+            n = 1
+            while True:
+                cand = _with_stem(it, u'{} ({})'.format(stem, n))
+                if path_key(cand) not in taken:
+                    break
+                n += 1
+            _move(it, cand)
+    return renamed
@@ -0,0 +1,720 @@
+# -*- coding: utf-8 -*-
+# Assemblage local de PDF : concatène des PDF existants (un par feuille,
+# en pratique) en un seul fichier, sans Revit ni dépendance externe.
+#
+#   pages = merge_pdfs([u'A101.pdf', u'A102.pdf'], u'Carnet.pdf')
+#
+# Lecture en flux : seule la table xref de chaque source est chargée ; les
+# objets sont relus un par un à leur offset, et le contenu des streams est
+# recopié par blocs, sans décodage (les pages ne sont jamais décompressées).
+# Seuls les streams xref / d'objets (PDF 1.5+) sont décodés en mémoire.
+#
+# Pour chaque source : parcours de l'arbre des pages (attributs hérités
+# Resources / MediaBox / CropBox / Rotate recopiés sur la page), puis copie
+# des objets atteignables depuis les pages, renumérotés. Le /Parent des
+# pages pointe sur le nouvel arbre ; les références aux anciens noeuds
+# /Pages deviennent `null`. Le catalogue source (signets, formulaires,
+# structure) n'est pas repris.
+#
+# Non pris en charge (PdfMergeError, l'appelant repasse par Revit) : PDF
+# chiffrés, table xref illisible, filtres de stream xref autres que Flate.
+
+from __future__ import unicode_literals
+
+import os
+import re
+import zlib
+from collections import deque
+
+
+class PdfMergeError(Exception):
+    """PDF illisible ou non pris en charge."""
+
+
+class _Incomplete(Exception):
+    """Tampon trop court : relire plus loin dans le fichier."""
+
+
+_WS = b' \t\r\n\x00\x0c'
+_DELIMS = b'()<>[]{}/%'
+_READ_SIZE = 4096
+_COPY_SIZE = 256 * 1024
+_INHERITABLE = (b'Resources', b'MediaBox', b'CropBox', b'Rotate')
+_OBJ_HEADER = re.compile(br'\s*(\d+)\s+(\d+)\s+obj')
+_STARTXREF = re.compile(br'startxref\s+(\d+)')
+_MAX_DEPTH = 64
+
+
+class PdfName(object):
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name   # octets, sans le '/'
+
+    def __eq__(self, other):
+        return isinstance(other, PdfName) and other.name == self.name
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class PdfRef(object):
+    __slots__ = ('num', 'gen')
+
+    def __init__(self, num, gen=0):
+        self.num = num
+        self.gen = gen
+
+
+class PdfRaw(object):
+    """Jeton recopié tel quel : nombre, chaîne, booléen, null."""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+def _ascii(text):
+    return text.encode('ascii')
+
+
+def _int(value):
+    if isinstance(value, PdfRaw):
+        return int(value.raw)
+    return int(value)
+
+
+def _name(value):
+    return value.name if isinstance(value, PdfName) else None
+
+
+def _be(data):
+    n = 0
+    for b in bytearray(data):
+        n = (n << 8) | b
+    return n
+
+
+# ----------------------------------------------------------------------
+# Analyse d'objets
+# ----------------------------------------------------------------------
+
+class _Parser(object):
+    def __init__(self, data, eof=True):
+        self.data = data
+        self.eof = eof   # False : les données continuent après le tampon
+
+    def need(self, pos, count=1):
+        if pos + count > len(self.data):
+            if not self.eof:
+                raise _Incomplete()
+            if pos >= len(self.data):
+                raise PdfMergeError(u'fin de données inattendue')
+
+    def skip_ws(self, pos):
+        data, n = self.data, len(self.data)
+        while pos < n:
+            c = data[pos:pos + 1]
+            if c in _WS:
+                pos += 1
+            elif c == b'%':
+                while pos < n and data[pos:pos + 1] not in b'\r\n':
+                    pos += 1
+            else:
+                break
+        return pos
+
+    def token_end(self, pos):
+        data, n = self.data, len(self.data)
+        while pos < n:
+            c = data[pos:pos + 1]
+            if c in _WS or c in _DELIMS:
+                return pos
+            pos += 1
+        if not self.eof:
+            raise _Incomplete()
+        return pos
+
+    def parse(self, pos):
+        """Objet direct à `pos` -> (valeur, position suivante)."""
+        pos = self.skip_ws(pos)
+        self.need(pos)
+        data = self.data
+        c = data[pos:pos + 1]
+        if c == b'<':
+            self.need(pos, 2)
+            if data[pos + 1:pos + 2] == b'<':
+                return self._dict(pos + 2)
+            end = data.find(b'>', pos)
+            if end < 0:
+                self.need(len(data), 1)
+                raise PdfMergeError(u'chaîne hexadécimale non terminée')
+            return PdfRaw(data[pos:end + 1]), end + 1
+        if c == b'[':
+            return self._array(pos + 1)
+        if c == b'(':
+            return self._string(pos)
+        if c == b'/':
+            end = self.token_end(pos + 1)
+            return PdfName(data[pos + 1:end]), end
+        if c in b')>]{}':
+            raise PdfMergeError(u'délimiteur inattendu à {}'.format(pos))
+        end = self.token_end(pos)
+        token = data[pos:end]
+        if token.isdigit():
+            ref = self._ref(int(token), end)
+            if ref is not None:
+                return ref
+        return PdfRaw(token), end
+
+    def _ref(self, num, pos):
+        # "num gen R" ; sinon None (simple entier)
+        data = self.data
+        pos = self.skip_ws(pos)
+        if pos >= len(data) and not self.eof:
+            raise _Incomplete()
+        if not data[pos:pos + 1].isdigit():
+            return None
+        end = self.token_end(pos)
+        gen = data[pos:end]
+        if not gen.isdigit():
+            return None
+        pos = self.skip_ws(end)
+        if pos + 2 > len(data) and not self.eof:
+            raise _Incomplete()
+        if data[pos:pos + 1] != b'R':
+            return None
+        after = data[pos + 1:pos + 2]
+        if after and after not in _WS and after not in _DELIMS:
+            return None
+        return PdfRef(num, int(gen)), pos + 1
+
+    def _dict(self, pos):
+        data = self.data
+        out = {}
+        while True:
+            pos = self.skip_ws(pos)
+            self.need(pos, 2)
+            if data[pos:pos + 2] == b'>>':
+                return out, pos + 2
+            key, pos = self.parse(pos)
+            if not isinstance(key, PdfName):
+                raise PdfMergeError(u'clé de dictionnaire invalide')
+            value, pos = self.parse(pos)
+            out[key.name] = value
+
+    def _array(self, pos):
+        data = self.data
+        out = []
+        while True:
+            pos = self.skip_ws(pos)
+            self.need(pos)
+            if data[pos:pos + 1] == b']':
+                return out, pos + 1
+            value, pos = self.parse(pos)
+            out.append(value)
+
+    def _string(self, start):
+        data, n = self.data, len(self.data)
+        depth = 0
+        i = start
+        while i < n:
+            c = data[i:i + 1]
+            if c == b'\\':
+                i += 2
+                continue
+            if c == b'(':
+                depth += 1
+            elif c == b')':
+                depth -= 1
+                if depth == 0:
+                    return PdfRaw(data[start:i + 1]), i + 1
+            i += 1
+        self.need(n, 1)
+        raise PdfMergeError(u'chaîne non terminée')
+
+
+def _png_unpredict(data, columns, colors=1, bpc=8):
+    """Prédicteurs PNG (10-15) des streams xref / d'objets."""
+    bpp = max(1, colors * bpc // 8)
+    rowlen = (columns * colors * bpc + 7) // 8
+    buf = bytearray(data)
+    out = bytearray()
+    prev = bytearray(rowlen)
+    i = 0
+    while i + 1 + rowlen <= len(buf):
+        ft = buf[i]
+        row = buf[i + 1:i + 1 + rowlen]
+        i += 1 + rowlen
+        if ft == 1:
+            for j in range(bpp, rowlen):
+                row[j] = (row[j] + row[j - bpp]) & 0xff
+        elif ft == 2:
+            for j in range(rowlen):
+                row[j] = (row[j] + prev[j]) & 0xff
+        elif ft == 3:
+            for j in range(rowlen):
+                left = row[j - bpp] if j >= bpp else 0
+                row[j] = (row[j] + ((left + prev[j]) >> 1)) & 0xff
+        elif ft == 4:
+            for j in range(rowlen):
+                a = row[j - bpp] if j >= bpp else 0
+                b = prev[j]
+                c = prev[j - bpp] if j >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if (pa <= pb and pa <= pc) else (b if pb <= pc else c)
+                row[j] = (row[j] + pred) & 0xff
+        elif ft != 0:
+            raise PdfMergeError(u'prédicteur PNG inconnu : {}'.format(ft))
+        out.extend(row)
+        prev = row
+    return bytes(out)
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+class PdfReader(object):
+    """Accès aux objets d'un PDF via sa table xref, sans le charger."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, 'rb')
+        self._xref = {}      # num -> ('n', offset) | ('c', num stream, index)
+        self._objstm = {}    # num stream -> (données, First, [(num, offset)])
+        self.trailer = {}
+        try:
+            self._read_xref()
+            if b'Encrypt' in self.trailer:
+                raise PdfMergeError(u'PDF chiffré non pris en charge')
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        fh, self._fh = self._fh, None
+        if fh is not None:
+            fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- xref ----------------------------------------------------------
+
+    def _read_xref(self):
+        fh = self._fh
+        fh.seek(0, 2)
+        size = fh.tell()
+        tail = min(size, 2048)
+        fh.seek(size - tail)
+        data = fh.read(tail)
+        idx = data.rfind(b'startxref')
+        m = _STARTXREF.match(data, idx) if idx >= 0 else None
+        if m is None:
+            raise PdfMergeError(u'startxref introuvable')
+        offset = int(m.group(1))
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            entries, trailer = self._read_section(offset)
+            hybrid = trailer.get(b'XRefStm')
+            if hybrid is not None and _int(hybrid) not in seen:
+                seen.add(_int(hybrid))
+                self._merge_entries(self._read_section(_int(hybrid))[0])
+            self._merge_entries(entries)
+            for key in (b'Root', b'Encrypt'):
+                if key in trailer and key not in self.trailer:
+                    self.trailer[key] = trailer[key]
+            prev = trailer.get(b'Prev')
+            offset = _int(prev) if prev is not None else None
+        if b'Root' not in self.trailer:
+            raise PdfMergeError(u'catalogue introuvable')
+
+    def _merge_entries(self, entries):
+        # La section la plus récente (lue en premier) l'emporte.
+        for num, entry in entries.items():
+            self._xref.setdefault(num, entry)
+
+    def _read_section(self, offset):
+        size = _READ_SIZE
+        while True:
+            self._fh.seek(offset)
+            data = self._fh.read(size)
+            eof = len(data) < size
+            try:
+                parser = _Parser(data, eof)
+                pos = parser.skip_ws(0)
+                if data[pos:pos + 4] == b'xref':
+                    return self._parse_table(parser, pos + 4)
+                break
+            except _Incomplete:
+                if eof:
+                    raise PdfMergeError(u'table xref tronquée')
+                size *= 4
+        return self._parse_xref_stream(offset)
+
+    @staticmethod
+    def _parse_table(parser, pos):
+        data = parser.data
+        entries = {}
+        while True:
+            pos = parser.skip_ws(pos)
+            parser.need(pos, 7)
+            if data[pos:pos + 7] == b'trailer':
+                trailer, _pos = parser.parse(pos + 7)
+                return entries, trailer
+            fields = []
+            for _n in range(2):
+                pos = parser.skip_ws(pos)
+                end = parser.token_end(pos)
+                fields.append(int(data[pos:end]))
+                pos = end
+            start, count = fields
+            for i in range(count):
+                row = []
+                for _n in range(3):
+                    pos = parser.skip_ws(pos)
+                    end = parser.token_end(pos)
+                    row.append(data[pos:end])
+                    pos = end
+                if row[2] == b'n':
+                    entries[start + i] = ('n', int(row[0]))
+
+    def _parse_xref_stream(self, offset):
+        _num, info, stream_offset = self._read_object_at(offset)
+        if not isinstance(info, dict) or stream_offset is None or _name(info.get(b'Type')) != b'XRef':
+            raise PdfMergeError(u'table xref introuvable à {}'.format(offset))
+        data = self._decode(info, self._read_stream(info, stream_offset))
+        widths = [_int(w) for w in self.resolve(info.get(b'W'))]
+        index = [_int(v) for v in (self.resolve(info.get(b'Index')) or [PdfRaw(b'0'), info.get(b'Size')])]
+        w0, w1, w2 = widths
+        rec = w0 + w1 + w2
+        entries = {}
+        pos = 0
+        for k in range(0, len(index) - 1, 2):
+            start, count = index[k], index[k + 1]
+            for i in range(count):
+                row = data[pos:pos + rec]
+                pos += rec
+                kind = _be(row[:w0]) if w0 else 1
+                f2 = _be(row[w0:w0 + w1])
+                f3 = _be(row[w0 + w1:rec])
+                if kind == 1:
+                    entries[start + i] = ('n', f2)
+                elif kind == 2:
+                    entries[start + i] = ('c', f2, f3)
+        return entries, info
+
+    # -- objets --------------------------------------------------------
+
+    def _read_object_at(self, offset):
+        """(num, valeur, offset du contenu de stream ou None)."""
+        size = _READ_SIZE
+        while True:
+            self._fh.seek(offset)
+            data = self._fh.read(size)
+            eof = len(data) < size
+            m = _OBJ_HEADER.match(data)
+            if m is None:
+                raise PdfMergeError(u'objet introuvable à {}'.format(offset))
+            parser = _Parser(data, eof)
+            try:
+                value, pos = parser.parse(m.end())
+                pos = parser.skip_ws(pos)
+                stream_offset = None
+                if pos < len(data) or not eof:
+                    parser.need(pos, 8)
+                if data[pos:pos + 6] == b'stream':
+                    pos += 6
+                    if data[pos:pos + 2] == b'\r\n':
+                        pos += 2
+                    elif data[pos:pos + 1] in (b'\n', b'\r'):
+                        pos += 1
+                    stream_offset = offset + pos
+                return int(m.group(1)), value, stream_offset
+            except _Incomplete:
+                if eof:
+                    raise PdfMergeError(u'objet tronqué à {}'.format(offset))
+                size *= 4
+
+    def read(self, num):
+        """Objet indirect `num` -> (valeur, offset du stream ou None).
+        Un objet absent vaut null (None)."""
+        entry = self._xref.get(num)
+        if entry is None:
+            return None, None
+        if entry[0] == 'n':
+            _num, value, stream_offset = self._read_object_at(entry[1])
+            return value, stream_offset
+        return self._compressed(entry[1], entry[2]), None
+
+    def resolve(self, value):
+        depth = 0
+        while isinstance(value, PdfRef):
+            depth += 1
+            if depth > _MAX_DEPTH:
+                raise PdfMergeError(u'références circulaires')
+            value = self.read(value.num)[0]
+        return value
+
+    def _compressed(self, stm_num, index):
+        cached = self._objstm.get(stm_num)
+        if cached is None:
+            entry = self._xref.get(stm_num)
+            if entry is None or entry[0] != 'n':
+                raise PdfMergeError(u'stream d\'objets {} introuvable'.format(stm_num))
+            _num, info, stream_offset = self._read_object_at(entry[1])
+            data = self._decode(info, self._read_stream(info, stream_offset))
+            count, first = _int(info.get(b'N')), _int(info.get(b'First'))
+            parser = _Parser(data)
+            pos, numbers = 0, []
+            for _n in range(2 * count):
+                pos = parser.skip_ws(pos)
+                end = parser.token_end(pos)
+                numbers.append(int(data[pos:end]))
+                pos = end
+            offsets = [numbers[k + 1] for k in range(0, len(numbers), 2)]
+            if len(self._objstm) >= 4:
+                self._objstm.clear()
+            cached = self._objstm[stm_num] = (data, first, offsets)
+        data, first, offsets = cached
+        return _Parser(data).parse(first + offsets[index])[0]
+
+    # -- streams -------------------------------------------------------
+
+    def stream_length(self, info):
+        length = self.resolve(info.get(b'Length'))
+        if length is None:
+            raise PdfMergeError(u'stream sans /Length')
+        return _int(length)
+
+    def _read_stream(self, info, stream_offset):
+        self._fh.seek(stream_offset)
+        return self._fh.read(self.stream_length(info))
+
+    def copy_stream(self, stream_offset, length, write):
+        """Recopie `length` octets de stream par blocs vers `write`."""
+        self._fh.seek(stream_offset)
+        left = length
+        while left > 0:
+            chunk = self._fh.read(min(_COPY_SIZE, left))
+            if not chunk:
+                raise PdfMergeError(u'stream tronqué')
+            write(chunk)
+            left -= len(chunk)
+
+    def _decode(self, info, raw):
+        filters = self.resolve(info.get(b'Filter'))
+        parms = self.resolve(info.get(b'DecodeParms'))
+        if filters is None:
+            filters = []
+        elif not isinstance(filters, list):
+            filters, parms = [filters], [parms]
+        if not isinstance(parms, list):
+            parms = [parms] * len(filters)
+        data = raw
+        for pos, flt in enumerate(filters):
+            if _name(flt) not in (b'FlateDecode', b'Fl'):
+                raise PdfMergeError(u'filtre non pris en charge : {}'.format(_name(flt)))
+            data = zlib.decompress(data)
+            parm = self.resolve(parms[pos]) if pos < len(parms) else None
+            if isinstance(parm, dict):
+                predictor = _int(parm.get(b'Predictor', PdfRaw(b'1')))
+                if predictor >= 10:
+                    data = _png_unpredict(data, _int(parm.get(b'Columns', PdfRaw(b'1'))),
+                                          _int(parm.get(b'Colors', PdfRaw(b'1'))),
+                                          _int(parm.get(b'BitsPerComponent', PdfRaw(b'8'))))
+                elif predictor > 1:
+                    raise PdfMergeError(u'prédicteur TIFF non pris en charge')
+        return data
+
+    # -- pages ---------------------------------------------------------
+
+    def pages(self):
+        """Pages dans l'ordre du document : `([(num, dict, hérités)],
+        {num des noeuds /Pages})`."""
+        root = self.resolve(self.trailer.get(b'Root'))
+        if not isinstance(root, dict):
+            raise PdfMergeError(u'catalogue invalide')
+        pages, nodes = [], set()
+        self._walk(root.get(b'Pages'), {}, pages, nodes, 0)
+        return pages, nodes
+
+    def _walk(self, ref, inherited, pages, nodes, depth):
+        if depth > _MAX_DEPTH:
+            raise PdfMergeError(u'arbre des pages trop profond')
+        if not isinstance(ref, PdfRef):
+            raise PdfMergeError(u'noeud de page non indirect')
+        if ref.num in nodes:
+            return
+        node = self.read(ref.num)[0]
+        if not isinstance(node, dict):
+            return
+        kids = node.get(b'Kids')
+        if _name(node.get(b'Type')) == b'Pages' or (kids is not None and b'Type' not in node):
+            nodes.add(ref.num)
+            inherited = dict(inherited)
+            for key in _INHERITABLE:
+                if key in node:
+                    inherited[key] = node[key]
+            for kid in self.resolve(kids) or []:
+                self._walk(kid, inherited, pages, nodes, depth + 1)
+        else:
+            pages.append((ref.num, node, inherited))
+
+
+def page_count(path):
+    with PdfReader(path) as reader:
+        return len(reader.pages()[0])
+
+
+# ----------------------------------------------------------------------
+# Écriture
+# ----------------------------------------------------------------------
+
+def _serialize(value, ref):
+    if isinstance(value, dict):
+        parts = [b'<<']
+        for key, val in value.items():
+            parts.append(b'/' + key)
+            parts.append(_serialize(val, ref))
+        parts.append(b'>>')
+        return b' '.join(parts)
+    if isinstance(value, list):
+        return b'[' + b' '.join(_serialize(v, ref) for v in value) + b']'
+    if isinstance(value, PdfName):
+        return b'/' + value.name
+    if isinstance(value, PdfRef):
+        return ref(value)
+    if isinstance(value, PdfRaw):
+        return value.raw
+    return b'null'
+
+
+_CATALOG = 1
+_PAGES = 2
+
+
+class _Writer(object):
+    def __init__(self, out):
+        self._out = out
+        self._pos = 0
+        self._offsets = {}
+        self._next = _PAGES + 1
+
+    def write(self, data):
+        self._out.write(data)
+        self._pos += len(data)
+
+    def _alloc(self):
+        num, self._next = self._next, self._next + 1
+        return num
+
+    def _begin(self, num):
+        self._offsets[num] = self._pos
+        self.write(_ascii('{} 0 obj\n'.format(num)))
+
+    def merge(self, sources):
+        self.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        kids = []
+        for src in sources:
+            with PdfReader(src) as reader:
+                kids.extend(self._copy(reader))
+        if not kids:
+            raise PdfMergeError(u'aucune page à assembler')
+        self._begin(_CATALOG)
+        self.write(_ascii('<< /Type /Catalog /Pages {} 0 R >>\nendobj\n'.format(_PAGES)))
+        self._begin(_PAGES)
+        self.write(_ascii('<< /Type /Pages /Count {} /Kids ['.format(len(kids))))
+        self.write(b' '.join(_ascii('{} 0 R'.format(k)) for k in kids))
+        self.write(b'] >>\nendobj\n')
+        xref = self._pos
+        self.write(_ascii('xref\n0 {}\n'.format(self._next)))
+        self.write(b'0000000000 65535 f \n')
+        for num in range(1, self._next):
+            self.write(_ascii('{:010d} 00000 n \n'.format(self._offsets[num])))
+        self.write(_ascii('trailer\n<< /Size {} /Root {} 0 R >>\nstartxref\n{}\n%%EOF\n'.format(
+            self._next, _CATALOG, xref)))
+        return len(kids)
+
+    def _copy(self, reader):
+        pages, nodes = reader.pages()
+        mapping = {}
+        queue = deque()
+        page_data = {}
+
+        def target(num):
+            dst = mapping.get(num)
+            if dst is None:
+                dst = mapping[num] = self._alloc()
+                queue.append(num)
+            return dst
+
+        def ref(value):
+            if value.num in nodes:
+                return b'null'
+            return _ascii('{} 0 R'.format(target(value.num)))
+
+        kids = []
+        for num, node, inherited in pages:
+            page_data[num] = (node, inherited)
+            kids.append(target(num))
+        parent = PdfRaw(_ascii('{} 0 R'.format(_PAGES)))
+        while queue:
+            num = queue.popleft()
+            if num in page_data:
+                node, inherited = page_data.pop(num)
+                value = dict(node)
+                value[b'Parent'] = parent
+                for key, val in inherited.items():
+                    value.setdefault(key, val)
+                stream_offset = None
+            else:
+                value, stream_offset = reader.read(num)
+            self._object(mapping[num], value, stream_offset, reader, ref)
+        return kids
+
+    def _object(self, num, value, stream_offset, reader, ref):
+        self._begin(num)
+        if stream_offset is not None and isinstance(value, dict):
+            length = reader.stream_length(value)
+            value = dict(value)
+            value[b'Length'] = PdfRaw(_ascii('{}'.format(length)))
+            self.write(_serialize(value, ref))
+            self.write(b'\nstream\n')
+            reader.copy_stream(stream_offset, length, self.write)
+            self.write(b'\nendstream\nendobj\n')
+        else:
+            self.write(_serialize(value, ref))
+            self.write(b'\nendobj\n')
+
+
+def merge_pdfs(sources, path):
+    """Concatène `sources` (dans l'ordre) dans `path` ; retourne le nombre
+    de pages. Écriture dans un fichier `.part` renommé à la fin : en cas
+    d'échec, `path` n'est pas touché. Lève PdfMergeError."""
+    tmp = path + '.part'
+    try:
+        with open(tmp, 'wb') as out:
+            count = _Writer(out).merge(list(sources or []))
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp, path)
+        return count
+    except Exception as e:
+        try:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        except Exception:
+            pass
+        if isinstance(e, (PdfMergeError, IOError, OSError)):
+            raise
+        raise PdfMergeError(u'{}: {}'.format(e.__class__.__name__, e))
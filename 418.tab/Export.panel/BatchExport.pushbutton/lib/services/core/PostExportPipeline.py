@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Étape post-export : travaux fichiers exécutés hors du thread Revit.
+#
+# Déplacer les DWG hors du dossier temporaire, recopier les rasters et
+# supprimer les arborescences temporaires se faisait en ligne, entre deux
+# `doc.Export`. Ces travaux passent ici dans un pool de threads borné :
+# l'orchestrateur enfile et enchaîne aussitôt l'export Revit suivant.
+#
+# Règles :
+#   - seuls des travaux FICHIERS sont soumis (jamais d'appel à l'API Revit) ;
+#   - la file est bornée : si les workers prennent du retard, `submit`
+#     bloque (contre-pression) au lieu d'accumuler des Go de temporaires ;
+#   - les callbacks `when_written` et les erreurs sont remontés sur le
+#     thread appelant, dans `poll()` / `wait()` / `drain()` (jamais depuis
+#     un worker : log_cb touche l'UI) ;
+#   - `wait(cibles)` attend seulement les fichiers dont l'appelant a besoin
+#     tout de suite (ex. PDF unitaires à assembler en carnet) ;
+#   - `workers=0` exécute tout en ligne (même contrat, sans thread).
+
+from __future__ import unicode_literals
+
+import threading
+import time
+
+try:
+    import queue as _queue
+except ImportError:  # IronPython 2.7
+    import Queue as _queue  # type: ignore
+
+_STOP = object()
+
+
+class PostExportPipeline(object):
+    def __init__(self, workers=2, max_pending=16):
+        self._workers = max(0, int(workers or 0))
+        self._jobs = _queue.Queue(maxsize=max(1, int(max_pending or 1)))
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # notifié à chaque fin de travail
+        self._finished = []     # [(label, targets, err)] terminés, non relevés
+        self._pending = {}      # cible -> nombre de travaux en cours
+        self._callbacks = {}    # cible -> [callable] à appeler si succès
+        self._unreported = []   # [(label, message)] pas encore remontées
+        self._threads = []
+        self._closed = False
+        for n in range(self._workers):
+            t = threading.Thread(target=self._loop, name='post-export-{}'.format(n))
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    # ------------------------------------------------------------------
+    # Soumission
+    # ------------------------------------------------------------------
+
+    def submit(self, label, fn, args=(), targets=()):
+        """Enfile `fn(*args)`. `targets` : chemins produits par le travail
+        (cf. `when_written`). Exécuté en ligne si pas de worker."""
+        targets = tuple(targets or ())
+        with self._lock:
+            for t in targets:
+                self._pending[t] = self._pending.get(t, 0) + 1
+        if self._workers == 0 or self._closed:
+            self._run(label, fn, args, targets)
+            self._collect()
+            return
+        self._jobs.put((label, fn, args, targets))
+
+    def when_written(self, path, callback):
+        """Appelle `callback()` (thread appelant) quand les travaux produisant
+        `path` ont réussi ; immédiatement si aucun n'est en cours."""
+        with self._lock:
+            if self._pending.get(path):
+                self._callbacks.setdefault(path, []).append(callback)
+                return
+        callback()
+
+    # ------------------------------------------------------------------
+    # Relève (thread appelant)
+    # ------------------------------------------------------------------
+
+    def poll(self):
+        """Relève les travaux terminés : exécute leurs callbacks et retourne
+        les erreurs `[(label, message)]` pas encore remontées."""
+        self._collect()
+        errors, self._unreported = self._unreported, []
+        return errors
+
+    def _collect(self):
+        with self._lock:
+            finished, self._finished = self._finished, []
+        errors = []
+        for label, targets, err in finished:
+            ready = []
+            with self._lock:
+                for t in targets:
+                    left = self._pending.get(t, 1) - 1
+                    if left > 0:
+                        self._pending[t] = left
+                        continue
+                    self._pending.pop(t, None)
+                    cbs = self._callbacks.pop(t, [])
+                    if err is None:
+                        ready.extend(cbs)
+            if err is not None:
+                errors.append((label, err))
+            for cb in ready:
+                try:
+                    cb()
+                except Exception:
+                    pass
+        self._unreported.extend(errors)
+
+    def wait(self, targets, timeout=None):
+        """Attend (thread appelant) la fin des travaux produisant `targets`,
+        avec relève des callbacks (cf. `poll` ; les erreurs restent pour le
+        prochain `poll`). Retourne False si `timeout` (s) a expiré."""
+        targets = tuple(targets or ())
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self._collect()
+            with self._changed:
+                if not any(self._pending.get(t) for t in targets):
+                    return True
+                if self._finished:
+                    continue
+                left = 0.5 if deadline is None else deadline - time.time()
+                if left <= 0:
+                    return False
+                self._changed.wait(min(left, 0.5))
+
+    def drain(self):
+        """Attend la fin de tous les travaux, arrête les workers et relève
+        (cf. `poll`)."""
+        if not self._closed:
+            self._closed = True
+            for _t in self._threads:
+                self._jobs.put(_STOP)
+            for t in self._threads:
+                t.join()
+        return self.poll()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                return
+            label, fn, args, targets = job
+            self._run(label, fn, args, targets)
+
+    def _run(self, label, fn, args, targets):
+        err = None
+        try:
+            fn(*args)
+        except Exception as e:
+            try:
+                err = u'{}'.format(e)
+            except Exception:
+                err = u'erreur'
+        with self._changed:
+            self._finished.append((label, targets, err))
+            self._changed.notify_all()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Relais de progression entre l'orchestrateur et le ViewModel.
+#
+# `progress_cb` est appelé plusieurs fois par feuille ; chaque appel
+# modifiait ProgressValue/StatusText (mises à jour de binding WPF) et
+# écrivait une ligne flushée dans le log de session. Le relais :
+#   - coalesce : au plus `max_rate` livraisons par seconde, le dernier état
+#     reçu remplace les précédents en attente ;
+#   - livre toujours l'état final (current >= total, ou `flush()`) ;
+#   - livre sans attendre l'annonce d'un élément qui démarre (`start`) :
+#     l'export bloquant qui suit ne laisse aucune livraison différée avant
+#     sa fin, la barre afficherait l'élément précédent pendant ce temps ;
+#   - compte les éléments terminés par étape (`item_done('pdf')`) et en
+#     déduit débit (feuilles/min) et temps restant (`planned(n)` = total) ;
+#     l'étape `SKIPPED` (reprise/incrémental) réduit le reste sans compter
+#     dans le débit ;
+#   - tant que le débit mesuré repose sur trop peu d'éléments, le temps
+#     restant vient de la durée prévue par l'historique (`predicted(s)`,
+#     cf. TimingHistory).
+#
+# Il s'utilise comme un `progress_cb` ordinaire ; l'orchestrateur détecte
+# `planned` / `item_done` / `start` par getattr (un callback simple reste
+# accepté).
+
+from __future__ import unicode_literals
+
+import time
+
+SKIPPED = 'skipped'
+# Éléments exportés à partir desquels le débit mesuré remplace la prévision.
+MEASURED_ETA_MIN_ITEMS = 5
+
+
+def format_duration(seconds):
+    seconds = int(round(max(0, seconds)))
+    if seconds < 60:
+        return u'{} s'.format(seconds)
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return u'{} min {:02d}'.format(minutes, seconds)
+    hours, minutes = divmod(minutes, 60)
+    return u'{} h {:02d}'.format(hours, minutes)
+
+
+class ProgressDispatcher(object):
+    def __init__(self, sink, max_rate=4.0, clock=None):
+        # sink(current, total, message) : la mise à jour réelle (VM + log)
+        self._sink = sink
+        self._interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self._clock = clock or time.time
+        self._t0 = self._clock()
+        self._last_emit = None
+        self._pending = None
+        self._last = None
+        self.counters = {}
+        self.total_items = 0
+        self.predicted_seconds = None
+        self.delivered = 0
+
+    # ------------------------------------------------------------------
+    # Interface progress_cb
+    # ------------------------------------------------------------------
+
+    def __call__(self, current, total, message=u''):
+        state = (current, total, message)
+        try:
+            final = int(current) >= int(total)
+        except Exception:
+            final = False
+        now = self._clock()
+        if final or self._last_emit is None or now - self._last_emit >= self._interval:
+            self._emit(state, now)
+        else:
+            self._pending = state
+
+    def start(self, current, total, message=u''):
+        """Annonce d'un élément qui démarre, livrée immédiatement (hors
+        coalescence) : l'appel bloquant qui suit (doc.Export) empêche toute
+        livraison de l'état en attente avant la fin de cet élément."""
+        self._emit((current, total, message), self._clock())
+
+    def flush(self):
+        """Livre l'état en attente (fin de run)."""
+        if self._pending is not None:
+            self._emit(self._pending, self._clock())
+
+    def _emit(self, state, now):
+        self._pending = None
+        self._last_emit = now
+        self._last = state
+        self.delivered += 1
+        try:
+            self._sink(*state)
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Compteurs, débit, ETA
+    # ------------------------------------------------------------------
+
+    def planned(self, count):
+        """Nombre total d'éléments prévus pour le run (base de l'ETA)."""
+        try:
+            self.total_items = max(0, int(count))
+        except Exception:
+            self.total_items = 0
+
+    def predicted(self, seconds):
+        """Durée totale prévue du run (historique), ETA des débuts de run."""
+        try:
+            self.predicted_seconds = max(0.0, float(seconds)) if seconds is not None else None
+        except Exception:
+            self.predicted_seconds = None
+
+    def item_done(self, stage, count=1):
+        self.counters[stage] = self.counters.get(stage, 0) + count
+
+    @property
+    def done(self):
+        return sum(self.counters.values())
+
+    @property
+    def exported(self):
+        return self.done - self.counters.get(SKIPPED, 0)
+
+    def throughput(self):
+        """Éléments exportés par minute depuis le début (None avant le 1er)."""
+        elapsed = self._clock() - self._t0
+        if not self.exported or elapsed <= 0:
+            return None
+        return self.exported * 60.0 / elapsed
+
+    def eta(self):
+        """Secondes restantes estimées (None si inconnu) : débit mesuré, ou
+        prévision au prorata des éléments restants en début de run."""
+        rate = self.throughput()
+        if not self.total_items:
+            return None
+        remaining = max(0, self.total_items - self.done)
+        if self.predicted_seconds is not None and self.exported < MEASURED_ETA_MIN_ITEMS:
+            return self.predicted_seconds * remaining / float(self.total_items)
+        if not rate:
+            return None
+        return remaining * 60.0 / rate
+
+    def describe(self):
+        """Résumé court pour la barre d'état : débit et temps restant."""
+        rate = self.throughput()
+        parts = [u'{:.0f} feuille(s)/min'.format(rate)] if rate is not None else []
+        eta = self.eta()
+        if eta is not None:
+            parts.append(u'reste ~{}'.format(format_duration(eta)))
+        return u' · '.join(parts)
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+# Cache local des rendus par feuille (PDF/DWG), adressé par contenu.
+#
+# Une feuille dont l'empreinte (cf. IncrementalManifest.sheet_fingerprint),
+# le setup et l'état du document n'ont pas changé produit le même fichier :
+# on le recopie depuis le cache au lieu d'appeler `doc.Export`.
+#
+#   render_cache/
+#     index.json              clé de rendu -> {blob, taille, ext, dernier usage}
+#     blobs/ab/ab12...        contenu, nommé par son sha1 (dédoublonné)
+#
+# Service d'une entrée : lien physique vers la destination (instantané,
+# même volume), sinon copie. Un lien partage le contenu avec le cache :
+# avant de réécrire une sortie en place, l'appelant la détache (`detach`).
+#
+# Taille plafonnée (`max_bytes`, mémorisé dans l'index : l'entretien hors
+# run reprend le plafond du dernier export) : éviction LRU sur la date de
+# dernier usage. Entretien : `verify()` (recalcule les sha1, retire les blobs
+# altérés ou absents) et `gc()` (blobs orphelins, temporaires, plafond).
+# Ne lève jamais : un cache illisible est un cache vide.
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+CACHE_DIR_NAME = 'render_cache'
+INDEX_FILE_NAME = 'index.json'
+INDEX_VERSION = 1
+DEFAULT_MAX_MB = 2048
+_HASH_BLOCK = 1024 * 1024
+
+
+def _cache_dir():
+    # Dossier de l'utilisateur (cf. core.AppPaths.data_dir) : jamais dans
+    # l'extension, qui peut être en lecture seule et partagée.
+    return os.path.join(data_dir(), CACHE_DIR_NAME)
+
+
+def render_key(*parts):
+    """Clé de rendu (sha1) : document, état, format, empreinte, setup..."""
+    raw = json.dumps([u'{}'.format(p if p is not None else u'') for p in parts], ensure_ascii=False)
+    if not isinstance(raw, bytes):
+        raw = raw.encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        while True:
+            block = fh.read(_HASH_BLOCK)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    link = getattr(os, 'link', None)
+    if link is not None:
+        try:
+            link(src, dst)
+            return
+        except Exception:
+            pass
+    shutil.copy2(src, dst)
+
+
+class RenderCache(object):
+    def __init__(self, root=None, max_bytes=None, clock=None):
+        self.root = root or _cache_dir()
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._entries, saved_max = self._load()
+        if max_bytes is None:
+            max_bytes = saved_max if saved_max is not None else DEFAULT_MAX_MB * 1024 * 1024
+        self.max_bytes = max(0, int(max_bytes))
+        self._dirty = saved_max != self.max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Chemins / index
+    # ------------------------------------------------------------------
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, INDEX_FILE_NAME)
+
+    def _blob_path(self, blob):
+        return os.path.join(self.root, 'blobs', blob[:2], blob)
+
+    def _load(self):
+        try:
+            if os.path.exists(self.index_path):
+                with io.open(self.index_path, 'r', encoding='utf-8') as fh:
+                    data = json.load(fh)
+                if isinstance(data, dict) and isinstance(data.get('entries'), dict):
+                    return dict(data['entries']), data.get('max_bytes')
+        except Exception:
+            pass
+        return {}, None
+
+    def save(self):
+        """Écriture atomique de l'index (si modifié) ; ne lève jamais."""
+        with self._lock:
+            if not self._dirty:
+                return True
+            payload = {'version': INDEX_VERSION, 'max_bytes': self.max_bytes,
+                       'entries': dict(self._entries)}
+            self._dirty = False
+        tmp = self.index_path + '.tmp'
+        try:
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root)
+            with io.open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write(u'{}'.format(json.dumps(payload, ensure_ascii=False, indent=1, sort_keys=True)))
+            try:
+                os.replace(tmp, self.index_path)
+            except Exception:
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                os.rename(tmp, self.index_path)
+            return True
+        except Exception:
+            return False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def total_bytes(self):
+        """Taille occupée (blobs distincts)."""
+        with self._lock:
+            return self._total_locked()
+
+    def _total_locked(self):
+        sizes = {}
+        for rec in self._entries.values():
+            sizes[rec.get('blob')] = rec.get('size') or 0
+        return sum(sizes.values())
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def lookup(self, key):
+        """Chemin du blob de `key` s'il est présent et intact (taille), sinon None."""
+        with self._lock:
+            rec = self._entries.get(key)
+        if not rec:
+            return None
+        path = self._blob_path(rec.get('blob') or u'')
+        try:
+            if os.path.getsize(path) == rec.get('size'):
+                return path
+        except Exception:
+            pass
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+        return None
+
+    def fetch(self, key, dest):
+        """Place le rendu de `key` dans `dest` (lien, sinon copie). Retourne
+        False sur défaut de cache ou échec (l'appelant exporte)."""
+        blob = self.lookup(key)
+        if blob is None:
+            self.misses += 1
+            return False
+        try:
+            folder = os.path.dirname(dest)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            if os.path.lexists(dest):
+                os.remove(dest)
+            _link_or_copy(blob, dest)
+        except Exception:
+            self.misses += 1
+            return False
+        with self._lock:
+            rec = self._entries.get(key)
+            if rec is not None:
+                rec['used'] = self._clock()
+                self._dirty = True
+        self.hits += 1
+        return True
+
+    @staticmethod
+    def detach(path):
+        """Supprime `path` s'il partage son contenu avec un autre fichier
+        (lien physique vers le cache) : un export qui réécrit le fichier en
+        place ne doit pas altérer le blob."""
+        try:
+            if os.path.isfile(path) and os.stat(path).st_nlink > 1:
+                os.remove(path)
+                return True
+        except Exception:
+            pass
+        return False
+
+    # ------------------------------------------------------------------
+    # Écriture (thread post-export possible)
+    # ------------------------------------------------------------------
+
+    def store(self, key, path, ext=None):
+        """Enregistre `path` comme rendu de `key` (copie dans le cache)."""
+        try:
+            blob = file_sha1(path)
+            size = os.path.getsize(path)
+            if self.max_bytes and size > self.max_bytes:
+                return False
+            target = self._blob_path(blob)
+            if not (os.path.exists(target) and os.path.getsize(target) == size):
+                folder = os.path.dirname(target)
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+                tmp = u'{}.{}.tmp'.format(target, threading.current_thread().ident)
+                shutil.copyfile(path, tmp)
+                if os.path.exists(target):
+                    os.remove(target)
+                os.rename(tmp, target)
+        except Exception:
+            return False
+        with self._lock:
+            self._entries[key] = {
+                'blob': blob,
+                'size': size,
+                'ext': (ext or os.path.splitext(path)[1].lstrip('.')).lower(),
+                'used': self._clock(),
+            }
+            self._dirty = True
+            evicted = self._evict_locked()
+        self._remove_blobs(evicted)
+        return True
+
+    def _evict_locked(self):
+        """Retire les entrées les moins récemment utilisées jusqu'au plafond ;
+        retourne les blobs devenus orphelins."""
+        if not self.max_bytes:
+            return []
+        total = self._total_locked()
+        if total <= self.max_bytes:
+            return []
+        dropped = set()
+        for key in sorted(self._entries, key=lambda k: self._entries[k].get('used') or 0):
+            if total <= self.max_bytes:
+                break
+            rec = self._entries.pop(key)
+            blob = rec.get('blob')
+            if not any(r.get('blob') == blob for r in self._entries.values()):
+                total -= rec.get('size') or 0
+                dropped.add(blob)
+        self._dirty = True
+        return sorted(dropped)
+
+    def _remove_blobs(self, blobs):
+        for blob in blobs or []:
+            try:
+                os.remove(self._blob_path(blob))
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    # Entretien
+    # ------------------------------------------------------------------
+
+    def verify(self):
+        """Recalcule le sha1 de chaque blob référencé ; retire les entrées
+        dont le blob est absent ou altéré. Retourne `(vérifiés, retirés)`."""
+        with self._lock:
+            blobs = sorted(set(rec.get('blob') for rec in self._entries.values()))
+        bad = set()
+        for blob in blobs:
+            path = self._blob_path(blob or u'')
+            try:
+                if file_sha1(path) != blob:
+                    bad.add(blob)
+            except Exception:
+                bad.add(blob)
+        with self._lock:
+            dropped = [k for k, rec in self._entries.items() if rec.get('blob') in bad]
+            for key in dropped:
+                del self._entries[key]
+            if dropped:
+                self._dirty = True
+        self._remove_blobs(bad)
+        self.save()
+        return len(blobs), len(dropped)
+
+    def gc(self):
+        """Supprime blobs orphelins et temporaires, applique le plafond.
+        Retourne le nombre de fichiers supprimés."""
+        with self._lock:
+            evicted = self._evict_locked()
+            referenced = set(rec.get('blob') for rec in self._entries.values())
+        self._remove_blobs(evicted)
+        removed = len(evicted)
+        top = os.path.join(self.root, 'blobs')
+        for folder, _dirs, files in os.walk(top):
+            for name in files:
+                if name in referenced:
+                    continue
+                try:
+                    os.remove(os.path.join(folder, name))
+                    removed += 1
+                except Exception:
+                    pass
+        self.save()
+        return removed
+
+    def maintenance(self):
+        """`verify` puis `gc` ; lignes de bilan pour le log."""
+        checked, dropped = self.verify()
+        removed = self.gc()
+        return [
+            u'Cache de rendu : {} blob(s) vérifié(s), {} entrée(s) invalide(s) retirée(s).'.format(
+                checked, dropped),
+            u'Cache de rendu : {} fichier(s) supprimé(s), {} entrée(s), {:.1f} Mo / {:.0f} Mo.'.format(
+                removed, len(self), self.total_bytes() / 1048576.0, self.max_bytes / 1048576.0),
+        ]
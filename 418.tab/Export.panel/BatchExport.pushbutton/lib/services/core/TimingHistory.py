@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# Historique local des durées et tailles d'export par feuille, base des
+# estimations (« durée estimée » avant l'export, temps restant au démarrage
+# du run, espace disque nécessaire : cf. DiskSpacePrecheck).
+#
+# Clé : (setup d'export, format, classe de taille de la feuille). Classes :
+# A0..A4 (même règle que CollectionPreviewComponent : cotes SHEET_WIDTH /
+# SHEET_HEIGHT, tolérance 10 mm), 'Custom' (hors ISO), '' (inconnue) et
+# 'carnet' (PDF combiné exporté par Revit, durée rapportée à la feuille).
+#
+#   {"version": 1, "window": 30,
+#    "samples": {"Setup A3|pdf|A1": [2.41, 2.38, ...], ...},
+#    "sizes": {"Setup A3|pdf|A1": [183204, 179950, ...], ...}}
+#
+# Alimenté en fin de run depuis la trace (cf. ExportTrace). Durées : seuls
+# les éléments passés par doc.Export comptent (rendus servis par le cache,
+# carnets assemblés localement : ignorés). Tailles (octets par feuille) :
+# toute sortie réussie du run. Fenêtre glissante bornée par clé
+# (`window` dernières mesures) : l'estimation suit l'évolution du poste et
+# du modèle. Fichier `batch_export_timings.json`, dossier de données de
+# l'utilisateur (core.AppPaths.data_dir).
+
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+
+try:
+    from ...core.AppPaths import data_dir
+except Exception:
+    try:
+        from lib.core.AppPaths import data_dir
+    except Exception:
+        from core.AppPaths import data_dir
+
+try:
+    from Autodesk.Revit import DB  # type: ignore
+except Exception:
+    DB = None  # type: ignore
+
+HISTORY_FILE_NAME = 'batch_export_timings.json'
+HISTORY_VERSION = 1
+DEFAULT_WINDOW = 30
+CARNET = 'carnet'
+_FT_TO_MM = 304.8
+_ISO_SIZES = (('A0', 841, 1189), ('A1', 594, 841), ('A2', 420, 594), ('A3', 297, 420), ('A4', 210, 297))
+_TOLERANCE_MM = 10.0
+
+
+def _median(values):
+    vals = sorted(values)
+    if not vals:
+        return None
+    mid = len(vals) // 2
+    return vals[mid] if len(vals) % 2 else (vals[mid - 1] + vals[mid]) / 2.0
+
+
+def size_class(width_ft, height_ft):
+    """Classe de taille d'une feuille depuis ses cotes (pieds) : 'A0'..'A4',
+    'Custom', ou '' si les cotes sont inconnues."""
+    try:
+        dims = sorted([float(width_ft) * _FT_TO_MM, float(height_ft) * _FT_TO_MM])
+    except Exception:
+        return u''
+    if dims[1] <= 0:
+        return u''
+    for name, short, long_side in _ISO_SIZES:
+        if abs(dims[0] - short) < _TOLERANCE_MM and abs(dims[1] - long_side) < _TOLERANCE_MM:
+            return name
+    return u'Custom'
+
+
+def sheet_size_class(sheet):
+    """Classe de taille d'une ViewSheet ('' hors Revit ou cotes absentes)."""
+    if DB is None or sheet is None:
+        return u''
+    try:
+        w = sheet.get_Parameter(DB.BuiltInParameter.SHEET_WIDTH)
+        h = sheet.get_Parameter(DB.BuiltInParameter.SHEET_HEIGHT)
+        return size_class(w.AsDouble() if w else 0.0, h.AsDouble() if h else 0.0)
+    except Exception:
+        return u''
+
+
+def timing_key(setup, fmt, size):
+    return u'{}|{}|{}'.format(setup or u'', (fmt or u'').lower(), size or u'')
+
+
+def _split_key(key):
+    parts = key.rsplit(u'|', 2)
+    return tuple(parts) if len(parts) == 3 else (u'', u'', u'')
+
+
+class TimingHistory(object):
+    def __init__(self, path=None, window=DEFAULT_WINDOW):
+        self._path = path or os.path.join(data_dir(), HISTORY_FILE_NAME)
+        self.window = max(1, int(window or DEFAULT_WINDOW))
+        self.samples = {}  # secondes par feuille
+        self.sizes = {}  # octets par feuille
+        self._load()
+
+    @property
+    def path(self):
+        return self._path
+
+    def __len__(self):
+        return sum(len(v) for v in self.samples.values())
+
+    # ------------------------------------------------------------------
+    # Mesures
+    # ------------------------------------------------------------------
+
+    def add(self, setup, fmt, size, seconds):
+        """Ajoute une durée par feuille ; la fenêtre glissante est bornée."""
+        self._add(self.samples, setup, fmt, size, seconds, 3)
+
+    def add_size(self, setup, fmt, size, nbytes):
+        """Ajoute une taille de sortie par feuille (octets)."""
+        self._add(self.sizes, setup, fmt, size, nbytes, 0)
+
+    def _add(self, samples, setup, fmt, size, value, digits):
+        try:
+            value = float(value)
+        except Exception:
+            return
+        if value < 0:
+            return
+        vals = samples.setdefault(timing_key(setup, fmt, size), [])
+        vals.append(round(value, digits))
+        del vals[:-self.window]
+
+    def record_trace(self, trace_records, outputs, setups=None):
+        """Ajoute les mesures d'un run. `outputs` : `{chemin normalisé:
+        (classe de taille, nb de feuilles)}` des sorties du run ; `setups` :
+        `{format: nom du setup}`. Retourne le nombre de mesures ajoutées."""
+        setups = setups or {}
+        added = 0
+        for rec in trace_records or []:
+            if rec.get('status') != 'ok':
+                continue
+            found = [(p, outputs.get(os.path.normcase(p))) for p in rec.get('paths') or []]
+            found = [(p, f) for p, f in found if f is not None]
+            fmt = rec.get('fmt') or u''
+            for p, (size, n) in found:
+                try:
+                    self.add_size(setups.get(fmt), fmt, size, os.path.getsize(p) / float(n))
+                    added += 1
+                except Exception:
+                    continue
+            sheets = sum(n for _p, (_size, n) in found)
+            if not sheets or rec.get('total') is None or 'export' not in (rec.get('stages') or {}):
+                continue
+            per_sheet = rec['total'] / float(sheets)
+            for _p, (size, _n) in found:
+                self.add(setups.get(fmt), fmt, size, per_sheet)
+                added += 1
+        return added
+
+    # ------------------------------------------------------------------
+    # Estimation
+    # ------------------------------------------------------------------
+
+    def estimate(self, setup, fmt, size):
+        """Durée par feuille attendue (médiane), ou None sans historique.
+        Repli du plus précis au plus large : même setup/format/taille, même
+        format/taille (tout setup), même setup/format, même format."""
+        return self._estimate(self.samples, setup, fmt, size)
+
+    def estimate_bytes(self, setup, fmt, size):
+        """Taille par feuille attendue (octets, médiane), mêmes replis."""
+        return self._estimate(self.sizes, setup, fmt, size)
+
+    @staticmethod
+    def _estimate(samples, setup, fmt, size):
+        exact = samples.get(timing_key(setup, fmt, size))
+        if exact:
+            return _median(exact)
+        fmt = (fmt or u'').lower()
+        keys = [_split_key(k) + (k,) for k in samples]
+        for keep in (lambda s, f, z: f == fmt and z == (size or u''),
+                     lambda s, f, z: f == fmt and s == (setup or u''),
+                     lambda s, f, z: f == fmt):
+            vals = []
+            for s, f, z, key in keys:
+                if keep(s, f, z):
+                    vals.extend(samples[key])
+            if vals:
+                return _median(vals)
+        return None
+
+    def predict(self, work):
+        """Durée totale (secondes) pour `work` = `[(setup, format, taille,
+        nb de feuilles)]`. Retourne `(secondes, feuilles sans estimation)` ;
+        secondes = None si rien n'est estimable."""
+        return self._predict(work, self.estimate)
+
+    def predict_bytes(self, work):
+        """Comme `predict`, en octets : `(octets, feuilles sans estimation)`."""
+        return self._predict(work, self.estimate_bytes)
+
+    @staticmethod
+    def _predict(work, estimate):
+        total = 0.0
+        unknown = 0
+        known = False
+        cache = {}
+        for setup, fmt, size, count in work or []:
+            key = timing_key(setup, fmt, size)
+            if key not in cache:
+                cache[key] = estimate(setup, fmt, size)
+            per_sheet = cache[key]
+            if per_sheet is None:
+                unknown += count
+                continue
+            known = True
+            total += per_sheet * count
+        return (total if known else None), unknown
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        try:
+            if not os.path.exists(self._path):
+                return
+            with io.open(self._path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+            for name, samples in (('samples', self.samples), ('sizes', self.sizes)):
+                for key, vals in (data.get(name) or {}).items():
+                    vals = [float(v) for v in vals or []][-self.window:]
+                    if vals:
+                        samples[key] = vals
+        except Exception:
+            self.samples = {}
+            self.sizes = {}
+
+    def save(self):
+        """Écriture atomique ; ne lève jamais."""
+        payload = {'version': HISTORY_VERSION, 'window': self.window, 'samples': self.samples,
+                   'sizes': self.sizes}
+        tmp = self._path + '.tmp'
+        try:
+            d = os.path.dirname(self._path)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with io.open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write(u'{}'.format(json.dumps(payload, ensure_ascii=False, sort_keys=True)))
+            try:
+                os.replace(tmp, self._path)
+            except AttributeError:  # IronPython 2.7
+                if os.path.exists(self._path):
+                    os.remove(self._path)
+                os.rename(tmp, self._path)
+            return True
+        except Exception:
+            return False
+
+
+def plan_work(items, setups=None, assembled_carnets=False):
+    """`work` pour `TimingHistory.predict` depuis des éléments de plan
+    (`ExportItem`). `assembled_carnets` : carnets assemblés localement à
+    partir des PDF par feuille (non comptés)."""
+    setups = setups or {}
+    work = []
+    for it in items or []:
+        fmt = (it.fmt or u'').lower()
+        if it.is_group:
+            if not assembled_carnets:
+                work.append((setups.get(fmt), fmt, CARNET, len(it.sheets or it.members)))
+        else:
+            work.append((setups.get(fmt), fmt, sheet_size_class(it.sheet), 1))
+    return work
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Paquet de diffusion (ZIP) alimenté au fil de l'export.
+#
+# Chaque sortie terminée (PDF/DWG) est ajoutée dès son écriture, depuis le
+# pipeline post-export : le fichier est relu pendant qu'il est encore dans
+# le cache disque, et son SHA-256 est calculé pendant cette même lecture
+# (écriture en flux dans l'archive). À la fermeture, le bordereau CSV
+# (nom, feuille, révision, taille, SHA-256) est ajouté à l'archive.
+#
+# L'archive est écrite sous `<nom>.zip.part` et ne prend son nom définitif
+# qu'à `close()` : un run interrompu ne laisse pas de ZIP incomplet qui
+# aurait l'air valide (`abort()` supprime le temporaire).
+#
+# `add` peut être appelé depuis plusieurs workers : les écritures dans une
+# même archive sont sérialisées (zipfile n'est pas thread-safe).
+
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import sys
+import threading
+import zipfile
+
+try:
+    import zlib as _zlib  # noqa: F401
+    _COMPRESSION = zipfile.ZIP_DEFLATED
+except Exception:
+    _COMPRESSION = zipfile.ZIP_STORED
+
+MANIFEST_NAME = 'bordereau.csv'
+MANIFEST_HEADER = (u'Nom', u'Feuille', u'Révision', u'Taille (octets)', u'SHA-256')
+_BLOCK = 1024 * 1024
+# Écriture en flux (`ZipFile.open(..., 'w')`) : Python 3.6+. Sinon (IronPython
+# 2.7) : hachage puis `ZipFile.write`, soit une seconde lecture du fichier.
+_STREAMING = sys.version_info >= (3, 6)
+
+
+def _csv_field(value):
+    text = u'{}'.format(value if value is not None else u'')
+    if any(c in text for c in u',;"\r\n'):
+        text = u'"{}"'.format(text.replace(u'"', u'""'))
+    return text
+
+
+def csv_line(fields):
+    """Ligne CSV (séparateur virgule, guillemets si nécessaire, CRLF)."""
+    return u','.join(_csv_field(f) for f in fields) + u'\r\n'
+
+
+class TransmittalPackager(object):
+    def __init__(self, path, root=None):
+        self.path = path
+        self.root = root or os.path.dirname(path)
+        self.entries = []       # [(nom dans l'archive, feuille, révision, taille, sha256)]
+        self._names = set()
+        self._lock = threading.Lock()
+        self._zip = None
+        self._closed = False
+
+    @property
+    def part_path(self):
+        return self.path + '.part'
+
+    def arcname(self, path):
+        """Chemin dans l'archive : relatif à `root` (séparateurs '/'), sinon
+        simple nom de fichier."""
+        try:
+            rel = os.path.relpath(path, self.root)
+        except Exception:
+            rel = None
+        if not rel or rel.startswith(os.pardir):
+            rel = os.path.basename(path)
+        return rel.replace(os.sep, '/')
+
+    def _open_locked(self):
+        if self._zip is None:
+            folder = os.path.dirname(self.part_path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            self._zip = zipfile.ZipFile(self.part_path, 'w', _COMPRESSION, allowZip64=True)
+        return self._zip
+
+    def add(self, path, sheet_number=u'', revision=u''):
+        """Ajoute `path` à l'archive et l'inscrit au bordereau. Retourne le
+        SHA-256 ; lève IOError/OSError si le fichier est illisible. Un même
+        nom n'est ajouté qu'une fois."""
+        arc = self.arcname(path)
+        if not _STREAMING:
+            digest, size = self._hash_file(path)
+        with self._lock:
+            if self._closed:
+                raise IOError(u"archive déjà fermée : {}".format(os.path.basename(self.path)))
+            if arc in self._names:
+                return None
+            zf = self._open_locked()
+            if _STREAMING:
+                digest, size = self._stream_into(zf, path, arc)
+            else:
+                zf.write(path, arc)
+            self._names.add(arc)
+            self.entries.append((arc, sheet_number or u'', revision or u'', size, digest))
+        return digest
+
+    @staticmethod
+    def _hash_file(path):
+        h = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as fh:
+            while True:
+                block = fh.read(_BLOCK)
+                if not block:
+                    break
+                h.update(block)
+                size += len(block)
+        return h.hexdigest(), size
+
+    @staticmethod
+    def _stream_into(zf, path, arc):
+        # Une seule lecture : chaque bloc est haché puis écrit dans l'archive.
+        info = zipfile.ZipInfo.from_file(path, arc)
+        info.compress_type = _COMPRESSION
+        h = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as src:
+            with zf.open(info, 'w', force_zip64=True) as dst:
+                while True:
+                    block = src.read(_BLOCK)
+                    if not block:
+                        break
+                    h.update(block)
+                    dst.write(block)
+                    size += len(block)
+        return h.hexdigest(), size
+
+    def manifest_text(self):
+        lines = [csv_line(MANIFEST_HEADER)]
+        for entry in sorted(self.entries):
+            lines.append(csv_line(entry))
+        return u''.join(lines)
+
+    def total_bytes(self):
+        return sum(e[3] for e in self.entries)
+
+    def close(self):
+        """Ajoute le bordereau, ferme l'archive et lui donne son nom
+        définitif. Retourne le nombre de fichiers ; 0 (et aucun ZIP) si rien
+        n'a été ajouté."""
+        with self._lock:
+            if self._closed:
+                return len(self.entries)
+            self._closed = True
+            zf, self._zip = self._zip, None
+        if zf is None:
+            return 0
+        try:
+            # BOM : accents lisibles à l'ouverture directe dans Excel.
+            zf.writestr(MANIFEST_NAME, (u'\ufeff' + self.manifest_text()).encode('utf-8'))
+            zf.close()
+            try:
+                os.replace(self.part_path, self.path)
+            except AttributeError:  # IronPython 2.7
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                os.rename(self.part_path, self.path)
+        except Exception:
+            self._discard(zf)
+            raise
+        return len(self.entries)
+
+    def abort(self):
+        """Abandonne l'archive (run interrompu) : le temporaire est supprimé."""
+        with self._lock:
+            self._closed = True
+            zf, self._zip = self._zip, None
+        self._discard(zf)
+
+    def _discard(self, zf):
+        if zf is not None:
+            try:
+                zf.close()
+            except Exception:
+                pass
+        try:
+            if os.path.exists(self.part_path):
+                os.remove(self.part_path)
+        except Exception:
+            pass
@@ -143,6 +143,15 @@ class CollectionPreviewComponent(object):
         except Exception:
             pass
 
+        namer = None
+        try:
+            from ...services.NamingService import NamingService
+            namer = NamingService(doc)
+            if nres is not None:
+                nres.use_context(namer.new_context())  # même date pour tout l'aperçu
+        except Exception:
+            pass
+
         try:
             from ...data.destination.DestinationStore import DestinationStore
             dest = DestinationStore()
@@ -169,6 +178,18 @@ class CollectionPreviewComponent(object):
                 return base
             except Exception:
                 return getattr(viewsheet, 'Name', 'Sheet')
+
+        def _names_for_sheets(viewsheets):
+            """Noms projetés des feuilles d'une collection, résolus en un lot
+            (NamingService.resolve_many) ; repli feuille par feuille."""
+            if namer is None or not sheet_rows:
+                return [_name_for_sheet(vs) for vs in viewsheets]
+            try:
+                batch = namer.resolve_many(viewsheets, sheet_rows, 'sheet',
+                                           transform=dest.sanitize if dest is not None else None)
+            except Exception:
+                return [_name_for_sheet(vs) for vs in viewsheets]
+            return [name or getattr(vs, 'Name', 'Sheet') for vs, name in zip(viewsheets, batch)]
         
         def _name_for_collection(collection):
             """Retourne le nom projeté d'une collection (carnet) selon les règles de nommage"""
@@ -288,8 +309,9 @@ class CollectionPreviewComponent(object):
                 coll_preview_name = _name_for_collection(coll)
                 
                 group_header = coll.Name
+                sheet_names = _names_for_sheets(sheets)
 
-                for sh in sheets:
+                for sh, sheet_preview_name in zip(sheets, sheet_names):
                     size, orientation = _get_sheet_size_orientation(sh)
                     sheet_num = getattr(sh, 'SheetNumber', '')
                     sheet_name = getattr(sh, 'Name', '')
@@ -302,7 +324,7 @@ class CollectionPreviewComponent(object):
                             if is_combined:
                                 preview_name = coll_preview_name
                             else:
-                                preview_name = _name_for_sheet(sh)
+                                preview_name = sheet_preview_name
                         except Exception:
                             preview_name = sheet_name
 
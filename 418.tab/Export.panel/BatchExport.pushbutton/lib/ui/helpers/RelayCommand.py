@@ -5,11 +5,17 @@ try:
 except Exception:
     ICommand = object  # type: ignore
 
+try:
+    from System import EventArgs
+except Exception:
+    EventArgs = None  # type: ignore
+
 
 class RelayCommand(ICommand):
     def __init__(self, execute, can_execute=None):
         self._execute = execute
         self._can_execute = can_execute
+        self._can_execute_handlers = []
 
     def CanExecute(self, parameter):
         return self._can_execute(parameter) if self._can_execute else True
@@ -18,7 +24,17 @@ class RelayCommand(ICommand):
         self._execute(parameter)
 
     def add_CanExecuteChanged(self, handler):
-        pass
+        self._can_execute_handlers.append(handler)
 
     def remove_CanExecuteChanged(self, handler):
-        pass
+        if handler in self._can_execute_handlers:
+            self._can_execute_handlers.remove(handler)
+
+    def raise_can_execute_changed(self):
+        """Demande à WPF de réévaluer `CanExecute` (état du prédicat modifié)."""
+        args = EventArgs.Empty if EventArgs is not None else None
+        for handler in list(self._can_execute_handlers):
+            try:
+                handler(self, args)
+            except Exception:
+                pass
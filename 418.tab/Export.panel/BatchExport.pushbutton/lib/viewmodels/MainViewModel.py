@@ -98,6 +98,14 @@ except Exception:
     except Exception:
         DwgExporterService = None  # type: ignore
 
+try:
+    from lib.data.sheets.ParameterSnapshot import SESSION_SNAPSHOT
+except Exception:
+    try:
+        from data.sheets.ParameterSnapshot import SESSION_SNAPSHOT
+    except Exception:
+        SESSION_SNAPSHOT = None  # type: ignore
+
 try:
     from lib.services.BulkEditService import BulkEditService
 except Exception:
@@ -114,6 +122,49 @@ except Exception:
     except Exception:
         ListSelectionService = None  # type: ignore
 
+try:
+    from lib.services.core.ProgressDispatcher import ProgressDispatcher, format_duration
+except Exception:
+    try:
+        from services.core.ProgressDispatcher import ProgressDispatcher, format_duration
+    except Exception:
+        ProgressDispatcher = None  # type: ignore
+        format_duration = None  # type: ignore
+
+try:
+    from lib.services.core.TimingHistory import TimingHistory, sheet_size_class, CARNET
+except Exception:
+    try:
+        from services.core.TimingHistory import TimingHistory, sheet_size_class, CARNET
+    except Exception:
+        TimingHistory = None  # type: ignore
+        sheet_size_class = None  # type: ignore
+        CARNET = 'carnet'  # type: ignore
+
+try:
+    from lib.services.core.CancellationToken import CancellationToken
+except Exception:
+    try:
+        from services.core.CancellationToken import CancellationToken
+    except Exception:
+        CancellationToken = None  # type: ignore
+
+try:
+    from lib.services.core.ExportJournal import ExportJournal
+except Exception:
+    try:
+        from services.core.ExportJournal import ExportJournal
+    except Exception:
+        ExportJournal = None  # type: ignore
+
+try:
+    from lib.ui.helpers.RelayCommand import RelayCommand
+except Exception:
+    try:
+        from ui.helpers.RelayCommand import RelayCommand
+    except Exception:
+        RelayCommand = None  # type: ignore
+
 
 _MODES = (u'auto', u'manual', u'settings')
 _SURFACE_TITRES = {
@@ -143,6 +194,21 @@ _CFG_KEY_PARAM_DWG = 'sheet_param_dwgcombo'
 _CFG_KEY_COMBINE_PDF = 'manual_combine_pdf'
 _CFG_KEY_PDF_COMBINE_TITLE = 'manual_pdf_combine_title'
 
+# Mode « par jeu » : export incrémental (feuilles inchangées sautées, cf.
+# lib/services/core/IncrementalManifest). Transmis à ExportOrchestrator.run().
+_CFG_KEY_INCREMENTAL = 'incremental_export'
+
+# Mode « par jeu » : les jeux en carnet produisent aussi leurs PDF par feuille ;
+# le carnet est alors assemblé localement à partir d'eux (cf.
+# lib/services/core/PdfMerger). Transmis à ExportOrchestrator.run().
+_CFG_KEY_CARNET_SHEETS = 'pdf_carnet_sheets'
+
+# Deux modes : ZIP de diffusion (sorties + bordereau CSV, cf.
+# lib/services/core/TransmittalPackager). Portée en mode « par jeu » :
+# `transmittal_scope` = 'collection' (un ZIP par jeu, défaut) ou 'run'.
+_CFG_KEY_TRANSMITTAL = 'transmittal_zip'
+_CFG_KEY_TRANSMITTAL_SCOPE = 'transmittal_scope'
+
 
 class SheetItemVM(BaseViewModel):
     """Item bindable pour une feuille au sein d'une collection (mode « par
@@ -151,11 +217,12 @@ class SheetItemVM(BaseViewModel):
     `dict` Python n'expose pas ces propriétés et ne bind pas de façon
     fiable via `{Binding [Cle]}`."""
 
-    def __init__(self, numero, nom, nom_projete):
+    def __init__(self, numero, nom, nom_projete, elem=None):
         super(SheetItemVM, self).__init__()
         self._numero = numero
         self._nom = nom
         self._nom_projete = nom_projete
+        self._elem = elem
 
     @property
     def Numero(self):
@@ -169,6 +236,10 @@ class SheetItemVM(BaseViewModel):
     def NomProjete(self):
         return self._nom_projete
 
+    @property
+    def Elem(self):
+        return self._elem
+
 
 class CollectionItemVM(BaseViewModel):
     """Item bindable pour une collection (jeu) au sein du mode « par jeu »."""
@@ -381,6 +452,11 @@ class MainViewModel(BaseViewModel):
             except Exception:
                 self._cfg = None
 
+        # Nouvelle fenêtre : les paramètres ont pu changer depuis la
+        # précédente (la fenêtre, modale, n'en modifie aucun ensuite).
+        if SESSION_SNAPSHOT is not None:
+            SESSION_SNAPSHOT.invalidate()
+
         # Services injectables : si absents, instancier les vrais sous
         # try/except -> None (permet l'usage hors Revit / dans les tests).
         # On INJECTE self._cfg (config partagée du VM) : ainsi tous les services
@@ -465,6 +541,49 @@ class MainViewModel(BaseViewModel):
         self._filtres_manuel = []
         self._recherche_manuel = u''
         self._on_export_done_cb = None
+        # Export en cours : jeton d'annulation (bouton « Annuler »). L'export
+        # tourne sur le thread UI ; `_ui_pump` (posé par la vue) laisse WPF
+        # traiter les clics à chaque mise à jour de progression.
+        self._cancel_token = None
+        self._ui_pump = None
+        self._annuler_export_cmd = (
+            RelayCommand(lambda _p: self.annuler_export(), lambda _p: self.ExportEnCours)
+            if RelayCommand else None)
+        # Reprise : journal d'export relu à l'ouverture et après chaque run
+        # (cf. `_refresh_reprise`), pas à chaque évaluation de CanExecute.
+        self._reprise_possible = False
+        self._reprendre_export_cmd = (
+            RelayCommand(lambda _p: self.reprendre_export(),
+                         lambda _p: self._reprise_possible and not self.ExportEnCours)
+            if RelayCommand else None)
+        # Aperçu (dry-run) : lignes du dernier aperçu, affichées par la vue
+        # via `_on_apercu_cb(destination)`.
+        self._apercu_lignes = []
+        self._on_apercu_cb = None
+        self._apercu_export_cmd = (
+            RelayCommand(lambda _p: self.ouvrir_apercu(), lambda _p: not self.ExportEnCours)
+            if RelayCommand else None)
+        # Entretien du cache de rendu (page Paramètres).
+        self._bilan_cache = u''
+        self._entretien_cache_cmd = (
+            RelayCommand(lambda _p: self.entretien_cache_rendu(), lambda _p: not self.ExportEnCours)
+            if RelayCommand else None)
+        # File multi-documents : `_pick_models` (posé par la vue) retourne
+        # les chemins .rvt choisis, ou None.
+        self._pick_models = None
+        self._exporter_maquettes_cmd = (
+            RelayCommand(lambda _p: self.exporter_maquettes(), lambda _p: not self.ExportEnCours)
+            if RelayCommand else None)
+        # Anomalies du dernier export (manifeste vérifié), lues par l'écran
+        # de fin d'export.
+        self._anomalies_export = []
+        # Estimation de durée (cf. TimingHistory) : historique relu après
+        # chaque export, classes de taille mises en cache par feuille, texte
+        # mis en cache jusqu'au prochain changement de sélection ou de
+        # format (cf. `_notify_duree_estimee`).
+        self._timings = None
+        self._size_classes = {}
+        self._duree_estimee = None
 
         # Aperçu des conventions de nommage (page Réglages) : motifs bruts
         # (chaînes à jetons ou anciens templates), recalculés par
@@ -479,6 +598,7 @@ class MainViewModel(BaseViewModel):
         # Aperçu initial (avant tout refresh_manuel()) -- best-effort,
         # cf. refresh_patterns_apercu().
         self.refresh_patterns_apercu()
+        self._refresh_reprise()
 
         # Log de session : ouvert ici, reste ouvert toute la session.
         self._log_file = None
@@ -506,6 +626,7 @@ class MainViewModel(BaseViewModel):
         for name in (u'ActiveMode', u'IsAuto', u'IsNotAuto', u'IsManual',
                      u'IsSettings', u'IsNotSettings', u'SurfaceTitre'):
             self.notify_property(name)
+        self._notify_duree_estimee()
 
     def set_mode(self, mode):
         self._log(u'MODE', u'{} → {}'.format(self._mode, mode))
@@ -701,6 +822,91 @@ class MainViewModel(BaseViewModel):
     # Mode « par jeu »
     # ------------------------------------------------------------------
 
+    def _compile_naming(self, pattern, kind):
+        """Résolveur `elem -> nom` pour `pattern` : compilé une fois
+        (`NamingService.compile`) puis évalué par élément. None sans service
+        ou sans pattern."""
+        if self._naming_service is None or not pattern:
+            return None
+        compile_ = getattr(self._naming_service, 'compile', None)
+        if compile_ is None:
+            return lambda elem: self._naming_service.resolve_for_element(elem, pattern)
+        try:
+            compiled = compile_(pattern, kind)
+        except Exception:
+            compiled = None
+        return compiled.evaluate if compiled is not None else None
+
+    def _resolve_naming(self, pattern, elems, kind):
+        """Noms projetés de `elems` (même ordre, u'' pour un élément None ou
+        non résolu) : `NamingService.resolve_many` si disponible, sinon
+        pattern compilé évalué élément par élément. Retourne `(noms, bilan)`,
+        bilan = `ResolvedNames` (noms vides / doublons) ou None."""
+        elems = list(elems or [])
+        if self._naming_service is None or not pattern:
+            return [u''] * len(elems), None
+        resolve_many = getattr(self._naming_service, 'resolve_many', None)
+        if resolve_many is not None:
+            present = [pos for pos, elem in enumerate(elems) if elem is not None]
+            try:
+                batch = resolve_many([elems[pos] for pos in present], pattern, kind)
+            except Exception:
+                batch = None
+            if batch is not None:
+                names = [u''] * len(elems)
+                for pos, name in zip(present, batch):
+                    names[pos] = name or u''
+                return names, batch
+        resolve_name = self._compile_naming(pattern, kind)
+        names = []
+        for elem in elems:
+            name = u''
+            if resolve_name is not None and elem is not None:
+                try:
+                    name = resolve_name(elem) or u''
+                except Exception:
+                    name = u''
+            names.append(name)
+        return names, None
+
+    def _new_naming_context(self):
+        """Fige date et ProjectInfo pour le refresh en cours (cf.
+        NamingContext) ; sans effet si le service ne le gère pas."""
+        new_context = getattr(self._naming_service, 'new_context', None)
+        if new_context is not None:
+            try:
+                new_context()
+            except Exception:
+                pass
+
+    def _log_naming_issues(self, label, batch, numeros):
+        """Signale dans le log les noms vides et les doublons d'un lot
+        (`numeros` : numéros de feuille, dans l'ordre du lot)."""
+        if batch is None or not getattr(batch, 'has_issues', False):
+            return
+        def _nums(positions):
+            return u', '.join(u'{}'.format(numeros[pos]) for pos in positions if pos < len(numeros))
+        if batch.empty:
+            self._log(u'AVERT', u'Nommage — {} : {} nom(s) vide(s) ({})'.format(
+                label, len(batch.empty), _nums(batch.empty)))
+        for name, positions in batch.duplicates.items():
+            self._log(u'AVERT', u'Nommage — {} : nom "{}" produit {} fois ({})'.format(
+                label, name, len(positions), _nums(positions)))
+
+    def exemple_nommage(self, kind):
+        """Élément d'exemple pour l'aperçu de l'éditeur de nommage : première
+        feuille listée (mode manuel, sinon par jeu) pour 'sheet', None sinon."""
+        if kind != 'sheet':
+            return None
+        for sheet in self._sheets_manuel or []:
+            if getattr(sheet, 'Elem', None) is not None:
+                return sheet.Elem
+        for coll in self._collections or []:
+            for sheet in coll.Sheets or []:
+                if getattr(sheet, 'Elem', None) is not None:
+                    return sheet.Elem
+        return None
+
     def refresh_par_jeu(self):
         """Construit `self._collections` à partir des services injectés.
 
@@ -736,6 +942,8 @@ class MainViewModel(BaseViewModel):
             except Exception:
                 _pattern = u''
                 rows_sheet = []
+        naming_pattern = _pattern or rows_sheet
+        self._new_naming_context()
 
         raw_collections = []
         if self._sheet_service is not None:
@@ -782,21 +990,21 @@ class MainViewModel(BaseViewModel):
                 except Exception:
                     raw_sheets = []
 
-            for sheet in raw_sheets:
+            sheet_elems = [sheet.get('Elem') if isinstance(sheet, dict) else None for sheet in raw_sheets]
+            noms_projetes, batch = self._resolve_naming(naming_pattern, sheet_elems, 'sheet')
+            if qualified:
+                self._log_naming_issues(u'Jeu "{}"'.format(titre), batch, [
+                    sheet.get('Numero', u'') if isinstance(sheet, dict) else u''
+                    for sheet, elem in zip(raw_sheets, sheet_elems) if elem is not None])
+
+            for sheet, sheet_elem, nom_projete in zip(raw_sheets, sheet_elems, noms_projetes):
                 numero = sheet.get('Numero', u'') if isinstance(sheet, dict) else u''
                 nom = sheet.get('Nom', u'') if isinstance(sheet, dict) else u''
-                sheet_elem = sheet.get('Elem') if isinstance(sheet, dict) else None
-
-                nom_projete = u''
-                if self._naming_service is not None and sheet_elem is not None and (_pattern or rows_sheet):
-                    try:
-                        nom_projete = self._naming_service.resolve_for_element(sheet_elem, _pattern or rows_sheet) or u''
-                    except Exception:
-                        nom_projete = u''
+
                 if not nom_projete:
                     nom_projete = u"{}{}".format(numero, nom)
 
-                sheets_out.append(SheetItemVM(numero, nom, nom_projete))
+                sheets_out.append(SheetItemVM(numero, nom, nom_projete, elem=sheet_elem))
 
             if qualified:
                 nb_feuilles_qualifiees += len(sheets_out)
@@ -842,6 +1050,7 @@ class MainViewModel(BaseViewModel):
 
         for name in (u'Collections', u'NbJeuxQualifies', u'NbFeuillesQualifiees'):
             self.notify_property(name)
+        self._notify_duree_estimee()
 
     @property
     def Collections(self):
@@ -913,6 +1122,8 @@ class MainViewModel(BaseViewModel):
             except Exception:
                 _pattern = u''
                 rows_sheet = []
+        naming_pattern = _pattern or rows_sheet
+        self._new_naming_context()
 
         raw_sheets = []
         if self._sheet_service is not None:
@@ -921,22 +1132,20 @@ class MainViewModel(BaseViewModel):
             except Exception:
                 raw_sheets = []
 
+        elems = [sheet.get('Elem') if isinstance(sheet, dict) else None for sheet in raw_sheets]
+        noms_projetes, batch = self._resolve_naming(naming_pattern, elems, 'sheet')
+        self._log_naming_issues(u'Feuilles', batch, [
+            sheet.get('Numero', u'') if isinstance(sheet, dict) else u''
+            for sheet, elem in zip(raw_sheets, elems) if elem is not None])
+
         sheets_out = []
-        for sheet in raw_sheets:
+        for sheet, elem, nom_projete in zip(raw_sheets, elems, noms_projetes):
             numero = sheet.get('Numero', u'') if isinstance(sheet, dict) else u''
             nom = sheet.get('Nom', u'') if isinstance(sheet, dict) else u''
             coll_id = sheet.get('CollectionId') if isinstance(sheet, dict) else None
-            elem = sheet.get('Elem') if isinstance(sheet, dict) else None
 
             jeu_nom = collections_titres.get(coll_id, u'') or u''
 
-            nom_projete = u''
-            if self._naming_service is not None and elem is not None and (_pattern or rows_sheet):
-                try:
-                    nom_projete = self._naming_service.resolve_for_element(elem, _pattern or rows_sheet) or u''
-                except Exception:
-                    nom_projete = u''
-
             sheets_out.append(ManualSheetVM(
                 numero, nom, collection_id=coll_id, elem=elem,
                 export_pdf=True, export_dwg=False,
@@ -989,6 +1198,7 @@ class MainViewModel(BaseViewModel):
                      u'SheetsManuelFiltrees', u'NbFeuillesManuel', u'NbPdf',
                      u'NbDwg', u'FiltresResume'):
             self.notify_property(name)
+        self._notify_duree_estimee()
 
     def _on_manual_sheet_change(self):
         """Callback passé à chaque `ManualSheetVM` : un toggle ExportPdf/
@@ -996,6 +1206,7 @@ class MainViewModel(BaseViewModel):
         les feuilles FILTRÉES), jamais la liste ni les filtres eux-mêmes."""
         for name in (u'NbPdf', u'NbDwg', u'NbSelected'):
             self.notify_property(name)
+        self._notify_duree_estimee()
 
     def _on_format_propagate(self, source, prop, value):
         """Propage `prop=value` à toute la sélection si `source` est sélectionné.
@@ -1347,6 +1558,7 @@ class MainViewModel(BaseViewModel):
             return
         self._cfg_set(_CFG_KEY_COMBINE_PDF, u'1' if value else u'0')
         self.notify_property(u'CombinerPdf')
+        self._notify_duree_estimee()
 
     @property
     def TitrePdfCombine(self):
@@ -1363,6 +1575,64 @@ class MainViewModel(BaseViewModel):
         self._cfg_set(_CFG_KEY_PDF_COMBINE_TITLE, value)
         self.notify_property(u'TitrePdfCombine')
 
+    @property
+    def ExportIncremental(self):
+        """Mode par jeu : ne réexporter que les feuilles dont l'empreinte
+        (nom, révisions, paramètres du nommage, setup, vues placées) a changé
+        depuis le dernier export dans la même destination. Persisté via
+        UserConfig, transmis à `ExportOrchestrator.run()`."""
+        return self._cfg_get(_CFG_KEY_INCREMENTAL, u'0') == u'1'
+
+    @ExportIncremental.setter
+    def ExportIncremental(self, value):
+        value = bool(value)
+        if value == self.ExportIncremental:
+            return
+        self._cfg_set(_CFG_KEY_INCREMENTAL, u'1' if value else u'0')
+        self.notify_property(u'ExportIncremental')
+
+    @property
+    def CarnetAvecFeuilles(self):
+        """Mode par jeu : un jeu exporté en carnet produit aussi un PDF par
+        feuille ; le carnet est assemblé à partir de ces PDF (un seul rendu
+        Revit par feuille). Persisté via UserConfig, transmis à
+        `ExportOrchestrator.run()`."""
+        return self._cfg_get(_CFG_KEY_CARNET_SHEETS, u'0') == u'1'
+
+    @CarnetAvecFeuilles.setter
+    def CarnetAvecFeuilles(self, value):
+        value = bool(value)
+        if value == self.CarnetAvecFeuilles:
+            return
+        self._cfg_set(_CFG_KEY_CARNET_SHEETS, u'1' if value else u'0')
+        self.notify_property(u'CarnetAvecFeuilles')
+        self._notify_duree_estimee()
+
+    @property
+    def ZipDiffusion(self):
+        """Empaqueter les sorties dans un ZIP de diffusion (avec bordereau
+        CSV : nom, feuille, révision, taille, SHA-256) au fil de l'export.
+        Persisté via UserConfig, transmis à l'orchestrateur."""
+        return self._cfg_get(_CFG_KEY_TRANSMITTAL, u'0') == u'1'
+
+    @ZipDiffusion.setter
+    def ZipDiffusion(self, value):
+        value = bool(value)
+        if value == self.ZipDiffusion:
+            return
+        self._cfg_set(_CFG_KEY_TRANSMITTAL, u'1' if value else u'0')
+        self.notify_property(u'ZipDiffusion')
+
+    def _transmittal_option(self, manual=False):
+        """Valeur `transmittal` pour l'orchestrateur : False, 'collection'
+        ou 'run' (toujours un seul ZIP en mode manuel)."""
+        if not self.ZipDiffusion:
+            return False
+        if manual:
+            return u'run'
+        scope = self._cfg_get(_CFG_KEY_TRANSMITTAL_SCOPE, u'collection')
+        return u'run' if scope == u'run' else u'collection'
+
     # ------------------------------------------------------------------
     # Page Paramètres : sélecteurs de setup PDF / DWG
     # ------------------------------------------------------------------
@@ -1405,6 +1675,7 @@ class MainViewModel(BaseViewModel):
         except Exception:
             pass
         self.notify_property(u'SetupPdf')
+        self._notify_duree_estimee()
 
     @property
     def SetupsDwg(self):
@@ -1437,6 +1708,7 @@ class MainViewModel(BaseViewModel):
         except Exception:
             pass
         self.notify_property(u'SetupDwg')
+        self._notify_duree_estimee()
 
     # ------------------------------------------------------------------
     # Export (Task 3) : coordination VM -> ExportOrchestrator
@@ -1580,16 +1852,219 @@ class MainViewModel(BaseViewModel):
             pass
 
     def _make_export_callbacks_with_log(self):
-        """Retourne (progress_cb, log_cb) qui alimentent StatusText ET le log de session."""
-        def progress_cb(current, total, message=u''):
+        """Retourne (progress_cb, log_cb) qui alimentent StatusText ET le log de session.
+
+        `progress_cb` est un `ProgressDispatcher` (si disponible) : mises à
+        jour coalescées (au plus 4/s), débit et temps restant ajoutés au
+        statut. Appeler `_finish_progress(progress_cb)` en fin d'export.
+        """
+        dispatcher = []
+
+        def progress_sink(current, total, message=u''):
+            extra = dispatcher[0].describe() if dispatcher else u''
+            if extra:
+                message = u'{} — {}'.format(message, extra) if message else extra
             self._on_export_progress(current, total, message)
             self._log(u'PROGRESS', u'[{}/{}] {}'.format(current, total, message or u''))
+            self._pump_ui()
 
         def log_cb(message):
             self._on_export_log(message)
             self._log(u'LOG', message)
 
-        return progress_cb, log_cb
+        if ProgressDispatcher is None:
+            return progress_sink, log_cb
+        dispatcher.append(ProgressDispatcher(progress_sink))
+        return dispatcher[0], log_cb
+
+    def _finish_progress(self, progress_cb):
+        """Livre le dernier état de progression en attente et journalise le
+        bilan (éléments par étape, débit)."""
+        flush = getattr(progress_cb, 'flush', None)
+        if flush is None:
+            return
+        flush()
+        counters = getattr(progress_cb, 'counters', None) or {}
+        if counters:
+            self._log(u'EXPORT', u'Bilan : {}{}'.format(
+                u', '.join(u'{}={}'.format(k, counters[k]) for k in sorted(counters)),
+                u' | ' + progress_cb.describe() if progress_cb.describe() else u''))
+
+    def _pump_ui(self):
+        if callable(self._ui_pump):
+            try:
+                self._ui_pump()
+            except Exception:
+                pass
+
+    @property
+    def ExportEnCours(self):
+        return self._cancel_token is not None
+
+    @property
+    def AnnulerExportCommand(self):
+        """Commande du bouton « Annuler » : cf. `annuler_export()`."""
+        return self._annuler_export_cmd
+
+    def annuler_export(self):
+        """Demande l'arrêt de l'export en cours. L'orchestrateur termine
+        l'élément en cours puis s'arrête ; le journal reste reprenable
+        (`reprendre_export()`). Sans effet si aucun export ne tourne."""
+        token = self._cancel_token
+        if token is None:
+            return
+        token.cancel(u'demandé par l\'utilisateur')
+        self.StatusText = u"Annulation : fin de l'élément en cours..."
+        self._log(u'EXPORT', u'Annulation demandée')
+
+    def _notify_export_en_cours(self):
+        # Binding de visibilité + réévaluation de CanExecute par WPF.
+        self.notify_property(u'ExportEnCours')
+        for cmd in (self._annuler_export_cmd, self._reprendre_export_cmd,
+                    self._apercu_export_cmd, self._exporter_maquettes_cmd,
+                    self._entretien_cache_cmd):
+            raise_changed = getattr(cmd, 'raise_can_execute_changed', None)
+            if raise_changed is not None:
+                raise_changed()
+
+    def _begin_export(self):
+        """Jeton d'annulation du run qui démarre (None si indisponible)."""
+        self._cancel_token = CancellationToken() if CancellationToken is not None else None
+        self._notify_export_en_cours()
+        return self._cancel_token
+
+    def _end_export(self, token):
+        """Libère le jeton ; retourne True si le run a été annulé."""
+        self._cancel_token = None
+        self._timings = None  # historique enrichi par le run
+        self._refresh_reprise()
+        self._notify_export_en_cours()
+        self._notify_duree_estimee()
+        if token is None or not token.cancelled:
+            return False
+        self.StatusText = u"Export annulé — reprise possible."
+        self._log(u'EXPORT', u'Export annulé ({})'.format(token.reason or u'sans motif'))
+        return True
+
+    def _notify_duree_estimee(self):
+        """Sélection, formats ou historique changés : l'estimation est
+        recalculée à la prochaine lecture de `DureeEstimee`."""
+        self._duree_estimee = None
+        self.notify_property(u'DureeEstimee')
+
+    def _timing_history(self):
+        if self._timings is None and TimingHistory is not None:
+            try:
+                self._timings = TimingHistory()
+            except Exception:
+                self._timings = None
+        return self._timings
+
+    def _size_class(self, elem):
+        key = id(elem)
+        if key not in self._size_classes:
+            self._size_classes[key] = sheet_size_class(elem) if sheet_size_class is not None else u''
+        return self._size_classes[key]
+
+    def _estimation_work(self):
+        """Travail prévu pour la sélection courante : `[(setup, format,
+        taille, nb de feuilles)]` (cf. TimingHistory.predict). Même
+        découpage que le plan de l'orchestrateur."""
+        pdf, dwg = self.SetupPdf, self.SetupDwg
+        work = []
+        if self._mode == u'manual':
+            selection = self.selection_manuelle()
+            pdf_sheets = [s for s in selection if s.ExportPdf]
+            if self.CombinerPdf and pdf_sheets:
+                work.append((pdf, u'pdf', CARNET, len(pdf_sheets)))
+            else:
+                work.extend((pdf, u'pdf', self._size_class(s.Elem), 1) for s in pdf_sheets)
+            work.extend((dwg, u'dwg', self._size_class(s.Elem), 1) for s in selection if s.ExportDwg)
+        elif self._mode == u'auto':
+            for coll in self._collections:
+                if not coll.Qualified:
+                    continue
+                sizes = [self._size_class(sh.Elem) for sh in coll.Sheets]
+                carnet = coll.FlagCarnet
+                if not carnet or self.CarnetAvecFeuilles:
+                    work.extend((pdf, u'pdf', size, 1) for size in sizes)
+                # Carnet + feuilles : carnet assemblé localement, non compté.
+                if carnet and not self.CarnetAvecFeuilles and sizes:
+                    work.append((pdf, u'pdf', CARNET, len(sizes)))
+                if coll.FlagDwg:
+                    work.extend((dwg, u'dwg', size, 1) for size in sizes)
+        return work
+
+    @property
+    def DureeEstimee(self):
+        """Durée prévue de l'export de la sélection courante, d'après
+        l'historique des runs précédents ('' si rien à exporter). Calculée
+        une fois par état de la sélection, pas à chaque lecture."""
+        if self._duree_estimee is None:
+            self._duree_estimee = self._compute_duree_estimee()
+        return self._duree_estimee
+
+    def _compute_duree_estimee(self):
+        work = self._estimation_work()
+        history = self._timing_history()
+        if not work or history is None or format_duration is None:
+            return u''
+        seconds, unknown = history.predict(work)
+        if seconds is None:
+            return u"Durée estimée : inconnue (aucun historique)"
+        text = u"Durée estimée : ~{}".format(format_duration(seconds))
+        if unknown:
+            text += u" (hors {} feuille(s) sans historique)".format(unknown)
+        return text
+
+    @property
+    def AnomaliesExport(self):
+        """Anomalies du dernier export : éléments en échec ou fichiers non
+        conformes (absent, vide, en-tête invalide), cf. ExportManifest.
+        Liste vide si tout est conforme."""
+        return list(self._anomalies_export)
+
+    def _collect_export_issues(self, orch):
+        """Relève les anomalies du manifeste vérifié du run (journalisées)."""
+        manifest = getattr(orch, 'last_manifest', None)
+        try:
+            lines = manifest.failure_lines(limit=20) if manifest is not None else []
+        except Exception:
+            lines = []
+        self._anomalies_export = lines
+        for line in lines:
+            self._log(u'AVERT', u'Intégrité : {}'.format(line))
+
+    def _conclude_export(self, orch, ok, destination, aborted=None):
+        """Écran de fin d'un run ni annulé ni en erreur, d'après le retour de
+        l'orchestrateur (`ok`) et son manifeste vérifié (`last_manifest`) :
+
+        - anomalies au manifeste : écran de fin avec anomalies, même si le
+          run s'est arrêté en route ;
+        - `ok` faux (abandon au pré-contrôle d'espace disque, rien à
+          reprendre…) : aucun écran, motif dans `StatusText` ;
+        - run complet sans fichier au manifeste (aucun jeu qualifié) :
+          aucun écran ;
+        - sinon : écran « Export terminé »."""
+        manifest = getattr(orch, 'last_manifest', None)
+        try:
+            produced = len(manifest) if manifest is not None else 0
+        except Exception:
+            produced = 0
+        if not self._anomalies_export:
+            if not ok:
+                self.StatusText = aborted or u"Export interrompu — voir le journal."
+                self._log(u'EXPORT', self.StatusText)
+                return
+            if not produced:
+                self.StatusText = u"Aucun fichier exporté — voir le journal."
+                return
+        self.StatusText = u''
+        if callable(self._on_export_done_cb):
+            try:
+                self._on_export_done_cb(destination)
+            except Exception:
+                pass
 
     def _on_export_progress(self, current, total, message=u''):
         try:
@@ -1616,6 +2091,9 @@ class MainViewModel(BaseViewModel):
             self.lancer_export_manuel()
             return
 
+        if self.ExportEnCours:
+            return
+
         if self._doc is None:
             self.StatusText = u"Export indisponible (hors Revit)."
             return
@@ -1667,11 +2145,14 @@ class MainViewModel(BaseViewModel):
             self.ParamExport, self.ParamCarnet, self.ParamDwg))
         self._log(u'EXPORT', u'Destination="{}" | SousDossiers={} | FormatsSepar={}'.format(
             self.DestinationPath, self.CreerSousDossiers, self.SeparerFormats))
-        self._log(u'EXPORT', u'SetupPdf="{}" | SetupDwg="{}"'.format(
-            self.SetupPdf, self.SetupDwg))
+        self._log(u'EXPORT', u'SetupPdf="{}" | SetupDwg="{}" | Incremental={} | CarnetAvecFeuilles={} | Zip={}'.format(
+            self.SetupPdf, self.SetupDwg, self.ExportIncremental, self.CarnetAvecFeuilles,
+            self._transmittal_option() or u'non'))
         if not self.ParamExport:
             self._log(u'AVERT',
                 u'ParamExport vide → aucun jeu ne sera qualifié (mappez dans Réglages)')
+        if self.DureeEstimee:
+            self._log(u'EXPORT', self.DureeEstimee)
 
         # --- Plan prévisionnel : ce que le programme va faire ---
         try:
@@ -1695,16 +2176,20 @@ class MainViewModel(BaseViewModel):
 
         progress_cb, log_cb = self._make_export_callbacks_with_log()
 
-        _export_ok = False
+        _export_ok = None  # None : exception, StatusText déjà renseigné
+        cancel = self._begin_export()
         try:
-            orch.run(
+            _export_ok = bool(orch.run(
                 self._doc,
                 self._get_ctrl_adapter(),
                 progress_cb=progress_cb,
                 log_cb=log_cb,
                 destination=self.DestinationPath,
-            )
-            _export_ok = True
+                incremental=self.ExportIncremental,
+                carnet_sheets=self.CarnetAvecFeuilles,
+                transmittal=self._transmittal_option(),
+                cancel=cancel,
+            ))
         except Exception as exc:
             try:
                 msg = u"Erreur pendant l'export : {}".format(exc)
@@ -1713,14 +2198,13 @@ class MainViewModel(BaseViewModel):
             self.StatusText = msg
             self._log(u'ERREUR', msg)
 
+        self._finish_progress(progress_cb)
+        self._collect_export_issues(orch)
         self._log(u'EXPORT', u'--- Fin export AUTO ---')
-        if _export_ok:
-            self.StatusText = u''
-            if callable(self._on_export_done_cb):
-                try:
-                    self._on_export_done_cb(self.DestinationPath)
-                except Exception:
-                    pass
+        if self._end_export(cancel):
+            return
+        if _export_ok is not None:
+            self._conclude_export(orch, _export_ok, self.DestinationPath)
 
     def lancer_export_manuel(self):
         """Lance l'export « feuille par feuille » via `ExportOrchestrator.run_manual()`.
@@ -1729,6 +2213,9 @@ class MainViewModel(BaseViewModel):
         transmet `CombinerPdf` et `TitrePdfCombine` à l'orchestrateur.
         Ne lève jamais : StatusText reflète toute indisponibilité ou erreur.
         """
+        if self.ExportEnCours:
+            return
+
         if self._doc is None:
             self.StatusText = u"Export indisponible (hors Revit)."
             return
@@ -1769,10 +2256,12 @@ class MainViewModel(BaseViewModel):
         self._log(u'EXPORT', u'--- Export MANUEL lancé ---')
         self._log(u'EXPORT', u'{} feuilles sélectionnées : {} PDF, {} DWG'.format(
             len(selection), n_pdf, n_dwg))
-        self._log(u'EXPORT', u'CombinerPdf={} | TitrePdf="{}"'.format(
-            self.CombinerPdf, self.TitrePdfCombine))
+        self._log(u'EXPORT', u'CombinerPdf={} | TitrePdf="{}" | Zip={}'.format(
+            self.CombinerPdf, self.TitrePdfCombine, self.ZipDiffusion))
         self._log(u'EXPORT', u'Destination="{}" | SetupPdf="{}" | SetupDwg="{}"'.format(
             self.DestinationPath, self.SetupPdf, self.SetupDwg))
+        if self.DureeEstimee:
+            self._log(u'EXPORT', self.DureeEstimee)
         for s in selection:
             elem_ok = u'Elem=OK' if s.Elem is not None else u'Elem=NULL!'
             self._log(u'SÉLECT',
@@ -1781,9 +2270,10 @@ class MainViewModel(BaseViewModel):
 
         progress_cb, log_cb = self._make_export_callbacks_with_log()
 
-        _export_ok = False
+        _export_ok = None  # None : exception, StatusText déjà renseigné
+        cancel = self._begin_export()
         try:
-            orch.run_manual(
+            _export_ok = bool(orch.run_manual(
                 self._doc,
                 selection,
                 combine_pdf=self.CombinerPdf,
@@ -1791,8 +2281,9 @@ class MainViewModel(BaseViewModel):
                 progress_cb=progress_cb,
                 log_cb=log_cb,
                 destination=self.DestinationPath,
-            )
-            _export_ok = True
+                transmittal=self._transmittal_option(manual=True),
+                cancel=cancel,
+            ))
         except Exception as exc:
             try:
                 msg = u"Erreur pendant l'export : {}".format(exc)
@@ -1801,11 +2292,357 @@ class MainViewModel(BaseViewModel):
             self.StatusText = msg
             self._log(u'ERREUR', msg)
 
+        self._finish_progress(progress_cb)
+        self._collect_export_issues(orch)
         self._log(u'EXPORT', u'--- Fin export MANUEL ---')
-        if _export_ok:
-            self.StatusText = u''
-            if callable(self._on_export_done_cb):
-                try:
-                    self._on_export_done_cb(self.DestinationPath)
-                except Exception:
-                    pass
+        if self._end_export(cancel):
+            return
+        if _export_ok is not None:
+            self._conclude_export(orch, _export_ok, self.DestinationPath)
+
+    @property
+    def ReprisePossible(self):
+        """Vrai si le journal d'export contient un run interrompu."""
+        return self._reprise_possible
+
+    @property
+    def ReprendreExportCommand(self):
+        """Commande du bouton « Reprendre » : cf. `reprendre_export()`.
+        Active si `ReprisePossible` et aucun export en cours."""
+        return self._reprendre_export_cmd
+
+    def _refresh_reprise(self):
+        """Relit le journal d'export (run interrompu ?) et notifie la vue."""
+        try:
+            possible = ExportJournal is not None and ExportJournal().load().interrupted
+        except Exception:
+            possible = False
+        if possible == self._reprise_possible:
+            return
+        self._reprise_possible = possible
+        self.notify_property(u'ReprisePossible')
+        raise_changed = getattr(self._reprendre_export_cmd, 'raise_can_execute_changed', None)
+        if raise_changed is not None:
+            raise_changed()
+
+    def reprendre_export(self):
+        """Reprend le dernier export interrompu via
+        `ExportOrchestrator.resume_last_run()` (journal d'export sur disque).
+
+        Le mode (par jeu / manuel) et la destination sont ceux du run
+        interrompu, pas ceux de l'interface. Ne lève jamais.
+        """
+        if self.ExportEnCours:
+            return
+
+        if self._doc is None:
+            self.StatusText = u"Export indisponible (hors Revit)."
+            return
+
+        try:
+            try:
+                from lib.services.core.ExportOrchestrator import ExportOrchestrator
+            except Exception:
+                from services.core.ExportOrchestrator import ExportOrchestrator
+        except Exception:
+            self.StatusText = u"Export indisponible (orchestrateur introuvable)."
+            return
+
+        try:
+            orch = ExportOrchestrator()
+        except Exception:
+            self.StatusText = u"Export indisponible (initialisation impossible)."
+            return
+
+        # Destination du run interrompu (pour la modale de fin d'export).
+        destination = self.DestinationPath
+        if ExportJournal is not None:
+            try:
+                info = ExportJournal().load().run or {}
+                destination = info.get('destination') or destination
+            except Exception:
+                pass
+
+        self.StatusText = u"Reprise de l'export..."
+        self.ProgressValue = 0
+        self._log(u'EXPORT', u'--- Reprise du dernier export ---')
+
+        progress_cb, log_cb = self._make_export_callbacks_with_log()
+
+        _resumed = None  # None : exception, StatusText déjà renseigné
+        cancel = self._begin_export()
+        try:
+            _resumed = bool(orch.resume_last_run(
+                self._doc,
+                self._get_ctrl_adapter(),
+                progress_cb=progress_cb,
+                log_cb=log_cb,
+                cancel=cancel,
+            ))
+        except Exception as exc:
+            try:
+                msg = u"Erreur pendant la reprise : {}".format(exc)
+            except Exception:
+                msg = u"Erreur pendant la reprise."
+            self.StatusText = msg
+            self._log(u'ERREUR', msg)
+
+        self._finish_progress(progress_cb)
+        self._collect_export_issues(orch)
+        self._log(u'EXPORT', u'--- Fin reprise ---')
+        if self._end_export(cancel):
+            return
+        if _resumed is not None:
+            self._conclude_export(orch, _resumed, destination,
+                                  aborted=u"Aucun export interrompu à reprendre.")
+
+    @property
+    def ExporterMaquettesCommand(self):
+        """Commande du bouton « Plusieurs maquettes… » : cf. `exporter_maquettes()`."""
+        return self._exporter_maquettes_cmd
+
+    def exporter_maquettes(self, paths=None):
+        """File d'export multi-documents (cf. MultiDocumentExportRunner) :
+        chaque maquette de `paths` (défaut : choisies via `_pick_models`) est
+        ouverte, exportée « par jeu » avec le profil actif dans un
+        sous-dossier de la destination courante, puis fermée.
+
+        Annulable comme un export ; les documents en échec sont listés
+        comme anomalies de l'écran de fin. Ne lève jamais.
+        """
+        if self.ExportEnCours:
+            return
+
+        if self._doc is None:
+            self.StatusText = u"Export indisponible (hors Revit)."
+            return
+
+        try:
+            try:
+                from lib.services.ConfigManagerService import ConfigManagerService
+                from lib.services.core.MultiDocumentExportRunner import (
+                    MultiDocumentExportRunner, RevitDocumentProvider)
+            except Exception:
+                from services.ConfigManagerService import ConfigManagerService
+                from services.core.MultiDocumentExportRunner import (
+                    MultiDocumentExportRunner, RevitDocumentProvider)
+            manager = ConfigManagerService()
+            profile = manager.get_active_profile_key()
+        except Exception:
+            self.StatusText = u"File multi-documents indisponible."
+            return
+        if not profile:
+            self.StatusText = u"Aucun profil actif : enregistrez un profil (Réglages)."
+            return
+
+        if paths is None and callable(self._pick_models):
+            try:
+                paths = self._pick_models()
+            except Exception:
+                paths = None
+        paths = list(paths or [])
+        if not paths:
+            return
+
+        destination = self.DestinationPath
+        self.StatusText = u"Préparation de la file multi-documents..."
+        self.ProgressValue = 0
+        self._log(u'EXPORT', u'--- File multi-documents : {} maquette(s), profil "{}" ---'.format(
+            len(paths), profile))
+        self._log(u'EXPORT', u'Destination="{}"'.format(destination))
+
+        progress_cb, log_cb = self._make_export_callbacks_with_log()
+
+        def _log_and_pump(message):
+            # La file ne livre qu'une progression par document : les messages
+            # des runs laissent aussi passer le clic « Annuler ».
+            log_cb(message)
+            self._pump_ui()
+
+        report = None
+        cancel = self._begin_export()
+        try:
+            runner = MultiDocumentExportRunner(RevitDocumentProvider(self._doc.Application),
+                                               config_manager=manager)
+            report = runner.run(paths, profile, destination, progress_cb=progress_cb,
+                                log_cb=_log_and_pump, cancel=cancel)
+        except Exception as exc:
+            try:
+                msg = u"Erreur pendant la file multi-documents : {}".format(exc)
+            except Exception:
+                msg = u"Erreur pendant la file multi-documents."
+            self.StatusText = msg
+            self._log(u'ERREUR', msg)
+
+        self._finish_progress(progress_cb)
+        self._anomalies_export = [u'{} : {}'.format(os.path.basename(r.path), r.error)
+                                  for r in (report.failed if report is not None else [])]
+        self._log(u'EXPORT', u'--- Fin file multi-documents ---')
+        if self._end_export(cancel) or report is None:
+            return
+        self.StatusText = u''
+        if callable(self._on_export_done_cb):
+            try:
+                self._on_export_done_cb(destination)
+            except Exception:
+                pass
+
+    @property
+    def ApercuExportCommand(self):
+        """Commande du bouton « Aperçu » : cf. `ouvrir_apercu()`."""
+        return self._apercu_export_cmd
+
+    @property
+    def ApercuExport(self):
+        """Lignes du dernier aperçu (fichiers prévus, volume, nommage,
+        collisions, écart avec le dernier export), lues par la modale."""
+        return list(self._apercu_lignes)
+
+    def ouvrir_apercu(self):
+        """Calcule l'aperçu puis l'affiche dans la modale de la vue
+        (`_on_apercu_cb(destination)`). Ne lève jamais."""
+        if self.ExportEnCours:
+            return
+        if self.apercu_export() is None or not callable(self._on_apercu_cb):
+            return
+        try:
+            self._on_apercu_cb(self.DestinationPath)
+        except Exception:
+            pass
+
+    def apercu_export(self):
+        """Aperçu (dry-run) de l'export AUTO via `ExportOrchestrator.dry_run()`.
+
+        Journalise chaque fichier prévu (catégorie PLAN) et l'écart avec le
+        plan du dernier export exécuté ; les mêmes lignes alimentent
+        `ApercuExport`. Aucun export, aucune écriture.
+        Retourne le plan (`ExportRunPlan`) ou None. Ne lève jamais.
+        """
+        self._apercu_lignes = []
+        if self._doc is None:
+            self.StatusText = u"Aperçu indisponible (hors Revit)."
+            return None
+
+        try:
+            try:
+                from lib.services.core.ExportOrchestrator import ExportOrchestrator
+                from lib.services.core.ExportRunPlan import ExportRunPlan
+            except Exception:
+                from services.core.ExportOrchestrator import ExportOrchestrator
+                from services.core.ExportRunPlan import ExportRunPlan
+            orch = ExportOrchestrator()
+        except Exception:
+            self.StatusText = u"Aperçu indisponible (orchestrateur introuvable)."
+            return None
+
+        try:
+            plan = orch.dry_run(self._doc, self._get_ctrl_adapter(), destination=self.DestinationPath,
+                                carnet_sheets=self.CarnetAvecFeuilles)
+        except Exception as exc:
+            try:
+                msg = u"Erreur pendant l'aperçu : {}".format(exc)
+            except Exception:
+                msg = u"Erreur pendant l'aperçu."
+            self.StatusText = msg
+            self._log(u'ERREUR', msg)
+            return None
+        if plan is None:
+            self.StatusText = u"Aperçu indisponible."
+            return None
+
+        lines = []
+        for it in plan:
+            lines.append(u'[{}] {}{}'.format(it.fmt.upper(), it.path, u' (existe)' if it.exists else u''))
+        lines.extend(self._plan_space_lines(plan))
+        for line in plan.info.get('naming_warnings') or []:
+            lines.append(u'Nommage : ' + line)
+        collisions = plan.info.get('collisions') or []
+        if collisions:
+            strategy = plan.info.get('collision_strategy')
+            lines.append(u'Collisions de noms : {} ({})'.format(
+                len(collisions), u'signalées seulement' if strategy == u'aucune'
+                else u'levées, stratégie « {} »'.format(strategy)))
+            lines.extend(u'  ' + line for line in collisions)
+        diff = plan.diff(ExportRunPlan.load())
+        if diff.is_empty:
+            lines.append(u'Identique au dernier export.')
+        else:
+            lines.append(u'Écart avec le dernier export :')
+            lines.extend(u'  ' + line for line in diff.summary_lines())
+
+        self._log(u'PLAN', u'--- Aperçu : {} fichier(s) prévu(s) ---'.format(len(plan)))
+        for line in lines:
+            self._log(u'PLAN', u'  ' + line if line.startswith(u'[') else line)
+        self._apercu_lignes = lines
+        self.StatusText = u"Aperçu : {} fichier(s), {} existant(s).".format(
+            len(plan), len(plan.existing()))
+        return plan
+
+    def _plan_space_lines(self, plan):
+        """Volume attendu par jeu et manques d'espace (cf. DiskSpacePrecheck)."""
+        try:
+            try:
+                from lib.services.core.DiskSpacePrecheck import format_bytes
+            except Exception:
+                from services.core.DiskSpacePrecheck import format_bytes
+        except Exception:
+            return []
+        lines = []
+        estimated = plan.info.get('estimated_bytes') or {}
+        if any(estimated.values()):
+            lines.append(u'Volume attendu : ~{}'.format(format_bytes(sum(estimated.values()))))
+            for cname in plan.collections():
+                if estimated.get(cname):
+                    lines.append(u'  {} : ~{}'.format(cname, format_bytes(estimated[cname])))
+        if plan.info.get('estimated_unknown'):
+            lines.append(u'  (hors {} feuille(s) sans historique de taille)'.format(
+                plan.info['estimated_unknown']))
+        for line in plan.info.get('space_warnings') or []:
+            lines.append(u'Espace disque probablement insuffisant : ' + line)
+        return lines
+
+    @property
+    def EntretienCacheCommand(self):
+        """Commande du bouton « Vérifier et nettoyer » (page Paramètres) :
+        cf. `entretien_cache_rendu()`."""
+        return self._entretien_cache_cmd
+
+    @property
+    def BilanCacheRendu(self):
+        """Bilan du dernier entretien du cache de rendu ('' avant le premier),
+        affiché sur la page Paramètres (le pied de page, et donc
+        `StatusText`, y est masqué)."""
+        return self._bilan_cache
+
+    def _set_bilan_cache(self, text):
+        self._bilan_cache = text or u''
+        self.notify_property(u'BilanCacheRendu')
+
+    def entretien_cache_rendu(self):
+        """Entretien du cache de rendu (cf. lib/services/core/RenderCache) :
+        vérification des blobs puis nettoyage (orphelins, plafond de taille).
+        Bilan dans le log (catégorie CACHE) et dans `BilanCacheRendu`.
+        Retourne les lignes du bilan, [] en cas d'échec. Ne lève jamais.
+        """
+        if self.ExportEnCours:
+            return []
+        try:
+            try:
+                from lib.services.core.RenderCache import RenderCache
+            except Exception:
+                from services.core.RenderCache import RenderCache
+            lines = RenderCache().maintenance()
+        except Exception as exc:
+            try:
+                msg = u"Entretien du cache impossible : {}".format(exc)
+            except Exception:
+                msg = u"Entretien du cache impossible."
+            self.StatusText = msg
+            self._set_bilan_cache(msg)
+            self._log(u'ERREUR', msg)
+            return []
+        for line in lines:
+            self._log(u'CACHE', line)
+        self.StatusText = lines[-1] if lines else u''
+        self._set_bilan_cache(u'\n'.join(lines))
+        return lines
@@ -110,9 +110,12 @@ class NamingEditorViewModel(BaseViewModel):
     ajoute le jeton en fin de motif (utilisable hors contexte WPF, ex. tests).
     """
 
-    def __init__(self, kind, naming_service=None):
+    def __init__(self, kind, naming_service=None, sample_elem=None):
         super(NamingEditorViewModel, self).__init__()
         self._kind = kind if kind in (u'sheet', u'set') else u'sheet'
+        # Élément d'exemple (ex. première feuille listée) : si fourni,
+        # `Apercu` affiche le nom résolu plutôt que le motif brut.
+        self._sample_elem = sample_elem
 
         if naming_service is not None:
             self._naming_service = naming_service
@@ -224,10 +227,16 @@ class NamingEditorViewModel(BaseViewModel):
 
     @property
     def Apercu(self):
-        """Aperçu « template » : le motif courant tel quel (pas de
-        résolution contre un élément Revit réel -- amélioration future,
-        hors périmètre ici pour ne pas coupler ce VM à un doc)."""
-        return self._pattern
+        """Aperçu : le motif courant résolu contre l'élément d'exemple
+        (pattern compilé via `naming_service.compile`, mémorisé par le
+        service), sinon le motif tel quel."""
+        if self._sample_elem is None or not self._pattern or self._naming_service is None:
+            return self._pattern
+        try:
+            compiled = self._naming_service.compile(self._pattern, self._kind)
+            return (compiled.evaluate(self._sample_elem) if compiled is not None else u'') or self._pattern
+        except Exception:
+            return self._pattern
 
     # ------------------------------------------------------------------
     # Insertion de jeton (repli sans curseur -- append en fin de motif)
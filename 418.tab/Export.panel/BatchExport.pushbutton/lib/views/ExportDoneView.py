@@ -15,9 +15,11 @@ def _xaml_path():
 
 
 class ExportDoneView(BaseWindow):
-    def __init__(self, destination_path):
+    def __init__(self, destination_path, issues=None):
         super(ExportDoneView, self).__init__(_xaml_path(), view_model=None)
         self._destination = destination_path or u''
+        # Anomalies relevées par la vérification des sorties (cf. ExportManifest)
+        self._issues = list(issues or [])
 
     def _load(self):
         super(ExportDoneView, self)._load()
@@ -32,6 +34,24 @@ class ExportDoneView(BaseWindow):
             except Exception:
                 pass
 
+        if self._issues:
+            title = self._window.FindName(u'TitleText')
+            if title is not None:
+                try:
+                    title.Text = u'Export terminé avec anomalies'
+                except Exception:
+                    pass
+            issues_block = self._window.FindName(u'IssuesBlock')
+            if issues_block is not None:
+                try:
+                    issues_block.Text = u'{} fichier(s) à vérifier :\n{}'.format(
+                        len([i for i in self._issues if not i.startswith(u'...')]),
+                        u'\n'.join(self._issues))
+                    from System.Windows import Visibility  # type: ignore
+                    issues_block.Visibility = Visibility.Visible
+                except Exception:
+                    pass
+
         open_btn = self._window.FindName(u'OpenFolderButton')
         if open_btn is not None:
             _dest = self._destination
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+try:
+    from views.ExportDoneView import ExportDoneView
+except Exception:
+    try:
+        from lib.views.ExportDoneView import ExportDoneView
+    except Exception:
+        ExportDoneView = None  # type: ignore
+
+
+class ExportPreviewView(ExportDoneView if ExportDoneView is not None else object):
+    """Aperçu (dry-run) de l'export : même modale que la fin d'export
+    (ExportDone.xaml, boutons « Ouvrir » / « Fermer »), avec le bilan en
+    tête et le détail du plan dans `DetailsBlock`."""
+
+    def __init__(self, destination_path, summary=u'', lines=None):
+        super(ExportPreviewView, self).__init__(destination_path)
+        self._summary = summary or u''
+        self._lines = list(lines or [])
+
+    def _load(self):
+        super(ExportPreviewView, self)._load()
+        if self._window is None:
+            return
+
+        title = self._window.FindName(u'TitleText')
+        if title is not None:
+            try:
+                title.Text = u"Aperçu de l'export"
+            except Exception:
+                pass
+
+        dest_block = self._window.FindName(u'DestinationBlock')
+        if dest_block is not None:
+            try:
+                dest_block.Text = u'{}\nDestination :\n{}'.format(self._summary, self._destination)
+            except Exception:
+                pass
+
+        details = self._window.FindName(u'DetailsBlock')
+        scroll = self._window.FindName(u'DetailsScroll')
+        if details is not None and scroll is not None and self._lines:
+            try:
+                details.Text = u'\n'.join(self._lines)
+                from System.Windows import Visibility  # type: ignore
+                scroll.Visibility = Visibility.Visible
+            except Exception:
+                pass
@@ -34,6 +34,14 @@ except Exception:
     except Exception:
         ExportDoneView = None  # type: ignore
 
+try:
+    from views.ExportPreviewView import ExportPreviewView
+except Exception:
+    try:
+        from lib.views.ExportPreviewView import ExportPreviewView
+    except Exception:
+        ExportPreviewView = None  # type: ignore
+
 # SPIKE (étape 0 découpage main window) : sous-VM de la page « par jeu ».
 try:
     from viewmodels.AutoPageVM import AutoPageVM
@@ -77,6 +85,34 @@ def _pick_folder():
     return None
 
 
+def _pick_models():
+    """Ouvre un sélecteur de maquettes Revit (multi-sélection). Retourne la
+    liste des chemins choisis, ou `None` (annulation ou hors Revit).
+
+    Même ordre de repli que `_pick_folder` : `pyrevit.forms.pick_file`,
+    puis `Microsoft.Win32.OpenFileDialog`.
+    """
+    try:
+        from pyrevit import forms
+        chemins = forms.pick_file(file_ext='rvt', multi_file=True)
+        if chemins:
+            return list(chemins)
+    except Exception:
+        pass
+
+    try:
+        from Microsoft.Win32 import OpenFileDialog
+        dlg = OpenFileDialog()
+        dlg.Filter = u'Maquettes Revit (*.rvt)|*.rvt'
+        dlg.Multiselect = True
+        if dlg.ShowDialog():
+            return list(dlg.FileNames)
+    except Exception:
+        pass
+
+    return None
+
+
 class MainWindowView(BaseWindow):
     def __init__(self, view_model):
         super(MainWindowView, self).__init__(_xaml_path(), view_model)
@@ -89,7 +125,11 @@ class MainWindowView(BaseWindow):
         self.wire_destination()
         self.wire_naming_editors()
         self.wire_bulk_selection()
+        self.wire_export_input_guard()
         self._vm._on_export_done_cb = self._show_export_done
+        self._vm._on_apercu_cb = self._show_apercu
+        self._vm._ui_pump = self._pump_ui
+        self._vm._pick_models = _pick_models
         try:
             self._vm.refresh_par_jeu()
         except Exception:
@@ -136,11 +176,39 @@ class MainWindowView(BaseWindow):
         except Exception:
             pass
 
+    def _pump_ui(self):
+        # L'export tourne sur le thread UI : traite les entrées en attente
+        # (clic « Annuler ») à chaque mise à jour de progression. Les autres
+        # entrées sont écartées tant que l'export tourne (cf.
+        # wire_export_input_guard) : l'orchestrateur est encore dans le
+        # contexte de l'API Revit.
+        if self._window is None:
+            return
+        from System import Action
+        from System.Windows.Threading import DispatcherPriority
+        self._window.Dispatcher.Invoke(Action(lambda: None), DispatcherPriority.Background)
+
     def _show_export_done(self, destination):
         if ExportDoneView is None:
             return
         try:
-            view = ExportDoneView(destination)
+            view = ExportDoneView(destination, getattr(self._vm, 'AnomaliesExport', None))
+            view._load()
+            if view._window is not None and self._window is not None:
+                try:
+                    view._window.Owner = self._window
+                except Exception:
+                    pass
+            view.show()
+        except Exception:
+            pass
+
+    def _show_apercu(self, destination):
+        if ExportPreviewView is None:
+            return
+        try:
+            view = ExportPreviewView(destination, getattr(self._vm, 'StatusText', u''),
+                                     getattr(self._vm, 'ApercuExport', None))
             view._load()
             if view._window is not None and self._window is not None:
                 try:
@@ -169,6 +237,42 @@ class MainWindowView(BaseWindow):
         except Exception:
             pass
 
+    def wire_export_input_guard(self):
+        """Pendant un export, seules les entrées destinées au bouton
+        « Annuler » (CancelExportButton) sont traitées : souris, molette et
+        clavier vers tout autre contrôle sont marqués `Handled` avant
+        d'atteindre leur cible, et la fermeture de la fenêtre est refusée.
+        Évite qu'un clic pompé par `_pump_ui` relance un export ou change de
+        jeu / de profil au milieu d'un run."""
+        if self._window is None:
+            return
+        vm = self._vm
+
+        def _guard(sender, args):
+            try:
+                if vm.ExportEnCours and not _is_within(args.OriginalSource, u'CancelExportButton'):
+                    args.Handled = True
+            except Exception:
+                pass
+
+        def _on_closing(sender, args):
+            try:
+                if vm.ExportEnCours:
+                    args.Cancel = True
+            except Exception:
+                pass
+
+        win = self._window
+        try:
+            win.PreviewMouseDown += _guard
+            win.PreviewMouseUp += _guard
+            win.PreviewMouseWheel += _guard
+            win.PreviewKeyDown += _guard
+            win.PreviewTextInput += _guard
+            win.Closing += _on_closing
+        except Exception:
+            pass
+
     def wire_destination(self):
         if self._window is None:
             return
@@ -235,9 +339,11 @@ class MainWindowView(BaseWindow):
             return
         vm = self._vm
 
+        sample = getattr(vm, 'exemple_nommage', None)
         ned_vm = NamingEditorViewModel(
             kind,
             naming_service=getattr(vm, '_naming_service', None),
+            sample_elem=sample(kind) if sample is not None else None,
         )
         view = NamingEditorView(ned_vm)
 
@@ -338,6 +444,35 @@ class MainWindowView(BaseWindow):
             pass
 
 
+def _is_within(source, name):
+    """True si `source` est l'élément nommé `name` ou l'un de ses
+    descendants (arbre visuel, à défaut arbre logique)."""
+    try:
+        from System.Windows.Media import VisualTreeHelper
+        from System.Windows import LogicalTreeHelper
+    except Exception:
+        return False
+    current = source
+    while current is not None:
+        try:
+            if getattr(current, 'Name', None) == name:
+                return True
+        except Exception:
+            pass
+        parent = None
+        try:
+            parent = VisualTreeHelper.GetParent(current)
+        except Exception:
+            parent = None
+        if parent is None:
+            try:
+                parent = LogicalTreeHelper.GetParent(current)
+            except Exception:
+                parent = None
+        current = parent
+    return False
+
+
 def _handle_sheet_row_click(vm, args):
     """Interprète un PreviewMouseLeftButtonDown sur le SheetListControl.
 
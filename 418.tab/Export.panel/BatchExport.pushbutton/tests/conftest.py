@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Isolation commune des tests (pytest) : chaque test tourne dans son propre
+# dossier temporaire, jamais dans l'arbre du dépôt.
+#   - PY418_CONFIG_DIR : config, journal, manifeste, historique, cache...
+#   - LIVE_LOG_PATH    : log live des MainViewModel de test ;
+#   - dossier courant  : les destinations relatives des exports simulés
+#                        ('X', 'C:/Test'...) y sont créées.
+from __future__ import unicode_literals
+import os
+import sys
+
+import pytest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_dirs(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    data.mkdir()
+    monkeypatch.setenv('PY418_CONFIG_DIR', str(data))
+    try:
+        import lib.viewmodels.MainViewModel as mvm
+        monkeypatch.setattr(mvm, 'LIVE_LOG_PATH', str(tmp_path / 'BatchExport_debug.log'))
+    except Exception:
+        pass
+    monkeypatch.chdir(tmp_path)
+    yield
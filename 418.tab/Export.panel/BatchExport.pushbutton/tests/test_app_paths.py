@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.core.AppPaths import AppPaths, DATA_DIR_ENV, data_dir
+from lib.services.core.ExportJournal import ExportJournal, JOURNAL_FILE_NAME
+
+
+class TestDataDir(unittest.TestCase):
+    def setUp(self):
+        self._env = dict((k, os.environ.get(k)) for k in (DATA_DIR_ENV, 'APPDATA'))
+
+    def tearDown(self):
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    def test_override_explicite(self):
+        os.environ[DATA_DIR_ENV] = '/tmp/418-donnees'
+        self.assertEqual(AppPaths().data_dir(), '/tmp/418-donnees')
+
+    def test_dossier_utilisateur_hors_de_l_extension(self):
+        os.environ.pop(DATA_DIR_ENV, None)
+        os.environ['APPDATA'] = os.path.join(_tf.gettempdir(), 'Roaming')
+        d = AppPaths().data_dir()
+        self.assertEqual(d, os.path.join(os.environ['APPDATA'], '418', 'BatchExport'))
+        self.assertFalse(os.path.abspath(d).startswith(_BUTTON))
+        self.assertEqual(data_dir(), d)
+
+    def test_journal_dans_le_dossier_de_donnees(self):
+        os.environ.pop(DATA_DIR_ENV, None)
+        os.environ['APPDATA'] = os.path.join(_tf.gettempdir(), 'Roaming')
+        self.assertEqual(ExportJournal().path, os.path.join(AppPaths().data_dir(), JOURNAL_FILE_NAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.CancellationToken import CancellationToken
+from lib.services.core.ExportJournal import ExportJournal
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.ExportRunPlan import ExportItem
+from lib.viewmodels.MainViewModel import MainViewModel, ManualSheetVM
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = 'Plan'
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+
+
+class FakeSheetVM(object):
+    def __init__(self, sheet, pdf=True, dwg=False):
+        self.Elem = sheet
+        self.Numero = sheet.SheetNumber
+        self.ExportPdf = pdf
+        self.ExportDwg = dwg
+
+
+class CancellingOrchestrator(ExportOrchestrator):
+    """Exports unitaires simulés (fichier écrit) ; le jeton est annulé après
+    `stop_after` feuilles, comme un clic « Annuler » pendant l'export."""
+
+    def __init__(self, token, stop_after):
+        super(CancellingOrchestrator, self).__init__()
+        self.token = token
+        self.stop_after = stop_after
+        self.exported = []
+
+    def _export_pdf_sheet(self, doc, sheet, rows, base_folder, options, separate=True, overwrite=False,
+                          log_cb=None, path=None):
+        path = path or os.path.join(base_folder, '{}.pdf'.format(sheet.SheetNumber))
+        self._ensure_folder(os.path.dirname(path))
+        with open(path, 'wb') as fh:
+            fh.write(b'%PDF-1.7')
+        self.exported.append(sheet.SheetNumber)
+        if len(self.exported) >= self.stop_after:
+            self.token.cancel(u'test')
+        return True, path
+
+
+class TestCancellationToken(unittest.TestCase):
+    def test_annulation_idempotente(self):
+        token = CancellationToken()
+        self.assertFalse(token.cancelled)
+        token.cancel(u'premier')
+        token.cancel(u'second')
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, u'premier')
+
+
+class TestOrchestratorCancellation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418cancel_')
+        self.token = CancellationToken()
+        self.sheets = [FakeSheet(n, 'A10{}'.format(n)) for n in range(1, 5)]
+        self.logs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_arret_entre_deux_feuilles(self):
+        orch = CancellingOrchestrator(self.token, stop_after=2)
+        orch._cancel = self.token
+        results = orch._export_pdf_sheets(None, self.sheets, self.tmp, None, overwrite=True)
+        self.assertEqual(orch.exported, ['A101', 'A102'])
+        self.assertEqual([sh.SheetNumber for sh, _ok, _p in results], ['A101', 'A102'])
+
+    def test_elements_non_atteints_restent_a_faire(self):
+        orch = ExportOrchestrator()
+        orch._cancel = self.token
+        self.token.cancel()
+        items = [ExportItem('Jeu|{}|pdf'.format(sh.SheetNumber), 'Jeu', 'pdf',
+                            os.path.join(self.tmp, '{}.pdf'.format(sh.SheetNumber)),
+                            sheet_number=sh.SheetNumber, sheet=sh) for sh in self.sheets[:2]]
+        outcomes = orch._item_outcomes(items, items, [(items[0].sheet, True, items[0].path)])
+        self.assertEqual([status for _it, status, _p in outcomes], ['ok', 'pending'])
+
+    def test_run_manuel_annule_reste_reprenable(self):
+        orch = CancellingOrchestrator(self.token, stop_after=1)
+        vms = [FakeSheetVM(sh, dwg=True) for sh in self.sheets[:3]]
+        ok = orch.run_manual(FakeDoc(), vms, log_cb=self.logs.append, destination=self.tmp,
+                             cancel=self.token)
+        self.assertFalse(ok)
+        self.assertEqual(orch.exported, ['A101'])
+        self.assertIsNone(orch._cancel)
+        # Journal non clos : la sélection complète (PDF et DWG) est reprenable.
+        state = ExportJournal().load()
+        self.assertTrue(state.interrupted)
+        self.assertEqual(state.pending_count(), 5)
+        # Manifeste partiel écrit : une feuille faite, le reste à faire.
+        counts = orch.last_manifest.counts()
+        self.assertEqual((counts.get('ok'), counts.get('pending')), (1, 5))
+        self.assertTrue(os.path.exists(orch.last_manifest.path))
+        self.assertTrue(any(u'Export annulé (test)' in line for line in self.logs))
+
+
+class TestMainViewModelAnnulation(unittest.TestCase):
+    def test_pas_d_export_en_cours_par_defaut(self):
+        vm = MainViewModel(doc=None)
+        self.assertFalse(vm.ExportEnCours)
+        vm.annuler_export()  # sans effet
+        self.assertIsNotNone(vm.AnnulerExportCommand)
+        self.assertFalse(vm.AnnulerExportCommand.CanExecute(None))
+
+    def test_commande_annule_le_run_en_cours(self):
+        vm = MainViewModel(doc=None)
+        token = vm._begin_export()
+        self.assertTrue(vm.ExportEnCours)
+        self.assertTrue(vm.AnnulerExportCommand.CanExecute(None))
+        vm.AnnulerExportCommand.Execute(None)
+        self.assertTrue(token.cancelled)
+        self.assertTrue(vm._end_export(token))
+        self.assertFalse(vm.ExportEnCours)
+        self.assertIn(u'annulé', vm.StatusText)
+
+    def test_commande_activee_pendant_un_export(self):
+        """WPF ne réévalue CanExecute que sur CanExecuteChanged : l'état vu
+        par la vue doit suivre le début et la fin de l'export."""
+        vm = MainViewModel(doc=object(), config=None)
+        cmd = vm.AnnulerExportCommand
+        seen = []
+        cmd.add_CanExecuteChanged(lambda sender, args: seen.append(sender.CanExecute(None)))
+        during = []
+
+        class OrchestrateurObserve(object):
+            def __init__(self, *a, **kw):
+                self._dest = object()
+
+            def run_manual(self, *a, **kw):
+                during.append(cmd.CanExecute(None))
+                return True
+
+        import lib.services.core.ExportOrchestrator as _eo_mod
+        _orig = _eo_mod.ExportOrchestrator
+        _eo_mod.ExportOrchestrator = OrchestrateurObserve
+        try:
+            vm._sheets_manuel = [ManualSheetVM(u'A101', u'Plan', export_pdf=True)]
+            vm.lancer_export_manuel()
+        finally:
+            _eo_mod.ExportOrchestrator = _orig
+        self.assertEqual(during, [True])
+        self.assertEqual(seen, [True, False])
+        self.assertFalse(cmd.CanExecute(None))
+
+    def test_reprise_activee_si_journal_interrompu(self):
+        journal = ExportJournal()
+        journal.start('manual')
+        try:
+            vm = MainViewModel(doc=None)
+            cmd = vm.ReprendreExportCommand
+            self.assertTrue(vm.ReprisePossible)
+            self.assertTrue(cmd.CanExecute(None))
+            seen = []
+            cmd.add_CanExecuteChanged(lambda sender, args: seen.append(sender.CanExecute(None)))
+            token = vm._begin_export()
+            self.assertFalse(cmd.CanExecute(None))  # pas de reprise pendant un run
+            journal.finish()
+            vm._end_export(token)
+            self.assertFalse(vm.ReprisePossible)
+            self.assertEqual(seen[0], False)
+            self.assertFalse(cmd.CanExecute(None))
+        finally:
+            journal.finish()
+
+    def test_reprise_desactivee_sans_journal_interrompu(self):
+        journal = ExportJournal()
+        journal.start('auto')
+        journal.finish()
+        vm = MainViewModel(doc=None)
+        self.assertFalse(vm.ReprisePossible)
+        self.assertFalse(vm.ReprendreExportCommand.CanExecute(None))
+
+    def test_pompe_ui_appelee_a_chaque_progression(self):
+        vm = MainViewModel(doc=None)
+        calls = []
+        vm._ui_pump = lambda: calls.append(1)
+        progress_cb, _log_cb = vm._make_export_callbacks_with_log()
+        progress_cb(1, 1, u'fin')
+        self.assertEqual(calls, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
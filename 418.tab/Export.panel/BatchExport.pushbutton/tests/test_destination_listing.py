@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+import lib.data.destination.DestinationListing as _listing_mod
+from lib.data.destination.DestinationListing import DestinationListing
+
+
+class FakeStore(object):
+    def __init__(self):
+        self.ensure_calls = []
+
+    def ensure(self, path):
+        self.ensure_calls.append(path)
+        return True, None
+
+
+class TestDestinationListing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418listing_')
+        for name in ('A101.pdf', 'A102.pdf', 'A102 (1).pdf'):
+            with open(os.path.join(self.tmp, name), 'wb') as fh:
+                fh.write(b'x')
+        self.calls = []
+        self._orig = _listing_mod._listdir
+
+        def _counting(folder):
+            self.calls.append(folder)
+            return self._orig(folder)
+        _listing_mod._listdir = _counting
+
+    def tearDown(self):
+        _listing_mod._listdir = self._orig
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _p(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_une_seule_enumeration_par_dossier(self):
+        listing = DestinationListing()
+        self.assertTrue(listing.exists(self._p('A101.pdf')))
+        self.assertFalse(listing.exists(self._p('A103.pdf')))
+        listing.unique_path(self._p('A102.pdf'))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_unique_path_suffixe_libre(self):
+        listing = DestinationListing()
+        self.assertEqual(listing.unique_path(self._p('A103.pdf')), self._p('A103.pdf'))
+        self.assertEqual(listing.unique_path(self._p('A101.pdf')), self._p('A101 (1).pdf'))
+        self.assertEqual(listing.unique_path(self._p('A102.pdf')), self._p('A102 (2).pdf'))
+
+    def test_add_met_a_jour_le_cache(self):
+        listing = DestinationListing()
+        listing.add(self._p('A101 (1).pdf'))
+        self.assertEqual(listing.unique_path(self._p('A101.pdf')), self._p('A101 (2).pdf'))
+        listing.discard(self._p('A101.pdf'))
+        self.assertFalse(listing.exists(self._p('A101.pdf')))
+
+    def test_dossier_absent_vu_comme_vide(self):
+        listing = DestinationListing()
+        self.assertFalse(listing.exists(os.path.join(self.tmp, 'absent', 'A101.pdf')))
+
+    def test_ensure_une_fois_par_dossier(self):
+        store = FakeStore()
+        listing = DestinationListing(store)
+        self.assertEqual(listing.ensure(self.tmp), (True, None))
+        listing.ensure(self.tmp)
+        self.assertEqual(store.ensure_calls, [self.tmp])
+
+    def test_ensure_sans_store_cree_le_dossier(self):
+        target = os.path.join(self.tmp, 'PDF')
+        ok, err = DestinationListing().ensure(target)
+        self.assertTrue(ok)
+        self.assertTrue(os.path.isdir(target))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+import lib.services.core.DiskSpacePrecheck as _space_mod
+from lib.services.core.DiskSpacePrecheck import (existing_ancestor, estimate_items, format_bytes,
+                                                 free_bytes, shortfalls)
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.ExportRunPlan import ExportItem, ExportRunPlan
+from lib.services.core.TimingHistory import TimingHistory
+
+_MB = 1024 * 1024
+
+
+class TestDiskSpacePrecheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418space_')
+        self.history = TimingHistory(os.path.join(self.tmp, 'timings.json'))
+        self.history.add_size('S', 'pdf', '', 2 * _MB)
+        self.history.add_size('S', 'dwg', '', 5 * _MB)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _item(self, collection, fmt, name):
+        return ExportItem('{}|{}|{}'.format(collection, name, fmt), collection, fmt,
+                          os.path.join(self.tmp, collection, '{}.{}'.format(name, fmt)), sheet=object())
+
+    def test_tailles_lisibles(self):
+        self.assertEqual(format_bytes(850 * 1024), '850 Ko')
+        self.assertEqual(format_bytes(int(12.4 * _MB)), '12,4 Mo')
+        self.assertEqual(format_bytes(3 * 1024 * _MB), '3,0 Go')
+
+    def test_racine_de_destination_existante(self):
+        self.assertEqual(existing_ancestor(os.path.join(self.tmp, 'Jeu', 'PDF')), self.tmp)
+        self.assertIsNotNone(free_bytes(os.path.join(self.tmp, 'Jeu')))
+
+    def test_estimation_par_racine_et_par_jeu(self):
+        items = [self._item('Jeu A', 'pdf', 'A101'), self._item('Jeu A', 'dwg', 'A101'),
+                 self._item('Jeu B', 'pdf', 'B101')]
+        by_root, unknown = estimate_items(items, self.history, {'pdf': 'S', 'dwg': 'S'})
+        self.assertEqual((by_root, unknown), ({self.tmp: 9 * _MB}, 0))
+        by_collection, _unknown = estimate_items(items, self.history, {'pdf': 'S', 'dwg': 'S'},
+                                                 group=lambda it: it.collection)
+        self.assertEqual(by_collection, {'Jeu A': 7 * _MB, 'Jeu B': 2 * _MB})
+
+    def test_manque_d_espace_avec_marge(self):
+        free = lambda root: 10 * _MB
+        self.assertEqual(shortfalls({'D:/': 9 * _MB}, free=free), [])
+        self.assertEqual(shortfalls({'D:/': int(9.5 * _MB)}, free=free), [('D:/', int(9.5 * _MB), 10 * _MB)])
+        self.assertEqual(shortfalls({'D:/': 50 * _MB}, free=lambda root: None), [])
+
+    def test_tailles_tirees_de_la_trace(self):
+        path = os.path.join(self.tmp, 'jeu.pdf')
+        with open(path, 'wb') as fh:
+            fh.write(b'%PDF' + b'0' * 396)
+        outputs = {os.path.normcase(path): ('carnet', 4)}
+        history = TimingHistory(os.path.join(self.tmp, 'other.json'))
+        history.record_trace([{'fmt': 'pdf', 'status': 'ok', 'stages': {'cache': 0.1}, 'total': 0.1,
+                               'paths': [path]}], outputs, {'pdf': 'S'})
+        self.assertEqual(history.sizes, {'S|pdf|carnet': [100.0]})
+        self.assertEqual(history.samples, {})  # rendu servi par le cache : pas de durée
+
+
+class LowSpaceOrchestrator(ExportOrchestrator):
+    def __init__(self, answer):
+        super(LowSpaceOrchestrator, self).__init__()
+        self.answer = answer
+        self.asked = []
+
+    def _confirm_low_space(self, lines):
+        self.asked.append(lines)
+        return self.answer
+
+
+class TestOrchestratorSpacePrecheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418space_')
+        self.logs = []
+        self._free = _space_mod.free_bytes
+        _space_mod.free_bytes = lambda root: 1 * _MB
+
+    def tearDown(self):
+        _space_mod.free_bytes = self._free
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_abandon_si_l_utilisateur_annule(self):
+        orch = LowSpaceOrchestrator(answer=False)
+        self.assertFalse(orch._precheck_space({self.tmp: 5 * _MB}, self.logs.append))
+        self.assertEqual(len(orch.asked), 1)
+        self.assertTrue(any('abandonné' in line for line in self.logs))
+        self.assertTrue(orch._precheck_space({self.tmp: 512 * 1024}, self.logs.append))
+
+    def test_sans_surveillance_avertissement_seul(self):
+        orch = LowSpaceOrchestrator(answer=False)
+        orch._overwrite_policy = True
+        self.assertTrue(orch._precheck_space({self.tmp: 5 * _MB}, self.logs.append))
+        self.assertEqual(orch.asked, [])
+        self.assertTrue(any('insuffisant' in line for line in self.logs))
+
+    def test_apercu_volume_par_jeu(self):
+        orch = ExportOrchestrator()
+        history = TimingHistory(os.path.join(self.tmp, 'timings.json'))
+        history.add_size(None, 'pdf', '', 3 * _MB)
+        orch._timings = (history, {'pdf': None, 'dwg': None}, {})
+        plan = ExportRunPlan([ExportItem('Jeu|A10{}|pdf'.format(n), 'Jeu', 'pdf',
+                                         os.path.join(self.tmp, 'A10{}.pdf'.format(n)), sheet=object())
+                              for n in range(2)])
+        orch._estimate_plan_space(plan)
+        self.assertEqual(plan.info['estimated_bytes'], {'Jeu': 6 * _MB})
+        self.assertEqual(len(plan.info['space_warnings']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.DocumentSheetIndex import DocumentSheetIndex, element_id_key
+
+
+class FakeId(object):
+    """Faux ElementId : `.IntegerValue` seulement (API Revit < 2024)."""
+
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeCollection(object):
+    def __init__(self, cid, name):
+        self.Id = FakeId(cid)
+        self.Name = name
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero, collection_id):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.SheetCollectionId = FakeId(collection_id)
+
+
+class TestDocumentSheetIndex(unittest.TestCase):
+    def setUp(self):
+        self.coll_a = FakeCollection(1, 'Jeu A')
+        self.coll_b = FakeCollection(2, 'Jeu B')
+        self.sheets = [
+            FakeSheet(10, 'A-103', 1),
+            FakeSheet(11, 'A-101', 1),
+            FakeSheet(12, 'B-201', 2),
+            FakeSheet(13, 'A-102', 1),
+            FakeSheet(14, 'X-001', 99),
+        ]
+        self.index = DocumentSheetIndex.from_elements([self.coll_a, self.coll_b], self.sheets)
+
+    def test_collection_par_nom(self):
+        self.assertIs(self.index.collection_by_name('Jeu B'), self.coll_b)
+        self.assertIsNone(self.index.collection_by_name('Inconnu'))
+
+    def test_feuilles_par_collection_triees_par_numero(self):
+        numeros = [s.SheetNumber for s in self.index.sheets_for_collection(self.coll_a)]
+        self.assertEqual(numeros, ['A-101', 'A-102', 'A-103'])
+
+    def test_feuilles_collection_inconnue_ou_none(self):
+        self.assertEqual(self.index.sheets_for_collection(FakeCollection(42, 'Vide')), [])
+        self.assertEqual(self.index.sheets_for_collection(None), [])
+
+    def test_feuille_par_id(self):
+        self.assertIs(self.index.sheet_by_id(FakeId(12)), self.sheets[2])
+        self.assertIsNone(self.index.sheet_by_id(FakeId(999)))
+
+    def test_collections_conserve_ordre_du_document(self):
+        self.assertEqual([n for _c, n in self.index.collections()], ['Jeu A', 'Jeu B'])
+
+    def test_resultats_sont_des_copies(self):
+        self.index.sheets_for_collection(self.coll_a).pop()
+        self.assertEqual(len(self.index.sheets_for_collection(self.coll_a)), 3)
+
+    def test_build_sans_doc_donne_index_vide(self):
+        index = DocumentSheetIndex.build(None)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.collections(), [])
+
+    def test_element_id_key_prefere_value(self):
+        class IdRecent(object):
+            Value = 7
+            IntegerValue = 8
+        self.assertEqual(element_id_key(IdRecent()), 7)
+        self.assertIsNone(element_id_key(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportJournal import ExportJournal, item_key
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+
+
+class FakeSheet(object):
+    def __init__(self, numero):
+        self.SheetNumber = numero
+        self.Id = None
+
+
+class TestExportJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418journal_')
+        self.journal = ExportJournal(os.path.join(self.tmp, 'journal.jsonl'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _output(self, name, content=b'%PDF-1.7'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as fh:
+            fh.write(content)
+        return path
+
+    def test_run_interrompu_puis_termine(self):
+        self.journal.start('auto', destination=self.tmp)
+        self.journal.planned(item_key('Jeu', 'A101', 'pdf'), collection='Jeu', sheet='A101', fmt='pdf')
+        state = self.journal.load()
+        self.assertTrue(state.interrupted)
+        self.assertEqual(state.run['destination'], self.tmp)
+        self.journal.finish()
+        self.assertFalse(self.journal.load().interrupted)
+
+    def test_element_termine_seulement_si_fichier_present_et_intact(self):
+        key = item_key('Jeu', 'A101', 'pdf')
+        path = self._output('A101.pdf')
+        self.journal.start('auto')
+        self.journal.planned(key)
+        self.journal.done(key, path)
+        self.assertTrue(self.journal.load().is_complete(key))
+        # Fichier modifié (taille différente) -> à refaire.
+        with open(path, 'ab') as fh:
+            fh.write(b'xx')
+        self.assertFalse(self.journal.load().is_complete(key))
+        os.remove(path)
+        self.assertFalse(self.journal.load().is_complete(key))
+
+    def test_start_reinitialise_le_journal(self):
+        self.journal.start('auto')
+        self.journal.planned('a|1|pdf')
+        self.journal.start('manual')
+        state = self.journal.load()
+        self.assertEqual(state.run['mode'], 'manual')
+        self.assertEqual(state.planned, [])
+
+    def test_ligne_tronquee_ignoree_et_plan_dedoublonne(self):
+        self.journal.start('auto')
+        self.journal.planned('a|1|pdf')
+        self.journal.planned('a|2|pdf')
+        # Reprise : le plan est réinscrit par une autre instance.
+        ExportJournal(self.journal.path).planned('a|1|pdf')
+        with io.open(self.journal.path, 'a', encoding='utf-8') as fh:
+            fh.write(u'{"type": "done", "key": "a|2')
+        state = self.journal.load()
+        self.assertEqual([p['key'] for p in state.planned], ['a|1|pdf', 'a|2|pdf'])
+        self.assertEqual(state.done, {})
+        self.assertEqual(state.pending_count(), 2)
+
+    def test_item_key_carnet(self):
+        self.assertEqual(item_key('Jeu', None, 'PDF'), 'Jeu|*|pdf')
+
+
+class TestExportOrchestratorReprise(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418journal_')
+        self.orch = ExportOrchestrator()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_resume_sans_journal_interrompu_ne_fait_rien(self):
+        ExportJournal().start('auto')
+        ExportJournal().finish()
+        logs = []
+        self.assertFalse(self.orch.resume_last_run(None, log_cb=logs.append))
+        self.assertEqual(len(logs), 1)
+
+    def test_feuilles_terminees_ignorees_en_reprise(self):
+        journal = ExportJournal(os.path.join(self.tmp, 'journal.jsonl'))
+        journal.start('auto')
+        path = os.path.join(self.tmp, 'A101.pdf')
+        with open(path, 'wb') as fh:
+            fh.write(b'%PDF-1.7')
+        journal.done(item_key('Jeu', 'A101', 'pdf'), path)
+        self.orch._resume = journal.load()
+        sheets = [FakeSheet('A101'), FakeSheet('A102')]
+        pending = self.orch._pending_sheets(sheets, 'Jeu', 'pdf')
+        self.assertEqual([s.SheetNumber for s in pending], ['A102'])
+
+
+if __name__ == '__main__':
+    unittest.main()
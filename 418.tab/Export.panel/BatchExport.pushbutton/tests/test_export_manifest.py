@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportManifest import (ExportManifest, check_file, header_ok,
+                                              CHECK_OK, CHECK_MISSING, CHECK_EMPTY, CHECK_HEADER)
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.ExportRunPlan import ExportItem
+from lib.services.core.ExportTrace import ExportTrace
+
+
+def _write(path, data):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+    return path
+
+
+class TestCheckFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418manifest_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_pdf_valide(self):
+        path = _write(os.path.join(self.tmp, 'a.pdf'), b'%PDF-1.7\n...')
+        check, size, sha = check_file(path, 'pdf')
+        self.assertEqual((check, size), (CHECK_OK, 12))
+        self.assertEqual(sha, hashlib.sha256(b'%PDF-1.7\n...').hexdigest())
+
+    def test_anomalies(self):
+        self.assertEqual(check_file(os.path.join(self.tmp, 'x.pdf'), 'pdf')[0], CHECK_MISSING)
+        self.assertEqual(check_file(_write(os.path.join(self.tmp, 'v.pdf'), b''), 'pdf')[0], CHECK_EMPTY)
+        self.assertEqual(check_file(_write(os.path.join(self.tmp, 'h.pdf'), b'<html>'), 'pdf')[0],
+                         CHECK_HEADER)
+
+    def test_entetes(self):
+        self.assertTrue(header_ok('dwg', b'AC1032\x00\x00'))
+        self.assertFalse(header_ok('dwg', b'%PDF-1.7'))
+        self.assertTrue(header_ok('pdf', b'\xef\xbb\xbf%PDF-1.4'))
+        self.assertTrue(header_ok('zip', b'PK'))
+
+
+class TestExportManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418manifest_')
+        self.manifest = ExportManifest(os.path.join(self.tmp, 'outputs.json'), mode='auto')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _plan(self):
+        items = [ExportItem('Jeu|A10{}|pdf'.format(n), 'Jeu', 'pdf', os.path.join(self.tmp, 'A10{}.pdf'.format(n)),
+                            sheet_number='A10{}'.format(n)) for n in range(1, 5)]
+        self.manifest.plan(items)
+        return items
+
+    def test_chemin_par_defaut_dans_le_dossier_de_donnees(self):
+        from lib.core.AppPaths import data_dir
+        from lib.services.core.ExportManifest import MANIFEST_FILE_NAME
+        self.assertEqual(ExportManifest().path, os.path.join(data_dir(), MANIFEST_FILE_NAME))
+
+    def test_verification_parallele(self):
+        items = self._plan()
+        _write(items[0].path, b'%PDF-1.7 ok')
+        _write(items[1].path, b'')
+        self.manifest.record(items[0].key, 'ok', items[0].path)
+        self.manifest.record(items[1].key, 'ok', items[1].path)
+        self.manifest.record(items[2].key, 'error', items[2].path)
+        failures = self.manifest.verify(workers=3)
+        self.assertEqual([r['key'] for r in failures], ['Jeu|A102|pdf', 'Jeu|A103|pdf'])
+        self.assertEqual(self.manifest.counts(), {'ok': 2, 'error': 1, 'pending': 1})
+        self.assertEqual(self.manifest.records[0]['size'], 11)
+        self.assertEqual(self.manifest.failure_lines(), ['A102.pdf : vide', 'A103.pdf : export en échec'])
+
+    def test_duree_et_retour_revit_depuis_la_trace(self):
+        items = self._plan()
+        self.manifest.record(items[0].key, 'ok', items[0].path)
+        self.manifest.apply_trace([
+            {'paths': [items[0].path, items[1].path], 'total': 3.0, 'revit': 'True'},
+            {'paths': [], 'total': 9.0},
+        ])
+        self.assertEqual(self.manifest.records[0]['duration'], 1.5)
+        self.assertEqual(self.manifest.records[1]['revit'], 'True')
+
+    def test_json_et_csv(self):
+        items = self._plan()
+        _write(items[0].path, b'%PDF-1.7')
+        self.manifest.record(items[0].key, 'ok', items[0].path)
+        self.manifest.verify()
+        self.assertTrue(self.manifest.save())
+        relu = ExportManifest.load(self.manifest.path)
+        self.assertEqual(len(relu), 4)
+        self.assertEqual(relu.records[0]['check'], CHECK_OK)
+        self.assertEqual(relu.info['mode'], 'auto')
+        with io.open(self.manifest.csv_path, 'r', encoding='utf-8-sig') as fh:
+            rows = fh.read().splitlines()
+        self.assertEqual(rows[0].split(',')[:3], ['key', 'collection', 'fmt'])
+        self.assertEqual(len(rows), 5)
+
+    def test_lignes_de_bilan(self):
+        self._plan()
+        lines = self.manifest.summary_lines()
+        self.assertIn('4 non atteint(s)', lines[0])
+        self.assertIn('conformes', lines[1])
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = 'Plan'
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+
+
+class TestOrchestratorManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418manifest_')
+        self.orch = ExportOrchestrator()
+        self.orch._trace = ExportTrace(path=os.path.join(self.tmp, 'trace.jsonl'))
+        self.orch._open_outputs('auto', FakeDoc())
+        self.orch._outputs._path = os.path.join(self.tmp, 'outputs.json')
+        self.logs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _item(self, sid, numero, data=None):
+        path = os.path.join(self.tmp, '{}.pdf'.format(numero))
+        if data is not None:
+            _write(path, data)
+        return ExportItem('Jeu|{}|pdf'.format(numero), 'Jeu', 'pdf', path, sheet_number=numero,
+                          sheet=FakeSheet(sid, numero))
+
+    def test_issues_exportees_sautees_et_en_echec(self):
+        ok_item = self._item(1, 'A101', b'%PDF-1.7')
+        err_item = self._item(2, 'A102')
+        old_item = self._item(3, 'A103', b'%PDF-1.4 ancien')
+        items = [ok_item, err_item, old_item]
+        self.orch._outputs.plan(items)
+        trace_item = self.orch._trace_item('pdf', 'A101')
+        trace_item.note('revit', True)
+        trace_item.finish(ok_item.path)
+        self.orch._record_items(items, [ok_item, err_item],
+                                [(ok_item.sheet, True, ok_item.path), (err_item.sheet, False, err_item.path)])
+        self.orch._close_outputs(self.logs.append)
+        manifest = self.orch.last_manifest
+        self.assertIsNone(self.orch._outputs)
+        self.assertEqual([r['status'] for r in manifest.records], ['ok', 'error', 'skipped'])
+        self.assertEqual(manifest.records[0]['revit'], 'True')
+        self.assertEqual(manifest.records[2]['check'], CHECK_OK)
+        self.assertEqual(manifest.failure_lines(), ['A102.pdf : export en échec'])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, 'outputs.csv')))
+        self.assertTrue(any('1 anomalie' in line for line in self.logs))
+
+    def test_mode_manuel_inscrit_les_resultats(self):
+        path = _write(os.path.join(self.tmp, 'A101.dwg'), b'AC1032')
+        self.orch._record_results([(FakeSheet(1, 'A101'), True, path)], 'dwg')
+        self.orch._close_outputs()
+        rec = self.orch.last_manifest.records[0]
+        self.assertEqual((rec['fmt'], rec['sheet'], rec['check']), ('dwg', 'A101', CHECK_OK))
+
+
+if __name__ == '__main__':
+    unittest.main()
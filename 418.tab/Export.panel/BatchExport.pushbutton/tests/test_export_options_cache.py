@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportOptionsCache import ExportOptionsCache, data_revision, doc_key
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+
+
+class FakeDoc(object):
+    def __init__(self, path):
+        self.PathName = path
+        self.Title = os.path.basename(path)
+
+
+class FakeOptions(object):
+    def __init__(self):
+        self.Combine = False
+        self.FileName = u''
+        self.rule = None
+
+    def SetNamingRule(self, rule):
+        self.rule = rule
+
+
+class FakeService(object):
+    def __init__(self, setup='A3', custom=None):
+        self.setup = setup
+        self.custom = custom
+        self.builds = 0
+
+    def get_saved_setup(self):
+        return self.setup
+
+    def get_custom_setup_data(self, name):
+        return self.custom
+
+    def build_options(self, doc, setup_name=None):
+        self.builds += 1
+        return FakeOptions()
+
+
+class TestExportOptionsCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ExportOptionsCache()
+        self.doc = FakeDoc('C:/Projet/ARC.rvt')
+        self.builds = []
+
+    def _build(self):
+        self.builds.append(1)
+        return FakeOptions()
+
+    def test_gabarit_construit_une_fois_par_cle(self):
+        a = self.cache.template(self.doc, 'pdf', 'A3', self._build, revision='r1')
+        b = self.cache.template(FakeDoc('C:/Projet/ARC.rvt'), 'pdf', 'A3', self._build, revision='r1')
+        self.assertIs(a, b)
+        self.assertEqual(len(self.builds), 1)
+        self.cache.template(self.doc, 'pdf', 'A1', self._build, revision='r1')
+        self.cache.template(self.doc, 'dwg', 'A3', self._build, revision='r1')
+        self.assertEqual(len(self.builds), 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    def test_nouvelle_revision_remplace_l_ancienne(self):
+        a = self.cache.template(self.doc, 'pdf', 'A3', self._build, revision='r1')
+        b = self.cache.template(self.doc, 'pdf', 'A3', self._build, revision='r2')
+        self.assertIsNot(a, b)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_derive_ne_modifie_pas_le_gabarit(self):
+        tpl = self.cache.template(self.doc, 'pdf', 'A3', self._build)
+        first = self.cache.derive(tpl, Combine=True, FileName='A101', NamingRule='regle')
+        second = self.cache.derive(tpl, FileName='A102')
+        self.assertEqual((first.Combine, first.FileName, first.rule), (True, 'A101', 'regle'))
+        self.assertEqual((second.Combine, second.FileName, second.rule), (False, 'A102', None))
+        self.assertEqual((tpl.Combine, tpl.FileName, tpl.rule), (False, u'', None))
+
+    def test_champ_inconnu_ignore(self):
+        opts = self.cache.derive(FakeOptions(), MergedViews=True)
+        self.assertFalse(hasattr(opts, 'MergedViews'))
+
+    def test_invalidation_par_document(self):
+        other = FakeDoc('C:/Projet/STR.rvt')
+        self.cache.template(self.doc, 'pdf', 'A3', self._build)
+        self.cache.template(other, 'pdf', 'A3', self._build)
+        self.cache.invalidate(self.doc)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_cles_et_revisions(self):
+        self.assertEqual(doc_key(self.doc), 'C:/Projet/ARC.rvt')
+        self.assertEqual(data_revision({'a': 1, 'b': 2}), data_revision({'b': 2, 'a': 1}))
+        self.assertNotEqual(data_revision({'a': 1}), data_revision({'a': 2}))
+
+
+class TestOrchestratorOptionsCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ExportOptionsCache()
+        self.orch = ExportOrchestrator(options_cache=self.cache)
+        self.orch._pdf = FakeService()
+        self.doc = FakeDoc('C:/Projet/ARC.rvt')
+
+    def test_setup_resolu_une_fois_par_session(self):
+        a = self.orch._get_pdf_options(self.doc)
+        b = ExportOrchestrator(options_cache=self.cache)
+        b._pdf = self.orch._pdf
+        self.assertIs(b._get_pdf_options(self.doc), a)
+        self.assertEqual(self.orch._pdf.builds, 1)
+
+    def test_setup_custom_modifie_reconstruit(self):
+        self.orch._pdf.custom = {'ZoomPercentage': 100}
+        self.orch._get_pdf_options(self.doc)
+        self.orch._pdf.custom = {'ZoomPercentage': 50}
+        self.orch._get_pdf_options(self.doc)
+        self.assertEqual(self.orch._pdf.builds, 2)
+
+    def test_options_par_element_independantes(self):
+        tpl = self.orch._get_pdf_options(self.doc)
+        opts = self.orch._item_options(tpl, Combine=True, FileName='A101')
+        self.assertIsNot(opts, tpl)
+        self.assertFalse(tpl.Combine)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportRenameMap import (
+    build_rename_map, build_rename_map_by_parts, normalize_stem,
+)
+
+
+class TestBuildRenameMap(unittest.TestCase):
+    def test_correspondance_exacte_par_numero(self):
+        files = ['A-101.pdf', 'A-102.pdf', 'A-103.pdf']
+        mapping = build_rename_map(files, {0: 'A-101', 1: 'A-102', 2: 'A-103'}, 'pdf')
+        self.assertEqual(mapping, {0: 'A-101.pdf', 1: 'A-102.pdf', 2: 'A-103.pdf'})
+
+    def test_casse_et_caracteres_interdits_ignores(self):
+        files = ['a_101 bis.PDF']
+        mapping = build_rename_map(files, {'k': 'A/101 bis'}, '.pdf')
+        self.assertEqual(mapping, {'k': 'a_101 bis.PDF'})
+
+    def test_mauvaise_extension_ignoree(self):
+        mapping = build_rename_map(['A-101.dwg'], {0: 'A-101'}, 'pdf')
+        self.assertEqual(mapping, {})
+
+    def test_feuille_absente_non_associee(self):
+        mapping = build_rename_map(['A-101.pdf'], {0: 'A-101', 1: 'A-102'}, 'pdf')
+        self.assertEqual(mapping, {0: 'A-101.pdf'})
+
+    def test_nom_ambigu_exclu(self):
+        # Deux feuilles attendues sous le même nom : aucune n'est associée.
+        mapping = build_rename_map(['A-101.pdf'], {0: 'A-101', 1: 'a-101'}, 'pdf')
+        self.assertEqual(mapping, {})
+
+    def test_normalize_stem(self):
+        self.assertEqual(normalize_stem('  A:101  '), 'a_101')
+        self.assertEqual(normalize_stem(None), '')
+
+
+class TestBuildRenameMapByParts(unittest.TestCase):
+    def test_noms_dwg_revit(self):
+        files = [
+            'export-Feuille - A101 - Plan RDC.dwg',
+            'export-Feuille - A102 - Plan R+1.dwg',
+            'export-Feuille - A101 - Plan RDC-Image1.png',
+        ]
+        mapping = build_rename_map_by_parts(files, {0: 'A101', 1: 'A102'}, 'dwg', prefix='export')
+        self.assertEqual(mapping, {
+            0: 'export-Feuille - A101 - Plan RDC.dwg',
+            1: 'export-Feuille - A102 - Plan R+1.dwg',
+        })
+
+    def test_numero_present_dans_deux_fichiers_exclu(self):
+        # "A101" est à la fois numéro d'une feuille et nom d'une autre.
+        files = ['export-Feuille - A101 - Plan.dwg', 'export-Feuille - A102 - A101.dwg']
+        mapping = build_rename_map_by_parts(files, {0: 'A101', 1: 'A102'}, 'dwg', prefix='export')
+        self.assertEqual(mapping, {1: 'export-Feuille - A102 - A101.dwg'})
+
+    def test_fichier_revendique_par_deux_cles_exclu(self):
+        files = ['export-Feuille - A101 - A102.dwg']
+        mapping = build_rename_map_by_parts(files, {0: 'A101', 1: 'A102'}, 'dwg', prefix='export')
+        self.assertEqual(mapping, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
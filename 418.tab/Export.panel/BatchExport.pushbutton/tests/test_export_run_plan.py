@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.DocumentSheetIndex import DocumentSheetIndex
+from lib.services.core.ExportRunPlan import ExportItem, ExportRunPlan, PLAN_FILE_NAME
+from lib.services.core.ExportOrchestrator import ExportOrchestrator, ExportPlan
+from lib.services.NamingService import NamingService
+from lib.data.sheets.ParameterSnapshot import SESSION_SNAPSHOT
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeCollection(object):
+    def __init__(self, cid, name):
+        self.Id = FakeId(cid)
+        self.Name = name
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero, collection_id, nom='Plan'):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = nom
+        self.SheetCollectionId = FakeId(collection_id)
+
+
+class FakePatternStore(object):
+    def __init__(self, sheet_rows):
+        self.sheet_rows = sheet_rows
+
+    def load(self, kind):
+        return '', (self.sheet_rows if kind == 'sheet' else [])
+
+
+def _item(key, path, **kw):
+    coll, _num, fmt = key.split('|')
+    return ExportItem(key, coll, fmt, path, **kw)
+
+
+class TestExportRunPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418plan_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_aller_retour_json(self):
+        plan = ExportRunPlan([_item('Jeu|A101|pdf', 'D:/out/A101.pdf', sheet_id=11, sheet_number='A101'),
+                              _item('Jeu|*|pdf', 'D:/out/Jeu.pdf', group='Jeu', members=[11, 12])],
+                             mode='auto', doc='Projet')
+        data = json.loads(plan.to_json())
+        self.assertEqual(data['info']['doc'], 'Projet')
+        relu = ExportRunPlan.from_dict(data)
+        self.assertEqual([it.to_dict() for it in relu], [it.to_dict() for it in plan])
+        self.assertTrue(relu.items[1].is_group)
+        self.assertTrue(relu.diff(plan).is_empty)
+
+    def test_sauvegarde_dans_le_dossier_de_donnees(self):
+        self.assertEqual(ExportRunPlan.default_path(),
+                         os.path.join(os.environ['PY418_CONFIG_DIR'], PLAN_FILE_NAME))
+        path = os.path.join(self.tmp, 'plan.json')
+        self.assertIsNone(ExportRunPlan.load(path))
+        self.assertTrue(ExportRunPlan([_item('Jeu|A101|dwg', 'x.dwg')]).save(path))
+        self.assertEqual(ExportRunPlan.load(path).items[0].key, 'Jeu|A101|dwg')
+
+    def test_plan_illisible_equivaut_a_absent(self):
+        path = os.path.join(self.tmp, 'plan.json')
+        with io.open(path, 'w', encoding='utf-8') as fh:
+            fh.write('{tronqué')
+        self.assertIsNone(ExportRunPlan.load(path))
+
+    def test_diff_ajouts_suppressions_modifications(self):
+        avant = ExportRunPlan([_item('Jeu|A101|pdf', 'out/A101.pdf'),
+                               _item('Jeu|A102|pdf', 'out/A102.pdf'),
+                               _item('Jeu|*|pdf', 'out/Jeu.pdf', group='Jeu', members=[1, 2])])
+        apres = ExportRunPlan([_item('Jeu|A101|pdf', 'out/A101 - Indice B.pdf'),
+                               _item('Jeu|A103|pdf', 'out/A103.pdf'),
+                               _item('Jeu|*|pdf', 'out/Jeu.pdf', group='Jeu', members=[1, 3])])
+        diff = apres.diff(avant)
+        self.assertEqual([it.key for it in diff.added], ['Jeu|A103|pdf'])
+        self.assertEqual([it.key for it in diff.removed], ['Jeu|A102|pdf'])
+        self.assertEqual([new.key for _old, new in diff.changed], ['Jeu|A101|pdf', 'Jeu|*|pdf'])
+        lines = diff.summary_lines()
+        self.assertIn('+ out/A103.pdf', lines)
+        self.assertIn('- out/A102.pdf', lines)
+        self.assertIn('~ out/A101.pdf -> out/A101 - Indice B.pdf', lines)
+
+    def test_diff_sans_plan_precedent(self):
+        plan = ExportRunPlan([_item('Jeu|A101|pdf', 'a.pdf')])
+        self.assertEqual(len(plan.diff(None).added), 1)
+
+    def test_filtrage_par_collection_format_groupe(self):
+        plan = ExportRunPlan([_item('A|1|pdf', '1.pdf'), _item('A|*|pdf', 'A.pdf', group='A'),
+                              _item('A|1|dwg', '1.dwg'), _item('B|2|pdf', '2.pdf')])
+        self.assertEqual(plan.collections(), ['A', 'B'])
+        self.assertEqual([it.path for it in plan.items_for('A', 'pdf', group=False)], ['1.pdf'])
+        self.assertEqual([it.path for it in plan.items_for('A', 'pdf', group=True)], ['A.pdf'])
+        self.assertEqual([it.path for it in plan.items_for('A')], ['1.pdf', 'A.pdf', '1.dwg'])
+
+
+class TestOrchestratorPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418plan_')
+        self.orch = ExportOrchestrator()
+        coll_a = FakeCollection(1, 'Jeu A')
+        coll_b = FakeCollection(2, 'Jeu B')
+        self.sheets = [FakeSheet(12, 'A102', 1), FakeSheet(11, 'A101', 1), FakeSheet(21, 'B201', 2)]
+        self.orch._index = DocumentSheetIndex.from_elements([coll_a, coll_b], self.sheets)
+        self.orch._destination_override = self.tmp
+        self.orch._listing = self.orch._new_listing()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_plan_detaille_par_feuille_carnet_et_dwg(self):
+        plans = [ExportPlan('Jeu A', True, True, True, True),
+                 ExportPlan('Jeu B', True, False, False, True),
+                 ExportPlan('Ignoré', False, True, True, True)]
+        plan = self.orch.build_export_plan(None, plans)
+        self.assertEqual([it.key for it in plan], [
+            'Jeu A|A101|pdf', 'Jeu A|A102|pdf', 'Jeu A|A101|dwg', 'Jeu A|A102|dwg', 'Jeu B|*|pdf'])
+        first = plan.items[0]
+        self.assertEqual(first.path, os.path.join(self.tmp, 'A101_Plan.pdf'))
+        self.assertEqual(first.sheet_id, 11)
+        self.assertIs(first.sheet, self.sheets[1])
+        carnet = plan.items[-1]
+        self.assertEqual(carnet.group, 'Jeu B')
+        self.assertEqual(carnet.members, [21])
+
+    def test_fichiers_existants_et_chemins_uniques(self):
+        with open(os.path.join(self.tmp, 'A101_Plan.pdf'), 'wb') as fh:
+            fh.write(b'%PDF')
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu A', True, True, False, True)])
+        self.assertEqual([it.exists for it in plan], [True, False])
+        self.orch._assign_plan_paths(plan, overwrite=False)
+        self.assertEqual(plan.items[0].file_name, 'A101_Plan (1).pdf')
+        self.assertEqual(plan.items[1].file_name, 'A102_Plan.pdf')
+
+    def test_noms_resolus_par_lot_avec_avertissements(self):
+        SESSION_SNAPSHOT.invalidate()
+        self.orch._nstore = FakePatternStore([{'Name': 'Name', 'Prefix': '', 'Suffix': ''}])
+        self.orch._namer = NamingService(None, config=None)
+        batches = []
+        resolve = self.orch._resolve_sheet_names
+        self.orch._resolve_sheet_names = lambda sheets: batches.append(len(sheets)) or resolve(sheets)
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu A', True, True, True, True)])
+        self.assertEqual(batches, [2])  # une résolution par jeu, partagée PDF / DWG
+        self.assertEqual(plan.info['naming_warnings'], ['Jeu A : "Plan" produit par A101, A102'])
+        # Collisions levées dès le plan (stratégie par défaut : " (n)").
+        self.assertEqual([it.file_name for it in plan], ['Plan.pdf', 'Plan (1).pdf', 'Plan.dwg', 'Plan (1).dwg'])
+        self.assertEqual(plan.info['collisions'], ['"Plan.pdf" (Jeu A) : A101, A102',
+                                                   '"Plan.dwg" (Jeu A) : A101, A102'])
+
+    def test_plan_execute_tel_quel_sans_nouvelle_resolution(self):
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu A', True, True, True, False)])
+        self.orch._assign_plan_paths(plan, overwrite=True)
+        calls = []
+        self.orch._resolve_name_no_ext = lambda *a: calls.append(a) or 'autre'
+        results = self.orch._export_plan_items(None, plan.items, self.orch._export_dwg_sheets, None)
+        self.assertEqual(calls, [])
+        self.assertEqual([p for _sh, _ok, p in results], [it.path for it in plan])
+
+    def test_dry_run_n_ecrit_rien(self):
+        dest = os.path.join(self.tmp, 'nouveau')
+        plan = self.orch.dry_run(None, lambda name: None, destination=dest)
+        self.assertEqual(len(plan), 0)
+        self.assertFalse(os.path.exists(dest))
+        self.assertFalse(os.path.exists(ExportRunPlan.default_path()))
+
+
+if __name__ == '__main__':
+    unittest.main()
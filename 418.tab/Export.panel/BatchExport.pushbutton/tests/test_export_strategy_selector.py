@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.ExportStrategySelector import (ExportStrategySelector, revit_version,
+                                                      EXPORT_3, EXPORT_4, PRINT)
+
+
+class FakeApplication(object):
+    VersionNumber = '2024'
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+    Application = FakeApplication()
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = 'Plan'
+
+
+class FakePdfService(object):
+    def __init__(self, setup):
+        self.setup = setup
+
+    def get_saved_setup(self):
+        return self.setup
+
+
+class ProbingOrchestrator(ExportOrchestrator):
+    """Chemins d'export simulés : `working` = stratégies qui aboutissent ;
+    chaque tentative est notée dans `calls`."""
+
+    def __init__(self, selector, working, setup=u'A3'):
+        super(ProbingOrchestrator, self).__init__(strategy_selector=selector)
+        self._pdf = FakePdfService(setup)
+        self.working = set(working)
+        self.calls = []
+
+    def _pdf_strategy(self, strategy, doc, sheet, views, folder, file_no_ext, path, options, item, label, _log):
+        self.calls.append(strategy)
+        return strategy in self.working
+
+
+class TestExportStrategySelector(unittest.TestCase):
+    def test_ordre_par_defaut_puis_strategie_retenue(self):
+        selector = ExportStrategySelector()
+        key = ExportStrategySelector.key('2024', 'A3')
+        self.assertEqual(selector.order(key), [EXPORT_3, EXPORT_4, PRINT])
+        selector.succeeded(key, PRINT)
+        self.assertEqual(selector.order(key), [PRINT, EXPORT_3, EXPORT_4])
+        self.assertEqual(selector.order(ExportStrategySelector.key('2024', 'A1')), [EXPORT_3, EXPORT_4, PRINT])
+
+    def test_echec_de_la_strategie_retenue_relance_la_negociation(self):
+        selector = ExportStrategySelector()
+        key = ExportStrategySelector.key('2024', 'A3')
+        selector.succeeded(key, EXPORT_4)
+        selector.failed(key, EXPORT_3)  # autre chemin : sans effet
+        self.assertEqual(selector.preferred(key), EXPORT_4)
+        selector.failed(key, EXPORT_4)
+        self.assertIsNone(selector.preferred(key))
+
+    def test_version_de_revit(self):
+        self.assertEqual(revit_version(FakeDoc()), '2024')
+        self.assertEqual(revit_version(None), '')
+
+
+class TestOrchestratorStrategies(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418strategy_')
+        self.selector = ExportStrategySelector()
+        self.sheets = [FakeSheet(n, 'A10{}'.format(n)) for n in range(1, 4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _export(self, orch, sheet):
+        return orch._export_pdf_sheet(FakeDoc(), sheet, [], self.tmp, None,
+                                      path=os.path.join(self.tmp, sheet.SheetNumber + '.pdf'))
+
+    def test_negociation_une_seule_fois_par_session(self):
+        orch = ProbingOrchestrator(self.selector, working=[PRINT])
+        for sheet in self.sheets:
+            self.assertTrue(self._export(orch, sheet)[0])
+        self.assertEqual(orch.calls, [EXPORT_3, EXPORT_4, PRINT, PRINT, PRINT])
+        # Nouvel orchestrateur, même session : chemin déjà connu.
+        other = ProbingOrchestrator(self.selector, working=[PRINT])
+        self._export(other, self.sheets[0])
+        self.assertEqual(other.calls, [PRINT])
+        self.assertEqual(self.selector.probes, 1)
+
+    def test_renegociation_apres_echec(self):
+        orch = ProbingOrchestrator(self.selector, working=[EXPORT_4])
+        self._export(orch, self.sheets[0])
+        orch.working = set([EXPORT_3])
+        self.assertTrue(self._export(orch, self.sheets[1])[0])
+        self._export(orch, self.sheets[2])
+        self.assertEqual(orch.calls, [EXPORT_3, EXPORT_4, EXPORT_4, EXPORT_3, EXPORT_3])
+
+    def test_cle_par_setup(self):
+        orch = ProbingOrchestrator(self.selector, working=[PRINT])
+        self._export(orch, self.sheets[0])
+        other = ProbingOrchestrator(self.selector, working=[PRINT], setup=u'A1')
+        self._export(other, self.sheets[1])
+        self.assertEqual(other.calls, [EXPORT_3, EXPORT_4, PRINT])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportTrace import ExportTrace, NULL_ITEM, TRACE_FILE_NAME, percentile
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def tick(self, seconds):
+        self.now += seconds
+
+
+class TestPercentile(unittest.TestCase):
+    def test_liste_vide(self):
+        self.assertIsNone(percentile([], 50))
+
+    def test_rang_le_plus_proche(self):
+        vals = list(range(1, 21))
+        self.assertEqual(percentile(vals, 50), 10)
+        self.assertEqual(percentile(vals, 95), 19)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+
+class TestExportTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418trace_')
+        self.path = os.path.join(self.tmp, 'trace.jsonl')
+        self.clock = FakeClock()
+        self.trace = ExportTrace(self.path, clock=self.clock, run_id='r1')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _lines(self):
+        with io.open(self.path, 'r', encoding='utf-8') as fh:
+            return [json.loads(l) for l in fh if l.strip()]
+
+    def test_etapes_cumulees_et_total(self):
+        item = self.trace.item('PDF', 'A101')
+        with item.stage('resolve'):
+            self.clock.tick(0.5)
+        with item.stage('export'):
+            self.clock.tick(2.0)
+        item.start('export')
+        self.clock.tick(1.0)
+        item.stop('export')
+        item.finish()
+        rec = self._lines()[-1]
+        self.assertEqual(rec['type'], 'item')
+        self.assertEqual(rec['fmt'], 'pdf')
+        self.assertEqual(rec['item'], 'A101')
+        self.assertEqual(rec['stages'], {'resolve': 0.5, 'export': 3.0})
+        self.assertEqual(rec['total'], 3.5)
+        self.assertEqual(rec['status'], 'ok')
+
+    def test_taille_des_fichiers_produits(self):
+        out = os.path.join(self.tmp, 'A101.pdf')
+        with open(out, 'wb') as fh:
+            fh.write(b'x' * 42)
+        item = self.trace.item('pdf', 'A101')
+        item.finish([out, os.path.join(self.tmp, 'absent.pdf')])
+        rec = self._lines()[-1]
+        self.assertEqual(rec['size'], 42)
+        self.assertEqual(rec['count'], 2)
+
+    def test_fichiers_et_annotations(self):
+        item = self.trace.item('pdf', 'A101')
+        item.note('revit', True)
+        item.finish(os.path.join(self.tmp, 'A101.pdf'))
+        rec = self._lines()[-1]
+        self.assertEqual(rec['paths'], [os.path.join(self.tmp, 'A101.pdf')])
+        self.assertEqual(rec['revit'], 'True')
+
+    def test_finish_idempotent(self):
+        item = self.trace.item('dwg', 'A1')
+        item.finish()
+        item.finish(status='error')
+        self.assertEqual(len(self.trace.records), 1)
+        self.assertEqual(self.trace.records[0]['status'], 'ok')
+
+    def test_resume_p50_p95_par_format(self):
+        for secs in (1.0, 2.0, 3.0, 4.0):
+            item = self.trace.item('pdf', 'f')
+            with item.stage('export'):
+                self.clock.tick(secs)
+            item.finish()
+        item = self.trace.item('dwg', 'd')
+        with item.stage('move'):
+            self.clock.tick(0.25)
+        item.finish()
+        summary = self.trace.summary()
+        self.assertEqual(summary['pdf']['export'], {'n': 4, 'p50': 2.0, 'p95': 4.0})
+        self.assertEqual(summary['dwg']['move']['p50'], 0.25)
+        self.assertIn('total', summary['pdf'])
+        lines = self.trace.summary_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('Trace DWG'))
+
+    def test_close_ecrit_elements_ouverts_et_resume(self):
+        done = self.trace.item('pdf', 'fini')
+        done.finish()
+        self.trace.item('dwg', 'en cours')
+        self.trace.close()
+        lines = self._lines()
+        self.assertEqual(lines[0], {'type': 'run', 'run_id': 'r1'})
+        statuses = dict((l['item'], l['status']) for l in lines if l['type'] == 'item')
+        self.assertEqual(statuses, {'fini': 'ok', 'en cours': 'incomplete'})
+        self.assertEqual(lines[-1]['type'], 'summary')
+        self.assertIn('dwg', lines[-1]['stages'])
+
+    def test_nouveau_run_reecrit_le_fichier(self):
+        self.trace.item('pdf', 'ancien').finish()
+        ExportTrace(self.path, clock=self.clock, run_id='r2')
+        self.assertEqual(self._lines(), [{'type': 'run', 'run_id': 'r2'}])
+
+    def test_dossier_par_defaut(self):
+        trace = ExportTrace(run_id='x')
+        self.assertEqual(trace.path, os.path.join(os.environ['PY418_CONFIG_DIR'], TRACE_FILE_NAME))
+        self.assertTrue(os.path.isfile(trace.path))
+
+    def test_element_inerte(self):
+        with NULL_ITEM.stage('export'):
+            pass
+        NULL_ITEM.start('move')
+        NULL_ITEM.stop('move')
+        NULL_ITEM.finish(['x'])
+
+
+if __name__ == '__main__':
+    unittest.main()
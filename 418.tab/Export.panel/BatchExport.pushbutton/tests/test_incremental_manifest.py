@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.IncrementalManifest import (
+    IncrementalManifest, MANIFEST_FILE_NAME, carnet_fingerprint, sheet_fingerprint,
+)
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeParam(object):
+    def __init__(self, value):
+        self._value = value
+
+    def AsString(self):
+        return self._value
+
+
+class FakeSheet(object):
+    def __init__(self, revisions=(1,), current=1, views=(100, 101), params=None):
+        self._revisions = [FakeId(r) for r in revisions]
+        self._current = FakeId(current)
+        self._views = [FakeId(v) for v in views]
+        self._params = params or {}
+
+    def GetAllRevisionIds(self):
+        return self._revisions
+
+    def GetCurrentRevision(self):
+        return self._current
+
+    def GetAllPlacedViews(self):
+        return self._views
+
+    def LookupParameter(self, name):
+        return FakeParam(self._params[name]) if name in self._params else None
+
+
+ROWS = [{'Name': 'Indice', 'Prefix': '', 'Suffix': ''}]
+
+
+class TestSheetFingerprint(unittest.TestCase):
+    def test_stable_pour_meme_contenu(self):
+        a = sheet_fingerprint(FakeSheet(params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup')
+        b = sheet_fingerprint(FakeSheet(params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup')
+        self.assertEqual(a, b)
+
+    def test_change_avec_chaque_composant(self):
+        base = sheet_fingerprint(FakeSheet(params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup')
+        variantes = [
+            sheet_fingerprint(FakeSheet(params={'Indice': 'B'}), 'A102.pdf', ROWS, 'Setup'),
+            sheet_fingerprint(FakeSheet(revisions=(1, 2), params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup'),
+            sheet_fingerprint(FakeSheet(current=2, params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup'),
+            sheet_fingerprint(FakeSheet(params={'Indice': 'C'}), 'A101.pdf', ROWS, 'Setup'),
+            sheet_fingerprint(FakeSheet(params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Autre'),
+            sheet_fingerprint(FakeSheet(views=(100,), params={'Indice': 'B'}), 'A101.pdf', ROWS, 'Setup'),
+        ]
+        for fp in variantes:
+            self.assertNotEqual(fp, base)
+
+    def test_carnet_change_si_un_membre_change(self):
+        a = carnet_fingerprint('Carnet.pdf', ['x', 'y'], 'Setup')
+        self.assertEqual(a, carnet_fingerprint('Carnet.pdf', ['x', 'y'], 'Setup'))
+        self.assertNotEqual(a, carnet_fingerprint('Carnet.pdf', ['x', 'z'], 'Setup'))
+
+
+class TestIncrementalManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418manifest_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _write(self, name, content=b'%PDF-1.7'):
+        with open(os.path.join(self.tmp, name), 'wb') as fh:
+            fh.write(content)
+
+    def test_round_trip_et_inchange(self):
+        self._write('A101.pdf')
+        m = IncrementalManifest(self.tmp)
+        m.record('A101.pdf', 'fp1')
+        m.save()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, MANIFEST_FILE_NAME)))
+        m2 = IncrementalManifest(self.tmp)
+        self.assertTrue(m2.is_unchanged('A101.pdf', 'fp1'))
+        self.assertFalse(m2.is_unchanged('A101.pdf', 'fp2'))
+
+    def test_fichier_supprime_ou_modifie_a_refaire(self):
+        self._write('A101.pdf')
+        m = IncrementalManifest(self.tmp)
+        m.record('A101.pdf', 'fp1')
+        self._write('A101.pdf', b'%PDF-1.7 plus long')
+        self.assertFalse(m.is_unchanged('A101.pdf', 'fp1'))
+        os.remove(os.path.join(self.tmp, 'A101.pdf'))
+        self.assertFalse(m.is_unchanged('A101.pdf', 'fp1'))
+
+    def test_manifeste_illisible_equivaut_a_vide(self):
+        self._write(MANIFEST_FILE_NAME, b'{pas du json')
+        self._write('A101.pdf')
+        self.assertFalse(IncrementalManifest(self.tmp).is_unchanged('A101.pdf', 'fp1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
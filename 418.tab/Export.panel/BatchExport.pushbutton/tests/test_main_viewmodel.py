@@ -1223,6 +1223,65 @@ class TestMainViewModelCombinerPdf(unittest.TestCase):
         self.assertTrue(self.vm.CombinerPdf)
 
 
+class TestMainViewModelExportIncremental(unittest.TestCase):
+    """Mode par jeu : interrupteur « Incrémental » (UI + persistance)."""
+
+    def setUp(self):
+        self.cfg = FakeConfig()
+        self.vm = MainViewModel(doc=None, config=self.cfg)
+
+    def test_defaut_desactive(self):
+        self.assertFalse(self.vm.ExportIncremental)
+
+    def test_round_trip(self):
+        self.vm.ExportIncremental = True
+        self.assertTrue(self.vm.ExportIncremental)
+        self.assertEqual(self.cfg.get('incremental_export'), u'1')
+        self.vm.ExportIncremental = False
+        self.assertEqual(self.cfg.get('incremental_export'), u'0')
+
+
+class TestMainViewModelCarnetAvecFeuilles(unittest.TestCase):
+    """Mode par jeu : interrupteur « Carnet + feuilles » (UI + persistance)."""
+
+    def setUp(self):
+        self.cfg = FakeConfig()
+        self.vm = MainViewModel(doc=None, config=self.cfg)
+
+    def test_defaut_desactive(self):
+        self.assertFalse(self.vm.CarnetAvecFeuilles)
+
+    def test_round_trip(self):
+        self.vm.CarnetAvecFeuilles = True
+        self.assertTrue(self.vm.CarnetAvecFeuilles)
+        self.assertEqual(self.cfg.get('pdf_carnet_sheets'), u'1')
+        self.vm.CarnetAvecFeuilles = False
+        self.assertEqual(self.cfg.get('pdf_carnet_sheets'), u'0')
+
+
+class TestMainViewModelZipDiffusion(unittest.TestCase):
+    """Interrupteur « ZIP de diffusion » et portée transmise à l'orchestrateur."""
+
+    def setUp(self):
+        self.cfg = FakeConfig()
+        self.vm = MainViewModel(doc=None, config=self.cfg)
+
+    def test_defaut_desactive(self):
+        self.assertFalse(self.vm.ZipDiffusion)
+        self.assertFalse(self.vm._transmittal_option())
+
+    def test_portee_par_jeu_par_defaut(self):
+        self.vm.ZipDiffusion = True
+        self.assertEqual(self.cfg.get('transmittal_zip'), u'1')
+        self.assertEqual(self.vm._transmittal_option(), u'collection')
+        self.assertEqual(self.vm._transmittal_option(manual=True), u'run')
+
+    def test_portee_run_depuis_la_config(self):
+        self.vm.ZipDiffusion = True
+        self.cfg.set('transmittal_scope', u'run')
+        self.assertEqual(self.vm._transmittal_option(), u'run')
+
+
 class TestMainViewModelLancerExportManuel(unittest.TestCase):
     """`lancer_export_manuel()` : chemins hors Revit (doc=None, sélection vide,
     orchestrateur indisponible). Ne doit jamais lever.
@@ -1480,22 +1539,67 @@ class TestExportDoneCallback(unittest.TestCase):
         vm.lancer_export_manuel()
         self.assertEqual(len(calls), 0)
 
-    def test_callback_appele_apres_export_manuel_avec_doc_factice(self):
+    def _run_with(self, ok, records=None, manifest=True):
+        """Export manuel avec un orchestrateur factice : `run_manual`
+        retourne `ok`, manifeste vérifié avec `records` [(statut, check)]."""
         calls = []
-        dest_svc = FakeDestinationService(u'C:/Test/Export')
+        self.dest = _tf.mkdtemp(prefix='418test_')
+        dest = self.dest
+
+        class OrchestrateurFactice(object):
+            def __init__(self):
+                self._dest = object()
+                self.last_manifest = None
+
+            def run_manual(self, *a, **kw):
+                if manifest:
+                    from lib.services.core.ExportManifest import ExportManifest
+                    m = ExportManifest(path=os.path.join(dest, u'outputs.json'))
+                    for n, (status, check) in enumerate(records or []):
+                        m.record(u'k{}'.format(n), status, path=u'F{}.pdf'.format(n), check=check)
+                    self.last_manifest = m
+                return ok
+
         vm = MainViewModel(
             doc=object(),
             sheet_service=FakeSheetService(),
             naming_service=FakeNamingService(),
-            destination_service=dest_svc,
+            destination_service=FakeDestinationService(os.path.join(dest, u'Export')),
             config=FakeConfig(),
         )
         vm._on_export_done_cb = lambda dest: calls.append(dest)
-        svm = ManualSheetVM(u'01', u'Feuille 1', export_pdf=True, export_dwg=False)
-        vm._sheets_manuel = [svm]
-        vm.lancer_export_manuel()
+        vm._sheets_manuel = [ManualSheetVM(u'01', u'Feuille 1', export_pdf=True)]
+
+        import lib.services.core.ExportOrchestrator as _eo_mod
+        _orig = _eo_mod.ExportOrchestrator
+        _eo_mod.ExportOrchestrator = OrchestrateurFactice
+        try:
+            vm.lancer_export_manuel()
+        finally:
+            _eo_mod.ExportOrchestrator = _orig
+        return vm, calls
+
+    def test_callback_appele_apres_export_manuel_reussi(self):
+        vm, calls = self._run_with(True, [(u'ok', u'ok')])
+        self.assertEqual(calls, [os.path.join(self.dest, u'Export')])
+        self.assertEqual(vm.AnomaliesExport, [])
+
+    def test_callback_non_appele_si_run_abandonne(self):
+        # Retour False (ex. abandon au pré-contrôle d'espace disque) : pas
+        # d'écran « Export terminé ».
+        vm, calls = self._run_with(False, manifest=False)
+        self.assertEqual(calls, [])
+        self.assertIn(u'interrompu', vm.StatusText)
+
+    def test_callback_non_appele_si_rien_exporte(self):
+        vm, calls = self._run_with(True, [])
+        self.assertEqual(calls, [])
+        self.assertIn(u'Aucun fichier', vm.StatusText)
+
+    def test_ecran_anomalies_si_echecs_au_manifeste(self):
+        vm, calls = self._run_with(False, [(u'ok', u'ok'), (u'error', None)])
         self.assertEqual(len(calls), 1)
-        self.assertEqual(calls[0], u'C:/Test/Export')
+        self.assertEqual(vm.AnomaliesExport, [u'F1.pdf : export en échec'])
 
     def test_status_text_vide_apres_export_manuel_reussi(self):
         dest_svc = FakeDestinationService(u'C:/Test')
@@ -1549,5 +1653,210 @@ class TestExportDoneCallback(unittest.TestCase):
         self.assertIn(u'erreur', vm.StatusText.lower())
 
 
+class TestMainViewModelAnomaliesExport(unittest.TestCase):
+    """Anomalies du manifeste vérifié, relevées pour l'écran de fin d'export."""
+
+    def test_aucune_par_defaut(self):
+        self.assertEqual(MainViewModel(doc=None).AnomaliesExport, [])
+
+    def test_relevees_depuis_le_manifeste(self):
+        class FakeManifest(object):
+            def failure_lines(self, limit=None):
+                return [u'A101.pdf : vide']
+
+        class FakeOrch(object):
+            last_manifest = FakeManifest()
+
+        vm = MainViewModel(doc=None)
+        vm._collect_export_issues(FakeOrch())
+        self.assertEqual(vm.AnomaliesExport, [u'A101.pdf : vide'])
+        vm._collect_export_issues(object())  # orchestrateur sans manifeste
+        self.assertEqual(vm.AnomaliesExport, [])
+
+    def test_export_manuel_hors_revit_signale_l_echec(self):
+        vm = MainViewModel(
+            doc=object(),
+            sheet_service=FakeSheetService(),
+            naming_service=FakeNamingService(),
+            destination_service=FakeDestinationService(_tf.mkdtemp(prefix='418test_')),
+            config=FakeConfig(),
+        )
+        class FakeElem(object):
+            SheetNumber = u'01'
+            Name = u'Feuille 1'
+
+        vm._sheets_manuel = [ManualSheetVM(u'01', u'Feuille 1', elem=FakeElem(), export_pdf=True)]
+        vm.lancer_export_manuel()
+        # Hors Revit, aucun PDF n'est produit : l'écran de fin doit le dire.
+        self.assertTrue(any(u'échec' in line for line in vm.AnomaliesExport))
+
+
+
+class TestMainViewModelFileMultiDocuments(unittest.TestCase):
+    """`exporter_maquettes` : file MultiDocumentExportRunner sur le profil actif."""
+
+    def setUp(self):
+        import lib.services.ConfigManagerService as _cm_mod
+        import lib.services.core.MultiDocumentExportRunner as _md_mod
+        self.runs = []
+        self.active = u'Vendredi'
+        test = self
+
+        class FakeManager(object):
+            def get_active_profile_key(self):
+                return test.active
+
+        class FakeRunner(object):
+            def __init__(self, provider, config_manager=None):
+                pass
+
+            def run(self, paths, profile, destination, **kw):
+                test.runs.append((paths, profile, destination, test.vm.ExporterMaquettesCommand.CanExecute(None)))
+                report = _md_mod.MultiDocumentReport(profile, destination)
+                for path in paths:
+                    res = _md_mod.DocumentExportResult(path, destination)
+                    res.status = u'ok' if u'ARC' in path else u'error'
+                    res.error = None if res.status == u'ok' else u'export interrompu'
+                    report.results.append(res)
+                return report
+
+        class FakeDoc(object):
+            Application = object()
+
+        self._patches = [(_cm_mod, 'ConfigManagerService', FakeManager),
+                         (_md_mod, 'MultiDocumentExportRunner', FakeRunner)]
+        self._orig = [getattr(mod, name) for mod, name, _v in self._patches]
+        for mod, name, value in self._patches:
+            setattr(mod, name, value)
+        self.vm = MainViewModel(
+            doc=FakeDoc(),
+            sheet_service=FakeSheetService(),
+            naming_service=FakeNamingService(),
+            destination_service=FakeDestinationService(_tf.mkdtemp(prefix='418test_')),
+            config=FakeConfig(),
+        )
+        self.done = []
+        self.vm._on_export_done_cb = self.done.append
+        self.vm._pick_models = lambda: [u'C:/Modeles/ARC.rvt', u'C:/Modeles/CVC.rvt']
+
+    def tearDown(self):
+        for (mod, name, _v), orig in zip(self._patches, self._orig):
+            setattr(mod, name, orig)
+
+    def test_file_sur_le_profil_actif_et_anomalies_par_document(self):
+        self.assertTrue(self.vm.ExporterMaquettesCommand.CanExecute(None))
+        self.vm.ExporterMaquettesCommand.Execute(None)
+        self.assertEqual(self.runs, [([u'C:/Modeles/ARC.rvt', u'C:/Modeles/CVC.rvt'], u'Vendredi',
+                                      self.vm.DestinationPath, False)])
+        self.assertEqual(self.done, [self.vm.DestinationPath])
+        self.assertEqual(self.vm.AnomaliesExport, [u'CVC.rvt : export interrompu'])
+        self.assertFalse(self.vm.ExportEnCours)
+
+    def test_sans_profil_actif_rien_n_est_lance(self):
+        self.active = u''
+        self.vm.exporter_maquettes()
+        self.assertEqual(self.runs, [])
+        self.assertIn(u'profil', self.vm.StatusText)
+
+    def test_selection_annulee_rien_n_est_lance(self):
+        self.vm._pick_models = lambda: None
+        self.vm.exporter_maquettes()
+        self.assertEqual((self.runs, self.done), ([], []))
+
+
+
+class TestMainViewModelApercuExport(unittest.TestCase):
+    """`ApercuExportCommand` : dry-run, lignes du plan, modale de la vue."""
+
+    def setUp(self):
+        from lib.services.core.ExportRunPlan import ExportItem, ExportRunPlan
+        import lib.services.core.ExportOrchestrator as _eo_mod
+        plan = ExportRunPlan([
+            ExportItem(u'J|A101|pdf', u'J', u'pdf', u'D:/Exports/A101.pdf', sheet_number=u'A101'),
+            ExportItem(u'J|A101b|pdf', u'J', u'pdf', u'D:/Exports/A101 (1).pdf', sheet_number=u'A101',
+                       exists=True),
+        ], collisions=[u'"A101.pdf" (J) : A101, A101'], collision_strategy=u'index')
+
+        class OrchestrateurApercu(object):
+            def dry_run(self, *a, **kw):
+                return plan
+
+        self._eo_mod, self._orig = _eo_mod, _eo_mod.ExportOrchestrator
+        _eo_mod.ExportOrchestrator = OrchestrateurApercu
+        self.vm = MainViewModel(
+            doc=object(),
+            sheet_service=FakeSheetService(),
+            naming_service=FakeNamingService(),
+            destination_service=FakeDestinationService(_tf.mkdtemp(prefix='418test_')),
+            config=FakeConfig(),
+        )
+        self.shown = []
+        self.vm._on_apercu_cb = self.shown.append
+
+    def tearDown(self):
+        self._eo_mod.ExportOrchestrator = self._orig
+
+    def test_commande_ouvre_la_modale_avec_les_lignes_du_plan(self):
+        self.vm.ApercuExportCommand.Execute(None)
+        self.assertEqual(self.shown, [self.vm.DestinationPath])
+        lines = self.vm.ApercuExport
+        self.assertEqual(lines[:2], [u'[PDF] D:/Exports/A101.pdf', u'[PDF] D:/Exports/A101 (1).pdf (existe)'])
+        self.assertIn(u'Collisions de noms : 1 (levées, stratégie « index »)', lines)
+        self.assertEqual(self.vm.StatusText, u'Aperçu : 2 fichier(s), 1 existant(s).')
+
+    def test_commande_desactivee_pendant_un_export(self):
+        token = self.vm._begin_export()
+        self.assertFalse(self.vm.ApercuExportCommand.CanExecute(None))
+        self.vm.ouvrir_apercu()
+        self.assertEqual(self.shown, [])
+        self.vm._end_export(token)
+        self.assertTrue(self.vm.ApercuExportCommand.CanExecute(None))
+
+    def test_pas_de_modale_hors_revit(self):
+        self.vm._doc = None
+        self.vm.ouvrir_apercu()
+        self.assertEqual((self.shown, self.vm.ApercuExport), ([], []))
+
+
+
+class TestMainViewModelEntretienCache(unittest.TestCase):
+    """`EntretienCacheCommand` (page Paramètres) : bilan dans `BilanCacheRendu`."""
+
+    def setUp(self):
+        import lib.services.core.RenderCache as _rc_mod
+        self.calls = []
+        test = self
+
+        class FakeRenderCache(object):
+            def maintenance(self):
+                test.calls.append(1)
+                return [u'Cache de rendu : 3 blob(s) vérifié(s)', u'Cache de rendu : 1 fichier(s) supprimé(s)']
+
+        self._rc_mod, self._orig = _rc_mod, _rc_mod.RenderCache
+        _rc_mod.RenderCache = FakeRenderCache
+
+    def tearDown(self):
+        self._rc_mod.RenderCache = self._orig
+
+    def test_commande_lance_l_entretien_et_publie_le_bilan(self):
+        vm = MainViewModel(doc=None)
+        self.assertEqual(vm.BilanCacheRendu, u'')
+        notified = []
+        vm.notify_property = lambda name: notified.append(name)
+        vm.EntretienCacheCommand.Execute(None)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(vm.BilanCacheRendu.splitlines()[1], u'Cache de rendu : 1 fichier(s) supprimé(s)')
+        self.assertIn(u'BilanCacheRendu', notified)
+
+    def test_commande_desactivee_pendant_un_export(self):
+        vm = MainViewModel(doc=None)
+        token = vm._begin_export()
+        self.assertFalse(vm.EntretienCacheCommand.CanExecute(None))
+        self.assertEqual(vm.entretien_cache_rendu(), [])
+        self.assertEqual(self.calls, [])
+        vm._end_export(token)
+        self.assertTrue(vm.EntretienCacheCommand.CanExecute(None))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.CancellationToken import CancellationToken
+from lib.services.core.ExportManifest import ExportManifest
+from lib.services.core.MultiDocumentExportRunner import (
+    DocumentProvider, MultiDocumentExportRunner, REPORT_FILE_NAME)
+
+
+class FakeDoc(object):
+    def __init__(self, path):
+        self.PathName = path
+
+
+class FakeProvider(DocumentProvider):
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.opened = []
+        self.closed = []
+
+    def open(self, path):
+        if path in self.failing:
+            raise IOError('fichier verrouillé')
+        doc = FakeDoc(path)
+        self.opened.append(path)
+        return doc
+
+    def close(self, doc):
+        self.closed.append(doc.PathName)
+
+
+class FakeOrchestrator(object):
+    def __init__(self, calls, crash_on=(), aborted_on=(), broken_on=()):
+        self.calls = calls
+        self.crash_on = crash_on
+        self.aborted_on = aborted_on
+        self.broken_on = broken_on
+        self.last_manifest = None
+
+    def run(self, doc, get_ctrl, log_cb=None, destination=None, overwrite=None, cancel=None):
+        self.calls.append({'doc': doc.PathName, 'destination': destination, 'overwrite': overwrite,
+                           'export_param': get_ctrl('ExportationCombo').SelectedItem})
+        if doc.PathName in self.crash_on:
+            raise RuntimeError('export impossible')
+        if doc.PathName in self.aborted_on:
+            return False
+        if cancel is not None and doc.PathName == 'C:/Modeles/ARC.rvt':
+            cancel.cancel('test')
+            return False
+        manifest = ExportManifest(path=os.path.join(destination, 'outputs.json'))
+        manifest.record('J|A1|pdf', 'ok', path=os.path.join(destination, 'A1.pdf'), fmt='pdf', check='ok')
+        if doc.PathName in self.broken_on:
+            manifest.record('J|A2|pdf', 'ok', path=os.path.join(destination, 'A2.pdf'), fmt='pdf', check='vide')
+        self.last_manifest = manifest
+        return True
+
+
+class FakeConfigManager(object):
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.current = {'sheet_param_exportationcombo': 'Avant'}
+        self.active = 'Courant'
+        self.loaded = []
+
+    def get_active_profile_key(self):
+        return self.active
+
+    def set_active_profile_key(self, key):
+        self.active = key
+        return True
+
+    def capture_current_config(self):
+        return dict(self.current)
+
+    def restore_config(self, data):
+        self.current = dict(data)
+        return True
+
+    def load_profile(self, name):
+        if name not in self.profiles:
+            return False
+        self.loaded.append(name)
+        self.current = dict(self.profiles[name])
+        self.active = name
+        return True
+
+    def get_profile_data(self, name):
+        return dict(self.profiles.get(name, {}))
+
+
+class TestMultiDocumentExportRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418multi_')
+        self.calls = []
+        self.provider = FakeProvider(failing={'C:/Modeles/ELEC.rvt'})
+        self.config = FakeConfigManager({'Vendredi': {'sheet_param_exportationcombo': 'A exporter'}})
+        self.runner = MultiDocumentExportRunner(
+            self.provider,
+            orchestrator_factory=lambda: FakeOrchestrator(self.calls, crash_on={'C:/Modeles/CVC.rvt'},
+                                                          aborted_on={'C:/Modeles/PLB.rvt'},
+                                                          broken_on={'C:/Modeles/SYN.rvt'}),
+            config_manager=self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_chaque_document_dans_son_sous_dossier(self):
+        paths = ['C:/Modeles/ARC.rvt', 'D:/Autre/ARC.rvt', 'C:/Modeles/STR.rvt']
+        report = self.runner.run(paths, 'Vendredi', self.tmp)
+        self.assertEqual([c['destination'] for c in self.calls], [
+            os.path.join(self.tmp, 'ARC'), os.path.join(self.tmp, 'ARC (2)'), os.path.join(self.tmp, 'STR')])
+        self.assertEqual([c['overwrite'] for c in self.calls], [True, True, True])
+        self.assertEqual(self.provider.closed, paths)
+        self.assertEqual(report.results[0].files, [os.path.join(self.tmp, 'ARC', 'A1.pdf')])
+
+    def test_mapping_du_profil_et_config_restauree(self):
+        self.runner.run(['C:/Modeles/ARC.rvt'], 'Vendredi', self.tmp)
+        self.assertEqual(self.calls[0]['export_param'], 'A exporter')
+        self.assertEqual(self.config.loaded, ['Vendredi'])
+        self.assertEqual(self.config.current, {'sheet_param_exportationcombo': 'Avant'})
+        self.assertEqual(self.config.active, 'Courant')
+
+    def test_profil_actif_restaure_meme_si_le_run_leve(self):
+        def _boom(*a, **kw):
+            raise KeyboardInterrupt()
+        self.runner._export_one = _boom
+        with self.assertRaises(KeyboardInterrupt):
+            self.runner.run(['C:/Modeles/ARC.rvt'], 'Vendredi', self.tmp)
+        self.assertEqual(self.config.active, 'Courant')
+
+    def test_echec_d_un_document_n_arrete_pas_la_file(self):
+        paths = ['C:/Modeles/ELEC.rvt', 'C:/Modeles/CVC.rvt', 'C:/Modeles/STR.rvt']
+        logs = []
+        report = self.runner.run(paths, 'Vendredi', self.tmp, log_cb=logs.append)
+        self.assertEqual([r.status for r in report.results], ['error', 'error', 'ok'])
+        self.assertIn('verrouillé', report.results[0].error)
+        self.assertIn('export impossible', report.results[1].error)
+        # Document ouvert puis en échec : fermé quand même.
+        self.assertEqual(self.provider.closed, ['C:/Modeles/CVC.rvt', 'C:/Modeles/STR.rvt'])
+        self.assertTrue(any('2 en échec' in l for l in logs))
+
+    def test_run_interrompu_en_echec(self):
+        report = self.runner.run(['C:/Modeles/PLB.rvt'], 'Vendredi', self.tmp)
+        self.assertEqual(report.results[0].status, 'error')
+        self.assertIn('interrompu', report.results[0].error)
+        self.assertEqual(report.results[0].files, [])
+
+    def test_anomalie_au_manifeste_en_echec_fichiers_conformes_seuls(self):
+        report = self.runner.run(['C:/Modeles/SYN.rvt'], 'Vendredi', self.tmp)
+        res = report.results[0]
+        self.assertEqual(res.status, 'error')
+        self.assertIn('A2.pdf : vide', res.error)
+        self.assertEqual(res.files, [os.path.join(self.tmp, 'SYN', 'A1.pdf')])
+
+    def test_annulation_documents_restants_non_ouverts(self):
+        report = self.runner.run(['C:/Modeles/ARC.rvt', 'C:/Modeles/STR.rvt'], 'Vendredi', self.tmp,
+                                 cancel=CancellationToken())
+        self.assertEqual(self.provider.opened, ['C:/Modeles/ARC.rvt'])
+        self.assertEqual([r.error for r in report.results], ['export interrompu', 'file annulée'])
+        self.assertEqual(self.config.active, 'Courant')
+
+    def test_rapport_consolide_ecrit_dans_la_destination(self):
+        self.runner.run(['C:/Modeles/ARC.rvt', 'C:/Modeles/ELEC.rvt'], 'Vendredi', self.tmp)
+        with io.open(os.path.join(self.tmp, REPORT_FILE_NAME), 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        self.assertEqual(data['profile'], 'Vendredi')
+        self.assertEqual([d['status'] for d in data['documents']], ['ok', 'error'])
+
+    def test_profil_inconnu_aucun_document_ouvert(self):
+        report = self.runner.run(['C:/Modeles/ARC.rvt'], 'Inconnu', self.tmp)
+        self.assertEqual(self.provider.opened, [])
+        self.assertEqual(report.results[0].status, 'error')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportRunPlan import ExportItem, ExportRunPlan
+from lib.services.core.NameCollisionDetector import (collision_lines, disambiguate, find_collisions,
+                                                     STRATEGY_INDEX, STRATEGY_NONE, STRATEGY_NUMERO)
+
+_OUT = os.path.join(_tf.gettempdir(), '418out')
+
+
+def _sheet(numero, stem, fmt='pdf', collection='Jeu A'):
+    return ExportItem('{}|{}|{}'.format(collection, numero, fmt), collection, fmt,
+                      os.path.join(_OUT, '{}.{}'.format(stem, fmt)), sheet_number=numero)
+
+
+def _carnet(stem, collection='Jeu A'):
+    return ExportItem('{}|*|pdf'.format(collection), collection, 'pdf',
+                      os.path.join(_OUT, '{}.pdf'.format(stem)), sheet_number='*', group=collection)
+
+
+class TestNameCollisionDetector(unittest.TestCase):
+    def setUp(self):
+        self.items = [_sheet('A101', 'Plan'), _sheet('A102', 'Plan'), _sheet('A103', 'Coupe'),
+                      _sheet('A101', 'Plan', fmt='dwg'), _carnet('Plan')]
+
+    def _names(self):
+        return [it.file_name for it in self.items]
+
+    def test_groupes_et_rapport(self):
+        collisions = find_collisions(self.items)
+        self.assertEqual(len(collisions), 1)
+        self.assertEqual(collision_lines(collisions), ['"Plan.pdf" (Jeu A) : A101, A102, carnet Jeu A'])
+        self.assertEqual(find_collisions(self.items[2:4]), {})
+
+    def test_strategie_index(self):
+        renamed = disambiguate(self.items, STRATEGY_INDEX)
+        self.assertEqual(self._names(), ['Plan.pdf', 'Plan (1).pdf', 'Coupe.pdf', 'Plan.dwg', 'Plan (2).pdf'])
+        self.assertEqual(len(renamed), 2)
+        self.assertEqual(find_collisions(self.items), {})
+
+    def test_strategie_numero_puis_index_pour_le_reste(self):
+        disambiguate(self.items, STRATEGY_NUMERO, sanitize=lambda s: s.replace('/', '-'))
+        self.assertEqual(self._names(), ['Plan_A101.pdf', 'Plan_A102.pdf', 'Coupe.pdf', 'Plan.dwg', 'Plan.pdf'])
+        items = [_sheet('A101', 'Plan'), _sheet('A101', 'Plan')]
+        disambiguate(items, STRATEGY_NUMERO)
+        self.assertEqual([it.file_name for it in items], ['Plan_A101.pdf', 'Plan_A101 (1).pdf'])
+
+    def test_signalement_seul(self):
+        self.assertEqual(disambiguate(self.items, STRATEGY_NONE), [])
+        self.assertEqual(self._names()[:2], ['Plan.pdf', 'Plan.pdf'])
+
+    def test_plan_accepte_directement(self):
+        plan = ExportRunPlan(self.items)
+        self.assertEqual(len(find_collisions(plan)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
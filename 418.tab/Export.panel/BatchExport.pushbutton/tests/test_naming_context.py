@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import datetime
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.data.naming.NamingContext import NamingContext
+from lib.data.naming.NamingResolver import NamingResolver
+from lib.services.NamingService import NamingService
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+
+_AVANT_MINUIT = datetime.datetime(2026, 10, 17, 23, 59, 59)
+
+
+class FakeProjectInfo(object):
+    def __init__(self, **props):
+        self.reads = 0
+        self._props = props
+
+    def __getattr__(self, name):
+        props = self.__dict__.get('_props', {})
+        if name in props:
+            self.__dict__['reads'] += 1
+            return props[name]
+        raise AttributeError(name)
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+
+    def __init__(self, info=None):
+        self.ProjectInformation = info
+
+
+class FakeSheet(object):
+    SheetNumber = 'A101'
+    Name = 'Plan'
+
+
+class TestNamingContext(unittest.TestCase):
+    def test_date_figee(self):
+        ctx = NamingContext(now=_AVANT_MINUIT)
+        self.assertEqual(ctx.date_part('date'), '2026-10-17')
+        self.assertEqual((ctx.date_part('date_jour'), ctx.date_part('Date: Mois')), ('17', '10'))
+        self.assertEqual(ctx.date_part('Date: Année'), '2026')
+        self.assertIsNone(ctx.date_part('Phase'))
+
+    def test_proprietes_projet_lues_une_fois(self):
+        info = FakeProjectInfo(Name='Tour A', Number='P-042', ClientName='Ville', Status=None)
+        ctx = NamingContext(FakeDoc(info))
+        reads = info.reads
+        for _n in range(3):
+            self.assertEqual(ctx.project_property('Number'), 'P-042')
+        self.assertEqual(ctx.project_property('Status'), '')
+        self.assertEqual(info.reads, reads)
+
+
+class TestContexteDansLaResolution(unittest.TestCase):
+    def test_service_resout_dates_et_projet_depuis_le_contexte(self):
+        doc = FakeDoc(FakeProjectInfo(Name='Tour A', Number='P-042', ClientName='', Status=''))
+        service = NamingService(doc, config=None)
+        service.new_context(now=_AVANT_MINUIT)
+        pattern = '{projet_numero}_{numero}_{date}_{Date: Jour}'
+        self.assertEqual(service.resolve_for_element(FakeSheet(), pattern), 'P-042_A101_2026-10-17_17')
+        self.assertEqual(list(service.resolve_many([FakeSheet(), FakeSheet()], '{date_jour}')), ['17', '17'])
+
+    def test_resolveur_historique_partage_le_contexte(self):
+        resolver = NamingResolver(context=NamingContext(now=_AVANT_MINUIT))
+        self.assertEqual(resolver._get_system_param_value('Date: Jour'), '17')
+        self.assertIsNone(resolver._get_system_param_value('Phase'))
+
+    def test_un_contexte_par_run(self):
+        orch = ExportOrchestrator()
+        orch._init_resolver(FakeDoc())
+        first = orch._namer.context
+        orch._init_resolver(FakeDoc())
+        self.assertIsNotNone(first)
+        self.assertIsNot(orch._namer.context, first)
+
+
+if __name__ == '__main__':
+    unittest.main()
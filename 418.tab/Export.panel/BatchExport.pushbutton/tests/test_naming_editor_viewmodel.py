@@ -16,6 +16,7 @@ if _BUTTON not in sys.path:
 import tempfile as _tf
 os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
 
+from lib.services.NamingService import NamingService
 from lib.viewmodels.NamingEditorViewModel import (
     NamingEditorViewModel, TokenItemVM, SourceItemVM,
 )
@@ -89,6 +90,15 @@ class TestNamingEditorViewModelPattern(unittest.TestCase):
         vm.Pattern = u'{numero}_{nom}'
         self.assertEqual(vm.Apercu, u'{numero}_{nom}')
 
+    def test_apercu_resolu_sur_l_element_d_exemple(self):
+        class Feuille(object):
+            SheetNumber = u'A101'
+            Name = u'Plan'
+        vm = NamingEditorViewModel('sheet', naming_service=NamingService(),
+                                   sample_elem=Feuille())
+        vm.Pattern = u'{numero}_{nom}'
+        self.assertEqual(vm.Apercu, u'A101_Plan')
+
     def test_apercu_vide_sans_service(self):
         vm = NamingEditorViewModel('sheet', naming_service=None)
         vm._naming_service = None
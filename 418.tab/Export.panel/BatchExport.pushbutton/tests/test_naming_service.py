@@ -17,7 +17,7 @@ if _BUTTON not in sys.path:
 import tempfile as _tf
 os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
 
-from lib.services.NamingService import NamingService
+from lib.services.NamingService import NamingService, CompiledPattern, ResolvedNames, _PatternLRU
 
 
 class FakeParameter(object):
@@ -295,5 +295,72 @@ class TestNamingServicePersistence(unittest.TestCase):
         self.assertFalse(self.service.delete_preset('Inexistant'))
 
 
+class TestCompiledPattern(unittest.TestCase):
+    def setUp(self):
+        self.service = NamingService(doc=None, config=FakeConfig())
+        self.elem = FakeElement({'Phase': 'APS'}, sheet_number='A101', name='Plan RDC')
+
+    def test_segments_plats_litteraux_fusionnes(self):
+        compiled = CompiledPattern.parse('{numero}_{}-{param:Phase}.')
+        self.assertEqual(len(compiled._segments), 4)
+        self.assertEqual(compiled._segments[1], '_-')
+        self.assertTrue(CompiledPattern.parse('fixe{ }').is_constant)
+
+    def test_evaluation_identique_a_la_resolution(self):
+        for pattern in ('{numero}_{nom_tiret}_{param:Phase}', '{Phase}-{PARAM : Phase}', 'sans jeton',
+                        [{'Name': 'Phase', 'Prefix': '[', 'Suffix': ']'}]):
+            compiled = self.service.compile(pattern)
+            self.assertEqual(compiled.evaluate(self.elem), self.service.resolve_for_element(self.elem, pattern))
+        self.assertEqual(self.service.compile('{numero}_{nom_tiret}').evaluate(self.elem), 'A101_Plan-RDC')
+
+    def test_compile_memorise_par_pattern_et_kind(self):
+        a = self.service.compile('{numero}|memo', 'sheet')
+        b = NamingService(doc=None, config=FakeConfig()).compile('{numero}|memo', 'sheet')
+        self.assertIs(a._segments, b._segments)
+        self.assertIsNot(a._segments, self.service.compile('{numero}|memo', 'set')._segments)
+        rows = [{'Name': 'Phase', 'Prefix': '', 'Suffix': ''}]
+        self.assertIs(self.service.compile(rows)._segments, self.service.compile(list(rows))._segments)
+
+    def test_lru_borne(self):
+        lru = _PatternLRU(maxsize=2)
+        for key in ('a', 'b', 'a', 'c'):
+            lru.get(key, lambda: CompiledPattern.parse(key))
+        self.assertEqual(len(lru), 2)
+        self.assertEqual((lru.hits, lru.misses), (1, 3))
+        self.assertEqual(list(lru._entries), ['a', 'c'])
+
+
+class TestResolveMany(unittest.TestCase):
+    def setUp(self):
+        self.service = NamingService(doc=None, config=FakeConfig())
+        self.elems = [FakeElement({'Phase': 'APS'}, sheet_number='A101'),
+                      FakeElement({}, sheet_number='A102'),
+                      FakeElement({'Phase': 'aps'}, sheet_number='A103'),
+                      FakeElement({'Phase': 'PRO'}, sheet_number='A104')]
+
+    def test_noms_dans_l_ordre_identiques_a_la_resolution_unitaire(self):
+        pattern = '{numero}_{param:Phase}'
+        names = self.service.resolve_many(self.elems, pattern)
+        self.assertEqual(list(names), [self.service.resolve_for_element(e, pattern) for e in self.elems])
+        self.assertFalse(names.has_issues)
+
+    def test_noms_vides_et_doublons_signales(self):
+        names = self.service.resolve_many(self.elems, '{Phase}')
+        self.assertEqual(list(names), ['APS', '', 'aps', 'PRO'])
+        self.assertEqual(names.empty, [1])
+        self.assertEqual(dict(names.duplicates), {'APS': [0, 2]})
+
+    def test_transformation_avant_bilan(self):
+        names = self.service.resolve_many(self.elems, '{param:Phase}', transform=lambda n: n[:1])
+        self.assertEqual(list(names), ['A', '', 'a', 'P'])
+        self.assertEqual(dict(names.duplicates), {'A': [0, 2]})
+
+    def test_pattern_constant_et_liste_vide(self):
+        self.assertEqual(list(self.service.resolve_many(self.elems[:2], 'fixe')), ['fixe', 'fixe'])
+        empty = self.service.resolve_many([], '{numero}')
+        self.assertIsInstance(empty, ResolvedNames)
+        self.assertEqual((list(empty), empty.empty, dict(empty.duplicates)), ([], [], {}))
+
+
 if __name__ == '__main__':
     unittest.main()
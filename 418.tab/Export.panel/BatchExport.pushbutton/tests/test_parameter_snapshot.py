@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.data.naming.NamingResolver import NamingResolver
+from lib.data.sheets.ParameterSnapshot import ParameterSnapshot, SESSION_SNAPSHOT
+from lib.services.NamingService import NamingService
+from lib.services.SheetCollectionService import SheetCollectionService
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeDefinition(object):
+    def __init__(self, name):
+        self.Name = name
+
+
+class FakeParameter(object):
+    def __init__(self, name, value):
+        self.Definition = FakeDefinition(name)
+        self._value = value
+
+    def AsString(self):
+        return self._value if not isinstance(self._value, int) else None
+
+    def AsValueString(self):
+        return None
+
+    def AsInteger(self):
+        return self._value if isinstance(self._value, int) else 0
+
+
+class CountingElement(object):
+    """Élément Revit simulé comptant les allers-retours « interop ».
+    `lookup` : noms trouvables par LookupParameter (les autres ne le sont
+    que par itération de Parameters)."""
+
+    def __init__(self, eid, values, lookup=None, **attrs):
+        self.Id = FakeId(eid) if eid is not None else None
+        self._values = dict(values)
+        self._lookup = set(lookup if lookup is not None else values)
+        self.lookups = 0
+        self.iterations = 0
+        for name, val in attrs.items():
+            setattr(self, name, val)
+
+    def LookupParameter(self, name):
+        self.lookups += 1
+        return FakeParameter(name, self._values[name]) if name in self._lookup else None
+
+    @property
+    def Parameters(self):
+        self.iterations += 1
+        return [FakeParameter(n, v) for n, v in self._values.items()]
+
+
+class TestParameterSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = ParameterSnapshot()
+
+    def test_lecture_groupee_et_mise_en_cache(self):
+        elem = CountingElement(1, {'Phase': 'APS', 'Lot': '02', 'Indice': 'B'}, lookup=['Phase'])
+        values = self.snapshot.read(elem, ['Phase', 'Lot', 'Indice', 'Absent'])
+        self.assertEqual(values, {'Phase': 'APS', 'Lot': '02', 'Indice': 'B', 'Absent': None})
+        self.assertEqual((elem.lookups, elem.iterations), (4, 1))
+        self.assertEqual(self.snapshot.text(elem, 'Lot'), '02')
+        self.assertIsNone(self.snapshot.text(elem, 'Absent'))
+        self.assertEqual((elem.lookups, elem.iterations), (4, 1))
+
+    def test_propriete_directe_et_drapeaux(self):
+        elem = CountingElement(2, {'Export': 1, 'DWG': 0}, Name='Jeu A')
+        self.assertEqual(self.snapshot.text(elem, 'Name'), 'Jeu A')
+        self.assertTrue(self.snapshot.flag(elem, 'Export'))
+        self.assertFalse(self.snapshot.flag(elem, 'DWG'))
+        self.assertIsNone(self.snapshot.flag(elem, 'Carnet'))
+
+    def test_invalidation_explicite(self):
+        elem = CountingElement(3, {'Phase': 'APS'})
+        self.snapshot.text(elem, 'Phase', scope='doc A')
+        elem._values['Phase'] = 'PRO'
+        self.assertEqual(self.snapshot.text(elem, 'Phase', scope='doc A'), 'APS')
+        self.assertEqual(self.snapshot.text(elem, 'Phase', scope='doc B'), 'PRO')
+        self.snapshot.invalidate(scope='doc A', elem=elem)
+        self.assertEqual(self.snapshot.text(elem, 'Phase', scope='doc A'), 'PRO')
+        self.snapshot.invalidate()
+        self.assertEqual(len(self.snapshot), 0)
+
+    def test_element_sans_id_jamais_en_cache(self):
+        elem = CountingElement(None, {'Phase': 'APS'})
+        self.snapshot.text(elem, 'Phase')
+        self.snapshot.text(elem, 'Phase')
+        self.assertEqual(elem.lookups, 2)
+        self.assertEqual(len(self.snapshot), 0)
+
+
+class TestSnapshotPartage(unittest.TestCase):
+    def setUp(self):
+        SESSION_SNAPSHOT.invalidate()
+
+    def test_motif_compile_lit_ses_parametres_une_fois(self):
+        service = NamingService(doc=None, config=None)
+        elem = CountingElement(10, {'Phase': 'APS', 'Lot': '02'}, lookup=[], SheetNumber='A101')
+        compiled = service.compile('{numero}_{param:Phase}_{Lot}_{Phase}')
+        self.assertEqual(compiled.evaluate(elem), 'A101_APS_02_APS')
+        self.assertEqual(compiled.evaluate(elem), 'A101_APS_02_APS')
+        self.assertEqual(elem.iterations, 1)
+
+    def test_partage_entre_resolveur_et_service_de_collections(self):
+        elem = CountingElement(11, {'Phase': 'APS', 'Export': 1})
+        self.assertEqual(NamingResolver().resolve_for_element(elem, [{'Name': 'Phase', 'Suffix': '-'}]), 'APS-')
+        self.assertEqual(NamingService().resolve_for_element(elem, '{Phase}'), 'APS')
+        self.assertEqual(elem.lookups, 1)
+        service = SheetCollectionService(doc=None)
+        self.assertTrue(service.read_flag(elem, 'Export'))
+        self.assertTrue(service.read_flag(elem, 'Export'))
+        self.assertEqual(elem.lookups, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
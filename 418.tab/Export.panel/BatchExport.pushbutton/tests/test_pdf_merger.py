@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zlib
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.DocumentSheetIndex import DocumentSheetIndex
+from lib.services.core.ExportOrchestrator import ExportOrchestrator, ExportPlan
+from lib.services.core.PdfMerger import PdfMergeError, PdfReader, merge_pdfs, page_count
+
+
+def _b(text):
+    return text.encode('latin-1')
+
+
+def _content(label, padding=0):
+    # Octets arbitraires (dont "endstream") : le stream doit être recopié
+    # à l'octet près, d'après /Length.
+    return _b('BT ({}) Tj ET\n'.format(label)) + b'\x00\xff endstream endobj\n' + b'x' * padding
+
+
+def _pdf_classique(path, labels, padding=0, nested=False):
+    """PDF 1.4 : table xref classique, Resources/MediaBox hérités du noeud
+    /Pages, arbre à deux niveaux si `nested`."""
+    objs = {}
+    page_nums = []
+    num = 5
+    for label in labels:
+        data = _content(label, padding)
+        objs[num + 1] = _b('<< /Length {} >>\nstream\n'.format(len(data))) + data + b'\nendstream'
+        objs[num] = _b('<< /Type /Page /Parent {} 0 R /Contents {} 0 R >>'.format(
+            4 if nested else 2, num + 1))
+        page_nums.append(num)
+        num += 2
+    kids = ' '.join('{} 0 R'.format(n) for n in page_nums)
+    objs[1] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objs[3] = b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'
+    if nested:
+        objs[2] = _b('<< /Type /Pages /Kids [4 0 R] /Count {} /Resources << /Font << /F1 3 0 R >> >> '
+                     '/MediaBox [0 0 842 595] >>'.format(len(labels)))
+        objs[4] = _b('<< /Type /Pages /Parent 2 0 R /Kids [{}] /Count {} >>'.format(kids, len(labels)))
+    else:
+        objs[2] = _b('<< /Type /Pages /Kids [{}] /Count {} /Resources << /Font << /F1 3 0 R >> >> '
+                     '/MediaBox [0 0 842 595] >>'.format(kids, len(labels)))
+        objs[4] = b'(inutilise)'
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for n in sorted(objs):
+        offsets[n] = len(out)
+        out += _b('{} 0 obj\n'.format(n)) + objs[n] + b'\nendobj\n'
+    xref = len(out)
+    out += _b('xref\n0 {}\n0000000000 65535 f \n'.format(num))
+    for n in range(1, num):
+        out += _b('{:010d} 00000 n \n'.format(offsets[n]))
+    out += _b('trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n'.format(num, xref))
+    with open(path, 'wb') as fh:
+        fh.write(bytes(out))
+
+
+def _pdf_compresse(path, labels):
+    """PDF 1.5 : catalogue, arbre et pages dans un stream d'objets, table
+    xref en stream Flate avec prédicteur PNG (Up)."""
+    n_pages = len(labels)
+    page_nums = [3 + i for i in range(n_pages)]
+    content_nums = [3 + n_pages + i for i in range(n_pages)]
+    stm_num = 3 + 2 * n_pages
+    xref_num = stm_num + 1
+    packed = [(1, b'<< /Type /Catalog /Pages 2 0 R >>'),
+              (2, _b('<< /Type /Pages /Kids [{}] /Count {} /MediaBox [0 0 420 297] >>'.format(
+                  ' '.join('{} 0 R'.format(n) for n in page_nums), n_pages)))]
+    for pn, cn in zip(page_nums, content_nums):
+        packed.append((pn, _b('<< /Type /Page /Parent 2 0 R /Contents {} 0 R >>'.format(cn))))
+    out = bytearray(b'%PDF-1.5\n')
+    offsets = {}
+    for cn, label in zip(content_nums, labels):
+        data = zlib.compress(_content(label))
+        offsets[cn] = len(out)
+        out += _b('{} 0 obj\n<< /Length {} /Filter /FlateDecode >>\nstream\n'.format(cn, len(data)))
+        out += data + b'\nendstream\nendobj\n'
+    header, body = [], bytearray()
+    for n, data in packed:
+        header.append('{} {}'.format(n, len(body)))
+        body += data + b' '
+    header = _b(' '.join(header) + ' ')
+    stm = zlib.compress(header + bytes(body))
+    offsets[stm_num] = len(out)
+    out += _b('{} 0 obj\n<< /Type /ObjStm /N {} /First {} /Length {} /Filter /FlateDecode >>\nstream\n'.format(
+        stm_num, len(packed), len(header), len(stm)))
+    out += stm + b'\nendstream\nendobj\n'
+    offsets[xref_num] = len(out)
+    rows = [(0, 0, 0)]
+    index_of = dict((n, i) for i, (n, _d) in enumerate(packed))
+    for n in range(1, xref_num + 1):
+        if n in index_of:
+            rows.append((2, stm_num, index_of[n]))
+        else:
+            rows.append((1, offsets[n], 0))
+    raw, prev = bytearray(), bytearray(7)
+    for kind, f2, f3 in rows:
+        row = bytearray([kind]) + bytearray(f2.to_bytes(4, 'big')) + bytearray(f3.to_bytes(2, 'big'))
+        raw += bytearray([2]) + bytearray((row[j] - prev[j]) & 0xff for j in range(7))
+        prev = row
+    data = zlib.compress(bytes(raw))
+    out += _b('{} 0 obj\n<< /Type /XRef /Size {} /W [1 4 2] /Root 1 0 R /Filter /FlateDecode '
+              '/DecodeParms << /Predictor 12 /Columns 7 >> /Length {} >>\nstream\n'.format(
+                  xref_num, xref_num + 1, len(data)))
+    out += data + b'\nendstream\nendobj\n'
+    out += _b('startxref\n{}\n%%EOF\n'.format(offsets[xref_num]))
+    with open(path, 'wb') as fh:
+        fh.write(bytes(out))
+
+
+def _pages(path):
+    """[(contenu décodé, page)] du PDF relu avec PdfReader."""
+    out = []
+    with PdfReader(path) as reader:
+        for num, node, _inh in reader.pages()[0]:
+            ref = node[b'Contents']
+            info, stream_offset = reader.read(ref.num)
+            raw = reader._read_stream(info, stream_offset)
+            if b'Filter' in info:
+                raw = zlib.decompress(raw)
+            out.append((raw, node))
+    return out
+
+
+class TestPdfMerger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418pdf_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_concatene_dans_l_ordre(self):
+        _pdf_classique(self._path('a.pdf'), ['A101'])
+        _pdf_classique(self._path('b.pdf'), ['A102', 'A103'])
+        out = self._path('carnet.pdf')
+        self.assertEqual(merge_pdfs([self._path('a.pdf'), self._path('b.pdf')], out), 3)
+        self.assertEqual(page_count(out), 3)
+        pages = _pages(out)
+        self.assertEqual([raw.split(b')')[0] for raw, _p in pages], [b'BT (A101', b'BT (A102', b'BT (A103'])
+        self.assertEqual(pages[0][0], _content('A101'))
+
+    def test_attributs_herites_recopies_sur_la_page(self):
+        _pdf_classique(self._path('a.pdf'), ['A101', 'A102'], nested=True)
+        out = self._path('carnet.pdf')
+        merge_pdfs([self._path('a.pdf')], out)
+        with PdfReader(out) as reader:
+            pages, nodes = reader.pages()
+            self.assertEqual(nodes, set([2]))
+            for _num, node, _inh in pages:
+                self.assertEqual(node[b'Parent'].num, 2)
+                self.assertIn(b'MediaBox', node)
+                font = reader.resolve(reader.resolve(node[b'Resources'])[b'Font'][b'F1'])
+                self.assertEqual(font[b'BaseFont'].name, b'Helvetica')
+
+    def test_xref_et_objets_compresses(self):
+        _pdf_compresse(self._path('c.pdf'), ['B201', 'B202'])
+        _pdf_classique(self._path('a.pdf'), ['A101'])
+        self.assertEqual(page_count(self._path('c.pdf')), 2)
+        out = self._path('carnet.pdf')
+        merge_pdfs([self._path('c.pdf'), self._path('a.pdf')], out)
+        pages = _pages(out)
+        self.assertEqual([raw for raw, _p in pages], [_content('B201'), _content('B202'), _content('A101')])
+        self.assertEqual(pages[0][1][b'MediaBox'][2].raw, b'420')
+
+    def test_gros_stream_recopie_par_blocs(self):
+        _pdf_classique(self._path('a.pdf'), ['A101'], padding=700 * 1024)
+        out = self._path('carnet.pdf')
+        merge_pdfs([self._path('a.pdf'), self._path('a.pdf')], out)
+        self.assertEqual([raw for raw, _p in _pages(out)], [_content('A101', 700 * 1024)] * 2)
+
+    def test_carnet_reassemblable(self):
+        _pdf_classique(self._path('a.pdf'), ['A101', 'A102'])
+        merge_pdfs([self._path('a.pdf')], self._path('un.pdf'))
+        merge_pdfs([self._path('un.pdf'), self._path('un.pdf')], self._path('deux.pdf'))
+        self.assertEqual(page_count(self._path('deux.pdf')), 4)
+
+    def test_echec_ne_touche_pas_la_cible(self):
+        with open(self._path('chiffre.pdf'), 'wb') as fh:
+            fh.write(b'%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\nxref\n0 2\n'
+                     b'0000000000 65535 f \n0000000009 00000 n \n'
+                     b'trailer\n<< /Size 2 /Root 1 0 R /Encrypt << /V 1 >> >>\nstartxref\n47\n%%EOF\n')
+        with open(self._path('texte.pdf'), 'wb') as fh:
+            fh.write(b'pas un pdf')
+        out = self._path('carnet.pdf')
+        with open(out, 'wb') as fh:
+            fh.write(b'ancien')
+        for bad in ('chiffre.pdf', 'texte.pdf'):
+            with self.assertRaises(PdfMergeError):
+                merge_pdfs([self._path(bad)], out)
+        with open(out, 'rb') as fh:
+            self.assertEqual(fh.read(), b'ancien')
+        self.assertFalse(os.path.exists(out + '.part'))
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeCollection(object):
+    def __init__(self, cid, name):
+        self.Id = FakeId(cid)
+        self.Name = name
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero, collection_id, nom='Plan'):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = nom
+        self.SheetCollectionId = FakeId(collection_id)
+
+
+class TestCarnetAssemble(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418pdf_')
+        self.orch = ExportOrchestrator()
+        self.sheets = [FakeSheet(11, 'A101', 1), FakeSheet(12, 'A102', 1)]
+        self.orch._index = DocumentSheetIndex.from_elements([FakeCollection(1, 'Jeu')], self.sheets)
+        self.orch._destination_override = self.tmp
+        self.orch._listing = self.orch._new_listing()
+        self.logs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _unitaires(self):
+        paths = {}
+        for sh in self.sheets:
+            path = paths[sh.Id.IntegerValue] = os.path.join(self.tmp, '{}.pdf'.format(sh.SheetNumber))
+            _pdf_classique(path, [sh.SheetNumber])
+        return paths
+
+    def test_plan_carnet_avec_feuilles(self):
+        self.orch._carnet_sheets = True
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu', True, False, False, True)])
+        self.assertEqual([it.key for it in plan], ['Jeu|A101|pdf', 'Jeu|A102|pdf', 'Jeu|*|pdf'])
+        self.orch._carnet_sheets = False
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu', True, False, False, True)])
+        self.assertEqual([it.key for it in plan], ['Jeu|*|pdf'])
+
+    def test_carnet_assemble_sans_revit(self):
+        self.orch._sheet_pdfs = self._unitaires()
+        out = os.path.join(self.tmp, 'Jeu.pdf')
+        ok, path = self.orch._export_pdf_collection(None, self.sheets, None, self.tmp, None,
+                                                    log_cb=self.logs.append, path=out)
+        self.assertTrue(ok)
+        self.assertEqual(path, out)
+        self.assertEqual([raw for raw, _p in _pages(out)], [_content('A101'), _content('A102')])
+        self.assertIn('assemblé depuis 2 PDF unitaire(s)', self.logs[-1])
+
+    def test_feuille_manquante_repli_revit(self):
+        paths = self._unitaires()
+        del paths[12]
+        self.orch._sheet_pdfs = paths
+        out = os.path.join(self.tmp, 'Jeu.pdf')
+        ok, _path = self.orch._export_pdf_collection(None, self.sheets, None, self.tmp, None,
+                                                     log_cb=self.logs.append, path=out)
+        # Hors Revit, le repli ne peut rien produire.
+        self.assertFalse(ok)
+        self.assertFalse(os.path.exists(out))
+
+    def test_pdf_illisible_repli_revit(self):
+        paths = self._unitaires()
+        with open(paths[12], 'wb') as fh:
+            fh.write(b'corrompu')
+        self.orch._sheet_pdfs = paths
+        ok, _path = self.orch._export_pdf_collection(None, self.sheets, None, self.tmp, None,
+                                                     log_cb=self.logs.append,
+                                                     path=os.path.join(self.tmp, 'Jeu.pdf'))
+        self.assertFalse(ok)
+        self.assertTrue(any('assemblage local impossible' in m for m in self.logs))
+
+    def test_sorties_sautees_retenues(self):
+        self.orch._sheet_pdfs = {}
+        plan = self.orch.build_export_plan(None, [ExportPlan('Jeu', True, True, False, True)])
+        _pdf_classique(plan.items[0].path, ['A101'])
+        # A101 sautée (déjà à jour), A102 exportée ; une feuille en échec
+        # n'est pas retenue.
+        self.orch._register_sheet_pdfs(plan.items, [plan.items[1]],
+                                       [(self.sheets[1], True, plan.items[1].path)])
+        self.assertEqual(self.orch._sheet_pdfs, {11: plan.items[0].path, 12: plan.items[1].path})
+        self.orch._sheet_pdfs = {}
+        self.orch._register_sheet_pdfs(plan.items, plan.items, [(self.sheets[1], False, plan.items[1].path)])
+        self.assertEqual(self.orch._sheet_pdfs, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import threading
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.PostExportPipeline import PostExportPipeline
+
+
+def _echoue():
+    raise IOError('disque plein')
+
+
+class TestPostExportPipeline(unittest.TestCase):
+    def test_travaux_executes_hors_thread_appelant(self):
+        pipeline = PostExportPipeline(workers=2)
+        threads = []
+        for _i in range(5):
+            pipeline.submit('job', lambda: threads.append(threading.current_thread().name))
+        self.assertEqual(pipeline.drain(), [])
+        self.assertEqual(len(threads), 5)
+        self.assertNotIn(threading.current_thread().name, threads)
+
+    def test_erreurs_remontees_au_drain(self):
+        pipeline = PostExportPipeline(workers=1)
+        pipeline.submit('DWG [A101]', _echoue)
+        errors = pipeline.drain()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], 'DWG [A101]')
+        self.assertIn('disque plein', errors[0][1])
+
+    def test_erreur_remontee_une_seule_fois(self):
+        pipeline = PostExportPipeline(workers=0)
+        pipeline.submit('x', _echoue)
+        self.assertEqual(len(pipeline.poll()), 1)
+        self.assertEqual(pipeline.drain(), [])
+
+    def test_when_written_sur_thread_appelant_apres_succes(self):
+        pipeline = PostExportPipeline(workers=1)
+        gate = threading.Event()
+        seen = []
+        pipeline.submit('move', gate.wait, targets=['/out/A101.dwg'])
+        pipeline.when_written('/out/A101.dwg', lambda: seen.append(threading.current_thread().name))
+        self.assertEqual(seen, [])
+        gate.set()
+        pipeline.drain()
+        self.assertEqual(seen, [threading.current_thread().name])
+
+    def test_when_written_ignore_si_echec(self):
+        pipeline = PostExportPipeline(workers=1)
+        seen = []
+        gate = threading.Event()
+
+        def _job():
+            gate.wait()
+            _echoue()
+        pipeline.submit('move', _job, targets=['/out/A101.dwg'])
+        pipeline.when_written('/out/A101.dwg', lambda: seen.append(1))
+        gate.set()
+        pipeline.drain()
+        self.assertEqual(seen, [])
+
+    def test_when_written_immediat_sans_travail_en_cours(self):
+        pipeline = PostExportPipeline(workers=0)
+        seen = []
+        pipeline.when_written('/out/A101.pdf', lambda: seen.append(1))
+        self.assertEqual(seen, [1])
+
+    def test_wait_attend_les_cibles_demandees(self):
+        pipeline = PostExportPipeline(workers=2)
+        gate = threading.Event()
+        seen = []
+        pipeline.submit('move A101', lambda: seen.append('A101'), targets=['/out/A101.pdf'])
+        pipeline.submit('move A102', gate.wait, targets=['/out/A102.pdf'])
+        pipeline.when_written('/out/A101.pdf', lambda: seen.append('cb'))
+        self.assertTrue(pipeline.wait(['/out/A101.pdf']))
+        self.assertEqual(seen, ['A101', 'cb'])
+        self.assertFalse(pipeline.wait(['/out/A102.pdf'], timeout=0.05))
+        gate.set()
+        self.assertTrue(pipeline.wait(['/out/A102.pdf']))
+        self.assertEqual(pipeline.drain(), [])
+
+    def test_sans_worker_execution_en_ligne(self):
+        pipeline = PostExportPipeline(workers=0)
+        seen = []
+        pipeline.submit('inline', lambda: seen.append(threading.current_thread().name))
+        self.assertEqual(seen, [threading.current_thread().name])
+
+
+if __name__ == '__main__':
+    unittest.main()
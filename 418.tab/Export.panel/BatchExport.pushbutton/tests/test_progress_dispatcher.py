@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import sys
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ProgressDispatcher import ProgressDispatcher, SKIPPED
+from lib.viewmodels.MainViewModel import MainViewModel
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgressDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.received = []
+        self.disp = ProgressDispatcher(lambda c, t, m: self.received.append((c, t, m)),
+                                       max_rate=2.0, clock=self.clock)
+
+    def test_coalesce_au_plus_n_par_seconde(self):
+        for n in range(10):
+            self.disp(n, 100, u'f{}'.format(n))
+            self.clock.now += 0.125
+        # 1,25 s écoulée à 2/s : t=0 puis t=0,5 et t=1,0.
+        self.assertEqual([c for c, _t, _m in self.received], [0, 4, 8])
+
+    def test_etat_final_toujours_livre(self):
+        self.disp(1, 3, u'a')
+        self.disp(2, 3, u'b')
+        self.disp(3, 3, u'')
+        self.assertEqual(self.received[-1], (3, 3, u''))
+
+    def test_flush_livre_l_etat_en_attente(self):
+        self.disp(1, 10, u'a')
+        self.disp(2, 10, u'b')
+        self.assertEqual(len(self.received), 1)
+        self.disp.flush()
+        self.assertEqual(self.received[-1], (2, 10, u'b'))
+        self.disp.flush()
+        self.assertEqual(len(self.received), 2)
+
+    def test_start_livre_sans_coalescence(self):
+        # Annonce d'un élément avant un export bloquant : jamais retenue.
+        self.disp(1, 10, u'a')
+        self.disp(2, 10, u'b')
+        self.disp.start(2, 10, u'A102 (PDF)')
+        self.assertEqual(self.received, [(1, 10, u'a'), (2, 10, u'A102 (PDF)')])
+        self.disp.flush()  # l'état en attente a été remplacé
+        self.assertEqual(len(self.received), 2)
+
+    def test_orchestrateur_annonce_chaque_feuille_avant_son_export(self):
+        from lib.services.core.ExportOrchestrator import ExportOrchestrator
+
+        class Sheet(object):
+            SheetNumber = u'A101'
+            Name = u'Plan'
+
+        progress = ExportOrchestrator()._sheet_progress(self.disp, 0, 3, u'Jeu', u'PDF')
+        self.disp(0, 3, u'Collection: Jeu')
+        progress(Sheet())
+        self.assertEqual(self.received[-1], (0, 3, u'Jeu: A101_Plan (PDF)'))
+        ExportOrchestrator._progress_start(lambda c, t, m: self.received.append(('simple', m)), 0, 1, u'x')
+        self.assertEqual(self.received[-1], ('simple', u'x'))
+
+    def test_debit_et_eta(self):
+        self.assertIsNone(self.disp.throughput())
+        self.disp.planned(100)
+        self.disp.item_done(SKIPPED, 10)
+        self.disp.item_done('pdf', 20)
+        self.disp.item_done('dwg', 10)
+        self.clock.now += 60.0
+        self.assertEqual(self.disp.counters, {SKIPPED: 10, 'pdf': 20, 'dwg': 10})
+        self.assertAlmostEqual(self.disp.throughput(), 30.0)
+        self.assertAlmostEqual(self.disp.eta(), 120.0)
+        self.assertEqual(self.disp.describe(), u'30 feuille(s)/min · reste ~2 min 00')
+
+    def test_sink_en_erreur_ignore(self):
+        disp = ProgressDispatcher(lambda *a: 1 / 0)
+        disp(1, 1, u'')
+        self.assertEqual(disp.delivered, 1)
+
+
+class TestMainViewModelProgress(unittest.TestCase):
+    def test_callbacks_coalesces_et_bilan(self):
+        vm = MainViewModel(doc=None)
+        progress_cb, _log_cb = vm._make_export_callbacks_with_log()
+        progress_cb(0, 4, u'Préparation...')
+        progress_cb(1, 4, u'Collection: A')
+        self.assertEqual(vm.StatusText, u'Préparation...')
+        progress_cb.item_done('pdf', 3)
+        vm._finish_progress(progress_cb)
+        self.assertEqual(vm.ProgressValue, 25)
+        self.assertTrue(vm.StatusText.startswith(u'Collection: A — '))
+
+
+if __name__ == '__main__':
+    unittest.main()
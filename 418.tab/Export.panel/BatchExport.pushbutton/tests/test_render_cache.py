@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.DocumentSheetIndex import DocumentSheetIndex
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.RenderCache import RenderCache, render_key
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def _write(path, data):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418cache_')
+        self.root = os.path.join(self.tmp, 'cache')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _cache(self, **kw):
+        kw.setdefault('clock', self.clock)
+        return RenderCache(root=self.root, **kw)
+
+    def _file(self, name, data):
+        path = os.path.join(self.tmp, name)
+        _write(path, data)
+        return path
+
+    def test_stockage_puis_service(self):
+        cache = self._cache()
+        self.assertTrue(cache.store('k1', self._file('A101.pdf', b'rendu A101')))
+        dest = os.path.join(self.tmp, 'out', 'A101.pdf')
+        self.assertTrue(cache.fetch('k1', dest))
+        self.assertEqual(_read(dest), b'rendu A101')
+        self.assertFalse(cache.fetch('inconnue', dest))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_index_persiste_et_contenu_dedoublonne(self):
+        cache = self._cache()
+        cache.store('k1', self._file('a.pdf', b'meme contenu'))
+        cache.store('k2', self._file('b.pdf', b'meme contenu'))
+        self.assertEqual(cache.total_bytes(), len(b'meme contenu'))
+        self.assertTrue(cache.save())
+        relu = self._cache()
+        self.assertEqual(len(relu), 2)
+        self.assertIsNotNone(relu.lookup('k2'))
+
+    def test_blob_tronque_equivaut_a_absent(self):
+        cache = self._cache()
+        cache.store('k1', self._file('a.pdf', b'contenu'))
+        _write(cache.lookup('k1'), b'co')
+        self.assertIsNone(cache.lookup('k1'))
+        self.assertEqual(len(cache), 0)
+
+    def test_eviction_lru_au_plafond(self):
+        cache = self._cache(max_bytes=25)
+        cache.store('k1', self._file('a', b'a' * 10))
+        cache.store('k2', self._file('b', b'b' * 10))
+        self.assertTrue(cache.fetch('k1', os.path.join(self.tmp, 'x')))  # k1 redevient récent
+        cache.store('k3', self._file('c', b'c' * 10))
+        self.assertIsNotNone(cache.lookup('k1'))
+        self.assertIsNone(cache.lookup('k2'))
+        self.assertIsNotNone(cache.lookup('k3'))
+        self.assertLessEqual(cache.total_bytes(), 25)
+
+    def test_plafond_memorise_pour_l_entretien(self):
+        cache = self._cache(max_bytes=12345)
+        self.assertTrue(cache.save())
+        self.assertEqual(self._cache().max_bytes, 12345)
+
+    def test_verify_retire_les_blobs_alteres(self):
+        cache = self._cache()
+        cache.store('k1', self._file('a.pdf', b'original'))
+        cache.store('k2', self._file('b.pdf', b'autre'))
+        _write(cache.lookup('k1'), b'modifie')  # même taille, contenu différent
+        self.assertEqual(cache.verify(), (2, 1))
+        self.assertIsNone(cache.lookup('k1'))
+        self.assertIsNotNone(cache.lookup('k2'))
+
+    def test_gc_supprime_les_orphelins(self):
+        cache = self._cache()
+        cache.store('k1', self._file('a.pdf', b'garde'))
+        orphan = os.path.join(self.root, 'blobs', 'ff', 'ff00')
+        os.makedirs(os.path.dirname(orphan))
+        _write(orphan, b'orphelin')
+        self.assertEqual(cache.gc(), 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertIsNotNone(cache.lookup('k1'))
+        lines = cache.maintenance()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('1 blob(s) vérifié(s)', lines[0])
+
+    def test_detach_rompt_le_lien_physique(self):
+        if not hasattr(os, 'link'):
+            self.skipTest('liens physiques indisponibles')
+        cache = self._cache()
+        cache.store('k1', self._file('a.pdf', b'rendu'))
+        dest = os.path.join(self.tmp, 'A101.pdf')
+        cache.fetch('k1', dest)
+        self.assertTrue(RenderCache.detach(dest))
+        self.assertFalse(os.path.exists(dest))
+        self.assertIsNotNone(cache.lookup('k1'))
+        self.assertFalse(RenderCache.detach(self._file('seul.pdf', b'x')))
+
+    def test_cle_de_rendu_stable(self):
+        self.assertEqual(render_key('doc', 'v1', 'pdf', 'fp'), render_key('doc', 'v1', 'pdf', 'fp'))
+        self.assertNotEqual(render_key('doc', 'v1', 'pdf', 'fp'), render_key('doc', 'v1', 'dwg', 'fp'))
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeCollection(object):
+    def __init__(self, cid, name):
+        self.Id = FakeId(cid)
+        self.Name = name
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero, collection_id, nom='Plan'):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = nom
+        self.SheetCollectionId = FakeId(collection_id)
+
+
+class FakeCfg(object):
+    def __init__(self, **values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+    PathName = 'C:/Projets/Projet.rvt'
+    IsModified = False
+
+
+class TestOrchestratorRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418cache_')
+        self.dest = os.path.join(self.tmp, 'out')
+        os.makedirs(self.dest)
+        self.orch = ExportOrchestrator()
+        self.sheets = [FakeSheet(11, 'A101', 1), FakeSheet(12, 'A102', 1)]
+        self.orch._index = DocumentSheetIndex.from_elements([FakeCollection(1, 'Jeu')], self.sheets)
+        self.orch._listing = self.orch._new_listing()
+        self.orch._open_render_cache(FakeDoc())
+        self.orch._render_cache = RenderCache(root=os.path.join(self.tmp, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _rendre(self, fmt):
+        """Simule un premier export Revit : fichiers écrits puis mis en cache."""
+        keys, paths = self.orch._render_keys(self.sheets, None, fmt, self.dest, True)
+        for sh, path in zip(self.sheets, paths):
+            _write(path, 'rendu {}'.format(sh.SheetNumber).encode('ascii'))
+        self.orch._store_rendered([(sh, True, p) for sh, p in zip(self.sheets, paths)], keys, {}, fmt)
+        for path in paths:
+            os.remove(path)
+        return paths
+
+    def test_feuilles_servies_sans_export(self):
+        paths = self._rendre('pdf')
+        results = self.orch._export_pdf_sheets(None, self.sheets, self.dest, None, overwrite=True)
+        self.assertEqual([(ok, p) for _sh, ok, p in results], [(True, p) for p in paths])
+        self.assertEqual(_read(paths[1]), b'rendu A102')
+        self.assertEqual(self.orch._render_cache.hits, 2)
+
+    def test_cle_differente_par_format(self):
+        self._rendre('pdf')
+        results = self.orch._export_dwg_sheets(None, self.sheets, self.dest, None, overwrite=True)
+        # Hors Revit, aucune feuille DWG n'est produite : pas de rendu PDF servi.
+        self.assertEqual([ok for _sh, ok, _p in results], [False, False])
+
+    def test_dwg_avec_rasters_non_mis_en_cache(self):
+        keys, paths = self.orch._render_keys(self.sheets, None, 'dwg', self.dest, True)
+        for path in paths:
+            _write(path, b'dwg')
+        self.orch._mark_rasters([paths[0]])
+        self.orch._store_rendered([(sh, True, p) for sh, p in zip(self.sheets, paths)], keys, {}, 'dwg')
+        self.assertIsNone(self.orch._render_cache.lookup(keys[0]))
+        self.assertIsNotNone(self.orch._render_cache.lookup(keys[1]))
+
+    def test_document_modifie_cles_propres_au_run(self):
+        doc = FakeDoc()
+        doc.IsModified = True
+        self.orch._open_render_cache(doc)
+        first = self.orch._render_ctx[1]
+        self.orch._open_render_cache(doc)
+        self.assertTrue(first.startswith('run:'))
+        self.assertNotEqual(first, self.orch._render_ctx[1])
+
+    def test_cache_desactive_par_la_config(self):
+        self.orch._cfg = FakeCfg(render_cache_mb='0')
+        self.orch._open_render_cache(FakeDoc())
+        self.assertIsNone(self.orch._render_cache)
+        self.assertEqual(self.orch._render_keys(self.sheets, None, 'pdf', self.dest, True),
+                         (None, None))
+
+
+class TestRenderCacheDossier(unittest.TestCase):
+    def setUp(self):
+        self._env = dict((k, os.environ.get(k)) for k in ('PY418_CONFIG_DIR', 'APPDATA'))
+        self.tmp = tempfile.mkdtemp(prefix='418appdata_')
+        os.environ.pop('PY418_CONFIG_DIR', None)
+        os.environ['APPDATA'] = self.tmp
+
+    def tearDown(self):
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_cache_par_defaut_dans_le_dossier_utilisateur(self):
+        from lib.core.AppPaths import AppPaths
+        from lib.services.core.RenderCache import CACHE_DIR_NAME
+        root = RenderCache().root
+        self.assertEqual(root, os.path.join(AppPaths().data_dir(), CACHE_DIR_NAME))
+        self.assertTrue(root.startswith(self.tmp))
+        self.assertFalse(os.path.abspath(root).startswith(_BUTTON))
+
+
+if __name__ == '__main__':
+    unittest.main()
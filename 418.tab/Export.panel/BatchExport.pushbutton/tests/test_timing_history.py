@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.ExportRunPlan import ExportItem
+from lib.services.core.ExportTrace import ExportTrace
+from lib.services.core.ProgressDispatcher import ProgressDispatcher
+from lib.services.core.TimingHistory import TimingHistory, size_class, plan_work, CARNET
+from lib.viewmodels.MainViewModel import MainViewModel, ManualSheetVM
+
+_MM = 1 / 304.8
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimingHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418timing_')
+        self.path = os.path.join(self.tmp, 'timings.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_classes_de_taille(self):
+        self.assertEqual(size_class(1189 * _MM, 841 * _MM), 'A0')
+        self.assertEqual(size_class(297 * _MM, 420 * _MM), 'A3')
+        self.assertEqual(size_class(500 * _MM, 500 * _MM), 'Custom')
+        self.assertEqual(size_class(0, 0), '')
+
+    def test_fenetre_glissante_bornee(self):
+        history = TimingHistory(self.path, window=3)
+        for seconds in (10, 1, 2, 3):
+            history.add('Setup', 'pdf', 'A1', seconds)
+        self.assertEqual(history.samples['Setup|pdf|A1'], [1.0, 2.0, 3.0])
+        self.assertEqual(history.estimate('Setup', 'pdf', 'A1'), 2.0)
+
+    def test_replis_d_estimation(self):
+        history = TimingHistory(self.path)
+        history.add('Setup A', 'pdf', 'A1', 4.0)
+        history.add('Setup B', 'pdf', 'A3', 1.0)
+        self.assertEqual(history.estimate('Setup C', 'pdf', 'A1'), 4.0)   # même taille
+        self.assertEqual(history.estimate('Setup B', 'pdf', 'A0'), 1.0)   # même setup
+        self.assertEqual(history.estimate('Setup C', 'pdf', 'A0'), 2.5)   # même format
+        self.assertIsNone(history.estimate('Setup A', 'dwg', 'A1'))
+
+    def test_prevision_et_feuilles_inconnues(self):
+        history = TimingHistory(self.path)
+        history.add('S', 'pdf', 'A1', 3.0)
+        self.assertEqual(history.predict([('S', 'pdf', 'A1', 1), ('S', 'pdf', 'A1', 1),
+                                          ('S', 'dwg', 'A1', 4)]), (6.0, 4))
+        self.assertEqual(history.predict([('S', 'dwg', 'A1', 1)]), (None, 1))
+
+    def test_mesures_tirees_de_la_trace(self):
+        a101, a102, cached = [os.path.join(self.tmp, n) for n in ('A101.pdf', 'A102.pdf', 'A103.pdf')]
+        outputs = dict((os.path.normcase(p), (size, 1)) for p, size in ((a101, 'A1'), (a102, 'A3'), (cached, 'A1')))
+        records = [
+            {'fmt': 'pdf', 'status': 'ok', 'stages': {'export': 5.0}, 'total': 6.0, 'paths': [a101, a102]},
+            {'fmt': 'pdf', 'status': 'ok', 'stages': {'cache': 0.1}, 'total': 0.1, 'paths': [cached]},
+            {'fmt': 'pdf', 'status': 'error', 'stages': {'export': 9.0}, 'total': 9.0, 'paths': []},
+        ]
+        history = TimingHistory(self.path)
+        self.assertEqual(history.record_trace(records, outputs, {'pdf': 'S'}), 2)
+        self.assertEqual(history.samples, {'S|pdf|A1': [3.0], 'S|pdf|A3': [3.0]})
+        self.assertTrue(history.save())
+        self.assertEqual(len(TimingHistory(self.path)), 2)
+
+    def test_chemin_par_defaut_dans_le_dossier_de_donnees(self):
+        from lib.core.AppPaths import data_dir
+        from lib.services.core.TimingHistory import HISTORY_FILE_NAME
+        self.assertEqual(TimingHistory().path, os.path.join(data_dir(), HISTORY_FILE_NAME))
+
+    def test_travail_depuis_le_plan(self):
+        items = [ExportItem('k1', 'Jeu', 'pdf', 'a.pdf', sheet=object()),
+                 ExportItem('k2', 'Jeu', 'pdf', 'jeu.pdf', group='Jeu', sheets=[object(), object()])]
+        self.assertEqual(plan_work(items, {'pdf': 'S'}), [('S', 'pdf', '', 1), ('S', 'pdf', CARNET, 2)])
+        self.assertEqual(plan_work(items, {'pdf': 'S'}, assembled_carnets=True), [('S', 'pdf', '', 1)])
+
+
+class TestOrchestratorTimings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418timing_')
+        self.orch = ExportOrchestrator()
+        self.clock = FakeClock()
+        self.orch._trace = ExportTrace(path=os.path.join(self.tmp, 'trace.jsonl'), clock=self.clock)
+        self.history = TimingHistory(os.path.join(self.tmp, 'timings.json'))
+        self.orch._timings = (self.history, {'pdf': 'Setup', 'dwg': None}, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_historique_alimente_en_fin_de_run(self):
+        path = os.path.join(self.tmp, 'A101.pdf')
+        item = self.orch._trace_item('pdf', 'A101')
+        item.start('export')
+        self.clock.now += 4.0
+        item.stop('export')
+        item.finish(path)
+        self.orch._note_timing(True, path, 'A1')
+        self.orch._close_timings()
+        self.assertIsNone(self.orch._timings)
+        self.assertEqual(TimingHistory(self.history.path).samples, {'Setup|pdf|A1': [4.0]})
+
+    def test_duree_prevue_transmise_a_la_progression(self):
+        self.history.add('Setup', 'pdf', '', 2.0)
+        disp = ProgressDispatcher(lambda *a: None)
+        items = [ExportItem('k{}'.format(n), 'Jeu', 'pdf', '{}.pdf'.format(n), sheet=object()) for n in range(3)]
+        self.orch._progress_predicted(disp, self.orch._predict_items(items))
+        self.assertEqual(disp.predicted_seconds, 6.0)
+
+
+class TestProgressDispatcherPrevision(unittest.TestCase):
+    def test_prevision_puis_debit_mesure(self):
+        clock = FakeClock()
+        disp = ProgressDispatcher(lambda *a: None, clock=clock)
+        disp.planned(10)
+        disp.predicted(100.0)
+        self.assertEqual(disp.describe(), u'reste ~1 min 40')
+        disp.item_done('pdf', 5)
+        clock.now += 60.0
+        self.assertAlmostEqual(disp.eta(), 60.0)  # 5 restants à 5/min
+
+
+class FakeElem(object):
+    SheetNumber = u'01'
+    Name = u'Feuille'
+
+
+class CountingHistory(object):
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, work):
+        self.calls += 1
+        return 60.0, 0
+
+
+class TestMainViewModelDureeEstimee(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(TimingHistory().path):
+            os.remove(TimingHistory().path)
+        self.vm = MainViewModel(doc=None)
+        self.vm.set_mode(u'manual')
+        self.vm._sheets_manuel = [ManualSheetVM(u'0{}'.format(n), u'F', elem=FakeElem(), export_pdf=True)
+                                  for n in range(3)]
+
+    def test_sans_historique(self):
+        self.assertEqual(self.vm.DureeEstimee, u'Durée estimée : inconnue (aucun historique)')
+
+    def test_estimation_de_la_selection(self):
+        history = TimingHistory()
+        history.add(u'', 'pdf', '', 20.0)
+        history.save()
+        self.vm._timings = None
+        self.assertEqual(self.vm.DureeEstimee, u'Durée estimée : ~1 min 00')
+        self.vm.set_mode(u'settings')
+        self.assertEqual(self.vm.DureeEstimee, u'')
+
+    def test_estimation_recalculee_seulement_si_la_selection_change(self):
+        history = CountingHistory()
+        self.vm._timings = history
+        first = self.vm.DureeEstimee
+        self.vm.StatusText = u'autre notification'
+        self.vm.notify_property(u'DureeEstimee')
+        self.assertEqual(self.vm.DureeEstimee, first)
+        self.assertEqual(history.calls, 1)
+        self.vm._sheets_manuel[0].ExportPdf = False
+        self.vm._on_manual_sheet_change()
+        self.vm.DureeEstimee
+        self.assertEqual(history.calls, 2)
+        self.vm.CombinerPdf = not self.vm.CombinerPdf
+        self.vm.DureeEstimee
+        self.assertEqual(history.calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
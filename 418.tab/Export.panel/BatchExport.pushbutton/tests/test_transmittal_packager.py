@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SHARED_LIB = os.path.abspath(os.path.join(_HERE, '..', '..', '..', '..', 'lib'))
+if _SHARED_LIB not in sys.path:
+    sys.path.insert(0, _SHARED_LIB)
+_BUTTON = os.path.abspath(os.path.join(_HERE, '..'))
+if _BUTTON not in sys.path:
+    sys.path.insert(0, _BUTTON)
+
+# Isole la persistance UserConfig dans un dossier temporaire (jamais le config réel).
+import tempfile as _tf
+os.environ['PY418_CONFIG_DIR'] = _tf.mkdtemp(prefix='418test_')
+
+from lib.services.core.ExportOrchestrator import ExportOrchestrator
+from lib.services.core.PostExportPipeline import PostExportPipeline
+from lib.services.core.TransmittalPackager import TransmittalPackager, MANIFEST_NAME, csv_line
+
+
+def _write(path, data):
+    folder = os.path.dirname(path)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+    return path
+
+
+def _manifest(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        text = zf.read(MANIFEST_NAME).decode('utf-8-sig')
+    return [line.split(',') for line in text.strip().split('\r\n')]
+
+
+class TestTransmittalPackager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418zip_')
+        self.zip_path = os.path.join(self.tmp, 'Diffusion.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_contenu_et_bordereau(self):
+        pdf = _write(os.path.join(self.tmp, 'PDF', 'A101.pdf'), b'%PDF A101')
+        dwg = _write(os.path.join(self.tmp, 'DWG', 'A101.dwg'), b'AC1032' * 100)
+        pk = TransmittalPackager(self.zip_path, self.tmp)
+        self.assertEqual(pk.add(pdf, 'A101', 'B'), hashlib.sha256(b'%PDF A101').hexdigest())
+        pk.add(dwg, 'A101', 'B')
+        self.assertEqual(pk.close(), 2)
+        self.assertFalse(os.path.exists(pk.part_path))
+        with zipfile.ZipFile(self.zip_path) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['DWG/A101.dwg', 'PDF/A101.pdf', MANIFEST_NAME])
+            self.assertEqual(zf.read('DWG/A101.dwg'), b'AC1032' * 100)
+        rows = _manifest(self.zip_path)
+        self.assertEqual(rows[0][0], 'Nom')
+        self.assertEqual(rows[2], ['PDF/A101.pdf', 'A101', 'B', '9',
+                                   hashlib.sha256(b'%PDF A101').hexdigest()])
+
+    def test_fichier_ajoute_une_seule_fois(self):
+        pdf = _write(os.path.join(self.tmp, 'A101.pdf'), b'x')
+        pk = TransmittalPackager(self.zip_path, self.tmp)
+        pk.add(pdf)
+        self.assertIsNone(pk.add(pdf))
+        self.assertEqual(pk.close(), 1)
+
+    def test_hors_racine_nom_simple(self):
+        other = tempfile.mkdtemp(prefix='418zip_')
+        try:
+            pk = TransmittalPackager(self.zip_path, self.tmp)
+            self.assertEqual(pk.arcname(os.path.join(other, 'A101.pdf')), 'A101.pdf')
+        finally:
+            shutil.rmtree(other, ignore_errors=True)
+
+    def test_rien_ajoute_pas_d_archive(self):
+        pk = TransmittalPackager(self.zip_path, self.tmp)
+        self.assertEqual(pk.close(), 0)
+        self.assertFalse(os.path.exists(self.zip_path))
+
+    def test_abandon_supprime_le_temporaire(self):
+        pk = TransmittalPackager(self.zip_path, self.tmp)
+        pk.add(_write(os.path.join(self.tmp, 'A101.pdf'), b'x'))
+        self.assertTrue(os.path.exists(pk.part_path))
+        pk.abort()
+        self.assertFalse(os.path.exists(pk.part_path))
+        self.assertFalse(os.path.exists(self.zip_path))
+        with self.assertRaises(IOError):
+            pk.add(os.path.join(self.tmp, 'A101.pdf'))
+
+    def test_fichier_absent_leve(self):
+        pk = TransmittalPackager(self.zip_path, self.tmp)
+        with self.assertRaises((IOError, OSError)):
+            pk.add(os.path.join(self.tmp, 'absent.pdf'))
+
+    def test_csv_echappe(self):
+        self.assertEqual(csv_line(['a,b', 'c"d', 3]), '"a,b","c""d",3\r\n')
+
+
+class FakeId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class FakeParam(object):
+    def __init__(self, value):
+        self.value = value
+
+    def AsString(self):
+        return self.value
+
+
+class FakeSheet(object):
+    def __init__(self, sid, numero, revision=u''):
+        self.Id = FakeId(sid)
+        self.SheetNumber = numero
+        self.Name = 'Plan'
+        self._revision = revision
+
+    def LookupParameter(self, name):
+        return FakeParam(self._revision) if name == 'Current Revision' else None
+
+
+class FakeDoc(object):
+    Title = 'Projet'
+
+
+class FakeItem(object):
+    def __init__(self, sheet, path, key=None):
+        self.sheet = sheet
+        self.path = path
+        self.key = key
+
+
+class TestOrchestratorTransmittal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='418zip_')
+        self.orch = ExportOrchestrator()
+        self.orch._destination_override = self.tmp
+        self.logs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _zips(self):
+        return sorted(n for n in os.listdir(self.tmp) if n.endswith('.zip'))
+
+    def test_portee_lue_depuis_la_valeur(self):
+        self.assertEqual(self.orch._transmittal_scope('run'), 'run')
+        self.assertEqual(self.orch._transmittal_scope(True), 'collection')
+        self.assertIsNone(self.orch._transmittal_scope(False))
+        self.assertIsNone(self.orch._transmittal_scope(None))  # config par défaut : désactivé
+
+    def test_un_zip_par_jeu_alimente_par_le_pipeline(self):
+        self.orch._post = PostExportPipeline(workers=2)
+        self.orch._open_transmittal(FakeDoc(), 'collection')
+        a = _write(os.path.join(self.tmp, 'A101.pdf'), b'a')
+        b = _write(os.path.join(self.tmp, 'B201.pdf'), b'b')
+        self.orch._package_results([(FakeSheet(1, 'A101', 'C'), True, a)], 'Jeu A')
+        self.orch._package_results([(FakeSheet(2, 'B201'), True, b), (FakeSheet(3, 'B202'), False, None)],
+                                   'Jeu B')
+        self.orch._drain_post(self.logs.append)
+        self.orch._close_transmittals(self.logs.append)
+        zips = self._zips()
+        self.assertEqual(len(zips), 2)
+        self.assertTrue(zips[0].startswith('Diffusion - Jeu A - '))
+        self.assertEqual(_manifest(os.path.join(self.tmp, zips[0]))[1][:3], ['A101.pdf', 'A101', 'C'])
+        self.assertEqual(len([l for l in self.logs if l.startswith('ZIP de diffusion')]), 2)
+
+    def test_zip_unique_pour_le_run(self):
+        self.orch._open_transmittal(FakeDoc(), 'run')
+        a = _write(os.path.join(self.tmp, 'A101.pdf'), b'a')
+        b = _write(os.path.join(self.tmp, 'B201.pdf'), b'b')
+        self.orch._package_results([(FakeSheet(1, 'A101'), True, a)], 'Jeu A')
+        self.orch._package_results([(FakeSheet(2, 'B201'), True, b)], 'Jeu B')
+        self.orch._close_transmittals(self.logs.append)
+        zips = self._zips()
+        self.assertEqual(len(zips), 1)
+        self.assertTrue(zips[0].startswith('Diffusion - Projet - '))
+        self.assertEqual(len(_manifest(os.path.join(self.tmp, zips[0]))), 3)
+
+    def test_sorties_sautees_incluses(self):
+        self.orch._open_transmittal(FakeDoc(), 'collection')
+        kept = _write(os.path.join(self.tmp, 'A101.pdf'), b'deja la')
+        items = [FakeItem(FakeSheet(1, 'A101'), kept), FakeItem(FakeSheet(2, 'A102'),
+                                                               os.path.join(self.tmp, 'A102.pdf'))]
+        self.orch._package_items('Jeu A', items, [items[1]], [(items[1].sheet, False, None)])
+        self.orch._close_transmittals()
+        rows = _manifest(os.path.join(self.tmp, self._zips()[0]))
+        self.assertEqual([r[0] for r in rows[1:]], ['A101.pdf'])
+
+    def test_run_interrompu_pas_de_zip(self):
+        self.orch._open_transmittal(FakeDoc(), 'run')
+        self.orch._package_results([(FakeSheet(1, 'A101'), True,
+                                     _write(os.path.join(self.tmp, 'A101.pdf'), b'a'))])
+        self.orch._close_transmittals(abort=True)
+        self.assertEqual(os.listdir(self.tmp), ['A101.pdf'])
+
+    def test_desactive_aucun_effet(self):
+        self.orch._open_transmittal(FakeDoc(), False)
+        self.orch._package_results([(FakeSheet(1, 'A101'), True,
+                                     _write(os.path.join(self.tmp, 'A101.pdf'), b'a'))])
+        self.orch._close_transmittals()
+        self.assertEqual(self._zips(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()